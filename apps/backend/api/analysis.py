@@ -8,7 +8,7 @@ from datetime import datetime
 import asyncio
 import logging
 
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field
 
@@ -25,6 +25,7 @@ from core.agents.websocket_integration import create_agent_notifier
 from core.websocket import manager
 from config.settings import settings
 from core.context import context_manager
+from core.jobs import enqueue_analysis, request_cancel
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +41,7 @@ class CreateAnalysisRequest(BaseModel):
         None,
         description="Specific sections to analyze per framework"
     )
+    priority: int = Field(0, description="Queue priority; higher runs first")
     metadata: Optional[Dict[str, Any]] = None
 
 
@@ -84,103 +86,199 @@ AGENT_REGISTRY = {
 }
 
 
+async def build_analysis_context(
+    analysis_id: UUID,
+    system_description: str,
+    project_id: UUID,
+    metadata: Optional[Dict[str, Any]] = None
+) -> AgentContext:
+    """Initialize the context manager for an analysis, or fall back to a basic context"""
+    try:
+        context = await context_manager.initialize_analysis_context(
+            analysis_id,
+            system_description,
+            existing_artifacts=None
+        )
+        context.metadata = metadata or {}
+        context.metadata['project_id'] = str(project_id)
+    except Exception as e:
+        logger.warning(f"Failed to initialize context manager: {e}")
+        # Fall back to basic context
+        context = AgentContext(
+            analysis_id=analysis_id,
+            system_description=system_description,
+            artifacts={},
+            metadata={**(metadata or {}), 'project_id': str(project_id)}
+        )
+    return context
+
+
+def _restore_artifacts(context: AgentContext, framework: FrameworkType, sections: List[Dict[str, Any]]):
+    """Put a stored result's sections in the context, as its agent would have"""
+    for section in sections or []:
+        if section.get("status") != AnalysisStatus.FAILED.value:
+            context.artifacts[f"{framework.value}_{section['section_id']}"] = section.get("content", {})
+
+
+async def _run_framework(
+    framework: FrameworkType,
+    analysis_id: str,
+    context: AgentContext,
+    section_ids: Optional[Dict[str, List[str]]],
+    notifier,
+    db: AsyncSession
+):
+    """Run one framework agent and store its result as soon as it finishes"""
+    from core.database import async_session_maker
+    
+    agent_class = AGENT_REGISTRY.get(framework)
+    if not agent_class:
+        logger.warning(f"No agent found for framework: {framework}")
+        return
+        
+    try:
+        framework_sections = section_ids.get(framework.value) if section_ids else None
+        
+        # STPA-Sec saves its control structure through the analysis session
+        if framework == FrameworkType.STPA_SEC:
+            agent = agent_class(db_session=db)
+            result = await agent.analyze(context, framework_sections, notifier, save_to_db=True)
+        else:
+            agent = agent_class()
+            result = await agent.analyze(context, framework_sections, notifier)
+        
+        # Frameworks run concurrently, so each writes through its own session
+        async with async_session_maker() as result_db:
+            result_db.add(DBAnalysisResult(
+                id=uuid4(),
+                analysis_id=UUID(analysis_id),
+                framework=framework,
+                sections=result.sections,
+                artifacts=result.artifacts,
+                duration=result.duration,
+                token_usage=result.token_usage
+            ))
+            await result_db.commit()
+            
+    except Exception as e:
+        logger.error(f"Error in {framework} agent: {e}", exc_info=True)
+        await notifier.notify_analysis_complete(
+            framework.value,
+            success=False,
+            error=str(e)
+        )
+
+
+async def _update_unless_cancelled(db: AsyncSession, analysis_id: UUID, **values) -> bool:
+    """
+    Update an analysis unless it was cancelled meanwhile; False if it was
+
+    ``cancel_analysis`` commits from another session while the agents run,
+    so the status is checked in the UPDATE rather than on a loaded object.
+    """
+    from sqlalchemy import update
+    result = await db.execute(
+        update(Analysis)
+        .where(Analysis.id == analysis_id, Analysis.status != AnalysisStatus.CANCELLED)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
 async def run_analysis_task(
     analysis_id: str,
     context: AgentContext,
     frameworks: List[FrameworkType],
-    section_ids: Optional[Dict[str, List[str]]] = None
-):
-    """Background task to run analysis"""
-    logger.info(f"Background task started for analysis {analysis_id}")
+    section_ids: Optional[Dict[str, List[str]]] = None,
+    broadcaster=None
+) -> AnalysisStatus:
+    """
+    Run an analysis's framework agents; returns its final status
+    
+    STPA-Sec runs first because the other agents read its control
+    structure from the context; the rest then run concurrently, with LLM
+    calls bounded by the LLM manager's budget. Frameworks that already
+    have a result, from an earlier attempt at this analysis, are skipped;
+    a stored STPA-Sec result still provides the context's artifacts. An
+    analysis cancelled before or during the run stays cancelled.
+    """
+    logger.info(f"Analysis task started for analysis {analysis_id}")
     from core.database import async_session_maker
-    notifier = create_agent_notifier(analysis_id)
+    from sqlalchemy import select
+    notifier = create_agent_notifier(analysis_id, broadcaster)
+    analysis_uuid = UUID(analysis_id)
     
     async with async_session_maker() as db:
         try:
             logger.info(f"Updating analysis status to IN_PROGRESS for {analysis_id}")
             # Update analysis status
-            analysis = await db.get(Analysis, analysis_id)
-            analysis.status = AnalysisStatus.IN_PROGRESS
-            analysis.started_at = datetime.utcnow()
-            await db.commit()
+            if not await _update_unless_cancelled(db, analysis_uuid, status=AnalysisStatus.IN_PROGRESS,
+                                                  started_at=datetime.utcnow()):
+                logger.info(f"Analysis {analysis_id} was cancelled before it started")
+                return AnalysisStatus.CANCELLED
             
-            # Run each framework agent
-            for framework in frameworks:
-                agent_class = AGENT_REGISTRY.get(framework)
-                if not agent_class:
-                    logger.warning(f"No agent found for framework: {framework}")
-                    continue
-                    
-                try:
-                    # Pass database session to STPA-Sec agent
-                    if framework == FrameworkType.STPA_SEC:
-                        agent = agent_class(db_session=db)
-                    else:
-                        agent = agent_class()
-                    
-                    framework_sections = section_ids.get(framework.value) if section_ids else None
-                    
-                    # Run agent with WebSocket notifications
-                    # Enable database saving for STPA-Sec
-                    if framework == FrameworkType.STPA_SEC:
-                        result = await agent.analyze(context, framework_sections, notifier, save_to_db=True)
-                    else:
-                        result = await agent.analyze(context, framework_sections, notifier)
-                    
-                    # Store result in database
-                    db_result = DBAnalysisResult(
-                        id=uuid4(),
-                        analysis_id=analysis_id,
-                        framework=framework,
-                        sections=result.sections,
-                        artifacts=result.artifacts,
-                        duration=result.duration,
-                        token_usage=result.token_usage
-                    )
-                    db.add(db_result)
-                    
-                except Exception as e:
-                    logger.error(f"Error in {framework} agent: {e}", exc_info=True)
-                    await notifier.notify_analysis_complete(
-                        framework.value,
-                        success=False,
-                        error=str(e)
+            completed = set((await db.execute(
+                select(DBAnalysisResult.framework).where(DBAnalysisResult.analysis_id == analysis_uuid)
+            )).scalars())
+            if completed:
+                logger.info(f"Analysis {analysis_id} already has results for "
+                            f"{', '.join(f.value for f in completed)}")
+            pending = [f for f in dict.fromkeys(frameworks) if f not in completed]
+            
+            if FrameworkType.STPA_SEC in pending:
+                await _run_framework(FrameworkType.STPA_SEC, analysis_id, context, section_ids, notifier, db)
+            elif FrameworkType.STPA_SEC in completed:
+                # The other agents read STPA-Sec's sections from the context
+                stpa_sections = await db.scalar(
+                    select(DBAnalysisResult.sections).where(
+                        DBAnalysisResult.analysis_id == analysis_uuid,
+                        DBAnalysisResult.framework == FrameworkType.STPA_SEC
                     )
+                )
+                _restore_artifacts(context, FrameworkType.STPA_SEC, stpa_sections)
+            await asyncio.gather(*(
+                _run_framework(framework, analysis_id, context, section_ids, notifier, db)
+                for framework in pending if framework != FrameworkType.STPA_SEC
+            ))
                     
             # Update analysis status
-            analysis.status = AnalysisStatus.COMPLETED
-            analysis.completed_at = datetime.utcnow()
-            await db.commit()
+            status = AnalysisStatus.COMPLETED
+            if not await _update_unless_cancelled(db, analysis_uuid, status=status,
+                                                  completed_at=datetime.utcnow()):
+                logger.info(f"Analysis {analysis_id} was cancelled while running")
+                status = AnalysisStatus.CANCELLED
             
             # Clean up context manager
             try:
-                await context_manager.cleanup_analysis_context(UUID(analysis_id))
+                await context_manager.cleanup_analysis_context(analysis_uuid)
             except Exception as e:
                 logger.warning(f"Failed to cleanup context manager: {e}")
+            return status
             
         except Exception as e:
             logger.error(f"Error in analysis task: {e}", exc_info=True)
             # Update analysis status to failed
-            analysis = await db.get(Analysis, analysis_id)
-            if analysis:
-                analysis.status = AnalysisStatus.FAILED
-                analysis.error_message = str(e)
-                await db.commit()
+            await db.rollback()
+            status = AnalysisStatus.FAILED
+            if not await _update_unless_cancelled(db, analysis_uuid, status=status, error_message=str(e)):
+                status = AnalysisStatus.CANCELLED
                 
             # Clean up context manager on failure
             try:
-                await context_manager.cleanup_analysis_context(UUID(analysis_id))
+                await context_manager.cleanup_analysis_context(analysis_uuid)
             except Exception as e:
                 logger.warning(f"Failed to cleanup context manager: {e}")
+            return status
 
 
 @router.post("/", response_model=SimpleAnalysisResponse)
 async def create_analysis(
     request: CreateAnalysisRequest,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db)
 ):
-    """Create and start a new analysis"""
+    """Create a new analysis and queue it for the analysis workers"""
     from core.models.database import Project, User
     
     # Check if project exists, if not create a default one
@@ -223,37 +321,21 @@ async def create_analysis(
         metadata=request.metadata or {}
     )
     db.add(analysis)
-    await db.commit()
-    
-    # Initialize context manager for this analysis
-    try:
-        context = await context_manager.initialize_analysis_context(
-            analysis.id,
-            request.system_description,
-            existing_artifacts=None
-        )
-        context.metadata = request.metadata or {}
-        context.metadata['project_id'] = str(request.project_id)
-    except Exception as e:
-        logger.warning(f"Failed to initialize context manager: {e}")
-        # Fall back to basic context
-        context = AgentContext(
-            analysis_id=analysis.id,
-            system_description=request.system_description,
-            artifacts={},
-            metadata={**(request.metadata or {}), 'project_id': str(request.project_id)}
-        )
     
-    # Start analysis in background
-    logger.info(f"Starting background task for analysis {analysis.id}")
-    background_tasks.add_task(
-        run_analysis_task,
-        str(analysis.id),
-        context,
-        request.frameworks,
-        request.section_ids
+    # Committed together with the analysis; workers build the agent
+    # context and run the frameworks
+    await enqueue_analysis(
+        db,
+        analysis,
+        tenant_id=project.owner_id,
+        payload={
+            "frameworks": [framework.value for framework in request.frameworks],
+            "section_ids": request.section_ids,
+            "metadata": request.metadata or {}
+        },
+        priority=request.priority
     )
-    logger.info(f"Background task queued for analysis {analysis.id}")
+    logger.info(f"Queued analysis {analysis.id} with priority {request.priority}")
     
     return SimpleAnalysisResponse(
         id=analysis.id,
@@ -368,8 +450,10 @@ async def cancel_analysis(
             detail="Can only cancel pending or in-progress analyses"
         )
         
-    # Update status
+    # Update status and jobs together; workers stop running jobs at their
+    # next heartbeat
     analysis.status = AnalysisStatus.CANCELLED
+    await request_cancel(db, analysis_id)
     await db.commit()
     
     # Notify via WebSocket
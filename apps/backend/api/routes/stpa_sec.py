@@ -1,16 +1,22 @@
 """
 STPA-Sec specific API routes for database operations
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Header, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from .stpa_sec_db import get_sync_db
+from .stpa_sec_db import get_sync_db, run_in_db_pool
+from .stpa_sec_pagination import (
+    Collection, CollectionField, collection_response, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+)
 from storage.repositories.stpa_sec import STPASecRepository
 from src.database.stpa_sec_models import (
     SystemDefinition, Loss, Hazard, Entity, Relationship,
     Scenario, Mitigation, Adversary, ScenarioMitigation
 )
+from src.database.relationship_modeling import RelationshipModeler, CONTROL_LOOP_ISSUES
+from src.database.analytics_views import list_analytics_views, read_analytics_view
 from pydantic import BaseModel
 
 
@@ -101,142 +107,228 @@ class MitigationResponse(BaseModel):
 @router.get("/system-definition", response_model=Optional[SystemDefinitionResponse])
 async def get_system_definition(db: Session = Depends(get_sync_db)):
     """Get the current system definition"""
-    repo = STPASecRepository(db)
-    system_def = repo.get_system_definition()
-    return system_def
+    def load():
+        repo = STPASecRepository(db)
+        system_def = repo.get_system_definition()
+        return system_def
+        
+    return await run_in_db_pool(load)
+
+
+# Collection endpoints share keyset pagination on id, ``fields=`` projection
+# and NDJSON streaming for ``Accept: application/x-ndjson``
+def _properties(name: str, default: Any):
+    return lambda properties: properties.get(name, default) if properties else default
+
+
+LOSSES = Collection(Loss.id, {
+    "id": CollectionField(Loss.id),
+    "description": CollectionField(Loss.description),
+    "impact_type": CollectionField(Loss.impact_type),
+    "severity": CollectionField(Loss.severity),
+    "stakeholder_refs": CollectionField(Loss.stakeholder_refs),
+})
+
+HAZARDS = Collection(Hazard.id, {
+    "id": CollectionField(Hazard.id),
+    "description": CollectionField(Hazard.description),
+    "loss_refs": CollectionField(Hazard.loss_refs),
+    "worst_case_scenario": CollectionField(Hazard.worst_case_scenario),
+    "likelihood": CollectionField(Hazard.likelihood),
+    "detection_difficulty": CollectionField(Hazard.detection_difficulty),
+})
+
+ENTITIES = Collection(Entity.id, {
+    "id": CollectionField(Entity.id),
+    "name": CollectionField(Entity.name),
+    "type": CollectionField(Entity.properties, _properties('type', 'unknown')),
+    "description": CollectionField(Entity.description),
+    "responsibilities": CollectionField(Entity.properties, _properties('responsibilities', [])),
+})
+
+RELATIONSHIPS = Collection(Relationship.id, {
+    "id": CollectionField(Relationship.id),
+    "source_id": CollectionField(Relationship.source_id),
+    "target_id": CollectionField(Relationship.target_id),
+    "type": CollectionField(Relationship.type),
+    "control_actions": CollectionField(Relationship.properties, _properties('control_actions', [])),
+    "feedback_info": CollectionField(Relationship.properties, _properties('feedback_info', [])),
+})
+
+SCENARIOS = Collection(Scenario.id, {
+    "id": CollectionField(Scenario.id),
+    "description": CollectionField(Scenario.description),
+    "likelihood": CollectionField(Scenario.likelihood),
+    "impact": CollectionField(Scenario.impact),
+    "hazard_refs": CollectionField(Scenario.hazard_refs),
+    "threat_actor_refs": CollectionField(Scenario.threat_actor_refs),
+    "attack_chain": CollectionField(Scenario.attack_chain),
+})
+
+MITIGATIONS = Collection(Mitigation.id, {
+    "id": CollectionField(Mitigation.id),
+    "name": CollectionField(Mitigation.name),
+    "description": CollectionField(Mitigation.description),
+    "type": CollectionField(Mitigation.type),
+    "effectiveness": CollectionField(Mitigation.effectiveness),
+})
+
+FIELDS_QUERY = Query(None, description="Comma-separated fields to return")
+CURSOR_QUERY = Query(None, description="X-Next-Cursor of the previous page")
+LIMIT_QUERY = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
 
 
 @router.get("/losses", response_model=List[LossResponse])
 async def get_losses(
+    request: Request,
     stakeholder_id: Optional[str] = Query(None, description="Filter by stakeholder"),
+    fields: Optional[str] = FIELDS_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
+    limit: int = LIMIT_QUERY,
     db: Session = Depends(get_sync_db)
 ):
-    """Get all losses, optionally filtered by stakeholder"""
-    repo = STPASecRepository(db)
-    
-    if stakeholder_id:
-        losses = repo.get_losses_for_stakeholder(stakeholder_id)
-    else:
-        losses = db.query(Loss).all()
+    """Get losses, optionally filtered by stakeholder"""
+    def refine(query):
+        if stakeholder_id:
+            query = query.where(Loss.stakeholder_refs.any(stakeholder_id))
+        return query
     
-    return losses
+    return await collection_response(request, db, LOSSES, refine, fields, cursor, limit)
 
 
 @router.get("/hazards", response_model=List[HazardResponse])
 async def get_hazards(
+    request: Request,
     loss_id: Optional[str] = Query(None, description="Filter by loss"),
+    fields: Optional[str] = FIELDS_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
+    limit: int = LIMIT_QUERY,
     db: Session = Depends(get_sync_db)
 ):
-    """Get all hazards, optionally filtered by loss"""
-    repo = STPASecRepository(db)
-    
-    if loss_id:
-        hazards = repo.get_hazards_for_loss(loss_id)
-    else:
-        hazards = db.query(Hazard).all()
+    """Get hazards, optionally filtered by loss"""
+    def refine(query):
+        if loss_id:
+            query = query.where(Hazard.loss_refs.any(loss_id))
+        return query
     
-    return hazards
+    return await collection_response(request, db, HAZARDS, refine, fields, cursor, limit)
 
 
 @router.get("/control-structure", response_model=Dict[str, Any])
 async def get_control_structure(db: Session = Depends(get_sync_db)):
     """Get the complete control structure with entities and relationships"""
-    repo = STPASecRepository(db)
-    control_structure = repo.get_control_structure()
-    return control_structure
+    def load():
+        repo = STPASecRepository(db)
+        control_structure = repo.get_control_structure()
+        return control_structure
+        
+    return await run_in_db_pool(load)
 
 
 @router.get("/entities", response_model=List[EntityResponse])
 async def get_entities(
+    request: Request,
     entity_type: Optional[str] = Query(None, description="Filter by type: controller, actuator, sensor, process"),
+    fields: Optional[str] = FIELDS_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
+    limit: int = LIMIT_QUERY,
     db: Session = Depends(get_sync_db)
 ):
-    """Get all entities in the control structure"""
-    query = db.query(Entity)
-    
-    # Filter by type from properties JSON field if specified
-    if entity_type:
-        query = query.filter(Entity.properties['type'].astext == entity_type.lower())
-    
-    entities = query.all()
+    """Get entities in the control structure"""
+    def refine(query):
+        # Filter by type from properties JSON field if specified
+        if entity_type:
+            query = query.where(Entity.properties['type'].as_string() == entity_type.lower())
+        return query
     
-    # Transform entities to match the response model
-    entity_responses = []
-    for entity in entities:
-        entity_data = {
-            "id": entity.id,
-            "name": entity.name,
-            "description": entity.description,
-            "type": entity.properties.get('type', 'unknown') if entity.properties else 'unknown',
-            "responsibilities": entity.properties.get('responsibilities', []) if entity.properties else []
-        }
-        entity_responses.append(EntityResponse(**entity_data))
-    
-    return entity_responses
+    return await collection_response(request, db, ENTITIES, refine, fields, cursor, limit)
 
 
 @router.get("/relationships", response_model=List[RelationshipResponse])
 async def get_relationships(
+    request: Request,
     entity_id: Optional[str] = Query(None, description="Filter by entity (as source or target)"),
     relationship_type: Optional[str] = Query(None, description="Filter by type: control, feedback"),
+    fields: Optional[str] = FIELDS_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
+    limit: int = LIMIT_QUERY,
     db: Session = Depends(get_sync_db)
 ):
     """Get relationships between entities"""
-    query = db.query(Relationship)
-    
-    if entity_id:
-        query = query.filter(
-            (Relationship.source_id == entity_id) | 
-            (Relationship.target_id == entity_id)
-        )
+    def refine(query):
+        if entity_id:
+            query = query.where(
+                (Relationship.source_id == entity_id) | 
+                (Relationship.target_id == entity_id)
+            )
+        if relationship_type:
+            query = query.where(Relationship.type == relationship_type.lower())
+        return query
+    
+    return await collection_response(request, db, RELATIONSHIPS, refine, fields, cursor, limit)
+
+
+@router.get("/control-loops", response_model=Dict[str, Any])
+async def get_control_loops(
+    issue_type: Optional[str] = Query(None, description="Filter by issue: missing_feedback, stale_process_model"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_sync_db)
+):
+    """Get control loop analyses, one page at a time"""
+    if issue_type and issue_type.lower() not in CONTROL_LOOP_ISSUES:
+        raise HTTPException(status_code=400, detail=f"Unknown issue type: {issue_type}")
     
-    if relationship_type:
-        query = query.filter(Relationship.type == relationship_type.lower())
+    def load():
+        modeler = RelationshipModeler(db)
+        return modeler.control_loop_report(issue_type.lower() if issue_type else None, offset, limit)
     
-    relationships = query.all()
-    return relationships
+    return await run_in_db_pool(load)
 
 
 @router.get("/scenarios", response_model=List[ScenarioResponse])
 async def get_scenarios(
+    request: Request,
     likelihood: Optional[str] = Query(None, description="Filter by likelihood"),
     impact: Optional[str] = Query(None, description="Filter by impact"),
+    fields: Optional[str] = FIELDS_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
+    limit: int = LIMIT_QUERY,
     db: Session = Depends(get_sync_db)
 ):
     """Get loss scenarios, optionally filtered by risk parameters"""
-    query = db.query(Scenario)
+    def refine(query):
+        if likelihood:
+            query = query.where(Scenario.likelihood == likelihood.lower())
+        if impact:
+            query = query.where(Scenario.impact == impact.lower())
+        return query
     
-    if likelihood:
-        query = query.filter(Scenario.likelihood == likelihood.lower())
-    
-    if impact:
-        query = query.filter(Scenario.impact == impact.lower())
-    
-    scenarios = query.all()
-    
-    return scenarios
+    return await collection_response(request, db, SCENARIOS, refine, fields, cursor, limit)
 
 
 @router.get("/mitigations", response_model=List[MitigationResponse])
 async def get_mitigations(
+    request: Request,
     scenario_id: Optional[str] = Query(None, description="Filter by scenario"),
     effectiveness: Optional[str] = Query(None, description="Filter by effectiveness"),
+    fields: Optional[str] = FIELDS_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
+    limit: int = LIMIT_QUERY,
     db: Session = Depends(get_sync_db)
 ):
     """Get mitigations, optionally filtered"""
-    query = db.query(Mitigation)
-    
-    if scenario_id:
-        # Join with ScenarioMitigation to filter by scenario
-        query = query.join(ScenarioMitigation).filter(
-            ScenarioMitigation.scenario_id == scenario_id
-        )
+    def refine(query):
+        if scenario_id:
+            # Join with ScenarioMitigation to filter by scenario
+            query = query.join(ScenarioMitigation).where(
+                ScenarioMitigation.scenario_id == scenario_id
+            )
+        if effectiveness:
+            query = query.where(Mitigation.effectiveness == effectiveness.lower())
+        return query
     
-    if effectiveness:
-        query = query.filter(Mitigation.effectiveness == effectiveness.lower())
-    
-    mitigations = query.all()
-    return mitigations
+    return await collection_response(request, db, MITIGATIONS, refine, fields, cursor, limit)
 
 
 @router.get("/adversaries", response_model=List[Dict[str, Any]])
@@ -245,78 +337,98 @@ async def get_adversaries(
     db: Session = Depends(get_sync_db)
 ):
     """Get adversary profiles"""
-    query = db.query(Adversary)
-    
-    if sophistication:
-        query = query.filter(Adversary.technical_sophistication == sophistication.lower())
-    
-    adversaries = query.all()
-    
-    return [
-        {
-            "id": adv.id,
-            "name": adv.name,
-            "type": adv.type,
-            "technical_sophistication": adv.technical_sophistication,
-            "resources": adv.resources,
-            "primary_motivation": adv.primary_motivation,
-            "capabilities": adv.capabilities,
-            "ttps": adv.ttps
-        }
-        for adv in adversaries
-    ]
+    def load():
+        query = db.query(Adversary)
+        
+        if sophistication:
+            query = query.filter(Adversary.technical_sophistication == sophistication.lower())
+        
+        adversaries = query.all()
+        
+        return [
+            {
+                "id": adv.id,
+                "name": adv.name,
+                "type": adv.type,
+                "technical_sophistication": adv.technical_sophistication,
+                "resources": adv.resources,
+                "primary_motivation": adv.primary_motivation,
+                "capabilities": adv.capabilities,
+                "ttps": adv.ttps
+            }
+            for adv in adversaries
+        ]
+        
+    return await run_in_db_pool(load)
+
+
+@router.get("/analytics", response_model=List[Dict[str, Any]])
+async def get_analytics_views(db: Session = Depends(get_sync_db)):
+    """List the materialized analytics views and when each was refreshed"""
+    def load():
+        return list_analytics_views(db)
+        
+    return await run_in_db_pool(load)
+
+
+@router.get("/analytics/{view_name}", response_model=Dict[str, Any])
+async def get_analytics_view(
+    view_name: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_sync_db)
+):
+    """Get rows of an analytics view with a staleness indicator"""
+    def load():
+        try:
+            return read_analytics_view(db, view_name, limit=limit, offset=offset)
+        except ValueError:
+            raise HTTPException(status_code=404, detail=f"Unknown analytics view: {view_name}") from None
+        
+    return await run_in_db_pool(load)
+
+
+# Latest risk summary as (version, ETag, body); a write bumps the version.
+# One entry is enough: the summary reads the hazard, scenario and mitigation
+# tables, which have no analysis column, so every caller gets the same body.
+_risk_summary_cache: Optional[Tuple[int, str, Dict[str, Any]]] = None
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check: ``*`` or any listed tag, compared weakly"""
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == opaque for tag in if_none_match.split(','))
 
 
 @router.get("/risk-summary", response_model=Dict[str, Any])
-async def get_risk_summary(db: Session = Depends(get_sync_db)):
+async def get_risk_summary(
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_sync_db)
+):
     """Get a summary of the current risk posture"""
-    # Count critical items
-    critical_hazards = db.query(Hazard).count()
-    high_risk_scenarios = db.query(Scenario).filter(
-        (Scenario.impact == 'catastrophic') | (Scenario.impact == 'major')
-    ).count()
-    
-    total_scenarios = db.query(Scenario).count()
-    total_mitigations = db.query(Mitigation).count()
-    
-    # Risk distribution
-    risk_distribution = {
-        "critical": db.query(Scenario).filter(Scenario.impact == 'catastrophic').count(),
-        "high": db.query(Scenario).filter(Scenario.impact == 'major').count(),
-        "medium": db.query(Scenario).filter(Scenario.impact == 'moderate').count(),
-        "low": db.query(Scenario).filter(Scenario.impact == 'minor').count(),
-    }
-    
-    # Mitigation coverage
-    mitigated_scenarios = db.query(ScenarioMitigation.scenario_id).distinct().count()
-    coverage_percentage = (mitigated_scenarios / total_scenarios * 100) if total_scenarios > 0 else 0
-    
-    # Get top risks and convert to dictionaries
-    top_risk_scenarios = db.query(Scenario).filter(
-        (Scenario.impact == 'catastrophic') | (Scenario.impact == 'major')
-    ).limit(5).all()
-    
-    top_risks = [
-        {
-            "scenario_id": scenario.id,
-            "description": scenario.description,
-            "impact": scenario.impact,
-            "likelihood": scenario.likelihood
-        }
-        for scenario in top_risk_scenarios
-    ]
-    
-    return {
-        "summary": {
-            "total_hazards": critical_hazards,
-            "high_risk_scenarios": high_risk_scenarios,
-            "total_scenarios": total_scenarios,
-            "total_mitigations": total_mitigations,
-            "mitigation_coverage": coverage_percentage
-        },
-        "risk_distribution": risk_distribution,
-        "top_risks": top_risks
-    }
+    def load():
+        global _risk_summary_cache
+        repo = STPASecRepository(db)
+        
+        version = repo.get_risk_summary_version()
+        if version is None:
+            # Nothing would invalidate a cached copy
+            return None, repo.get_risk_summary()
+        cached = _risk_summary_cache
+        if cached is None or cached[0] != version:
+            cached = _risk_summary_cache = (version, f'W/"risk-summary-{version}"', repo.get_risk_summary())
+        return cached[1:]
+    
+    etag, summary = await run_in_db_pool(load)
+    if etag is None:
+        return JSONResponse(content=summary, headers={"Cache-Control": "no-store"})
+    
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=summary, headers=headers)
 
 
 @router.post("/export")
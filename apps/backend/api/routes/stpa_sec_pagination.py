@@ -0,0 +1,124 @@
+"""
+Keyset pagination, field projection and NDJSON streaming for STPA-Sec collections
+"""
+import base64
+import json
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement, Select
+
+from .stpa_sec_db import run_in_db_pool
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Rows fetched from the server-side cursor per round trip while streaming
+STREAM_BATCH_SIZE = 500
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+@dataclass
+class CollectionField:
+    """A response field read from one column, optionally transformed"""
+    column: ColumnElement
+    transform: Optional[Callable[[Any], Any]] = None
+
+
+@dataclass
+class Collection:
+    """Fields of a collection endpoint, in response order, sorted by ``key``"""
+    key: ColumnElement
+    fields: Dict[str, CollectionField] = field(default_factory=dict)
+
+    def project(self, requested: Optional[str]) -> List[str]:
+        """Field names selected by a comma-separated ``fields=`` value"""
+        if not requested:
+            return list(self.fields)
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        return list(dict.fromkeys(names))
+
+    def statement(self, names: List[str]) -> Select:
+        """Select the key and just the columns the named fields read"""
+        columns = {self.key.key: self.key}
+        for name in names:
+            column = self.fields[name].column
+            columns.setdefault(column.key, column)
+        return select(*columns.values()).order_by(self.key)
+
+    def serialize(self, row, names: List[str]) -> Dict[str, Any]:
+        values = row._mapping
+        result = {}
+        for name in names:
+            spec = self.fields[name]
+            value = values[spec.column.key]
+            result[name] = spec.transform(value) if spec.transform else value
+        return result
+
+
+def encode_cursor(key: Any) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Any:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from None
+
+
+def wants_ndjson(accept: Optional[str]) -> bool:
+    return bool(accept) and NDJSON_MEDIA_TYPE in accept
+
+
+async def collection_response(request: Request, db: Session, collection: Collection,
+                              refine: Callable[[Select], Select], fields: Optional[str],
+                              cursor: Optional[str], limit: int):
+    """
+    One page of a collection as a JSON list, or all of it as NDJSON
+
+    Pages are ordered by the collection key and continue after ``cursor``;
+    the cursor for the next page is sent in ``X-Next-Cursor`` and a
+    ``Link: rel="next"`` header. NDJSON responses stream every row after
+    ``cursor`` from a server-side cursor, a batch at a time.
+    """
+    names = collection.project(fields)
+    statement = refine(collection.statement(names))
+    if cursor:
+        statement = statement.where(collection.key > decode_cursor(cursor))
+
+    if wants_ndjson(request.headers.get('accept')):
+        return StreamingResponse(_stream(db, collection, statement, names), media_type=NDJSON_MEDIA_TYPE)
+
+    rows = await run_in_db_pool(lambda: db.execute(statement.limit(limit + 1)).all())
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]._mapping[collection.key.key])
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    return JSONResponse(content=[collection.serialize(row, names) for row in rows], headers=headers)
+
+
+async def _stream(db: Session, collection: Collection, statement: Select,
+                  names: List[str]) -> AsyncIterator[str]:
+    result = await run_in_db_pool(lambda: db.execute(
+        statement.execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE)
+    ))
+    batches = result.partitions()
+    try:
+        while True:
+            batch = await run_in_db_pool(lambda: next(batches, None))
+            if batch is None:
+                break
+            yield ''.join(
+                json.dumps(collection.serialize(row, names), default=str) + '\n' for row in batch
+            )
+    finally:
+        await run_in_db_pool(result.close)
@@ -4,6 +4,7 @@ STPA-Sec Step 1 Analysis CLI
 
 Usage:
     python cli.py analyze --config analysis-config.yaml
+    python cli.py batch example_systems/ --step 2
     python cli.py export --analysis-id <id> --format json
 """
 import argparse
@@ -42,6 +43,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from core.agents.step1_agents import Step1Coordinator
 from core.database import create_database_pool, run_migrations
+from core.schema_capabilities import get_schema_profile, schema_capabilities
 from config.settings import settings, ModelProvider, ModelConfig, AuthMethod
 from core.utils.prompt_saver import init_prompt_saver, get_prompt_saver
 from core.utils.output_display import OutputDisplay
@@ -367,6 +369,153 @@ class Step1CLI:
         self.console.print(f"\n✅ Analysis complete! Database: {db_name}")
         return db_name
     
+    async def batch(self, config_paths: List[str], steps: int = 1, enhanced: bool = False,
+                    max_systems: int = 4, llm_concurrency: int = 8, max_connections: int = 24,
+                    resume: Optional[str] = None, max_refinements: int = 5,
+                    input_cost_per_1k: float = 0.0, output_cost_per_1k: float = 0.0):
+        """Analyze many systems concurrently with shared LLM and database resources
+        
+        Args:
+            config_paths: Configuration files, or directories searched for config*.yaml
+            steps: Run Step 1 only (1) or Step 1 and Step 2 (2)
+            enhanced: Whether to use enhanced mode with multiple agents
+            max_systems: Systems analyzed at the same time
+            llm_concurrency: Global budget of concurrent LLM requests
+            max_connections: Global cap on database connections
+            resume: Existing batch directory to resume
+            max_refinements: Maximum refinement iterations for Step 2 quality control
+            input_cost_per_1k: Prompt token price used in the cost report
+            output_cost_per_1k: Completion token price used in the cost report
+        """
+        from core.batch import (
+            BatchRunner, BatchSystem, BatchPricing, SharedModelClient, DatabasePoolRegistry
+        )
+        from core.model_providers import get_model_client, set_shared_model_client
+        
+        project_root = Path(__file__).parent.parent.parent
+        if resume:
+            batch_dir = Path(resume)
+            if not batch_dir.is_absolute():
+                batch_dir = project_root / batch_dir
+            previous_state = BatchRunner.load_state(batch_dir)
+            if not previous_state:
+                self.console.print(f"[red]No batch state found in {batch_dir}[/red]")
+                sys.exit(1)
+            # Systems from the previous run come first so database names stay stable
+            config_paths = [entry['config_path'] for entry in previous_state.values()] + list(config_paths)
+            self.console.print(f"[cyan]Resuming batch {batch_dir.name}[/cyan]")
+        else:
+            batch_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+            batch_dir = project_root / 'analyses' / 'batches' / batch_id
+            previous_state = {}
+        
+        # Expand directories into their config files
+        expanded = []
+        for config_path in config_paths:
+            path = Path(config_path)
+            if not path.is_absolute() and not path.exists():
+                path = project_root / config_path
+            if path.is_dir():
+                expanded.extend(str(p) for p in sorted(path.rglob('config*.yaml')))
+            else:
+                expanded.append(str(path))
+        
+        # Load every configuration up front; a broken config fails only its own system
+        systems = []
+        seen = {}
+        for config_path in dict.fromkeys(expanded):
+            config_file = Path(config_path)
+            name = config_file.parent.name if config_file.stem == 'config' else f"{config_file.parent.name}-{config_file.stem}"
+            seen[name] = seen.get(name, 0) + 1
+            if seen[name] > 1:
+                name = f"{name}-{seen[name]}"
+            system = BatchSystem(name=name, config_path=str(config_file))
+            try:
+                system.config = self._load_config(config_path)
+                self._validate_config(system.config)
+                system.input_configs = self._get_input_configs_from_config(system.config, config_path)
+            except SystemExit:
+                system.status = 'failed'
+                system.error = f"Invalid configuration: {config_path}"
+            systems.append(system)
+        
+        runnable = [s for s in systems if s.status != 'failed']
+        if not runnable:
+            self.console.print("[red]No valid configurations to analyze[/red]")
+            sys.exit(1)
+        
+        # One provider serves the whole batch; it comes from the first valid config
+        self._setup_api_keys(runnable[0].config)
+        batch_model = runnable[0].config.get('model', {})
+        for system in runnable[1:]:
+            if system.config.get('model', {}) != batch_model:
+                self.console.print(
+                    f"[yellow]{system.name}: model settings differ from the batch model; "
+                    f"using the batch model[/yellow]"
+                )
+        if os.getenv("USE_MOCK_PROVIDER", "").lower() != "true":
+            await self._verify_model_configuration()
+        
+        shared_client = SharedModelClient(
+            get_model_client(),
+            max_concurrency=llm_concurrency,
+            cache_path=batch_dir / 'response-cache.jsonl'
+        )
+        set_shared_model_client(shared_client)
+        pools = DatabasePoolRegistry(self._get_db_url, max_connections=max_connections)
+        
+        runner = BatchRunner(
+            systems=runnable,
+            batch_dir=batch_dir,
+            model_client=shared_client,
+            pools=pools,
+            create_database=self._create_analysis_database,
+            prepare_step2_database=self._ensure_step2_tables,
+            steps=steps,
+            max_systems=max_systems,
+            enhanced=enhanced,
+            max_refinements=max_refinements,
+            knowledge_dir=project_root / "expert_knowledge",
+            pricing=BatchPricing(input_cost_per_1k, output_cost_per_1k),
+            on_progress=lambda system, message: self.console.print(f"[dim]{system.name}:[/dim] {message}")
+        )
+        runner.restore(previous_state)
+        
+        self.console.print(
+            f"[green]Batch {batch_dir.name}: {len(runnable)} systems, "
+            f"{runner.max_systems} at a time, LLM concurrency {llm_concurrency}[/green]"
+        )
+        try:
+            report = await runner.run()
+        finally:
+            set_shared_model_client(None)
+        
+        # Systems that never started (bad configs) still belong in the summary
+        invalid = [s for s in systems if s.status == 'failed' and s not in runnable]
+        
+        table = Table(title=f"Batch {batch_dir.name}")
+        table.add_column("System", style="cyan")
+        table.add_column("Status")
+        table.add_column("Database", style="dim")
+        table.add_column("LLM calls", justify="right")
+        table.add_column("Tokens", justify="right")
+        table.add_column("Cost", justify="right")
+        for entry in report['systems']:
+            status = "[green]completed[/green]" if entry['status'] == 'completed' else f"[red]{entry['status']}[/red]"
+            table.add_row(entry['name'], status, entry['db_name'] or "-", str(entry['usage']['calls']),
+                          str(entry['usage']['total_tokens']), f"${entry['cost']:.2f}")
+        for system in invalid:
+            table.add_row(system.name, "[red]invalid config[/red]", "-", "0", "0", "$0.00")
+        self.console.print(table)
+        
+        throughput = report['throughput']
+        self.console.print(
+            f"Wall time {report['wall_seconds']:.0f}s · {throughput['systems_per_hour']} systems/hour · "
+            f"cache hit rate {throughput['cache_hit_rate']:.0%} · estimated cost ${report['cost']:.2f}"
+        )
+        self.console.print(f"Report: {batch_dir / BatchRunner.MARKDOWN_REPORT_FILE}")
+        return report
+    
     def _load_config(self, config_path: str) -> dict:
         """Load configuration from YAML file
         
@@ -686,15 +835,19 @@ class Step1CLI:
             
             sys.exit(1)
     
-    async def _create_analysis_database(self, config: dict) -> tuple[str, str]:
+    async def _create_analysis_database(self, config: dict, db_name: Optional[str] = None) -> tuple[str, str]:
         """Create new PostgreSQL database for analysis
         
+        Args:
+            config: Analysis configuration
+            db_name: Explicit database name (batch runs); defaults to a timestamped name
+        
         Returns:
             Tuple of (db_name, timestamp)
         """
         # Generate timestamp and database name
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        db_name = f"stpa_analysis_{timestamp}"
+        db_name = db_name or f"stpa_analysis_{timestamp}"
         
         # Create database
         # Use environment variable or default to Docker service name
@@ -1861,6 +2014,8 @@ class Step1CLI:
                 # Connect to database
                 db_url = self._get_db_url(db_name)
                 db_conn = await asyncpg.connect(db_url)
+                # Agents in parallel phases each take a connection from this pool
+                db_pool = await asyncpg.create_pool(db_url, min_size=1, max_size=4)
                 
                 # Run Step 2 migration if needed
                 await self._ensure_step2_tables(db_conn)
@@ -1889,7 +2044,8 @@ class Step1CLI:
                     self.console.print(f"[dim]PromptSaver initialized in: {output_dir}/prompts[/dim]")
                 
                 # Create Step 2 coordinator with output directory
-                coordinator = Step2Coordinator(model_provider, db_conn, output_dir=output_dir)
+                coordinator = Step2Coordinator(model_provider, db_conn, output_dir=output_dir,
+                                               db_pool=db_pool)
                 
                 # Always wrap with ExpertAgent supervision
                 from core.agents.expert_integration import create_expert_supervised_coordinator
@@ -1950,6 +2106,7 @@ class Step1CLI:
                 
                 # Close database connection
                 await db_conn.close()
+                await db_pool.close()
                 
                 # Display results
                 self.console.print("[dim]Displaying Step 2 results...[/dim]")
@@ -2106,6 +2263,49 @@ class Step1CLI:
         validation = results.get('validation')
         if validation:
             self._display_step2_validation(validation)
+            
+        # 6. Agent schedule (if available)
+        schedule = results.get('schedule')
+        if schedule:
+            self._display_step2_schedule(schedule)
+            
+        # 7. Expert supervision cost (if supervised)
+        expert_calls = results.get('expert_calls')
+        if expert_calls:
+            self.console.print(
+                f"\n[dim]Expert review: {expert_calls['llm_calls']} LLM calls, "
+                f"{expert_calls['llm_calls_avoided']} avoided "
+                f"({expert_calls['prescreened_assessments']} pre-screened, "
+                f"{expert_calls['cached_assessments']} cached)[/dim]"
+            )
+                    
+    def _display_step2_schedule(self, schedule: Dict[str, Any]):
+        """Display when each Step 2 agent waited and ran, and the critical path."""
+        from rich.table import Table
+        
+        table = Table(title="Agent Schedule", show_header=True)
+        table.add_column("Agent", style="cyan")
+        table.add_column("Waits For")
+        table.add_column("Wait (s)", justify="right", style="yellow")
+        table.add_column("Run (s)", justify="right", style="green")
+        
+        critical = set(schedule['critical_path'])
+        for agent_name, agent in sorted(schedule['agents'].items(), key=lambda item: item[1]['wait_ms']):
+            name = f"[bold]{agent_name}[/bold]" if agent_name in critical else agent_name
+            table.add_row(
+                name,
+                ", ".join(dict.fromkeys(agent['depends_on'])) or "-",
+                f"{agent['wait_ms'] / 1000:.1f}",
+                f"{agent['run_ms'] / 1000:.1f}"
+            )
+            
+        self.console.print("\n")
+        self.console.print(table)
+        self.console.print(
+            f"[dim]Critical path: {' → '.join(schedule['critical_path'])} "
+            f"({schedule['critical_path_ms'] / 1000:.1f}s); "
+            f"{schedule['time_saved_ms'] / 1000:.1f}s saved by running agents concurrently[/dim]"
+        )
                     
     def _display_control_actions(self, actions: List[Dict[str, Any]]):
         """Display control actions in a table."""
@@ -2791,10 +2991,9 @@ class Step1CLI:
     async def _ensure_step2_tables(self, db_conn: asyncpg.Connection):
         """Ensure Step 2 tables exist by running migration if needed."""
         try:
-            # Check if step2_analyses table exists
-            exists = await db_conn.fetchval(
-                "SELECT EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'step2_analyses')"
-            )
+            # One cached catalog probe answers every existence check below
+            schema = await get_schema_profile(db_conn)
+            exists = schema.has_table('step2_analyses')
             
             migrations_to_run = []
             
@@ -2803,88 +3002,43 @@ class Step1CLI:
                 migrations_to_run.extend(["016_step2_control_structure.sql", "017_step2_fixes.sql"])
             else:
                 # Check if we need the fixes migration
-                has_metadata = await db_conn.fetchval(
-                    "SELECT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name = 'step2_analyses' AND column_name = 'metadata')"
-                )
-                if not has_metadata:
+                if not schema.has_column('step2_analyses', 'metadata'):
                     migrations_to_run.append("017_step2_fixes.sql")
                     
                 # Check if system_components has identifier column
-                has_identifier = False
-                components_table_exists = False
-                try:
-                    # Check if table exists first
-                    components_table_exists = await db_conn.fetchval(
-                        "SELECT EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'system_components')"
-                    )
-                    if components_table_exists:
-                        # Try a simple query to see if identifier column exists
-                        await db_conn.fetchval("SELECT identifier FROM system_components LIMIT 1")
-                        has_identifier = True
-                except Exception as e:
-                    if "column" in str(e) and "identifier" in str(e):
-                        # Column doesn't exist
-                        has_identifier = False
-                        
-                if not has_identifier and components_table_exists:
+                if (schema.has_table('system_components')
+                        and not schema.has_column('system_components', 'identifier')):
                     # Table exists but missing identifier column - try to add it first
                     self.console.print("[yellow]Identifier column missing. Attempting to add it...[/yellow]")
                     migrations_to_run.append("020_step2_ensure_identifier.sql")
             
-            # Check for process_models table
-            process_models_exists = await db_conn.fetchval(
-                "SELECT EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'process_models')"
-            )
-            if not process_models_exists:
-                migrations_to_run.append("021_process_models.sql")
-            
-            # Check for system_descriptions table
-            system_desc_exists = await db_conn.fetchval(
-                "SELECT EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'system_descriptions')"
-            )
-            if not system_desc_exists:
-                migrations_to_run.append("022_system_description.sql")
-            
-            # Check for control_contexts table
-            control_contexts_exists = await db_conn.fetchval(
-                "SELECT EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'control_contexts')"
-            )
-            if not control_contexts_exists:
-                migrations_to_run.append("023_control_contexts.sql")
-            
-            # Check for control_structures table
-            control_structures_exists = await db_conn.fetchval(
-                "SELECT EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'control_structures')"
-            )
-            if not control_structures_exists:
-                migrations_to_run.append("024_control_structures.sql")
+            # Tables added by later migrations
+            for table, migration in [
+                ('process_models', "021_process_models.sql"),
+                ('system_descriptions', "022_system_description.sql"),
+                ('control_contexts', "023_control_contexts.sql"),
+                ('control_structures', "024_control_structures.sql"),
+            ]:
+                if not schema.has_table(table):
+                    migrations_to_run.append(migration)
             
             # Always run foreign key type fixes after other tables are created
             # Check if we need the foreign key type fix by testing input_analysis table type
-            try:
-                input_analysis_type = await db_conn.fetchval(
-                    "SELECT data_type FROM information_schema.columns WHERE table_name = 'input_analysis' AND column_name = 'analysis_id'"
-                )
-                if input_analysis_type == 'uuid':
-                    # Still has UUID type, needs fixing
-                    migrations_to_run.append("025_fix_foreign_key_types.sql")
-            except Exception:
-                # input_analysis table might not exist, that's OK
-                pass
+            input_analysis_id = schema.column('input_analysis', 'analysis_id')
+            if input_analysis_id and input_analysis_id.data_type == 'uuid':
+                # Still has UUID type, needs fixing
+                migrations_to_run.append("025_fix_foreign_key_types.sql")
                 
             # Check if process_models has model_name as NOT NULL
-            try:
-                model_name_nullable = await db_conn.fetchval(
-                    "SELECT is_nullable FROM information_schema.columns WHERE table_name = 'process_models' AND column_name = 'model_name'"
-                )
-                if model_name_nullable == 'NO':
-                    # Still has NOT NULL constraint, needs fixing
-                    migrations_to_run.append("026_process_models_cleanup.sql")
-            except Exception:
-                # Column might not exist, that's OK
-                pass
+            model_name = schema.column('process_models', 'model_name')
+            if model_name and not model_name.is_nullable:
+                # Still has NOT NULL constraint, needs fixing
+                migrations_to_run.append("026_process_models_cleanup.sql")
                     
-            # Run necessary migrations
+            # Run necessary migrations; they change the schema, so drop the
+            # cached profile first and re-probe afterwards
+            if migrations_to_run:
+                schema_capabilities.invalidate(schema.database)
             for migration_file in migrations_to_run:
                 migration_path = Path(__file__).parent / "migrations" / migration_file
                 if migration_path.exists():
@@ -2897,13 +3051,11 @@ class Step1CLI:
                     
             if migrations_to_run:
                 self.console.print("[green]✓ Step 2 migrations completed successfully[/green]")
+                schema = await get_schema_profile(db_conn)
                 
             # Diagnostic: Check what columns exist in system_components
             if exists:
-                columns = await db_conn.fetch(
-                    "SELECT column_name FROM information_schema.columns WHERE table_name = 'system_components' ORDER BY ordinal_position"
-                )
-                self.console.print(f"[dim]system_components columns: {[col['column_name'] for col in columns]}[/dim]")
+                self.console.print(f"[dim]system_components columns: {schema.column_names('system_components')}[/dim]")
                     
         except Exception as e:
             self.console.print(f"[red]Error checking/creating Step 2 tables: {str(e)}[/red]")
@@ -2937,6 +3089,19 @@ async def main():
     # List command - list available databases
     list_parser = subparsers.add_parser('list', help='List available analysis databases')
     
+    # Batch command - analyze many systems with shared resources
+    batch_parser = subparsers.add_parser('batch', help='Analyze many systems concurrently')
+    batch_parser.add_argument('configs', nargs='*', help='Configuration files or directories containing config*.yaml')
+    batch_parser.add_argument('--step', type=int, choices=[1, 2], default=1, help='Run Step 1 only (1) or Steps 1 and 2 (2)')
+    batch_parser.add_argument('--enhanced', action='store_true', help='Use enhanced mode with multiple agents per phase')
+    batch_parser.add_argument('--max-systems', type=int, default=4, help='Systems analyzed at the same time (default: 4)')
+    batch_parser.add_argument('--llm-concurrency', type=int, default=8, help='Global limit on concurrent LLM requests (default: 8)')
+    batch_parser.add_argument('--max-connections', type=int, default=24, help='Global limit on database connections (default: 24)')
+    batch_parser.add_argument('--resume', help='Batch directory to resume; completed systems are skipped')
+    batch_parser.add_argument('--max-refinements', type=int, default=5, help='Maximum refinement iterations for Step 2 quality control (default: 5)')
+    batch_parser.add_argument('--input-cost-per-1k', type=float, default=0.0, help='Prompt token price per 1K tokens for the cost report')
+    batch_parser.add_argument('--output-cost-per-1k', type=float, default=0.0, help='Completion token price per 1K tokens for the cost report')
+    
     args = parser.parse_args()
     
     if not args.command:
@@ -2962,6 +3127,21 @@ async def main():
         console.print("[yellow]Export functionality coming soon![/yellow]")
     elif args.command == 'list':
         await cli.list_databases()
+    elif args.command == 'batch':
+        if not args.configs and not args.resume:
+            batch_parser.error('provide configuration files/directories or --resume')
+        await cli.batch(
+            args.configs,
+            steps=args.step,
+            enhanced=args.enhanced,
+            max_systems=args.max_systems,
+            llm_concurrency=args.llm_concurrency,
+            max_connections=args.max_connections,
+            resume=args.resume,
+            max_refinements=args.max_refinements,
+            input_cost_per_1k=args.input_cost_per_1k,
+            output_cost_per_1k=args.output_cost_per_1k
+        )
 
 
 if __name__ == "__main__":
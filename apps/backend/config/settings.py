@@ -116,7 +116,12 @@ class Settings(BaseSettings):
     
     # Performance
     max_concurrent_analyses: int = Field(10, env="MAX_CONCURRENT_ANALYSES")
+    llm_max_concurrency: int = Field(4, env="LLM_MAX_CONCURRENCY")
     analysis_timeout_seconds: int = Field(300, env="ANALYSIS_TIMEOUT_SECONDS")
+    analysis_jobs_per_tenant: int = Field(2, env="ANALYSIS_JOBS_PER_TENANT")
+    analysis_job_lease_seconds: int = Field(60, env="ANALYSIS_JOB_LEASE_SECONDS")
+    analysis_job_max_attempts: int = Field(3, env="ANALYSIS_JOB_MAX_ATTEMPTS")
+    embedded_analysis_worker: bool = Field(True, env="EMBEDDED_ANALYSIS_WORKER")
     enable_caching: bool = Field(True, env="ENABLE_CACHING")
     cache_ttl_seconds: int = Field(3600, env="CACHE_TTL_SECONDS")
     
@@ -4,9 +4,12 @@ Expert Agent for STPA-Sec Methodology Compliance and Quality Control
 The ExpertAgent acts as an AI-in-the-loop quality controller, ensuring that
 all analysis steps follow current STPA-Sec methodology and best practices.
 """
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
 import json
+import copy
+import hashlib
 import asyncio
+import time
 from pathlib import Path
 from datetime import datetime
 from enum import Enum
@@ -14,6 +17,8 @@ import logging
 
 from core.utils.json_parser import parse_llm_json
 from core.model_providers import BaseModelClient, ModelResponse
+from .expert_prescreen import ExpertPrescreen
+from .expert_knowledge import get_knowledge_index
 
 
 class OperatingMode(Enum):
@@ -31,6 +36,55 @@ class QualityLevel(Enum):
     UNACCEPTABLE = "unacceptable"  # Critical violations, must retry
 
 
+# Score of an assessment that did not report overall_score
+QUALITY_LEVEL_SCORES = {
+    QualityLevel.EXCELLENT: 1.0,
+    QualityLevel.ACCEPTABLE: 0.8,
+    QualityLevel.NEEDS_IMPROVEMENT: 0.5,
+    QualityLevel.UNACCEPTABLE: 0.2
+}
+
+
+class SupervisionBudget:
+    """
+    Refinement iterations and wall time shared by all agents supervised in
+    one run, so the number of agents does not multiply refinement cost.
+    """
+    
+    def __init__(self, max_iterations: int, time_budget_s: Optional[float] = None):
+        self.max_iterations = max_iterations
+        self.time_budget_s = time_budget_s
+        self.used_iterations = 0
+        self.started = time.monotonic()
+        
+    @property
+    def elapsed_s(self) -> float:
+        return time.monotonic() - self.started
+        
+    @property
+    def exhausted_reason(self) -> Optional[str]:
+        if self.used_iterations >= self.max_iterations:
+            return "iteration_budget"
+        if self.time_budget_s is not None and self.elapsed_s >= self.time_budget_s:
+            return "time_budget"
+        return None
+        
+    def take(self) -> bool:
+        """Claim one refinement iteration; False once the budget is spent"""
+        if self.exhausted_reason:
+            return False
+        self.used_iterations += 1
+        return True
+        
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "max_iterations": self.max_iterations,
+            "used_iterations": self.used_iterations,
+            "time_budget_s": self.time_budget_s,
+            "elapsed_s": round(self.elapsed_s, 1)
+        }
+
+
 class ExpertAgent:
     """
     Expert Agent that supervises and improves analysis quality using
@@ -44,11 +98,28 @@ class ExpertAgent:
         self.operating_mode = operating_mode
         self.logger = logging.getLogger(self.__class__.__name__)
         
-        # Load expert knowledge
+        # Load expert knowledge; documents come from the process-wide index
+        self.knowledge_index = get_knowledge_index(knowledge_dir)
+        self.knowledge_top_k = 3
         self.knowledge_base = self._load_knowledge_base()
         self.quality_standards = self._load_quality_standards()
         self.common_errors = self._load_common_error_patterns()
         
+        # Obvious passes and failures are decided without the LLM, and LLM
+        # assessments are reused while the output they judged and the context
+        # it was judged against are unchanged
+        self.prescreen = ExpertPrescreen(self.quality_standards, self.common_errors)
+        self._assessment_cache: Dict[str, Dict[str, Any]] = {}
+        self.call_stats = {
+            "llm_assessments": 0,
+            "llm_guidance": 0,
+            "prescreened_assessments": 0,
+            "prescreened_guidance": 0,
+            "cached_assessments": 0
+        }
+        # Smallest score gain between iterations that justifies refining again
+        self.min_improvement = 0.05
+        
         # Configure behavior based on operating mode
         self._configure_for_mode(operating_mode)
         
@@ -62,13 +133,8 @@ class ExpertAgent:
             "common_error_patterns": self._load_common_error_patterns()
         }
         
-        # Load documents from knowledge directory if available
-        if self.knowledge_dir.exists():
-            for doc_path in self.knowledge_dir.glob("*.md"):
-                doc_name = doc_path.stem
-                with open(doc_path, 'r') as f:
-                    knowledge[doc_name] = f.read()
-                    
+        # Documents from the knowledge directory are served by the index,
+        # which loads them off the event loop when first searched
         return knowledge
         
     def _load_stpa_principles(self) -> Dict[str, str]:
@@ -203,7 +269,9 @@ class ExpertAgent:
             
     async def supervise_step_analysis(self, step_number: int, agent_type: str,
                                     initial_output: Dict[str, Any], context: Dict[str, Any],
-                                    max_retries: Optional[int] = None) -> Dict[str, Any]:
+                                    max_retries: Optional[int] = None,
+                                    refine: Optional[Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]] = None,
+                                    budget: Optional[SupervisionBudget] = None) -> Dict[str, Any]:
         """
         Supervise and iteratively improve step analysis output.
         
@@ -213,9 +281,13 @@ class ExpertAgent:
             initial_output: Initial agent output to assess
             context: Analysis context including previous steps
             max_retries: Override default max retries
+            refine: Re-runs the agent with refinement guidance and returns its
+                new output; defaults to ``request_refined_output``
+            budget: Refinement iterations and time shared with other agents
             
         Returns:
-            Dict containing final output and quality assessment
+            Dict containing final output and quality assessment. The final
+            output is the best one seen, which is not necessarily the last.
         """
         if max_retries is None:
             max_retries = self.max_auto_retries
@@ -223,20 +295,30 @@ class ExpertAgent:
         current_output = initial_output
         retry_count = 0
         iteration_history = []
+        refinement_guidance = None
+        best = None
+        previous_score = None
+        stop_reason = "max_retries"
         
-        while retry_count <= max_retries:
+        while True:
             # Assess output quality
             quality_assessment = await self.assess_output_quality(
                 step_number, agent_type, current_output, context
             )
+            score = self._assessment_score(quality_assessment)
             
             # Log iteration
             iteration_history.append({
                 "iteration": retry_count,
                 "quality": quality_assessment["quality_level"],
+                "score": score,
                 "issues": quality_assessment["issues"],
+                "assessed_by": quality_assessment.get("assessed_by", "llm"),
                 "timestamp": datetime.now().isoformat()
             })
+            if best is None or score > best["score"]:
+                best = {"output": current_output, "assessment": quality_assessment,
+                        "score": score, "iteration": retry_count}
             
             # Check if quality is acceptable
             if quality_assessment["quality_level"] in [QualityLevel.EXCELLENT, QualityLevel.ACCEPTABLE]:
@@ -249,46 +331,92 @@ class ExpertAgent:
                     "quality_assessment": quality_assessment,
                     "iteration_history": iteration_history,
                     "retry_count": retry_count,
+                    "best_iteration": retry_count,
+                    "final_refinement_guidance": refinement_guidance,
                     "success": True
                 }
             
-            # Generate refinement guidance
-            refinement_guidance = await self.generate_refinement_guidance(
-                step_number, agent_type, quality_assessment, retry_count
-            )
-            
             # Check if we should continue
+            if previous_score is not None and score < previous_score + self.min_improvement:
+                self.logger.info(f"Quality of {agent_type} stopped improving ({previous_score:.2f} -> {score:.2f})")
+                stop_reason = "no_improvement"
+                break
+            previous_score = score
             if retry_count >= max_retries:
                 self.logger.warning(f"Max retries ({max_retries}) reached for {agent_type}")
                 break
+            if budget is not None and not budget.take():
+                self.logger.warning(f"Refinement budget exhausted before refining {agent_type}")
+                stop_reason = budget.exhausted_reason
+                break
+                
+            # Generate refinement guidance
+            if quality_assessment.get("assessed_by") == "prescreen":
+                # The pre-screen already knows what is wrong and how to fix it
+                refinement_guidance = self.prescreen.refinement_guidance(quality_assessment)
+                self.call_stats["prescreened_guidance"] += 1
+            else:
+                refinement_guidance = await self.generate_refinement_guidance(
+                    step_number, agent_type, quality_assessment, retry_count
+                )
                 
             # Request refined output
-            refined_output = await self.request_refined_output(
-                agent_type, current_output, refinement_guidance, context
-            )
+            if refine is not None:
+                refined_output = await refine(refinement_guidance)
+            else:
+                refined_output = await self.request_refined_output(
+                    agent_type, current_output, refinement_guidance, context
+                )
             
             if refined_output:
                 current_output = refined_output
                 retry_count += 1
             else:
                 self.logger.error(f"Failed to get refined output from {agent_type}")
+                stop_reason = "refinement_failed"
                 break
                 
-        # Max retries reached or refinement failed
+        # Refinement stopped before quality standards were met
         return {
-            "final_output": current_output,
-            "quality_assessment": quality_assessment,
+            "final_output": best["output"],
+            "quality_assessment": best["assessment"],
             "iteration_history": iteration_history,
             "retry_count": retry_count,
+            "best_iteration": best["iteration"],
+            "final_refinement_guidance": refinement_guidance,
+            "stop_reason": stop_reason,
             "success": False,
             "warning": "Quality standards not fully met"
         }
         
+    def _assessment_score(self, assessment: Dict[str, Any]) -> float:
+        """Numeric quality of an assessment, for comparing iterations"""
+        score = assessment.get("overall_score")
+        if isinstance(score, (int, float)):
+            return float(score)
+        return QUALITY_LEVEL_SCORES[assessment["quality_level"]]
+        
     async def assess_output_quality(self, step_number: int, agent_type: str,
                                   output: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """
         Assess the quality of agent output against methodology standards.
+        
+        The rule-based pre-screen decides obvious cases; everything else goes
+        to the LLM once per distinct output.
         """
+        screened = self.prescreen.assess(step_number, agent_type, output, context)
+        if screened is not None:
+            self.call_stats["prescreened_assessments"] += 1
+            screened["quality_level"] = QualityLevel(screened["quality_level"])
+            return screened
+            
+        cache_key = self._assessment_key(step_number, agent_type, output, context)
+        cached = self._assessment_cache.get(cache_key)
+        if cached is not None:
+            self.call_stats["cached_assessments"] += 1
+            return {**copy.deepcopy(cached), "assessed_by": "cache"}
+            
+        await self.knowledge_index.refresh_async()
         assessment_prompt = self._build_assessment_prompt(step_number, agent_type, output, context)
         
         messages = [
@@ -299,11 +427,13 @@ class ExpertAgent:
             messages,
             temperature=0.3
         )
+        self.call_stats["llm_assessments"] += 1
         
         try:
             assessment = parse_llm_json(response.content)
             # Convert quality level string to enum
             assessment["quality_level"] = QualityLevel(assessment.get("quality_level", "needs_improvement"))
+            self._assessment_cache[cache_key] = copy.deepcopy(assessment)
             return assessment
         except Exception as e:
             self.logger.error(f"Failed to parse quality assessment: {e}")
@@ -313,6 +443,24 @@ class ExpertAgent:
                 "recommendations": ["Manual review required"]
             }
             
+    def _assessment_key(self, step_number: int, agent_type: str, output: Dict[str, Any],
+                        context: Dict[str, Any]) -> str:
+        """Cache key for an assessment: the step, the agent, its exact output and its context"""
+        payload = json.dumps(
+            [step_number, agent_type, self._make_json_serializable(output), self._make_json_serializable(context)],
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+        
+    def supervision_stats(self) -> Dict[str, int]:
+        """Expert LLM calls made, and calls the pre-screen and cache avoided"""
+        stats = dict(self.call_stats)
+        stats["llm_calls"] = stats["llm_assessments"] + stats["llm_guidance"]
+        stats["llm_calls_avoided"] = (
+            stats["prescreened_assessments"] + stats["prescreened_guidance"] + stats["cached_assessments"]
+        )
+        return stats
+        
     def _build_assessment_prompt(self, step_number: int, agent_type: str,
                                output: Dict[str, Any], context: Dict[str, Any]) -> str:
         """Build prompt for quality assessment"""
@@ -320,6 +468,16 @@ class ExpertAgent:
         step_requirements = self.knowledge_base["step_requirements"].get(step_number, {})
         quality_standards = self.quality_standards
         
+        # Only the knowledge passages relevant to this agent's output
+        query = " ".join([
+            f"step {step_number}", agent_type.replace("_", " "),
+            *step_requirements.get("outputs", []), *step_requirements.get("quality_checks", [])
+        ])
+        guidance = "\n\n".join(
+            f"### {chunk.source} ({chunk.heading})\n{chunk.text}"
+            for chunk in self.knowledge_index.search(query, k=self.knowledge_top_k)
+        ) or "None available"
+        
         prompt = f"""
 You are assessing the quality of STPA-Sec Step {step_number} output from {agent_type}.
 
@@ -329,6 +487,9 @@ You are assessing the quality of STPA-Sec Step {step_number} output from {agent_
 ## Quality Standards:
 {json.dumps(quality_standards, indent=2)}
 
+## Relevant Methodology Guidance:
+{guidance}
+
 ## Output to Assess:
 {json.dumps(self._make_json_serializable(output), indent=2)}
 
@@ -417,6 +578,7 @@ Return guidance as JSON:
             messages,
             temperature=0.3
         )
+        self.call_stats["llm_guidance"] += 1
         
         try:
             return parse_llm_json(response.content)
@@ -483,5 +645,6 @@ Return guidance as JSON:
                 report += f"\n### Iteration {iteration['iteration']}\n"
                 report += f"- Quality: {iteration['quality']}\n"
                 report += f"- Issues: {len(iteration['issues'])}\n"
+                report += f"- Assessed By: {iteration.get('assessed_by', 'llm')}\n"
                 
         return report
\ No newline at end of file
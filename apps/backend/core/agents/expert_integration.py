@@ -4,12 +4,15 @@ Integration layer between ExpertAgent and STPA-Sec analysis agents
 Provides the glue code to enable ExpertAgent supervision of existing agents
 with iterative refinement capabilities.
 """
-from typing import Dict, Any, Optional, Type
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Type, Tuple
+from contextlib import nullcontext
+import asyncio
 import logging
 from pathlib import Path
 
-from .expert_agent import ExpertAgent, OperatingMode
+from .expert_agent import ExpertAgent, OperatingMode, SupervisionBudget
 from .step2_agents.base_step2 import BaseStep2Agent, AgentResult
+from .step2_agents.step1_snapshot import Step1Snapshot
 from core.model_providers import BaseModelClient
 
 
@@ -19,12 +22,17 @@ class RefinableAgent:
     """
     
     def __init__(self, agent_class: Type[BaseStep2Agent], model_provider: BaseModelClient,
-                 db_connection: Any, cognitive_style: Any):
+                 db_connection: Any, cognitive_style: Any, step1_snapshot: Optional[Step1Snapshot] = None):
         self.agent_class = agent_class
         self.model_provider = model_provider
         self.db_connection = db_connection
         self.cognitive_style = cognitive_style
         self.base_agent = agent_class(model_provider, db_connection, cognitive_style)
+        # Refinement retries reuse the snapshot instead of re-querying Step 1
+        self.base_agent.step1_snapshot = step1_snapshot
+        # Iterations are only stored once the expert has picked the best one
+        self.base_agent.defer_store = True
+        self.pending_stores: List[Optional[Callable[[], Awaitable[None]]]] = []
         self.refinement_history = []
         self.logger = logging.getLogger(f"Refinable{agent_class.__name__}")
         
@@ -44,6 +52,8 @@ class RefinableAgent:
             step2_analysis_id=step2_analysis_id,
             previous_results=previous_results
         )
+        self.pending_stores.append(self.base_agent.pending_store)
+        self.base_agent.pending_store = None
         
         # Track refinement history
         if refinement_guidance:
@@ -54,6 +64,12 @@ class RefinableAgent:
             
         return result
         
+    async def store_iteration(self, iteration: int) -> None:
+        """Write the results of one analysis iteration to the database"""
+        store = self.pending_stores[iteration]
+        if store is not None:
+            await store()
+        
     def _apply_refinement_guidance(self, previous_results: Dict[str, Any],
                                  refinement_guidance: Dict[str, Any]) -> Dict[str, Any]:
         """Apply ExpertAgent refinement guidance to the analysis context"""
@@ -90,35 +106,34 @@ class ExpertSupervisedCoordinator:
         
     async def coordinate_with_supervision(self, step1_analysis_id: str, 
                                          execution_mode: str = 'standard',
-                                         max_refinements: int = 3) -> Dict[str, Any]:
+                                         max_refinements: int = 3,
+                                         refinement_budget: Optional[int] = None,
+                                         time_budget_s: Optional[float] = None) -> Dict[str, Any]:
         """
         Run Step 2 coordination with ExpertAgent supervision
+        
+        Args:
+            step1_analysis_id: Step 1 analysis to build on
+            execution_mode: Step 2 execution mode
+            max_refinements: Most refinements of any one agent
+            refinement_budget: Refinements shared by all agents of the run,
+                defaults to ``max_refinements``
+            time_budget_s: Time after which no new refinement is started
         """
         # Initialize Step 2 analysis (mimics base coordinator initialization)
         step2_analysis_id = await self.base_coordinator._create_step2_analysis(step1_analysis_id, execution_mode)
         self.base_coordinator.current_step2_id = step2_analysis_id
+        self.base_coordinator.step1_snapshot = await self.base_coordinator.get_step1_snapshot(step1_analysis_id)
         
-        # Track supervision results
-        supervision_results = {}
-        
-        # Execute phases with supervision
-        phase_results = {}
+        budget = SupervisionBudget(
+            max_refinements if refinement_budget is None else refinement_budget,
+            time_budget_s
+        )
         
-        for phase in self.base_coordinator.phases:
-            self.logger.info(f"Executing Step 2 phase with supervision: {phase['name']}")
-            
-            # Run the phase
-            if phase.get('parallel', False):
-                results = await self._execute_parallel_with_supervision(
-                    phase, step1_analysis_id, phase_results, max_refinements
-                )
-            else:
-                results = await self._execute_sequential_with_supervision(
-                    phase, step1_analysis_id, phase_results, max_refinements
-                )
-                
-            phase_results[phase['name']] = results['outputs']
-            supervision_results[phase['name']] = results['supervision']
+        # Execute agents with supervision as soon as their inputs exist
+        phase_results, supervision_results = await self._execute_graph_with_supervision(
+            step1_analysis_id, max_refinements, budget
+        )
             
         # Final synthesis with quality check
         synthesis = await self._synthesize_with_quality_check(phase_results)
@@ -131,78 +146,100 @@ class ExpertSupervisedCoordinator:
             "phase_results": phase_results,
             "supervision_results": supervision_results,
             "synthesis": synthesis,
-            "overall_quality": self._calculate_overall_quality(supervision_results)
+            "overall_quality": self._calculate_overall_quality(supervision_results),
+            "refinement_budget": budget.to_dict(),
+            "expert_calls": self.expert_agent.supervision_stats()
         }
         
-    async def _execute_sequential_with_supervision(self, phase: Dict[str, Any],
-                                                 step1_analysis_id: str,
-                                                 previous_results: Dict[str, Any],
-                                                 max_refinements: int) -> Dict[str, Any]:
-        """Execute agents sequentially with expert supervision"""
+    async def _execute_graph_with_supervision(self, step1_analysis_id: str, max_refinements: int,
+                                              budget: SupervisionBudget) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Supervise every agent as soon as the agents it depends on are done.
+        
+        Independent agents are supervised concurrently, each on its own
+        pooled connection; without a pool they take turns on the shared one.
+        """
+        base = self.base_coordinator
+        graph = base.build_agent_graph()
+        outputs: Dict[str, AgentResult] = {}
+        supervision: Dict[str, Dict[str, Any]] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+        serial = asyncio.Lock() if base.db_pool is None else None
         
-        outputs = {}
-        supervision = {}
+        def phase_output(phase_name: str) -> Dict[str, Any]:
+            phase = next(phase for phase in base.phases if phase['name'] == phase_name)
+            return {agent_name: outputs[agent_name] for agent_name in phase['agents']}
         
-        for agent_name in phase['agents']:
-            # Create refinable agent wrapper
-            agent = self._create_refinable_agent(agent_name)
+        async def run(agent_name: str):
+            if graph[agent_name]:
+                await asyncio.gather(*(tasks[dep] for dep in graph[agent_name]))
+            previous_results = {
+                name: phase_output(name) for name in base.agent_classes[agent_name].consumes
+            }
+            async with serial or nullcontext():
+                self.logger.info(f"Executing Step 2 agent with supervision: {agent_name}")
+                outputs[agent_name], supervision[agent_name] = await self._supervise_agent(
+                    agent_name, step1_analysis_id, previous_results, max_refinements, budget
+                )
+                
+        for agent_name in graph:
+            tasks[agent_name] = asyncio.create_task(run(agent_name))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+            
+        phase_results = {phase['name']: phase_output(phase['name']) for phase in base.phases}
+        supervision_results = {
+            phase['name']: {agent_name: supervision[agent_name] for agent_name in phase['agents']}
+            for phase in base.phases
+        }
+        return phase_results, supervision_results
+        
+    async def _supervise_agent(self, agent_name: str, step1_analysis_id: str,
+                               previous_results: Dict[str, Any], max_refinements: int,
+                               budget: SupervisionBudget) -> Tuple[AgentResult, Dict[str, Any]]:
+        """Run one agent and refine it until the expert accepts it or refinement stops paying off"""
+        async with self.base_coordinator._agent_connection() as conn:
+            agent = self._create_refinable_agent(agent_name, conn)
             
             # Initial analysis
-            initial_result = await agent.analyze_with_refinement(
+            results = [await agent.analyze_with_refinement(
                 step1_analysis_id=step1_analysis_id,
                 step2_analysis_id=self.base_coordinator.current_step2_id,
                 previous_results=previous_results
-            )
+            )]
+            
+            async def refine(refinement_guidance: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+                refined_result = await agent.analyze_with_refinement(
+                    step1_analysis_id=step1_analysis_id,
+                    step2_analysis_id=self.base_coordinator.current_step2_id,
+                    previous_results=previous_results,
+                    refinement_guidance=refinement_guidance
+                )
+                results.append(refined_result)
+                return self._make_serializable(refined_result.data)
             
             # Expert supervision (clean data for JSON serialization)
-            clean_output = self._make_serializable(initial_result.data)
             supervision_result = await self.expert_agent.supervise_step_analysis(
                 step_number=2,
                 agent_type=agent_name,
-                initial_output=clean_output,
+                initial_output=self._make_serializable(results[0].data),
                 context=previous_results,
-                max_retries=max_refinements
+                max_retries=max_refinements,
+                refine=refine,
+                budget=budget
             )
             
-            # If refinement was needed, run refined analysis
-            if supervision_result["retry_count"] > 0:
-                final_guidance = supervision_result.get("final_refinement_guidance")
-                if final_guidance:
-                    refined_result = await agent.analyze_with_refinement(
-                        step1_analysis_id=step1_analysis_id,
-                        step2_analysis_id=self.base_coordinator.current_step2_id,
-                        previous_results=previous_results,
-                        refinement_guidance=final_guidance
-                    )
-                    outputs[agent_name] = refined_result
-                else:
-                    outputs[agent_name] = initial_result
-            else:
-                outputs[agent_name] = initial_result
-                
-            supervision[agent_name] = supervision_result
-            
-        return {
-            "outputs": outputs,
-            "supervision": supervision
-        }
-        
-    async def _execute_parallel_with_supervision(self, phase: Dict[str, Any],
-                                               step1_analysis_id: str,
-                                               previous_results: Dict[str, Any],
-                                               max_refinements: int) -> Dict[str, Any]:
-        """Execute agents in parallel with expert supervision"""
-        
-        # For parallel execution, run initial analysis for all agents first
-        # Then supervise and refine as needed
-        # Implementation similar to sequential but with asyncio.gather
-        
-        # Placeholder for now
-        return await self._execute_sequential_with_supervision(
-            phase, step1_analysis_id, previous_results, max_refinements
-        )
+            # Keep the best-rated result, not necessarily the last one, and
+            # store only that: the agents' inserts are not idempotent
+            best_iteration = supervision_result["best_iteration"]
+            await agent.store_iteration(best_iteration)
+        return results[best_iteration], supervision_result
         
-    def _create_refinable_agent(self, agent_name: str) -> RefinableAgent:
+    def _create_refinable_agent(self, agent_name: str, db_connection: Any = None) -> RefinableAgent:
         """Create a refinable wrapper for an agent"""
         
         agent_class = self.base_coordinator.agent_classes.get(agent_name)
@@ -212,8 +249,9 @@ class ExpertSupervisedCoordinator:
         return RefinableAgent(
             agent_class=agent_class,
             model_provider=self.base_coordinator.model_provider,
-            db_connection=self.base_coordinator.db_connection,
-            cognitive_style=self.base_coordinator.cognitive_style
+            db_connection=db_connection or self.base_coordinator.db_connection,
+            cognitive_style=self.base_coordinator.cognitive_style,
+            step1_snapshot=self.base_coordinator.step1_snapshot
         )
         
     async def _synthesize_with_quality_check(self, phase_results: Dict[str, Any]) -> Dict[str, Any]:
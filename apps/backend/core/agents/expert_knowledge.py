@@ -0,0 +1,258 @@
+"""
+Process-wide expert knowledge index
+
+Every ExpertAgent used to re-read the whole knowledge directory, and the PDF
+in it was never used. The index loads each directory once per process,
+splits the Markdown and PDF documents into chunks, and ranks chunks
+lexically (BM25) so expert prompts can include only the passages relevant
+to the agent being assessed. Files are re-checked by modification time, so
+edits to the knowledge directory are picked up without a restart.
+
+Loading is lazy: async callers ``await refresh_async()`` so document and
+PDF reads run on a worker thread, and each rebuild is published as one
+immutable state that searches read without taking the lock.
+"""
+from typing import Dict, List, Optional, Tuple
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+import asyncio
+import logging
+import math
+import re
+import threading
+import time
+
+from analysis.inputs.pdf import PDFProcessor
+
+logger = logging.getLogger(__name__)
+
+
+# Target chunk size in characters
+CHUNK_SIZE = 1200
+# Seconds between checks of the knowledge directory for changed files
+RELOAD_CHECK_INTERVAL_S = 5.0
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "with", "what", "when", "which", "must"
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords and with plural 's' stripped"""
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+@dataclass(frozen=True)
+class KnowledgeChunk:
+    source: str
+    heading: str
+    text: str
+
+
+@dataclass(frozen=True)
+class _IndexState:
+    """One fully built index; replaced as a whole, never modified"""
+    documents: Dict[str, str]
+    chunks: List[KnowledgeChunk]
+    postings: Dict[str, List[Tuple[int, int]]]
+    lengths: List[int]
+    average_length: float
+
+
+_EMPTY_STATE = _IndexState({}, [], {}, [], 0.0)
+
+
+def _split_text(text: str, size: int) -> List[str]:
+    """Split on paragraph boundaries into pieces of about ``size`` characters"""
+    pieces, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if current and len(current) + len(paragraph) > size:
+            pieces.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+        while len(current) > size * 2:
+            pieces.append(current[:size])
+            current = current[size:]
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_markdown(source: str, text: str, size: int = CHUNK_SIZE) -> List[KnowledgeChunk]:
+    """Chunk a Markdown document section by section"""
+    chunks = []
+    heading = source
+    section: List[str] = []
+
+    def flush():
+        for piece in _split_text("\n".join(section), size):
+            chunks.append(KnowledgeChunk(source, heading, piece))
+
+    for line in text.splitlines():
+        match = re.match(r"#{1,6}\s+(.*)", line)
+        if match:
+            flush()
+            heading = match.group(1).strip()
+            section = []
+        else:
+            section.append(line)
+    flush()
+    return chunks
+
+
+def chunk_pdf_text(source: str, text: str, size: int = CHUNK_SIZE) -> List[KnowledgeChunk]:
+    """Chunk extracted PDF text, labelling chunks with their page"""
+    chunks = []
+    for page_number, page in enumerate(re.split(r"--- Page \d+ ---|\f", text), start=1):
+        for piece in _split_text(page, size):
+            chunks.append(KnowledgeChunk(source, f"page {page_number}", piece))
+    return chunks
+
+
+class KnowledgeIndex:
+    """Chunked, lexically indexed documents of one knowledge directory"""
+
+    def __init__(self, knowledge_dir: Path, chunk_size: int = CHUNK_SIZE):
+        self.knowledge_dir = Path(knowledge_dir)
+        self.chunk_size = chunk_size
+        self._file_chunks: Dict[Path, Tuple[float, str, List[KnowledgeChunk]]] = {}
+        self._state = _EMPTY_STATE
+        self._last_check: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def documents(self) -> Dict[str, str]:
+        return self._state.documents
+
+    @property
+    def chunks(self) -> List[KnowledgeChunk]:
+        return self._state.chunks
+
+    def _paths(self) -> List[Path]:
+        if not self.knowledge_dir.exists():
+            return []
+        return sorted(
+            path for path in self.knowledge_dir.iterdir()
+            if path.suffix.lower() in (".md", ".pdf") and path.is_file()
+        )
+
+    def _read(self, path: Path) -> Tuple[str, List[KnowledgeChunk]]:
+        if path.suffix.lower() == ".md":
+            text = path.read_text()
+            return text, chunk_markdown(path.stem, text, self.chunk_size)
+        try:
+            processed = PDFProcessor().process(path)
+        except ValueError as e:
+            logger.warning(f"Skipping knowledge document {path.name}: {e}")
+            return "", []
+        if processed.metadata.get("extraction_method", "").startswith("MOCK"):
+            return "", []
+        return processed.content, chunk_pdf_text(path.stem, processed.content, self.chunk_size)
+
+    def _load(self) -> bool:
+        """(Re)read new or modified files; True when the index changed"""
+        paths = self._paths()
+        changed = set(self._file_chunks) - set(paths)
+        for path in changed:
+            del self._file_chunks[path]
+        for path in paths:
+            mtime = path.stat().st_mtime
+            cached = self._file_chunks.get(path)
+            if cached is None or cached[0] != mtime:
+                self._file_chunks[path] = (mtime, *self._read(path))
+                changed.add(path)
+        if changed or self._last_check is None:
+            self._build()
+        self._last_check = time.monotonic()
+        return bool(changed)
+
+    def _build(self):
+        documents = {path.stem: text for path, (_, text, _) in self._file_chunks.items() if text}
+        chunks = [chunk for _, _, file_chunks in self._file_chunks.values() for chunk in file_chunks]
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = []
+        for position, chunk in enumerate(chunks):
+            terms = tokenize(f"{chunk.heading} {chunk.text}")
+            lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                postings.setdefault(term, []).append((position, count))
+        average_length = sum(lengths) / len(lengths) if lengths else 0.0
+        # Searches running meanwhile keep the state they started with
+        self._state = _IndexState(documents, chunks, postings, lengths, average_length)
+        logger.debug(f"Indexed {len(chunks)} chunks from {len(documents)} documents "
+                     f"in {self.knowledge_dir}")
+
+    def refresh(self, force: bool = False) -> bool:
+        """Pick up changed files, checking at most every RELOAD_CHECK_INTERVAL_S"""
+        if (not force and self._last_check is not None
+                and time.monotonic() - self._last_check < RELOAD_CHECK_INTERVAL_S):
+            return False
+        with self._lock:
+            return self._load()
+
+    async def refresh_async(self, force: bool = False) -> bool:
+        """``refresh`` on a worker thread, keeping file and PDF reads off the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.refresh, force)
+
+    def search(self, query: str, k: int = 3) -> List[KnowledgeChunk]:
+        """The ``k`` chunks ranked highest for ``query`` by BM25, as of the last refresh"""
+        state = self._state
+        scores: Dict[int, float] = {}
+        chunk_count = len(state.chunks)
+        for term in set(tokenize(query)):
+            postings = state.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (chunk_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, count in postings:
+                length_norm = 1 - BM25_B + BM25_B * state.lengths[position] / state.average_length
+                scores[position] = scores.get(position, 0.0) + idf * count * (BM25_K1 + 1) / (
+                    count + BM25_K1 * length_norm
+                )
+        ranked = sorted(scores, key=lambda position: (-scores[position], position))
+        return [state.chunks[position] for position in ranked[:k]]
+
+
+class KnowledgeIndexRegistry:
+    """Caches one KnowledgeIndex per knowledge directory"""
+
+    def __init__(self):
+        self._indexes: Dict[Path, KnowledgeIndex] = {}
+        self._lock = threading.Lock()
+
+    def index(self, knowledge_dir: Path) -> KnowledgeIndex:
+        key = Path(knowledge_dir).resolve()
+        with self._lock:
+            if key not in self._indexes:
+                self._indexes[key] = KnowledgeIndex(key)
+            return self._indexes[key]
+
+    def invalidate(self, knowledge_dir: Optional[Path] = None):
+        with self._lock:
+            if knowledge_dir is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(Path(knowledge_dir).resolve(), None)
+
+
+knowledge_indexes = KnowledgeIndexRegistry()
+
+
+def get_knowledge_index(knowledge_dir: Path) -> KnowledgeIndex:
+    """Index from the process-wide registry"""
+    return knowledge_indexes.index(knowledge_dir)
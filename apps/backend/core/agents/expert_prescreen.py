@@ -0,0 +1,256 @@
+"""
+Rule-based pre-screen for ExpertAgent quality assessments
+
+Most agent outputs are either clearly fine or clearly broken, and neither
+needs an LLM to say so. The pre-screen checks an output against the
+ExpertAgent's quality standards, its common error patterns and the Step 2
+cross-reference checks. Only outputs it cannot decide go to the LLM.
+"""
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from .step2_agents.cross_reference_validator import CrossReferenceValidator
+
+
+# Score reported for outputs decided by the pre-screen
+PRESCREEN_SCORES = {
+    "acceptable": 0.8,
+    "needs_improvement": 0.5,
+    "unacceptable": 0.2
+}
+
+# Most severe first, for the order of refinement fixes
+SEVERITY_ORDER = {"critical": 0, "major": 1, "minor": 2}
+
+
+class ExpertPrescreen:
+    """
+    Deterministic quality checks run before any expert LLM call.
+
+    ``assess`` returns an assessment in the same shape as the LLM's, or
+    None when the output is neither an obvious pass nor an obvious failure.
+    """
+
+    def __init__(self, quality_standards: Dict[str, Any], common_errors: List[Dict[str, Any]]):
+        self.quality_standards = quality_standards
+        self.error_patterns = {error["pattern"]: error for error in common_errors}
+        # Kept across calls so re-checking a refined output only re-runs the
+        # cross-reference rules that read the refined agent's phase
+        self.cross_reference = CrossReferenceValidator()
+
+    def assess(self, step_number: int, agent_type: str, output: Dict[str, Any],
+               context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Decide obvious cases; None hands the output to the LLM"""
+        if step_number != 2 or agent_type not in CrossReferenceValidator.AGENT_OUTPUTS:
+            return None
+
+        issues = []
+        missing_elements = []
+
+        if output.get("error"):
+            issues.append(self._issue("agent_error", "critical", f"Agent failed: {output['error']}",
+                                      agent_type, "Re-run the agent"))
+
+        items = self._primary_items(agent_type, output)
+        if not items:
+            missing_elements.append(agent_type)
+            issues.append(self._issue("missing_elements", "critical",
+                                      f"{agent_type} produced no results", agent_type,
+                                      "Produce the outputs required for this step"))
+        else:
+            issues.extend(self._standards_issues(agent_type, output, items, context))
+            issues.extend(self._reference_issues(agent_type, output, context))
+
+        severities = {issue["severity"] for issue in issues}
+        if "critical" in severities:
+            quality_level = "unacceptable"
+        elif "major" in severities:
+            quality_level = "needs_improvement"
+        elif issues or not self._has_positive_checks(agent_type, context):
+            # Only minor findings, or nothing that could show the output is
+            # good rather than merely well-formed: judging it is the LLM's job
+            return None
+        else:
+            quality_level = "acceptable"
+
+        return {
+            "quality_level": quality_level,
+            "overall_score": PRESCREEN_SCORES[quality_level],
+            "methodology_compliance": {
+                "meets_step_requirements": not missing_elements,
+                "appropriate_abstraction": not any(i["type"] == "wrong_abstraction" for i in issues),
+                "complete_control_loops": not any(i["type"] == "missing_feedback" for i in issues)
+            },
+            "issues": issues,
+            "strengths": [] if issues else ["Passed all rule-based quality checks"],
+            "recommendations": [issue["fix_guidance"] for issue in issues],
+            "missing_elements": missing_elements,
+            "assessed_by": "prescreen"
+        }
+
+    def refinement_guidance(self, assessment: Dict[str, Any]) -> Dict[str, Any]:
+        """Refinement guidance for a pre-screen failure, built from its issues"""
+        issues = sorted(assessment["issues"], key=lambda issue: SEVERITY_ORDER.get(issue["severity"], 3))
+        return {
+            "priority_fixes": [
+                {
+                    "issue": issue["description"],
+                    "specific_guidance": issue["fix_guidance"],
+                    "example": ""
+                }
+                for issue in issues
+            ],
+            "prompt_additions": list(dict.fromkeys(issue["fix_guidance"] for issue in issues)),
+            "avoid_patterns": list(dict.fromkeys(
+                self.error_patterns[issue["type"]]["description"]
+                for issue in issues if issue["type"] in self.error_patterns
+            ))
+        }
+
+    def _issue(self, issue_type: str, severity: str, description: str, location: str,
+               fix_guidance: Optional[str] = None) -> Dict[str, Any]:
+        pattern = self.error_patterns.get(issue_type, {})
+        return {
+            "type": issue_type,
+            "severity": severity,
+            "description": description,
+            "location": location,
+            "fix_guidance": fix_guidance or pattern.get("fix", "Review and refine output")
+        }
+
+    def _primary_items(self, agent_type: str, output: Dict[str, Any]) -> List[Any]:
+        """The findings an agent exists to produce"""
+        if agent_type == "control_structure_analyst":
+            components = output.get("components") or {}
+            return (
+                list(components.get("controllers", [])) +
+                list(components.get("controlled_processes", [])) +
+                list(components.get("dual_role_components", []))
+            )
+        if agent_type == "control_action_mapping":
+            actions = output.get("control_actions") or {}
+            return list(actions.get("control_actions", []) if isinstance(actions, dict) else actions)
+        key = {
+            "control_context_analyst": "control_contexts",
+            "feedback_mechanism": "feedback_mechanisms",
+            "trust_boundary": "trust_boundaries",
+            "process_model_analyst": "process_models"
+        }[agent_type]
+        return list(output.get(key) or [])
+
+    def _has_positive_checks(self, agent_type: str, context: Dict[str, Any]) -> bool:
+        """Whether ``_standards_issues`` measures this output against a standard"""
+        if agent_type == "control_structure_analyst":
+            return True
+        if agent_type == "control_action_mapping":
+            # Coverage can only be checked against a known control structure
+            return any(self._context_components(context))
+        if agent_type == "feedback_mechanism":
+            # Loop closure can only be checked against known control actions
+            return bool(self._context_control_actions(context))
+        return False
+
+    def _standards_issues(self, agent_type: str, output: Dict[str, Any], items: List[Any],
+                          context: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Checks derived from the ExpertAgent's quality standards"""
+        issues = []
+
+        if agent_type == "control_structure_analyst":
+            standards = self.quality_standards["control_structure"]
+            components = output["components"]
+            if len(items) < standards["min_components"]:
+                issues.append(self._issue(
+                    "missing_elements", "critical",
+                    f"Only {len(items)} components identified (minimum {standards['min_components']})",
+                    "components", "Identify all decision-making entities in the system"
+                ))
+            has_controllers = components.get("controllers") or components.get("dual_role_components")
+            has_processes = components.get("controlled_processes") or components.get("dual_role_components")
+            if not has_controllers or not has_processes:
+                issues.append(self._issue(
+                    "missing_elements", "critical",
+                    f"Control structure must include {' and '.join(standards['required_types'])} components",
+                    "components", "Identify both controllers and the processes they control"
+                ))
+            depth = components.get("hierarchy_depth") or 0
+            if depth > standards["max_hierarchy_depth"]:
+                issues.append(self._issue(
+                    "wrong_abstraction", "minor",
+                    f"Hierarchy is {depth} levels deep (maximum {standards['max_hierarchy_depth']})",
+                    "hierarchy"
+                ))
+
+        elif agent_type == "control_action_mapping":
+            # Every controller needs an action it issues, and every
+            # controlled process an action it receives
+            controllers, processes, dual_roles = self._context_components(context)
+            issuing = {action.get("controller_id") for action in items}
+            receiving = {action.get("controlled_process_id") for action in items}
+            unmapped = sorted(
+                (controllers - issuing) | (processes - receiving) | (dual_roles - issuing - receiving)
+            )
+            if unmapped:
+                issues.append(self._issue(
+                    "missing_elements", "minor",
+                    f"{len(unmapped)} components have no control actions: {', '.join(unmapped)}",
+                    "control_actions", "Map the control actions of every controller and controlled process"
+                ))
+            generic = {
+                name.lower() for name in self.quality_standards["control_actions"]["examples"]["bad"]
+            }
+            for action in items:
+                if str(action.get("action_name", "")).strip().lower() in generic:
+                    issues.append(self._issue(
+                        "wrong_abstraction", "minor",
+                        f"Control action '{action['action_name']}' is too generic",
+                        action.get("identifier", "control_actions")
+                    ))
+
+        elif agent_type == "feedback_mechanism":
+            # Every control action needs a feedback path back to its controller
+            actions = self._context_control_actions(context)
+            loops = {
+                (action.get("controller_id"), action.get("controlled_process_id")) for action in actions
+            }
+            closed = {
+                (feedback.get("target_controller_id"), feedback.get("source_process_id")) for feedback in items
+            }
+            open_loops = loops - closed
+            if open_loops:
+                issues.append(self._issue(
+                    "missing_feedback", "major" if open_loops == loops else "minor",
+                    f"{len(open_loops)} of {len(loops)} control loops have no feedback path",
+                    "feedback_mechanisms"
+                ))
+
+        return issues
+
+    def _context_components(self, context: Dict[str, Any]) -> Tuple[Set[str], Set[str], Set[str]]:
+        """Identifiers of the controllers, controlled processes and dual-role components in context"""
+        controllers, processes, dual_roles = set(), set(), set()
+        for result in (context.get("control_structure") or {}).values():
+            data = result.data if hasattr(result, "data") else (result or {}).get("data", {})
+            components = (data or {}).get("components") or {}
+            for found, key in ((controllers, "controllers"), (processes, "controlled_processes"),
+                               (dual_roles, "dual_role_components")):
+                found.update(c["identifier"] for c in components.get(key, []) if c.get("identifier"))
+        return controllers, processes, dual_roles
+
+    def _context_control_actions(self, context: Dict[str, Any]) -> List[Dict[str, Any]]:
+        actions = []
+        for result in (context.get("control_actions") or {}).values():
+            data = result.data if hasattr(result, "data") else (result or {}).get("data", {})
+            mapped = (data or {}).get("control_actions") or {}
+            actions.extend(mapped.get("control_actions", []) if isinstance(mapped, dict) else mapped)
+        return actions
+
+    def _reference_issues(self, agent_type: str, output: Dict[str, Any],
+                          context: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Cross-reference errors in this agent's output"""
+        if agent_type != "control_structure_analyst" and not context.get("control_structure"):
+            # Nothing to check the references against
+            return []
+        report = self.cross_reference.validate_agent_output(agent_type, output, context)
+        return [
+            self._issue("undefined_components", "major", error["message"], error.get("id", error["entity"]))
+            for error in report["errors"]
+        ]
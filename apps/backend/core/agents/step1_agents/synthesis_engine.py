@@ -0,0 +1,234 @@
+"""
+Near-duplicate synthesis engine for cognitive-style results
+
+Dream-team and enhanced runs produce the same finding several times in
+slightly different words. Exact prefix keys never merge paraphrases, so this
+engine clusters findings with MinHash signatures and locality-sensitive
+hashing (LSH) banding. Candidate generation is linear in the number of
+findings; only findings sharing a band bucket are compared.
+"""
+from typing import Dict, Any, List, Optional, Callable, Iterable, Tuple
+from collections import Counter, defaultdict
+import random
+import re
+import zlib
+
+
+# Words that carry no meaning for near-duplicate detection
+_STOPWORDS = frozenset("""
+a an and are as at be been by can could for from has have in into is it its
+may might of on or that the their this through to was were which while will
+with within without would due such any all other others being
+""".split())
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _normalize_token(token: str) -> str:
+    """Cheap plural folding so 'systems' and 'system' share a shingle"""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def shingle(text: str) -> set:
+    """Break text into a set of normalized word and word-pair shingles"""
+    tokens = [
+        _normalize_token(t) for t in _TOKEN_PATTERN.findall(text.lower())
+        if t not in _STOPWORDS
+    ]
+    shingles = set(tokens)
+    shingles.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return shingles
+
+
+class MinHasher:
+    """Computes fixed-length MinHash signatures for shingle sets"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, shingles: Iterable[str]) -> Tuple[int, ...]:
+        hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles]
+        if not hashes:
+            return tuple([_MAX_HASH] * self.num_perm)
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._perms
+        )
+
+    @staticmethod
+    def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+        """Estimate Jaccard similarity from two signatures"""
+        matches = sum(1 for x, y in zip(sig_a, sig_b) if x == y)
+        return matches / len(sig_a)
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i == root_j:
+            return
+        # Keep the earliest finding as the cluster root so output order is stable
+        if root_j < root_i:
+            root_i, root_j = root_j, root_i
+        self.parent[root_j] = root_i
+
+
+class CognitiveSynthesisEngine:
+    """
+    Merges findings produced by several cognitive styles into one list.
+
+    Findings are grouped by an exact category key, then clustered inside each
+    group by MinHash/LSH similarity of their text field. Every merged finding
+    keeps provenance: the styles that found it and the variants it absorbed.
+    """
+
+    def __init__(self, threshold: float = 0.5, num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+
+    def cluster(self, texts: List[str], groups: Optional[List[str]] = None) -> List[List[int]]:
+        """
+        Cluster texts into near-duplicate groups.
+
+        Args:
+            texts: Text of each finding
+            groups: Optional exact key per finding; only findings in the same
+                group can be merged
+
+        Returns:
+            List of clusters as index lists, ordered by first appearance
+        """
+        count = len(texts)
+        groups = groups or [""] * count
+        union_find = _UnionFind(count)
+        signatures = []
+        buckets: Dict[Tuple, List[int]] = defaultdict(list)
+        exact: Dict[Tuple[str, str], int] = {}
+
+        for index, (text, group) in enumerate(zip(texts, groups)):
+            normalized = " ".join(text.lower().split())
+            exact_key = (group, normalized)
+            if exact_key in exact:
+                union_find.union(exact[exact_key], index)
+            else:
+                exact[exact_key] = index
+
+            shingles = shingle(text)
+            signature = self.hasher.signature(shingles) if shingles else None
+            signatures.append(signature)
+            if signature is None:
+                continue
+            for band in range(self.bands):
+                start = band * self.rows
+                buckets[(group, band, signature[start:start + self.rows])].append(index)
+
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            anchor = members[0]
+            for other in members[1:]:
+                if union_find.find(anchor) == union_find.find(other):
+                    continue
+                similarity = MinHasher.similarity(signatures[anchor], signatures[other])
+                if similarity >= self.threshold:
+                    union_find.union(anchor, other)
+
+        clusters: Dict[int, List[int]] = {}
+        for index in range(count):
+            clusters.setdefault(union_find.find(index), []).append(index)
+        return list(clusters.values())
+
+    def merge(self, results: List[Dict[str, Any]], list_key: str,
+              group_fields: Iterable[str] = (), text_field: Optional[str] = None,
+              on_merge: Optional[Callable[[Dict[str, Any], Dict[str, Any], str], None]] = None,
+              decorate: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """
+        Merge one list of findings across cognitive-style results.
+
+        Args:
+            results: Entries of {"cognitive_style": ..., "results": {...}}
+            list_key: Key of the finding list inside each style's results
+            group_fields: Fields that must match exactly for findings to merge
+            text_field: Field compared for near-duplicates; exact match only
+                when omitted
+            on_merge: Called as (merged, duplicate, style) for each absorbed
+                finding, to combine agent-specific attributes
+            decorate: Called once per new merged finding
+
+        Returns:
+            Merged findings with ``found_by_styles`` and ``merged_variants``
+        """
+        group_fields = tuple(group_fields)
+        findings: List[Tuple[str, Dict[str, Any]]] = []
+        for style_result in results:
+            style = style_result["cognitive_style"]
+            for finding in style_result["results"].get(list_key, []) or []:
+                findings.append((style, finding))
+
+        groups = [
+            "\x1f".join(str(finding.get(field, "")) for field in group_fields)
+            for _, finding in findings
+        ]
+        if text_field:
+            texts = [str(finding.get(text_field, "") or "") for _, finding in findings]
+            clusters = self.cluster(texts, groups)
+        else:
+            clusters = self._cluster_exact(groups)
+
+        merged_findings = []
+        for members in clusters:
+            style, first = findings[members[0]]
+            merged = {**first, "found_by_styles": [style]}
+            if decorate:
+                decorate(merged)
+            variants = []
+            for index in members[1:]:
+                dup_style, duplicate = findings[index]
+                if dup_style not in merged["found_by_styles"]:
+                    merged["found_by_styles"].append(dup_style)
+                if text_field and duplicate.get(text_field) != first.get(text_field):
+                    variants.append({"style": dup_style, text_field: duplicate.get(text_field)})
+                if on_merge:
+                    on_merge(merged, duplicate, dup_style)
+            if variants:
+                merged["merged_variants"] = variants
+            merged_findings.append(merged)
+        return merged_findings
+
+    @staticmethod
+    def _cluster_exact(keys: List[str]) -> List[List[int]]:
+        clusters: Dict[str, List[int]] = {}
+        for index, key in enumerate(keys):
+            clusters.setdefault(key, []).append(index)
+        return list(clusters.values())
+
+    @staticmethod
+    def style_contributions(findings: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Count findings per style in a single pass"""
+        return dict(Counter(
+            style for finding in findings for style in set(finding.get("found_by_styles", []))
+        ))
@@ -2,7 +2,8 @@
 Base class for Step 2 STPA-Sec agents
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
+from functools import partial
 import uuid
 from datetime import datetime
 import logging
@@ -14,6 +15,7 @@ from typing import Dict, Any, Optional
 from dataclasses import dataclass
 from core.utils.prompt_saver import get_prompt_saver
 from core.utils.json_parser import parse_llm_json
+from .step1_snapshot import Step1Snapshot, load_step1_snapshot
 
 
 @dataclass
@@ -42,186 +44,35 @@ class BaseStep2Agent(ABC):
     Provides common functionality for control structure analysis.
     """
     
+    # Earlier phase outputs (keys of previous_results) this agent needs; the
+    # coordinator starts the agent as soon as all of them are available
+    consumes: Tuple[str, ...] = ()
+    
     def __init__(self, model_provider, db_connection: asyncpg.Connection, cognitive_style: CognitiveStyle = CognitiveStyle.BALANCED):
         self.model_provider = model_provider
         self.db_connection = db_connection
         self.cognitive_style = cognitive_style
+        self.step1_snapshot: Optional[Step1Snapshot] = None
+        # With defer_store set, analyze() leaves its writes in pending_store
+        # for the caller to run once it decides to keep the result
+        self.defer_store = False
+        self.pending_store: Optional[Callable[[], Awaitable[None]]] = None
         self.agent_id = str(uuid.uuid4())
         self.created_at = datetime.now()
         self.logger = logging.getLogger(f"{self.__class__.__name__}-{self.agent_id[:8]}")
         
-    async def load_step1_results(self, step1_analysis_id: str) -> Dict[str, Any]:
+    async def load_step1_results(self, step1_analysis_id: str) -> Step1Snapshot:
         """
         Load relevant Step 1 results for Step 2 analysis.
         Returns consolidated view of Step 1 outputs.
+
+        The coordinator loads the snapshot once per run and hands it to every
+        agent; agents used on their own load it themselves.
         """
-        # Load Step 1 analysis metadata
-        step1_analysis = await self.db_connection.fetchrow(
-            "SELECT * FROM step1_analyses WHERE id = $1", 
-            step1_analysis_id
-        )
-        if not step1_analysis:
-            raise ValueError(f"Step 1 analysis {step1_analysis_id} not found")
-            
-        # Load key Step 1 results
-        results = {
-            'analysis_id': step1_analysis_id,
-            'system_name': step1_analysis.get('name', 'Unknown System'),
-            'mission_statement': await self._get_mission_statement(step1_analysis_id),
-            'losses': await self._get_losses(step1_analysis_id),
-            'hazards': await self._get_hazards(step1_analysis_id),
-            'security_constraints': await self._get_security_constraints(step1_analysis_id),
-            'stakeholders': await self._get_stakeholders(step1_analysis_id),
-            'system_boundaries': await self._get_system_boundaries(step1_analysis_id)
-        }
-        
-        return results
-        
-    async def _get_mission_statement(self, analysis_id: str) -> str:
-        """Extract mission statement from Step 1 results."""
-        query = """
-        SELECT metadata->>'mission_statement' as mission_statement
-        FROM step1_analyses
-        WHERE id = $1
-        """
-        result = await self.db_connection.fetchrow(query, analysis_id)
-        return result['mission_statement'] if result else ''
-        
-    async def _get_losses(self, analysis_id: str) -> List[Dict[str, Any]]:
-        """Get losses from Step 1."""
-        # Check which table exists (step1_losses for new schema, losses for old)
-        has_step1_losses = await self.db_connection.fetchval("""
-            SELECT EXISTS (
-                SELECT 1 FROM information_schema.tables 
-                WHERE table_name = 'step1_losses'
-            )
-        """)
-        
-        if has_step1_losses:
-            # New schema with step1_losses table
-            query = """
-            SELECT id, identifier, loss_category as loss_type, description, 
-                   COALESCE(severity_classification->>'stakeholder_impact', '') as stakeholder_impact
-            FROM step1_losses
-            WHERE analysis_id = $1
-            ORDER BY identifier
-            """
-        else:
-            # Old schema with losses table
-            query = """
-            SELECT id, description, 
-                   COALESCE(properties->>'loss_type', 'safety') as loss_type,
-                   COALESCE(properties->>'stakeholder_impact', '') as stakeholder_impact,
-                   'L-' || SUBSTRING(id::text, 1, 8) as identifier
-            FROM losses
-            ORDER BY created_at
-            """
-        
-        rows = await self.db_connection.fetch(query, analysis_id)
-        return [dict(row) for row in rows]
-        
-    async def _get_hazards(self, analysis_id: str) -> List[Dict[str, Any]]:
-        """Get hazards from Step 1."""
-        # Check which table exists (step1_hazards for new schema, hazards for old)
-        has_step1_hazards = await self.db_connection.fetchval("""
-            SELECT EXISTS (
-                SELECT 1 FROM information_schema.tables 
-                WHERE table_name = 'step1_hazards'
-            )
-        """)
-        
-        if has_step1_hazards:
-            # New schema with step1_hazards table
-            query = """
-            SELECT h.id, h.identifier, h.description, h.hazard_category,
-                   h.affected_system_property,
-                   COALESCE(h.environmental_factors->>'system_state', '') as system_state,
-                   array_agg(DISTINCT hm.loss_id) as associated_losses
-            FROM step1_hazards h
-            LEFT JOIN hazard_loss_mappings hm ON h.id = hm.hazard_id
-            WHERE h.analysis_id = $1
-            GROUP BY h.id, h.identifier, h.description, h.hazard_category, 
-                     h.affected_system_property, h.environmental_factors
-            ORDER BY h.identifier
-            """
-        else:
-            # Old schema without identifier
-            query = """
-            SELECT h.id, h.description, 
-                   COALESCE(h.properties->>'system_state', '') as system_state,
-                   'H-' || SUBSTRING(h.id::text, 1, 8) as identifier,
-                   array_agg(DISTINCT hl.loss_id) as associated_losses
-            FROM hazards h
-            LEFT JOIN hazard_losses hl ON h.id = hl.hazard_id
-            GROUP BY h.id, h.description, h.properties
-            ORDER BY h.created_at
-            """
-        
-        rows = await self.db_connection.fetch(query, analysis_id)
-        return [dict(row) for row in rows]
-        
-    async def _get_security_constraints(self, analysis_id: str) -> List[Dict[str, Any]]:
-        """Get security constraints from Step 1."""
-        # Always use security_constraints table (both old and new schemas use this name)
-        query = """
-        SELECT sc.id, sc.identifier, sc.constraint_statement as constraint_text, sc.constraint_type,
-               array_agg(DISTINCT chm.hazard_id) as mitigated_hazards
-        FROM security_constraints sc
-        LEFT JOIN constraint_hazard_mappings chm ON sc.id = chm.constraint_id
-        WHERE sc.analysis_id = $1
-        GROUP BY sc.id, sc.identifier, sc.constraint_statement, sc.constraint_type
-        ORDER BY sc.identifier
-        """
-        
-        rows = await self.db_connection.fetch(query, analysis_id)
-        return [dict(row) for row in rows]
-        
-    async def _get_stakeholders(self, analysis_id: str) -> List[Dict[str, Any]]:
-        """Get stakeholders from Step 1."""
-        # Check which table exists (step1_stakeholders for new schema, stakeholders for old)
-        has_step1_stakeholders = await self.db_connection.fetchval("""
-            SELECT EXISTS (
-                SELECT 1 FROM information_schema.tables 
-                WHERE table_name = 'step1_stakeholders'
-            )
-        """)
-        
-        if has_step1_stakeholders:
-            # New schema with step1_stakeholders table
-            query = """
-            SELECT id, name, stakeholder_type, 
-                   COALESCE(mission_perspective->>'primary_needs', '') as concerns,
-                   COALESCE(influence_interest->>'trust_level', 'medium') as trust_level
-            FROM step1_stakeholders
-            WHERE analysis_id = $1
-            ORDER BY name
-            """
-        else:
-            # Old schema
-            query = """
-            SELECT id, name, stakeholder_type, concerns, trust_level
-            FROM stakeholders
-            WHERE analysis_id = $1
-            ORDER BY name
-            """
-        
-        rows = await self.db_connection.fetch(query, analysis_id)
-        return [dict(row) for row in rows]
-        
-    async def _get_system_boundaries(self, analysis_id: str) -> List[Dict[str, Any]]:
-        """Get system boundaries from Step 1."""
-        # Always use system_boundaries table (both old and new schemas use this name)
-        query = """
-        SELECT id, boundary_type, description, 
-               COALESCE(definition_criteria->>'includes', '[]') as includes,
-               COALESCE(definition_criteria->>'excludes', '[]') as excludes
-        FROM system_boundaries
-        WHERE analysis_id = $1
-        ORDER BY boundary_type
-        """
-        
-        rows = await self.db_connection.fetch(query, analysis_id)
-        return [dict(row) for row in rows]
+        if self.step1_snapshot is not None and self.step1_snapshot.analysis_id == step1_analysis_id:
+            return self.step1_snapshot
+        self.step1_snapshot = await load_step1_snapshot(self.db_connection, step1_analysis_id)
+        return self.step1_snapshot
         
     def format_control_structure_prompt(self, step1_results: Dict[str, Any], specific_focus: str = "") -> str:
         """
@@ -326,6 +177,12 @@ Maintain appropriate abstraction for security analysis:
         """
         pass
     
+    async def _store_result(self, store: Callable[..., Awaitable[None]], *args: Any) -> None:
+        """Run an analysis's store step, or hold it when storage is deferred"""
+        if self.defer_store:
+            self.pending_store = partial(store, *args)
+        else:
+            await store(*args)
     
     async def query_llm_with_retry(self, messages: List[Dict[str, str]], 
                                    max_retries: int = 3, 
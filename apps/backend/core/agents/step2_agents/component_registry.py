@@ -200,29 +200,36 @@ class ComponentRegistry:
         
         return registry
         
-    def get_prompt_context(self) -> str:
+    def get_prompt_context(self, identifiers: Optional[Set[str]] = None) -> str:
         """
         Generate a context string for prompts to inform agents about existing components.
+        
+        Args:
+            identifiers: Limit the listing to these components (one partition
+                of a large control structure)
         """
+        def listed(ids: Set[str]) -> List[str]:
+            return sorted(ids if identifiers is None else ids & identifiers)
+            
         context = "## Existing Components in Control Structure\n\n"
         
-        if self.controllers:
+        if listed(self.controllers):
             context += "### Controllers:\n"
-            for ctrl_id in sorted(self.controllers):
+            for ctrl_id in listed(self.controllers):
                 comp = self.components[ctrl_id]
                 context += f"- {ctrl_id}: {comp.name} - {comp.description}\n"
             context += "\n"
             
-        if self.processes:
+        if listed(self.processes):
             context += "### Controlled Processes:\n"
-            for proc_id in sorted(self.processes):
+            for proc_id in listed(self.processes):
                 comp = self.components[proc_id]
                 context += f"- {proc_id}: {comp.name} - {comp.description}\n"
             context += "\n"
             
-        if self.dual_roles:
+        if listed(self.dual_roles):
             context += "### Dual-Role Components:\n"
-            for dual_id in sorted(self.dual_roles):
+            for dual_id in listed(self.dual_roles):
                 comp = self.components[dual_id]
                 context += f"- {dual_id}: {comp.name} - {comp.description}\n"
             context += "\n"
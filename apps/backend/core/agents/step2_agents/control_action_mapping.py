@@ -1,10 +1,16 @@
 from typing import Dict, Any, List, Optional
+import asyncio
 import json
 import uuid
 from datetime import datetime
 
 from .base_step2 import BaseStep2Agent, AgentResult
 from .component_registry import ComponentRegistry
+from .db_compat import Step2DBCompat
+from .partitioning import (
+    RegistryPartition, should_partition, partition_registry, interface_summary,
+    merge_partition_lists, normalized, scope_components
+)
 from core.agents.step1_agents.base_step1 import CognitiveStyle
 from core.utils.json_parser import parse_llm_json
 from .schemas import CONTROL_ACTION_SCHEMA
@@ -16,6 +22,8 @@ class ControlActionMappingAgent(BaseStep2Agent):
     Identifies what commands flow through the system.
     """
     
+    consumes = ('control_structure',)
+    
     async def analyze(self, step1_analysis_id: str, step2_analysis_id: str, **kwargs) -> AgentResult:
         """Map control actions between components."""
         start_time = datetime.now()
@@ -41,9 +49,34 @@ class ControlActionMappingAgent(BaseStep2Agent):
         # Load control structure from previous phase
         control_structure = await self._load_control_structure(step2_analysis_id)
         
-        # Build prompt with component registry context
-        prompt = self._build_control_action_prompt(step1_results, control_structure, registry)
+        if should_partition(registry):
+            # Too many components for one prompt: map partitions concurrently
+            control_actions = await self._map_partitioned(step1_results, control_structure, registry)
+        else:
+            # Build prompt with component registry context
+            prompt = self._build_control_action_prompt(step1_results, control_structure, registry)
+            control_actions = await self._generate_control_actions(prompt, control_structure, registry)
+        
+        # Store in database
+        await self._store_result(self._store_control_actions, step2_analysis_id, control_actions)
+        
+        execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
+        
+        return AgentResult(
+            agent_type="control_action_mapping",
+            success=True,
+            data={
+                'control_actions': control_actions,
+                'summary': self._generate_summary(control_actions),
+                'component_registry': registry
+            },
+            execution_time_ms=execution_time,
+            metadata={'cognitive_style': self.cognitive_style.value}
+        )
         
+    async def _generate_control_actions(self, prompt: str, control_structure: Dict[str, Any],
+                                        registry: ComponentRegistry) -> Dict[str, Any]:
+        """Query the LLM for control actions and parse them against the registry."""
         # Get LLM response with retry logic
         messages = [
             {"role": "system", "content": "You are an expert systems security analyst who MUST respond with raw JSON only. Do NOT use markdown formatting, code blocks, or backticks. Start your response directly with { and end with }. No ```json tags. You specialize in control action identification and mapping."},
@@ -60,31 +93,77 @@ class ControlActionMappingAgent(BaseStep2Agent):
                 max_tokens=4000
             )
             # Parse response and validate against registry
-            control_actions = self._parse_control_actions(structured_response, control_structure, registry)
+            return self._parse_control_actions(structured_response, control_structure, registry)
         except Exception as e:
             self.logger.warning(f"Structured output failed: {e}. Using regular generation.")
             # Fall back to regular generation with retry
             response_text = await self.query_llm_with_retry(messages, temperature=0.7, max_tokens=4000)
             # Parse response and validate against registry
-            control_actions = self._parse_control_actions(response_text, control_structure, registry)
-        
-        # Store in database
-        await self._store_control_actions(step2_analysis_id, control_actions)
+            return self._parse_control_actions(response_text, control_structure, registry)
+            
+    async def _map_partitioned(self, step1_results: Dict[str, Any], control_structure: Dict[str, Any],
+                               registry: ComponentRegistry) -> Dict[str, Any]:
+        """Map control actions for each partition concurrently, then merge them."""
+        partitions = partition_registry(registry)
+        self.logger.info(
+            f"Mapping control actions for {len(registry.components)} components "
+            f"in {len(partitions)} partitions"
+        )
         
-        execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
+        async def map_partition(partition: RegistryPartition) -> Dict[str, Any]:
+            prompt = self._build_control_action_prompt(
+                step1_results, control_structure, registry, partition, len(partitions)
+            )
+            try:
+                return await self._generate_control_actions(prompt, control_structure, registry)
+            except Exception as e:
+                self.logger.error(f"Partition {partition.index + 1} failed: {e}")
+                return {
+                    'control_actions': [],
+                    'control_contexts': {},
+                    'analysis_notes': '',
+                    'validation_errors': [f"Partition {partition.index + 1} failed: {e}"]
+                }
+                
+        parts = await asyncio.gather(*(map_partition(partition) for partition in partitions))
+        return self._merge_partitioned_actions(parts, partitions)
         
-        return AgentResult(
-            agent_type="control_action_mapping",
-            success=True,
-            data={
-                'control_actions': control_actions,
-                'summary': self._generate_summary(control_actions),
-                'component_registry': registry
-            },
-            execution_time_ms=execution_time,
-            metadata={'cognitive_style': self.cognitive_style.value}
+    def _merge_partitioned_actions(self, parts: List[Dict[str, Any]],
+                                   partitions: List[RegistryPartition]) -> Dict[str, Any]:
+        """Merge per-partition results, dropping actions found by several partitions."""
+        actions, remaps, duplicates = merge_partition_lists(
+            [part['control_actions'] for part in parts],
+            key=lambda action: (
+                action.get('controller_id'),
+                action.get('controlled_process_id'),
+                normalized(action.get('action_name'))
+            ),
+            id_field='identifier',
+            id_prefix='CA'
         )
         
+        contexts = {}
+        for part, remap in zip(parts, remaps):
+            for old_id, context in part['control_contexts'].items():
+                new_id = remap.get(old_id)
+                if new_id and new_id not in contexts:
+                    contexts[new_id] = {**context, 'control_action_id': new_id}
+                    
+        return {
+            'control_actions': actions,
+            'control_contexts': contexts,
+            'analysis_notes': "\n\n".join(
+                f"[Partition {index + 1}] {part['analysis_notes']}"
+                for index, part in enumerate(parts) if part['analysis_notes']
+            ),
+            'validation_errors': [error for part in parts for error in part['validation_errors']],
+            'partitioning': {
+                'partitions': len(partitions),
+                'partition_sizes': [len(partition.members) for partition in partitions],
+                'duplicates_removed': duplicates
+            }
+        }
+        
     async def _load_control_structure(self, analysis_id: str) -> Dict[str, Any]:
         """Load control structure components from database."""
         # Load controllers
@@ -112,12 +191,22 @@ class ControlActionMappingAgent(BaseStep2Agent):
             'processes': [dict(p) for p in processes]
         }
         
-    def _build_control_action_prompt(self, step1_results: Dict[str, Any], control_structure: Dict[str, Any], registry: ComponentRegistry) -> str:
+    def _build_control_action_prompt(self, step1_results: Dict[str, Any], control_structure: Dict[str, Any], registry: ComponentRegistry,
+                                     partition: Optional[RegistryPartition] = None, partition_count: int = 1) -> str:
         """Build prompt for control action mapping."""
         base_prompt = self.format_control_structure_prompt(step1_results)
         
         # Get component context from registry
-        registry_context = registry.get_prompt_context()
+        if partition is None:
+            registry_context = registry.get_prompt_context()
+        else:
+            # Only this partition's components plus the interface to the rest
+            registry_context = registry.get_prompt_context(set(partition.members))
+            registry_context += "\n" + interface_summary(registry, partition, partition_count)
+            control_structure = {
+                key: scope_components(rows, partition.identifiers)
+                for key, rows in control_structure.items()
+            }
         
         prompt = f"""{base_prompt}
 
@@ -307,47 +396,56 @@ Ensure all string values properly escape newlines and quotes."""
             }
             
     async def _store_control_actions(self, analysis_id: str, actions_data: Dict[str, Any]) -> None:
-        """Store control actions in database."""
-        for action in actions_data['control_actions']:
-            action_id = str(uuid.uuid4())
+        """Store control actions and their contexts in one transaction."""
+        db_compat = Step2DBCompat(self.db_connection)
+        actions = actions_data['control_actions']
+        
+        async with self.db_connection.transaction():
+            action_ids = await db_compat.insert_control_actions(analysis_id, [
+                {
+                    'identifier': action['identifier'],
+                    'controller_id': action['controller_db_id'],
+                    'controlled_process_id': action['process_db_id'],
+                    'action_name': action['action_name'],
+                    'action_description': action.get('action_description', ''),
+                    'action_type': action.get('action_type', 'command'),
+                    'timing_requirements': action.get('timing_requirements', {}),
+                    'authority_level': action.get('authority_level', 'optional')
+                }
+                for action in actions
+            ])
             
-            # Store control action
+            # Re-stored actions keep their id, so replace their contexts
+            contexts = [
+                (action_ids[identifier], context)
+                for identifier, context in actions_data['control_contexts'].items()
+                if context and identifier in action_ids
+            ]
+            if not contexts:
+                return
             await self.db_connection.execute(
+                "DELETE FROM control_action_contexts WHERE control_action_id = ANY($1::varchar[])",
+                [action_id for action_id, _ in contexts]
+            )
+            await self.db_connection.executemany(
                 """
-                INSERT INTO control_actions
-                (id, analysis_id, identifier, controller_id, controlled_process_id,
-                 action_name, action_description, action_type, timing_requirements, authority_level)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+                INSERT INTO control_action_contexts
+                (id, control_action_id, required_system_state, prohibited_states,
+                 preconditions, postconditions)
+                VALUES ($1, $2, $3, $4, $5, $6)
                 """,
-                action_id,
-                analysis_id,
-                action['identifier'],
-                action['controller_db_id'],
-                action['process_db_id'],
-                action['action_name'],
-                action.get('action_description', ''),
-                action.get('action_type', 'command'),
-                json.dumps(action.get('timing_requirements', {})),
-                action.get('authority_level', 'optional')
+                [
+                    (
+                        str(uuid.uuid4()),
+                        action_id,
+                        ', '.join(context.get('valid_states', [])),
+                        context.get('prohibited_states', []),
+                        json.dumps(context.get('preconditions', [])),
+                        json.dumps(context.get('postconditions', []))
+                    )
+                    for action_id, context in contexts
+                ]
             )
-            
-            # Store context if available
-            context = actions_data['control_contexts'].get(action['identifier'])
-            if context:
-                await self.db_connection.execute(
-                    """
-                    INSERT INTO control_action_contexts
-                    (id, control_action_id, required_system_state, prohibited_states,
-                     preconditions, postconditions)
-                    VALUES ($1, $2, $3, $4, $5, $6)
-                    """,
-                    str(uuid.uuid4()),
-                    action_id,
-                    ', '.join(context.get('valid_states', [])),
-                    context.get('prohibited_states', []),
-                    json.dumps(context.get('preconditions', [])),
-                    json.dumps(context.get('postconditions', []))
-                )
                 
     def _generate_summary(self, actions_data: Dict[str, Any]) -> str:
         """Generate summary of control actions."""
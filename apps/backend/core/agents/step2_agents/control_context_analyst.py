@@ -20,6 +20,9 @@ from .schemas import CONTROL_CONTEXT_SCHEMA
 class ControlContextAnalystAgent(BaseStep2Agent):
     """Analyzes control contexts without identifying unsafe states."""
     
+    # Control structure and actions are read back from the database
+    consumes = ('control_structure', 'control_actions')
+    
     def __init__(self, model_provider, db_connection: Any, cognitive_style: CognitiveStyle = CognitiveStyle.BALANCED):
         super().__init__(model_provider, db_connection, cognitive_style)
         self.logger = logging.getLogger(self.__class__.__name__)
@@ -75,7 +78,7 @@ class ControlContextAnalystAgent(BaseStep2Agent):
                 control_contexts = self._parse_control_contexts(response, control_actions)
             
             # Save to database
-            await self._save_control_contexts(control_contexts)
+            await self._store_result(self._save_control_contexts, control_contexts)
             
             # Generate summary
             summary = self._generate_summary(control_contexts)
@@ -298,56 +301,61 @@ Start your response with {{ and end with }}.
             }
     
     async def _save_control_contexts(self, control_contexts: Dict[str, Any]):
-        """Save control contexts to database."""
+        """Save control contexts and operational modes in one transaction."""
         if not self.db_connection:
             return
-            
-        # Save control contexts
-        for context in control_contexts.get('control_contexts', []):
-            await self.db_connection.execute("""
-                INSERT INTO control_contexts 
-                (id, analysis_id, control_action_id, execution_context, 
-                 decision_logic, valid_modes, created_at)
-                VALUES ($1, $2, $3, $4, $5, $6, $7)
-                ON CONFLICT (analysis_id, control_action_id) 
-                DO UPDATE SET 
-                    execution_context = $4,
-                    decision_logic = $5,
-                    valid_modes = $6
-            """,
-                str(uuid4()),
-                self.step2_analysis_id,
-                context.get('control_action_uuid'),
-                json.dumps(context.get('execution_context', {})),
-                json.dumps(context.get('decision_logic', {})),
-                context.get('applicable_modes', []),
-                datetime.now()
-            )
         
-        # Save operational modes
-        for mode in control_contexts.get('operational_modes', []):
-            # Store active_controllers in metadata since column doesn't exist
-            metadata = {
-                'active_controllers': mode.get('active_controllers', [])
-            }
+        contexts = control_contexts.get('control_contexts', [])
+        modes = control_contexts.get('operational_modes', [])
+        now = datetime.now()
+        
+        async with self.db_connection.transaction():
+            if contexts:
+                await self.db_connection.executemany("""
+                    INSERT INTO control_contexts 
+                    (id, analysis_id, control_action_id, execution_context, 
+                     decision_logic, valid_modes, created_at)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7)
+                    ON CONFLICT (analysis_id, control_action_id) 
+                    DO UPDATE SET 
+                        execution_context = $4,
+                        decision_logic = $5,
+                        valid_modes = $6
+                """, [
+                    (
+                        str(uuid4()),
+                        self.step2_analysis_id,
+                        context.get('control_action_uuid'),
+                        json.dumps(context.get('execution_context', {})),
+                        json.dumps(context.get('decision_logic', {})),
+                        context.get('applicable_modes', []),
+                        now
+                    )
+                    for context in contexts
+                ])
             
-            await self.db_connection.execute("""
-                INSERT INTO operational_modes
-                (id, analysis_id, mode_name, description, entry_conditions,
-                 exit_conditions, available_control_actions, restricted_actions, 
-                 created_at)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-            """,
-                str(uuid4()),
-                self.step2_analysis_id,
-                mode['mode_name'],
-                mode['description'],
-                json.dumps(mode.get('entry_conditions', [])),  # JSONB field
-                json.dumps(mode.get('exit_conditions', [])),    # JSONB field
-                mode.get('available_actions', []),
-                mode.get('mode_constraints', []),  # Use as restricted_actions
-                datetime.now()
-            )
+            # active_controllers has no column, so it is not stored
+            if modes:
+                await self.db_connection.executemany("""
+                    INSERT INTO operational_modes
+                    (id, analysis_id, mode_name, description, entry_conditions,
+                     exit_conditions, available_control_actions, restricted_actions, 
+                     created_at)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                """, [
+                    (
+                        str(uuid4()),
+                        self.step2_analysis_id,
+                        mode['mode_name'],
+                        mode['description'],
+                        json.dumps(mode.get('entry_conditions', [])),  # JSONB field
+                        json.dumps(mode.get('exit_conditions', [])),    # JSONB field
+                        mode.get('available_actions', []),
+                        mode.get('mode_constraints', []),  # Use as restricted_actions
+                        now
+                    )
+                    for mode in modes
+                ])
     
     def _generate_summary(self, control_contexts: Dict[str, Any]) -> str:
         """Generate summary of control context analysis."""
@@ -2,7 +2,7 @@
 Control Structure Analyst Agent for Step 2 STPA-Sec
 Identifies controllers, controlled processes, and their relationships.
 """
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List
 import json
 import uuid
 from datetime import datetime
@@ -59,7 +59,7 @@ class ControlStructureAnalystAgent(BaseStep2Agent):
             components = self._parse_control_structure(response_text, step1_results)
         
         # Store in database and register in component registry
-        await self._store_components(step2_analysis_id, components, registry)
+        await self._store_result(self._store_components, step2_analysis_id, components, registry)
         
         execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
         
@@ -370,124 +370,121 @@ Ensure all string values properly escape newlines and quotes.
             relationships = components.get('control_relationships', [])
             hierarchy = components.get('control_hierarchy', [])
         
-        # Store controllers
+        rows = []
+        
+        # Controllers
         for controller in controllers:
-            try:
-                # Register in component registry
-                registry.register_component(
-                    identifier=controller['identifier'],
-                    name=controller['name'],
-                    comp_type='controller',
-                    description=controller.get('description', ''),
-                    source='control_structure_analyst',
-                    authority_level=controller.get('authority_level'),
-                    controls=controller.get('controls', []),
-                    abstraction_level=controller.get('abstraction_level', 'service')
-                )
-                
-                # Store in database
-                await db_compat.insert_component(
-                    component_id=str(uuid.uuid4()),
-                    analysis_id=step2_analysis_id,
-                    identifier=controller['identifier'],
-                    name=controller['name'],
-                    component_type='controller',
-                    description=controller.get('description', ''),
-                    abstraction_level=controller.get('abstraction_level', 'service'),
-                    source=controller.get('source', 'inferred'),
-                    metadata={
-                        'authority_level': controller.get('authority_level'),
-                        'controls': controller.get('controls', []),
-                        'stakeholder_link': controller.get('stakeholder_link'),
-                        'trust_level': controller.get('trust_level')
-                    }
-                )
-            except Exception as e:
-                self.logger.error(f"Error storing controller {controller['name']}: {e}")
-                raise
+            registry.register_component(
+                identifier=controller['identifier'],
+                name=controller['name'],
+                comp_type='controller',
+                description=controller.get('description', ''),
+                source='control_structure_analyst',
+                authority_level=controller.get('authority_level'),
+                controls=controller.get('controls', []),
+                abstraction_level=controller.get('abstraction_level', 'service'),
+                trust_level=controller.get('trust_level')
+            )
+            rows.append({
+                'identifier': controller['identifier'],
+                'name': controller['name'],
+                'component_type': 'controller',
+                'description': controller.get('description', ''),
+                'abstraction_level': controller.get('abstraction_level', 'service'),
+                'source': controller.get('source', 'inferred'),
+                'metadata': {
+                    'authority_level': controller.get('authority_level'),
+                    'controls': controller.get('controls', []),
+                    'stakeholder_link': controller.get('stakeholder_link'),
+                    'trust_level': controller.get('trust_level')
+                }
+            })
             
-        # Store controlled processes
+        # Controlled processes
         for process in processes:
-            try:
-                # Register in component registry
-                registry.register_component(
-                    identifier=process['identifier'],
-                    name=process['name'],
-                    comp_type='process',
-                    description=process.get('description', ''),
-                    source='control_structure_analyst',
-                    criticality=process.get('criticality'),
-                    controlled_by=process.get('controlled_by', []),
-                    abstraction_level=process.get('abstraction_level', 'service')
-                )
-                
-                # Store in database
-                await db_compat.insert_component(
-                    component_id=str(uuid.uuid4()),
-                    analysis_id=step2_analysis_id,
-                    identifier=process['identifier'],
-                    name=process['name'],
-                    component_type='controlled_process',
-                    description=process.get('description', ''),
-                    abstraction_level=process.get('abstraction_level', 'service'),
-                    source='system_description',
-                    metadata={
-                        'criticality': process.get('criticality'),
-                        'controlled_by': process.get('controlled_by', [])
-                    }
-                )
-            except Exception as e:
-                self.logger.error(f"Error storing process {process['name']}: {e}")
-                raise
+            registry.register_component(
+                identifier=process['identifier'],
+                name=process['name'],
+                comp_type='process',
+                description=process.get('description', ''),
+                source='control_structure_analyst',
+                criticality=process.get('criticality'),
+                controlled_by=process.get('controlled_by', []),
+                abstraction_level=process.get('abstraction_level', 'service')
+            )
+            rows.append({
+                'identifier': process['identifier'],
+                'name': process['name'],
+                'component_type': 'controlled_process',
+                'description': process.get('description', ''),
+                'abstraction_level': process.get('abstraction_level', 'service'),
+                'source': 'system_description',
+                'metadata': {
+                    'criticality': process.get('criticality'),
+                    'controlled_by': process.get('controlled_by', [])
+                }
+            })
             
-        # Store dual-role components (only in old format)
-        dual_role_components = components.get('dual_role_components', [])
-        for dual in dual_role_components:
+        # Dual-role components (only in old format)
+        for dual in components.get('dual_role_components', []):
+            registry.register_component(
+                identifier=dual['identifier'],
+                name=dual['name'],
+                comp_type='dual-role',
+                description=dual.get('description', ''),
+                source='control_structure_analyst',
+                controls=dual.get('controls', []),
+                controlled_by=dual.get('controlled_by', []),
+                rationale=dual.get('rationale', ''),
+                abstraction_level=dual.get('abstraction_level', 'service')
+            )
+            rows.append({
+                'identifier': dual['identifier'],
+                'name': dual['name'],
+                'component_type': 'both',
+                'description': dual.get('description', ''),
+                'abstraction_level': dual.get('abstraction_level', 'service'),
+                'source': 'inferred',
+                'metadata': {
+                    'controls': dual.get('controls', []),
+                    'controlled_by': dual.get('controlled_by', []),
+                    'rationale': dual.get('rationale', '')
+                }
+            })
+        
+        hierarchy_relations = components['control_hierarchy']
+        for rel in hierarchy_relations:
+            registry.add_reference(rel['parent'], rel['child'])
+        
+        # All components and their hierarchy are written as one unit
+        async with self.db_connection.transaction():
             try:
-                # Register in component registry
-                registry.register_component(
-                    identifier=dual['identifier'],
-                    name=dual['name'],
-                    comp_type='dual-role',
-                    description=dual.get('description', ''),
-                    source='control_structure_analyst',
-                    controls=dual.get('controls', []),
-                    controlled_by=dual.get('controlled_by', []),
-                    rationale=dual.get('rationale', ''),
-                    abstraction_level=dual.get('abstraction_level', 'service')
-                )
-                
-                # Store in database
-                await db_compat.insert_component(
-                    component_id=str(uuid.uuid4()),
-                    analysis_id=step2_analysis_id,
-                    identifier=dual['identifier'],
-                    name=dual['name'],
-                    component_type='both',
-                    description=dual.get('description', ''),
-                    abstraction_level=dual.get('abstraction_level', 'service'),
-                    source='inferred',
-                    metadata={
-                        'controls': dual.get('controls', []),
-                        'controlled_by': dual.get('controlled_by', []),
-                        'rationale': dual.get('rationale', '')
-                    }
-                )
+                component_ids = await db_compat.insert_components(step2_analysis_id, rows)
             except Exception as e:
-                self.logger.error(f"Error storing dual component {dual['name']}: {e}")
+                self.logger.error(f"Error storing {len(rows)} components: {e}")
                 raise
             
-        # Store hierarchy relationships
-        for rel in components['control_hierarchy']:
-            # Register hierarchy in component registry
-            registry.add_reference(rel['parent'], rel['child'])
-            
-            # Need to look up component IDs by identifier
-            parent_id = await self._get_component_id(step2_analysis_id, rel['parent'])
-            child_id = await self._get_component_id(step2_analysis_id, rel['child'])
+            # Hierarchies may name components stored by an earlier run
+            missing = {
+                identifier for rel in hierarchy_relations
+                for identifier in (rel['parent'], rel['child']) if identifier not in component_ids
+            }
+            component_ids.update(await db_compat.component_ids(step2_analysis_id, sorted(missing)))
             
-            if parent_id and child_id:
-                await self.db_connection.execute(
+            hierarchy_rows = [
+                (
+                    str(uuid.uuid4()),
+                    step2_analysis_id,
+                    component_ids[rel['parent']],
+                    component_ids[rel['child']],
+                    rel.get('relationship_type', 'supervises'),
+                    rel.get('description', '')
+                )
+                for rel in hierarchy_relations
+                if rel['parent'] in component_ids and rel['child'] in component_ids
+            ]
+            if hierarchy_rows:
+                await self.db_connection.executemany(
                     """
                     INSERT INTO control_hierarchies 
                     (id, analysis_id, parent_component_id, child_component_id, 
@@ -498,21 +495,8 @@ Ensure all string values properly escape newlines and quotes.
                         relationship_type = EXCLUDED.relationship_type,
                         description = EXCLUDED.description
                     """,
-                    str(uuid.uuid4()),
-                    step2_analysis_id,
-                    parent_id,
-                    child_id,
-                    rel.get('relationship_type', 'supervises'),
-                    rel.get('description', '')
+                    hierarchy_rows
                 )
-                
-    async def _get_component_id(self, analysis_id: str, identifier: str) -> Optional[str]:
-        """Get component ID by identifier."""
-        result = await self.db_connection.fetchrow(
-            "SELECT id FROM system_components WHERE analysis_id = $1 AND identifier = $2",
-            analysis_id, identifier
-        )
-        return result['id'] if result else None
         
     def _generate_summary(self, components: Dict[str, Any]) -> str:
         """Generate summary of control structure."""
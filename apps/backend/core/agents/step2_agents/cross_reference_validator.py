@@ -1,484 +1,371 @@
 """
 Cross-reference validation for Step 2 agent outputs
 """
-from typing import Dict, Any, List, Set, Tuple
+from typing import Dict, Any, List, Tuple, Optional
 import logging
 
+from core.validation import RuleEngine, RuleRegistry, Step2ResultModel, ValidationSeverity
+from .validation_graph import ValidationGraph
+
+# A finding and whether it is an error or a warning
+Finding = Tuple[ValidationSeverity, Dict[str, Any]]
+
 
 class CrossReferenceValidator:
     """
     Validates cross-references between Step 2 agent outputs to ensure consistency.
     """
     
+    # Phase each agent's output belongs to and the validation entities it is
+    # responsible for
+    AGENT_OUTPUTS = {
+        'control_structure_analyst': ('control_structure', {'hierarchy'}),
+        'control_action_mapping': ('control_actions', {'control_action'}),
+        'control_context_analyst': ('control_context', {'control_context'}),
+        'feedback_mechanism': ('feedback_trust', {'feedback'}),
+        'trust_boundary': ('feedback_trust', {'trust_boundary'}),
+        'process_model_analyst': ('process_models', {'process_model'}),
+    }
+    
+    rules = RuleRegistry('cross_reference')
+    
     def __init__(self):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.validation_errors = []
         self.validation_warnings = []
+        self.graph: Optional[ValidationGraph] = None
+        self.model = Step2ResultModel()
+        self.engine = RuleEngine(self.rules, self)
         
-    def validate(self, phase_results: Dict[str, Any]) -> Dict[str, Any]:
+    def validate(self, phase_results: Dict[str, Any],
+                 model: Optional[Step2ResultModel] = None) -> Dict[str, Any]:
         """
         Validate cross-references across all agent outputs.
         
+        Without a model the validator keeps its own and brings it up to date
+        with ``phase_results``, so only rules reading a changed phase re-run.
+        
         Returns validation report with errors and warnings.
         """
+        if model is None:
+            model = self.model
+            model.sync(phase_results)
+        self.graph = model.graph
+        
         self.validation_errors = []
         self.validation_warnings = []
-        
-        # Extract data from phase results
-        components = self._extract_components(phase_results)
-        control_actions = self._extract_control_actions(phase_results)
-        feedback_mechanisms = self._extract_feedback(phase_results)
-        trust_boundaries = self._extract_trust_boundaries(phase_results)
-        contexts = self._extract_contexts(phase_results)
-        process_models = self._extract_process_models(phase_results)
-        
-        # Extract hierarchy information
-        hierarchy = self._extract_hierarchy(phase_results)
-        
-        # Run validation checks
-        self._validate_control_action_references(control_actions, components)
-        self._validate_feedback_references(feedback_mechanisms, components)
-        self._validate_trust_boundary_references(trust_boundaries, components)
-        self._validate_context_references(contexts, control_actions)
-        self._validate_process_model_references(process_models, components)
-        self._validate_component_consistency(components, control_actions, feedback_mechanisms)
-        self._validate_hierarchy_consistency(components, hierarchy)
-        self._validate_process_model_completeness(components, process_models, control_actions)
+        for severity, finding in self.engine.run(model):
+            if severity == ValidationSeverity.ERROR:
+                self.validation_errors.append(finding)
+            else:
+                self.validation_warnings.append(finding)
         
         # Generate report
         return {
             'valid': len(self.validation_errors) == 0,
             'errors': self.validation_errors,
             'warnings': self.validation_warnings,
-            'summary': self._generate_summary()
+            'summary': self._generate_summary(),
+            'rules': self.engine.stats()
         }
     
-    def _extract_components(self, phase_results: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract all components from control structure phase."""
-        components = {
-            'controllers': set(),
-            'processes': set(),
-            'dual_role': set(),
-            'all': set(),
-            'hierarchical_levels': {}  # component_id -> level
-        }
+    def validate_agent_output(self, agent_type: str, data: Dict[str, Any],
+                              phase_results: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Validate one agent's output against the phase results it was built from.
         
-        control_structure = phase_results.get('control_structure', {})
-        for key, result in control_structure.items():
-            if hasattr(result, 'data') and result.success:
-                data = result.data
-            elif isinstance(result, dict) and result.get('success'):
-                data = result.get('data', {})
-            else:
-                continue
-                
-            comp_data = data.get('components', {})
-            
-            # Extract controllers
-            for ctrl in comp_data.get('controllers', []):
-                ctrl_id = ctrl.get('identifier')
-                components['controllers'].add(ctrl_id)
-                components['all'].add(ctrl_id)
-                # Store hierarchical level
-                if 'hierarchical_level' in ctrl:
-                    components['hierarchical_levels'][ctrl_id] = ctrl['hierarchical_level']
-                    
-            # Extract processes
-            for proc in comp_data.get('controlled_processes', []):
-                proc_id = proc.get('identifier')
-                components['processes'].add(proc_id)
-                components['all'].add(proc_id)
-            
-            # Extract dual-role components
-            for dual in comp_data.get('dual_role_components', []):
-                dual_id = dual.get('identifier')
-                components['dual_role'].add(dual_id)
-                components['all'].add(dual_id)
-                # Dual-role should also be in both controllers and processes
-                components['controllers'].add(dual_id)
-                components['processes'].add(dual_id)
-                
-        return components
-    
-    def _extract_control_actions(self, phase_results: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Extract all control actions."""
-        actions = []
-        
-        control_actions = phase_results.get('control_actions', {})
-        for key, result in control_actions.items():
-            if hasattr(result, 'data') and result.success:
-                data = result.data
-            elif isinstance(result, dict) and result.get('success'):
-                data = result.get('data', {})
-            else:
-                continue
-                
-            action_data = data.get('control_actions', {})
-            if isinstance(action_data, dict):
-                actions.extend(action_data.get('control_actions', []))
-            elif isinstance(action_data, list):
-                actions.extend(action_data)
-                
-        return actions
-    
-    def _extract_feedback(self, phase_results: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Extract all feedback mechanisms."""
-        feedbacks = []
-        
-        feedback_trust = phase_results.get('feedback_trust', {})
-        for key, result in feedback_trust.items():
-            if 'feedback' not in key:
-                continue
-                
-            if hasattr(result, 'data') and result.success:
-                data = result.data
-            elif isinstance(result, dict) and result.get('success'):
-                data = result.get('data', {})
-            else:
-                continue
-                
-            feedbacks.extend(data.get('feedback_mechanisms', []))
-            
-        return feedbacks
-    
-    def _extract_trust_boundaries(self, phase_results: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Extract all trust boundaries."""
-        boundaries = []
-        
-        feedback_trust = phase_results.get('feedback_trust', {})
-        for key, result in feedback_trust.items():
-            if 'trust' not in key:
-                continue
-                
-            if hasattr(result, 'data') and result.success:
-                data = result.data
-            elif isinstance(result, dict) and result.get('success'):
-                data = result.get('data', {})
-            else:
-                continue
-                
-            boundaries.extend(data.get('trust_boundaries', []))
-            
-        return boundaries
-    
-    def _extract_contexts(self, phase_results: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Extract control contexts."""
-        contexts = []
-        
-        control_context = phase_results.get('control_context', {})
-        for key, result in control_context.items():
-            if hasattr(result, 'data') and result.success:
-                data = result.data
-            elif isinstance(result, dict) and result.get('success'):
-                data = result.get('data', {})
-            else:
-                continue
-                
-            contexts.extend(data.get('control_contexts', []))
-            
-        return contexts
-    
-    def _extract_process_models(self, phase_results: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Extract process models."""
-        models = []
-        
-        process_models = phase_results.get('process_models', {})
-        for key, result in process_models.items():
-            if hasattr(result, 'data') and result.success:
-                data = result.data
-            elif isinstance(result, dict) and result.get('success'):
-                data = result.get('data', {})
-            else:
-                continue
-                
-            models.extend(data.get('process_models', []))
-            
-        return models
+        Only findings about the entities that agent produces are reported, so
+        gaps in phases that have not run yet do not count against it. Repeated
+        calls, e.g. for each refinement of the output, re-run only the rules
+        that read the agent's phase.
+        """
+        phase_name, entities = self.AGENT_OUTPUTS[agent_type]
+        merged = dict(phase_results)
+        merged[phase_name] = {**merged.get(phase_name, {}), agent_type: {'success': True, 'data': data}}
+        
+        report = self.validate(merged)
+        errors = [error for error in report['errors'] if error.get('entity') in entities]
+        warnings = [warning for warning in report['warnings'] if warning.get('entity') in entities]
+        return {
+            'valid': len(errors) == 0,
+            'errors': errors,
+            'warnings': warnings
+        }
     
-    def _validate_control_action_references(self, actions: List[Dict[str, Any]], 
-                                          components: Dict[str, Any]) -> None:
+    @rules.rule(phases=('control_structure', 'control_actions'))
+    def _validate_control_action_references(self, model: Step2ResultModel) -> List[Finding]:
         """Validate that control actions reference existing components."""
-        for action in actions:
+        graph = model.graph
+        findings = []
+        for action in model.control_actions:
             controller_id = action.get('controller_id')
             process_id = action.get('controlled_process_id')
             action_id = action.get('identifier', 'Unknown')
             
-            if controller_id and controller_id not in components['controllers']:
-                self.validation_errors.append({
+            if controller_id and not graph.has_role(controller_id, 'controllers'):
+                findings.append((ValidationSeverity.ERROR, {
                     'type': 'invalid_reference',
                     'entity': 'control_action',
                     'id': action_id,
                     'message': f"Control action references non-existent controller: {controller_id}"
-                })
+                }))
                 
-            if process_id and process_id not in components['processes']:
-                self.validation_errors.append({
+            if process_id and not graph.has_role(process_id, 'processes'):
+                findings.append((ValidationSeverity.ERROR, {
                     'type': 'invalid_reference',
                     'entity': 'control_action',
                     'id': action_id,
                     'message': f"Control action references non-existent process: {process_id}"
-                })
+                }))
+        
+        return findings
     
-    def _validate_feedback_references(self, feedbacks: List[Dict[str, Any]], 
-                                    components: Dict[str, Any]) -> None:
+    @rules.rule(phases=('control_structure', 'feedback_trust'))
+    def _validate_feedback_references(self, model: Step2ResultModel) -> List[Finding]:
         """Validate that feedback mechanisms reference existing components."""
-        for feedback in feedbacks:
+        graph = model.graph
+        findings = []
+        for feedback in model.feedback_mechanisms:
             source_id = feedback.get('source_process_id')
             target_id = feedback.get('target_controller_id')
             feedback_id = feedback.get('identifier', 'Unknown')
             
-            if source_id and source_id not in components['processes']:
-                self.validation_errors.append({
+            if source_id and not graph.has_role(source_id, 'processes'):
+                findings.append((ValidationSeverity.ERROR, {
                     'type': 'invalid_reference',
                     'entity': 'feedback',
                     'id': feedback_id,
                     'message': f"Feedback references non-existent source process: {source_id}"
-                })
+                }))
                 
-            if target_id and target_id not in components['controllers']:
-                self.validation_errors.append({
+            if target_id and not graph.has_role(target_id, 'controllers'):
+                findings.append((ValidationSeverity.ERROR, {
                     'type': 'invalid_reference',
                     'entity': 'feedback',
                     'id': feedback_id,
                     'message': f"Feedback references non-existent target controller: {target_id}"
-                })
+                }))
+        
+        return findings
     
-    def _validate_trust_boundary_references(self, boundaries: List[Dict[str, Any]], 
-                                          components: Dict[str, Any]) -> None:
+    @rules.rule(phases=('control_structure', 'feedback_trust'))
+    def _validate_trust_boundary_references(self, model: Step2ResultModel) -> List[Finding]:
         """Validate that trust boundaries reference existing components."""
-        for boundary in boundaries:
+        graph = model.graph
+        findings = []
+        for boundary in model.trust_boundaries:
             comp_a = boundary.get('component_a_id')
             comp_b = boundary.get('component_b_id')
             boundary_id = boundary.get('identifier', 'Unknown')
             
-            if comp_a and comp_a not in components['all']:
-                self.validation_errors.append({
+            if comp_a and not graph.has_role(comp_a, 'components'):
+                findings.append((ValidationSeverity.ERROR, {
                     'type': 'invalid_reference',
                     'entity': 'trust_boundary',
                     'id': boundary_id,
                     'message': f"Trust boundary references non-existent component: {comp_a}"
-                })
+                }))
                 
-            if comp_b and comp_b not in components['all']:
-                self.validation_errors.append({
+            if comp_b and not graph.has_role(comp_b, 'components'):
+                findings.append((ValidationSeverity.ERROR, {
                     'type': 'invalid_reference',
                     'entity': 'trust_boundary',
                     'id': boundary_id,
                     'message': f"Trust boundary references non-existent component: {comp_b}"
-                })
+                }))
+        
+        return findings
     
-    def _validate_context_references(self, contexts: List[Dict[str, Any]], 
-                                   actions: List[Dict[str, Any]]) -> None:
+    @rules.rule(phases=('control_actions', 'control_context'))
+    def _validate_context_references(self, model: Step2ResultModel) -> List[Finding]:
         """Validate that contexts reference existing control actions."""
-        action_ids = {a.get('identifier') for a in actions if a.get('identifier')}
+        action_ids = {a.get('identifier') for a in model.control_actions if a.get('identifier')}
         
-        for context in contexts:
+        findings = []
+        for context in model.control_contexts:
             action_id = context.get('control_action_id')
             
             if action_id and action_id not in action_ids:
-                self.validation_warnings.append({
+                findings.append((ValidationSeverity.WARNING, {
                     'type': 'orphan_context',
                     'entity': 'control_context',
                     'message': f"Context references non-existent control action: {action_id}"
-                })
+                }))
+        
+        return findings
     
-    def _validate_process_model_references(self, models: List[Dict[str, Any]], 
-                                         components: Dict[str, Any]) -> None:
+    @rules.rule(phases=('control_structure', 'process_models'))
+    def _validate_process_model_references(self, model: Step2ResultModel) -> List[Finding]:
         """Validate that process models reference existing components."""
-        for model in models:
-            controller_id = model.get('controller_id')
-            process_id = model.get('process_id')
-            model_id = model.get('identifier', 'Unknown')
+        graph = model.graph
+        findings = []
+        for process_model in model.process_models:
+            controller_id = process_model.get('controller_id')
+            process_id = process_model.get('process_id')
+            model_id = process_model.get('identifier', 'Unknown')
             
-            if controller_id and controller_id not in components['controllers']:
-                self.validation_errors.append({
+            if controller_id and not graph.has_role(controller_id, 'controllers'):
+                findings.append((ValidationSeverity.ERROR, {
                     'type': 'invalid_reference',
                     'entity': 'process_model',
                     'id': model_id,
                     'message': f"Process model references non-existent controller: {controller_id}"
-                })
+                }))
                 
-            if process_id and process_id not in components['processes']:
-                self.validation_errors.append({
+            if process_id and not graph.has_role(process_id, 'processes'):
+                findings.append((ValidationSeverity.ERROR, {
                     'type': 'invalid_reference',
                     'entity': 'process_model',
                     'id': model_id,
                     'message': f"Process model references non-existent process: {process_id}"
-                })
+                }))
+        
+        return findings
     
-    def _validate_component_consistency(self, components: Dict[str, Any], 
-                                      actions: List[Dict[str, Any]], 
-                                      feedbacks: List[Dict[str, Any]]) -> None:
+    @rules.rule(phases=('control_structure', 'control_actions', 'feedback_trust'))
+    def _validate_component_consistency(self, model: Step2ResultModel) -> List[Finding]:
         """Validate overall component consistency."""
+        graph = model.graph
+        components = model.components
+        
         # Validate dual-role components
-        self._validate_dual_role_components(components, actions, feedbacks)
+        findings = self._validate_dual_role_components(graph)
         
         # Check for controllers without any outgoing actions
-        controllers_with_actions = {a.get('controller_id') for a in actions if a.get('controller_id')}
+        controllers_with_actions = {graph.ids[node] for node, targets in enumerate(graph.controls) if targets}
         # Exclude dual-role from orphan check as they may act primarily as processes
         non_dual_controllers = components['controllers'] - components['dual_role']
         orphan_controllers = non_dual_controllers - controllers_with_actions
         
         for ctrl in orphan_controllers:
-            self.validation_warnings.append({
+            findings.append((ValidationSeverity.WARNING, {
                 'type': 'orphan_component',
                 'entity': 'controller',
                 'id': ctrl,
                 'message': f"Controller has no outgoing control actions"
-            })
+            }))
         
         # Check for processes without any incoming control
-        processes_with_control = {a.get('controlled_process_id') for a in actions if a.get('controlled_process_id')}
+        processes_with_control = {graph.ids[node] for node, sources in enumerate(graph.controlled_by) if sources}
         # Exclude dual-role from orphan check as they may act primarily as controllers
         non_dual_processes = components['processes'] - components['dual_role']
         orphan_processes = non_dual_processes - processes_with_control
         
         for proc in orphan_processes:
-            self.validation_warnings.append({
+            findings.append((ValidationSeverity.WARNING, {
                 'type': 'orphan_component',
                 'entity': 'process',
                 'id': proc,
                 'message': f"Process receives no control actions"
-            })
+            }))
         
         # Check for processes without feedback
-        processes_with_feedback = {f.get('source_process_id') for f in feedbacks if f.get('source_process_id')}
+        processes_with_feedback = {graph.ids[node] for node in graph.feedback_sources}
         processes_without_feedback = components['processes'] - processes_with_feedback
         
         if len(processes_without_feedback) > 0:
-            self.validation_warnings.append({
+            findings.append((ValidationSeverity.WARNING, {
                 'type': 'missing_feedback',
                 'entity': 'system',
                 'message': f"{len(processes_without_feedback)} processes have no feedback mechanisms"
-            })
+            }))
+        
+        return findings
     
-    def _validate_dual_role_components(self, components: Dict[str, Any],
-                                      actions: List[Dict[str, Any]],
-                                      feedbacks: List[Dict[str, Any]]) -> None:
+    def _validate_dual_role_components(self, graph: ValidationGraph) -> List[Finding]:
         """Validate that dual-role components are properly represented."""
-        for dual_id in components['dual_role']:
+        findings = []
+        for node in sorted(graph.dual_role):
+            dual_id = graph.ids[node]
             # Check if dual-role component acts as a controller
-            acts_as_controller = any(
-                a.get('controller_id') == dual_id for a in actions
-            )
+            acts_as_controller = bool(graph.controls[node])
             
             # Check if dual-role component acts as a process
-            acts_as_process = any(
-                a.get('controlled_process_id') == dual_id for a in actions
-            ) or any(
-                f.get('source_process_id') == dual_id for f in feedbacks
-            )
+            acts_as_process = bool(graph.controlled_by[node]) or node in graph.feedback_sources
             
             if not acts_as_controller and not acts_as_process:
-                self.validation_errors.append({
+                findings.append((ValidationSeverity.ERROR, {
                     'type': 'inactive_dual_role',
                     'entity': 'dual_role',
                     'id': dual_id,
                     'message': f"Dual-role component {dual_id} has no controller or process activities"
-                })
+                }))
             elif not acts_as_controller:
-                self.validation_warnings.append({
+                findings.append((ValidationSeverity.WARNING, {
                     'type': 'partial_dual_role',
                     'entity': 'dual_role',
                     'id': dual_id,
                     'message': f"Dual-role component {dual_id} only acts as a process, not as a controller"
-                })
+                }))
             elif not acts_as_process:
-                self.validation_warnings.append({
+                findings.append((ValidationSeverity.WARNING, {
                     'type': 'partial_dual_role',
                     'entity': 'dual_role',
                     'id': dual_id,
                     'message': f"Dual-role component {dual_id} only acts as a controller, not as a process"
-                })
-    
-    def _extract_hierarchy(self, phase_results: Dict[str, Any]) -> List[Dict[str, str]]:
-        """Extract hierarchy relationships from control structure phase."""
-        hierarchy = []
-        
-        control_structure = phase_results.get('control_structure', {})
-        for key, result in control_structure.items():
-            if hasattr(result, 'data') and result.success:
-                data = result.data
-            elif isinstance(result, dict) and result.get('success'):
-                data = result.get('data', {})
-            else:
-                continue
-                
-            # Extract control_hierarchy from components
-            components = data.get('components', {})
-            if isinstance(components, dict) and 'control_hierarchy' in components:
-                for rel in components.get('control_hierarchy', []):
-                    hierarchy.append({
-                        'parent': rel.get('parent'),
-                        'child': rel.get('child'),
-                        'type': rel.get('relationship_type', 'hierarchical'),
-                        'description': rel.get('description', '')
-                    })
-            
-            # Also check top-level control_hierarchy (in case it's not nested)
-            if 'control_hierarchy' in data:
-                for rel in data.get('control_hierarchy', []):
-                    hierarchy.append({
-                        'parent': rel.get('parent'),
-                        'child': rel.get('child'),
-                        'type': rel.get('relationship_type', 'hierarchical'),
-                        'description': rel.get('description', '')
-                    })
-                            
-        return hierarchy
+                }))
+        
+        return findings
     
-    def _validate_hierarchy_consistency(self, components: Dict[str, Any], 
-                                      hierarchy: List[Dict[str, str]]) -> None:
+    @rules.rule(phases=('control_structure',))
+    def _validate_hierarchy_consistency(self, model: Step2ResultModel) -> List[Finding]:
         """Validate hierarchy consistency and check for issues."""
-        # Check for circular dependencies using efficient single-pass algorithm
-        cycles = self._find_all_cycles(hierarchy)
+        graph = model.graph
+        components = model.components
+        hierarchy = model.hierarchy
+        findings = []
+        
+        # Check for circular dependencies: one cycle per strongly connected component
+        cycles = graph.find_cycles()
         for cycle in cycles:
             cycle_path = " -> ".join(cycle) + " -> " + cycle[0]
-            self.validation_errors.append({
+            findings.append((ValidationSeverity.ERROR, {
                 'type': 'circular_hierarchy',
                 'entity': 'hierarchy',
                 'message': f"Circular dependency detected: {cycle_path}"
-            })
+            }))
         
         # Verify all parent-child relationships reference valid components
         for rel in hierarchy:
             parent = rel['parent']
             child = rel['child']
             
-            if parent and parent not in components['all']:
-                self.validation_errors.append({
+            if parent and not graph.has_role(parent, 'components'):
+                findings.append((ValidationSeverity.ERROR, {
                     'type': 'invalid_hierarchy_reference',
                     'entity': 'hierarchy',
                     'message': f"Hierarchy references non-existent parent: {parent}"
-                })
+                }))
                 
-            if child and child not in components['all']:
-                self.validation_errors.append({
+            if child and not graph.has_role(child, 'components'):
+                findings.append((ValidationSeverity.ERROR, {
                     'type': 'invalid_hierarchy_reference', 
                     'entity': 'hierarchy',
                     'message': f"Hierarchy references non-existent child: {child}"
-                })
+                }))
         
         # Check hierarchy levels are properly assigned
-        controllers_with_levels = set()
-        for rel in hierarchy:
-            if rel['parent'] in components['controllers']:
-                controllers_with_levels.add(rel['parent'])
+        controllers_with_levels = {
+            graph.ids[node] for node in graph.controllers if graph.children[node]
+        }
                 
         orphan_controllers = components['controllers'] - controllers_with_levels
         if orphan_controllers:
-            self.validation_warnings.append({
+            findings.append((ValidationSeverity.WARNING, {
                 'type': 'missing_hierarchy',
                 'entity': 'hierarchy',
                 'message': f"{len(orphan_controllers)} controllers not in hierarchy"
-            })
+            }))
         
         # Validate hierarchical level consistency
-        self._validate_hierarchical_levels(components, hierarchy)
+        findings.extend(self._validate_hierarchical_levels(components, hierarchy))
+        
+        return findings
     
     def _validate_hierarchical_levels(self, components: Dict[str, Any], 
-                                     hierarchy: List[Dict[str, str]]) -> None:
+                                     hierarchy: List[Dict[str, str]]) -> List[Finding]:
         """Validate that hierarchical levels are consistent with parent-child relationships."""
+        findings = []
         level_order = {'system': 3, 'subsystem': 2, 'component': 1}
         
         for rel in hierarchy:
@@ -493,114 +380,73 @@ class CrossReferenceValidator:
                 child_rank = level_order.get(child_level, 0)
                 
                 if parent_rank <= child_rank:
-                    self.validation_errors.append({
+                    findings.append((ValidationSeverity.ERROR, {
                         'type': 'invalid_hierarchy_levels',
                         'entity': 'hierarchy',
                         'message': f"Invalid hierarchy: {parent} ({parent_level}) cannot be parent of {child} ({child_level})"
-                    })
-    
-    def _find_all_cycles(self, hierarchy: List[Dict[str, str]]) -> List[List[str]]:
-        """Find all cycles in hierarchy using efficient single-pass algorithm."""
-        WHITE, GRAY, BLACK = 0, 1, 2
-        color = {}
-        cycles = []
-        
-        def dfs(node: str, path: List[str]) -> None:
-            color[node] = GRAY
-            path.append(node)
-            
-            for rel in hierarchy:
-                if rel['parent'] == node:
-                    child = rel['child']
-                    if child not in color:
-                        dfs(child, path)
-                    elif color[child] == GRAY:
-                        # Found cycle
-                        cycle_start = path.index(child)
-                        cycles.append(path[cycle_start:].copy())
-            
-            path.pop()
-            color[node] = BLACK
+                    }))
         
-        # Get all nodes
-        nodes = set()
-        for rel in hierarchy:
-            nodes.add(rel['parent'])
-            nodes.add(rel['child'])
-        
-        # DFS from each unvisited node
-        for node in nodes:
-            if node not in color:
-                dfs(node, [])
-        
-        return cycles
+        return findings
     
-    def _validate_process_model_completeness(self, components: Dict[str, Any], 
-                                            process_models: List[Dict[str, Any]],
-                                            control_actions: List[Dict[str, Any]]) -> None:
+    @rules.rule(phases=('control_structure', 'control_actions', 'process_models'))
+    def _validate_process_model_completeness(self, model: Step2ResultModel) -> List[Finding]:
         """Validate that every controller has adequate process models."""
+        graph = model.graph
+        components = model.components
+        process_models = model.process_models
+        findings = []
+        
         # Build a map of controllers to their process models
         controller_models = {}
-        for model in process_models:
-            controller_id = model.get('controller_id')
+        for process_model in process_models:
+            controller_id = process_model.get('controller_id')
             if controller_id:
                 if controller_id not in controller_models:
                     controller_models[controller_id] = []
-                controller_models[controller_id].append(model)
+                controller_models[controller_id].append(process_model)
         
         # Check each controller has at least one process model
         for controller_id in components['controllers']:
             if controller_id not in controller_models:
-                self.validation_warnings.append({
+                findings.append((ValidationSeverity.WARNING, {
                     'type': 'missing_process_model',
                     'entity': 'controller',
                     'id': controller_id,
                     'message': f"Controller {controller_id} has no process models"
-                })
-        
-        # Build map of controller -> controlled processes
-        controller_processes = {}
-        for action in control_actions:
-            controller_id = action.get('controller_id')
-            process_id = action.get('controlled_process_id')
-            if controller_id and process_id:
-                if controller_id not in controller_processes:
-                    controller_processes[controller_id] = set()
-                controller_processes[controller_id].add(process_id)
+                }))
         
         # Check controllers have models for their controlled processes
         for controller_id, models in controller_models.items():
-            controlled = controller_processes.get(controller_id, set())
+            controller = graph.index.get(controller_id)
+            controlled = {graph.ids[node] for node in graph.controls[controller]} if controller is not None else set()
             modeled = {m.get('process_id') for m in models if m.get('process_id')}
             
             unmodeled = controlled - modeled
             if unmodeled:
-                self.validation_warnings.append({
+                findings.append((ValidationSeverity.WARNING, {
                     'type': 'incomplete_process_models',
                     'entity': 'controller',
                     'id': controller_id,
                     'message': f"Controller {controller_id} lacks models for processes: {', '.join(unmodeled)}"
-                })
+                }))
         
         # Check for process models without corresponding control actions
-        for model in process_models:
-            controller_id = model.get('controller_id')
-            process_id = model.get('process_id')
+        for process_model in process_models:
+            controller_id = process_model.get('controller_id')
+            process_id = process_model.get('process_id')
             
             if controller_id and process_id:
-                has_action = any(
-                    a.get('controller_id') == controller_id and 
-                    a.get('controlled_process_id') == process_id 
-                    for a in control_actions
-                )
+                has_action = (graph.index.get(controller_id), graph.index.get(process_id)) in graph.action_pairs
                 
                 if not has_action:
-                    self.validation_warnings.append({
+                    findings.append((ValidationSeverity.WARNING, {
                         'type': 'orphan_process_model',
                         'entity': 'process_model',
-                        'id': model.get('identifier', 'Unknown'),
+                        'id': process_model.get('identifier', 'Unknown'),
                         'message': f"Process model exists but no control action from {controller_id} to {process_id}"
-                    })
+                    }))
+        
+        return findings
     
     def _generate_summary(self) -> str:
         """Generate validation summary."""
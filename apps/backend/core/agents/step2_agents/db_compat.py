@@ -1,96 +1,258 @@
 """Database compatibility layer for Step 2 agents."""
 
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import asyncpg
 import json
+import uuid
+
+from core.schema_capabilities import get_schema_profile
 
 logger = logging.getLogger(__name__)
 
 
+# Batches at least this large are appended with COPY instead of executemany
+COPY_THRESHOLD = 200
+
+# How rows are written to a table, chosen once per table from the schema:
+#   upsert  - INSERT ... ON CONFLICT (analysis_id, identifier) DO UPDATE
+#   merge   - identifier column without a unique key: update existing rows, insert the rest
+#   legacy  - no identifier column: plain inserts
+UPSERT, MERGE, LEGACY = 'upsert', 'merge', 'legacy'
+
+# Writable columns of each Step 2 entity table besides id, analysis_id and identifier
+ENTITY_COLUMNS = {
+    'system_components': (
+        'name', 'component_type', 'description', 'abstraction_level', 'source', 'metadata'
+    ),
+    'control_actions': (
+        'controller_id', 'controlled_process_id', 'action_name', 'action_description',
+        'action_type', 'timing_requirements', 'authority_level'
+    ),
+    'feedback_mechanisms': (
+        'source_process_id', 'target_controller_id', 'feedback_name', 'information_type',
+        'information_content', 'timing_characteristics', 'reliability_requirements'
+    ),
+    'trust_boundaries': (
+        'boundary_name', 'boundary_type', 'component_a_id', 'component_b_id', 'trust_direction',
+        'authentication_method', 'authorization_method', 'data_protection_requirements'
+    ),
+}
+
+
+def _json_or_none(value: Optional[Dict]) -> Optional[str]:
+    return json.dumps(value) if value else None
+
+
+def _json_or_null(value: Optional[Dict]) -> Optional[str]:
+    return json.dumps(value) if value is not None else None
+
+
 class Step2DBCompat:
     """Provides backward-compatible database operations for Step 2."""
-    
+
     def __init__(self, db_connection: asyncpg.Connection):
         self.db_connection = db_connection
         self._has_identifier_column = None
-        
+        self._write_modes: Dict[str, str] = {}
+
     async def check_identifier_column(self) -> bool:
         """Check if system_components has identifier column."""
         if self._has_identifier_column is not None:
             return self._has_identifier_column
-            
-        try:
-            await self.db_connection.fetchval(
-                "SELECT identifier FROM system_components LIMIT 1"
-            )
-            self._has_identifier_column = True
-        except Exception as e:
-            if "column" in str(e) and "identifier" in str(e):
-                logger.warning("system_components table missing identifier column - using compatibility mode")
-                self._has_identifier_column = False
-            else:
-                # Some other error - re-raise
-                raise
-                
+
+        schema = await get_schema_profile(self.db_connection)
+        self._has_identifier_column = schema.has_column('system_components', 'identifier')
+        if not self._has_identifier_column:
+            logger.warning("system_components table missing identifier column - using compatibility mode")
+
         return self._has_identifier_column
-        
-    async def insert_component(self, component_id: str, analysis_id: str, 
-                             identifier: str, name: str, component_type: str,
-                             description: str, abstraction_level: str, 
-                             source: str, metadata: Dict[str, Any]) -> None:
-        """Insert a component with compatibility for old schema."""
-        has_identifier = await self.check_identifier_column()
-        
-        if has_identifier:
-            # New schema with identifier
-            # First check if component already exists
-            existing = await self.db_connection.fetchrow(
+
+    async def write_mode(self, table: str) -> str:
+        """How rows are written to ``table``; the schema is consulted once per instance"""
+        if not self._write_modes:
+            schema = await get_schema_profile(self.db_connection)
+            for name in ENTITY_COLUMNS:
+                if not schema.has_column(name, 'identifier'):
+                    self._write_modes[name] = LEGACY
+                elif schema.has_unique_key(name, ('analysis_id', 'identifier')):
+                    self._write_modes[name] = UPSERT
+                else:
+                    self._write_modes[name] = MERGE
+            self._has_identifier_column = self._write_modes['system_components'] != LEGACY
+        return self._write_modes[table]
+
+    async def insert_components(self, analysis_id: str, components: List[Dict[str, Any]]) -> Dict[str, str]:
+        """
+        Write components in one batch, updating those whose identifier exists.
+
+        Each component has identifier, name, component_type, description,
+        abstraction_level, source and metadata, and optionally an id.
+        Returns identifier -> database id.
+        """
+        if await self.write_mode('system_components') == LEGACY:
+            # Old schema without identifier - store it in metadata
+            components = [
+                {**component, 'metadata': {**component.get('metadata', {}), 'identifier': component['identifier']}}
+                for component in components
+            ]
+        rows = [
+            (component.get('id'), component['identifier'], (
+                component['name'], component['component_type'], component.get('description'),
+                component.get('abstraction_level'), component.get('source'),
+                json.dumps(component.get('metadata', {}))
+            ))
+            for component in components
+        ]
+        return await self._write('system_components', analysis_id, rows)
+
+    async def insert_control_actions(self, analysis_id: str, actions: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Write control actions in one batch; returns identifier -> database id"""
+        rows = [
+            (action.get('id'), action['identifier'], (
+                action['controller_id'], action['controlled_process_id'], action['action_name'],
+                action.get('action_description'), action.get('action_type'),
+                _json_or_none(action.get('timing_requirements')), action.get('authority_level')
+            ))
+            for action in actions
+        ]
+        return await self._write('control_actions', analysis_id, rows)
+
+    async def insert_feedback_mechanisms(self, analysis_id: str,
+                                         mechanisms: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Write feedback mechanisms in one batch; returns identifier -> database id"""
+        rows = [
+            (feedback.get('id'), feedback['identifier'], (
+                feedback['source_process_id'], feedback['target_controller_id'],
+                feedback['feedback_name'], feedback['information_type'],
+                feedback.get('information_content'),
+                _json_or_none(feedback.get('timing_characteristics')),
+                _json_or_none(feedback.get('reliability_requirements'))
+            ))
+            for feedback in mechanisms
+        ]
+        return await self._write('feedback_mechanisms', analysis_id, rows)
+
+    async def insert_trust_boundaries(self, analysis_id: str,
+                                      boundaries: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Write trust boundaries in one batch; returns identifier -> database id"""
+        rows = [
+            (boundary.get('id'), boundary['identifier'], (
+                boundary['boundary_name'], boundary.get('boundary_type'),
+                boundary['component_a_id'], boundary['component_b_id'], boundary.get('trust_direction'),
+                boundary.get('authentication_method'), boundary.get('authorization_method'),
+                # The trust boundary agent stores an empty object, not NULL, when
+                # the model names no data protection requirements
+                _json_or_null(boundary.get('data_protection_requirements'))
+            ))
+            for boundary in boundaries
+        ]
+        return await self._write('trust_boundaries', analysis_id, rows)
+
+    async def component_ids(self, analysis_id: str, identifiers: List[str]) -> Dict[str, str]:
+        """Database ids of already stored components, by identifier, in one query"""
+        if not identifiers:
+            return {}
+        if await self.write_mode('system_components') == LEGACY:
+            rows = await self.db_connection.fetch(
                 """
-                SELECT id FROM system_components 
-                WHERE analysis_id = $1 AND identifier = $2
+                SELECT metadata->>'identifier' AS identifier, id FROM system_components
+                WHERE analysis_id = $1 AND metadata->>'identifier' = ANY($2::varchar[])
                 """,
-                analysis_id, identifier
+                analysis_id, list(identifiers)
             )
-            
-            if existing:
-                # Update existing component
-                await self.db_connection.execute(
-                    """
-                    UPDATE system_components 
-                    SET name = $3, component_type = $4, description = $5,
-                        abstraction_level = $6, source = $7, metadata = $8
-                    WHERE id = $1 AND analysis_id = $2
-                    """,
-                    existing['id'], analysis_id, name, component_type,
-                    description, abstraction_level, source, json.dumps(metadata)
-                )
-            else:
-                # Insert new component
-                await self.db_connection.execute(
-                    """
-                    INSERT INTO system_components 
-                    (id, analysis_id, identifier, name, component_type, description, 
-                     abstraction_level, source, metadata)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-                    """,
-                    component_id, analysis_id, identifier, name, component_type,
-                    description, abstraction_level, source, json.dumps(metadata)
-                )
         else:
-            # Old schema without identifier - store it in metadata
-            metadata['identifier'] = identifier
-            await self.db_connection.execute(
+            rows = await self.db_connection.fetch(
                 """
-                INSERT INTO system_components 
-                (id, analysis_id, name, component_type, description, 
-                 abstraction_level, source, metadata)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                SELECT identifier, id FROM system_components
+                WHERE analysis_id = $1 AND identifier = ANY($2::varchar[])
                 """,
-                component_id, analysis_id, name, component_type,
-                description, abstraction_level, source, json.dumps(metadata)
+                analysis_id, list(identifiers)
             )
-            
+        return {row['identifier']: row['id'] for row in rows}
+
+    async def _write(self, table: str, analysis_id: str,
+                     rows: List[Tuple[Optional[str], str, Tuple[Any, ...]]]) -> Dict[str, str]:
+        """Write (id, identifier, values) rows in one transaction; returns identifier -> id"""
+        if not rows:
+            return {}
+        mode = await self.write_mode(table)
+        columns = ENTITY_COLUMNS[table]
+
+        # The last row of an identifier wins, as it would with one upsert per row
+        latest: Dict[str, Tuple[str, Tuple[Any, ...]]] = {}
+        for row_id, identifier, values in rows:
+            latest[identifier] = (row_id or str(uuid.uuid4()), values)
+
+        async with self.db_connection.transaction():
+            if mode == UPSERT:
+                placeholders = ', '.join(f'${n}' for n in range(1, len(columns) + 4))
+                updates = ', '.join(f'{column} = EXCLUDED.{column}' for column in columns)
+                await self.db_connection.executemany(
+                    f"""
+                    INSERT INTO {table} (id, analysis_id, identifier, {', '.join(columns)})
+                    VALUES ({placeholders})
+                    ON CONFLICT (analysis_id, identifier) DO UPDATE SET {updates}
+                    """,
+                    [(row_id, analysis_id, identifier, *values) for identifier, (row_id, values) in latest.items()]
+                )
+                # Conflicting rows keep their original id
+                stored = await self.db_connection.fetch(
+                    f"SELECT identifier, id FROM {table} WHERE analysis_id = $1 AND identifier = ANY($2::varchar[])",
+                    analysis_id, list(latest)
+                )
+                return {row['identifier']: row['id'] for row in stored}
+
+            if mode == MERGE:
+                existing = {
+                    row['identifier']: row['id'] for row in await self.db_connection.fetch(
+                        f"SELECT identifier, id FROM {table} WHERE analysis_id = $1 AND identifier = ANY($2::varchar[])",
+                        analysis_id, list(latest)
+                    )
+                }
+                if existing:
+                    assignments = ', '.join(f'{column} = ${n}' for n, column in enumerate(columns, start=3))
+                    await self.db_connection.executemany(
+                        f"UPDATE {table} SET {assignments} WHERE id = $1 AND analysis_id = $2",
+                        [(existing[identifier], analysis_id, *latest[identifier][1]) for identifier in existing]
+                    )
+                new_rows = [
+                    (row_id, analysis_id, identifier, *values)
+                    for identifier, (row_id, values) in latest.items() if identifier not in existing
+                ]
+                await self._append(table, ('id', 'analysis_id', 'identifier', *columns), new_rows)
+                return {**{identifier: row_id for identifier, (row_id, _) in latest.items()}, **existing}
+
+            await self._append(
+                table, ('id', 'analysis_id', *columns),
+                [(row_id, analysis_id, *values) for row_id, values in latest.values()]
+            )
+            return {identifier: row_id for identifier, (row_id, _) in latest.items()}
+
+    async def _append(self, table: str, columns: Tuple[str, ...], records: List[Tuple[Any, ...]]) -> None:
+        """Insert rows that cannot conflict, with COPY for large batches"""
+        if not records:
+            return
+        if len(records) >= COPY_THRESHOLD:
+            await self.db_connection.copy_records_to_table(table, records=records, columns=list(columns))
+            return
+        placeholders = ', '.join(f'${n}' for n in range(1, len(columns) + 1))
+        await self.db_connection.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+            records
+        )
+
+    async def insert_component(self, component_id: str, analysis_id: str,
+                             identifier: str, name: str, component_type: str,
+                             description: str, abstraction_level: str,
+                             source: str, metadata: Dict[str, Any]) -> None:
+        """Insert a component with compatibility for old schema."""
+        await self.insert_components(analysis_id, [{
+            'id': component_id, 'identifier': identifier, 'name': name,
+            'component_type': component_type, 'description': description,
+            'abstraction_level': abstraction_level, 'source': source, 'metadata': metadata
+        }])
+
     async def insert_control_action(self, action_id: str, analysis_id: str,
                                   identifier: str, controller_id: str,
                                   controlled_process_id: str, action_name: str,
@@ -98,64 +260,13 @@ class Step2DBCompat:
                                   timing_requirements: Optional[Dict],
                                   authority_level: Optional[str]) -> None:
         """Insert a control action with compatibility."""
-        has_identifier = await self.check_identifier_column()
-        
-        if has_identifier:
-            # Check if action already exists
-            existing = await self.db_connection.fetchrow(
-                """
-                SELECT id FROM control_actions 
-                WHERE analysis_id = $1 AND identifier = $2
-                """,
-                analysis_id, identifier
-            )
-            
-            if existing:
-                # Update existing action
-                await self.db_connection.execute(
-                    """
-                    UPDATE control_actions 
-                    SET controller_id = $3, controlled_process_id = $4,
-                        action_name = $5, action_description = $6, action_type = $7,
-                        timing_requirements = $8, authority_level = $9
-                    WHERE id = $1 AND analysis_id = $2
-                    """,
-                    existing['id'], analysis_id, controller_id, controlled_process_id,
-                    action_name, action_description, action_type,
-                    json.dumps(timing_requirements) if timing_requirements else None,
-                    authority_level
-                )
-            else:
-                # Insert new action
-                await self.db_connection.execute(
-                    """
-                    INSERT INTO control_actions 
-                    (id, analysis_id, identifier, controller_id, controlled_process_id,
-                     action_name, action_description, action_type, timing_requirements,
-                     authority_level)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-                    """,
-                    action_id, analysis_id, identifier, controller_id, controlled_process_id,
-                    action_name, action_description, action_type,
-                    json.dumps(timing_requirements) if timing_requirements else None,
-                    authority_level
-                )
-        else:
-            # Old schema - skip identifier
-            await self.db_connection.execute(
-                """
-                INSERT INTO control_actions 
-                (id, analysis_id, controller_id, controlled_process_id,
-                 action_name, action_description, action_type, timing_requirements,
-                 authority_level)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-                """,
-                action_id, analysis_id, controller_id, controlled_process_id,
-                action_name, action_description, action_type,
-                json.dumps(timing_requirements) if timing_requirements else None,
-                authority_level
-            )
-            
+        await self.insert_control_actions(analysis_id, [{
+            'id': action_id, 'identifier': identifier, 'controller_id': controller_id,
+            'controlled_process_id': controlled_process_id, 'action_name': action_name,
+            'action_description': action_description, 'action_type': action_type,
+            'timing_requirements': timing_requirements, 'authority_level': authority_level
+        }])
+
     async def insert_feedback_mechanism(self, feedback_id: str, analysis_id: str,
                                       identifier: str, source_process_id: str,
                                       target_controller_id: str, feedback_name: str,
@@ -163,40 +274,14 @@ class Step2DBCompat:
                                       timing_characteristics: Optional[Dict],
                                       reliability_requirements: Optional[Dict]) -> None:
         """Insert a feedback mechanism with compatibility."""
-        has_identifier = await self.check_identifier_column()
-        
-        if has_identifier:
-            await self.db_connection.execute(
-                """
-                INSERT INTO feedback_mechanisms 
-                (id, analysis_id, identifier, source_process_id, target_controller_id,
-                 feedback_name, information_type, information_content,
-                 timing_characteristics, reliability_requirements)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-                """,
-                feedback_id, analysis_id, identifier, source_process_id,
-                target_controller_id, feedback_name, information_type,
-                information_content,
-                json.dumps(timing_characteristics) if timing_characteristics else None,
-                json.dumps(reliability_requirements) if reliability_requirements else None
-            )
-        else:
-            # Old schema - skip identifier
-            await self.db_connection.execute(
-                """
-                INSERT INTO feedback_mechanisms 
-                (id, analysis_id, source_process_id, target_controller_id,
-                 feedback_name, information_type, information_content,
-                 timing_characteristics, reliability_requirements)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-                """,
-                feedback_id, analysis_id, source_process_id,
-                target_controller_id, feedback_name, information_type,
-                information_content,
-                json.dumps(timing_characteristics) if timing_characteristics else None,
-                json.dumps(reliability_requirements) if reliability_requirements else None
-            )
-            
+        await self.insert_feedback_mechanisms(analysis_id, [{
+            'id': feedback_id, 'identifier': identifier, 'source_process_id': source_process_id,
+            'target_controller_id': target_controller_id, 'feedback_name': feedback_name,
+            'information_type': information_type, 'information_content': information_content,
+            'timing_characteristics': timing_characteristics,
+            'reliability_requirements': reliability_requirements
+        }])
+
     async def insert_trust_boundary(self, boundary_id: str, analysis_id: str,
                                   identifier: str, boundary_name: str,
                                   boundary_type: Optional[str], component_a_id: str,
@@ -205,36 +290,11 @@ class Step2DBCompat:
                                   authorization_method: Optional[str],
                                   data_protection_requirements: Optional[Dict]) -> None:
         """Insert a trust boundary with compatibility."""
-        has_identifier = await self.check_identifier_column()
-        
-        if has_identifier:
-            await self.db_connection.execute(
-                """
-                INSERT INTO trust_boundaries 
-                (id, analysis_id, identifier, boundary_name, boundary_type,
-                 component_a_id, component_b_id, trust_direction,
-                 authentication_method, authorization_method,
-                 data_protection_requirements)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
-                """,
-                boundary_id, analysis_id, identifier, boundary_name, boundary_type,
-                component_a_id, component_b_id, trust_direction,
-                authentication_method, authorization_method,
-                json.dumps(data_protection_requirements) if data_protection_requirements else None
-            )
-        else:
-            # Old schema - skip identifier
-            await self.db_connection.execute(
-                """
-                INSERT INTO trust_boundaries 
-                (id, analysis_id, boundary_name, boundary_type,
-                 component_a_id, component_b_id, trust_direction,
-                 authentication_method, authorization_method,
-                 data_protection_requirements)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-                """,
-                boundary_id, analysis_id, boundary_name, boundary_type,
-                component_a_id, component_b_id, trust_direction,
-                authentication_method, authorization_method,
-                json.dumps(data_protection_requirements) if data_protection_requirements else None
-            )
\ No newline at end of file
+        await self.insert_trust_boundaries(analysis_id, [{
+            'id': boundary_id, 'identifier': identifier, 'boundary_name': boundary_name,
+            'boundary_type': boundary_type, 'component_a_id': component_a_id,
+            'component_b_id': component_b_id, 'trust_direction': trust_direction,
+            'authentication_method': authentication_method,
+            'authorization_method': authorization_method,
+            'data_protection_requirements': data_protection_requirements or None
+        }])
@@ -1,10 +1,16 @@
 from typing import Dict, Any, List, Optional
+import asyncio
 import json
 import uuid
 from datetime import datetime
 
 from .base_step2 import BaseStep2Agent, AgentResult
 from .component_registry import ComponentRegistry
+from .db_compat import Step2DBCompat
+from .partitioning import (
+    RegistryPartition, should_partition, partition_registry, interface_summary,
+    merge_partition_lists, normalized, scope_components
+)
 from core.agents.step1_agents.base_step1 import CognitiveStyle
 from core.utils.json_parser import parse_llm_json
 from .schemas import FEEDBACK_MECHANISM_SCHEMA
@@ -16,6 +22,8 @@ class FeedbackMechanismAgent(BaseStep2Agent):
     about the state of controlled processes.
     """
     
+    consumes = ('control_structure', 'control_actions')
+    
     async def analyze(self, step1_analysis_id: str, step2_analysis_id: str, **kwargs) -> AgentResult:
         """Identify feedback mechanisms."""
         start_time = datetime.now()
@@ -31,9 +39,35 @@ class FeedbackMechanismAgent(BaseStep2Agent):
         control_structure = await self._load_control_structure(step2_analysis_id)
         control_actions = await self._load_control_actions(step2_analysis_id)
         
-        # Build prompt with registry context
-        prompt = self._build_feedback_prompt(step1_results, control_structure, control_actions, registry)
+        if should_partition(registry):
+            # Too many components for one prompt: analyze partitions concurrently
+            feedback_data = await self._analyze_partitioned(step1_results, control_structure, control_actions, registry)
+        else:
+            # Build prompt with registry context
+            prompt = self._build_feedback_prompt(step1_results, control_structure, control_actions, registry)
+            feedback_data = await self._generate_feedback(prompt, control_structure, registry)
+        
+        # Store in database
+        await self._store_result(self._store_feedback_mechanisms, step2_analysis_id, feedback_data)
+        
+        execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
+        
+        return AgentResult(
+            agent_type="feedback_mechanism",
+            success=True,
+            data={
+                'feedback_mechanisms': feedback_data['feedback_mechanisms'],
+                'process_models': feedback_data['process_models'],
+                'summary': self._generate_summary(feedback_data),
+                'component_registry': registry
+            },
+            execution_time_ms=execution_time,
+            metadata={'cognitive_style': self.cognitive_style.value}
+        )
         
+    async def _generate_feedback(self, prompt: str, control_structure: Dict[str, Any],
+                                 registry: ComponentRegistry) -> Dict[str, Any]:
+        """Query the LLM for feedback mechanisms and parse them against the registry."""
         # Get LLM response with retry logic
         messages = [
             {"role": "system", "content": "You are an expert systems security analyst who MUST respond with raw JSON only. Do NOT use markdown formatting, code blocks, or backticks. Start your response directly with { and end with }. No ```json tags. You specialize in feedback mechanisms and observability."},
@@ -50,32 +84,95 @@ class FeedbackMechanismAgent(BaseStep2Agent):
                 max_tokens=4000
             )
             # Parse response and validate against registry
-            feedback_data = self._parse_feedback_mechanisms(structured_response, control_structure, registry)
+            return self._parse_feedback_mechanisms(structured_response, control_structure, registry)
         except Exception as e:
             self.logger.warning(f"Structured output failed: {e}. Using regular generation.")
             # Fall back to regular generation with retry
             response_text = await self.query_llm_with_retry(messages, temperature=0.7, max_tokens=4000)
             # Parse response
-            feedback_data = self._parse_feedback_mechanisms(response_text, control_structure, registry)
+            return self._parse_feedback_mechanisms(response_text, control_structure, registry)
+            
+    async def _analyze_partitioned(self, step1_results: Dict[str, Any], control_structure: Dict[str, Any],
+                                   control_actions: List[Dict[str, Any]],
+                                   registry: ComponentRegistry) -> Dict[str, Any]:
+        """Identify feedback for each partition concurrently, then merge the results."""
+        partitions = partition_registry(registry)
+        self.logger.info(
+            f"Analyzing feedback for {len(registry.components)} components "
+            f"in {len(partitions)} partitions"
+        )
         
-        # Store in database
-        await self._store_feedback_mechanisms(step2_analysis_id, feedback_data)
+        async def analyze_partition(partition: RegistryPartition) -> Dict[str, Any]:
+            members = set(partition.members)
+            partition_actions = [
+                action for action in control_actions
+                if action['controller_identifier'] in members or action['process_identifier'] in members
+            ]
+            prompt = self._build_feedback_prompt(
+                step1_results, control_structure, partition_actions, registry, partition, len(partitions)
+            )
+            try:
+                return await self._generate_feedback(prompt, control_structure, registry)
+            except Exception as e:
+                self.logger.error(f"Partition {partition.index + 1} failed: {e}")
+                return {
+                    'feedback_mechanisms': [],
+                    'process_models': [],
+                    'feedback_gaps': [],
+                    'analysis_notes': '',
+                    'validation_errors': [f"Partition {partition.index + 1} failed: {e}"]
+                }
+                
+        parts = await asyncio.gather(*(analyze_partition(partition) for partition in partitions))
+        return self._merge_partitioned_feedback(parts, partitions)
         
-        execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
+    def _merge_partitioned_feedback(self, parts: List[Dict[str, Any]],
+                                    partitions: List[RegistryPartition]) -> Dict[str, Any]:
+        """Merge per-partition results, dropping findings reported by several partitions."""
+        mechanisms, remaps, duplicates = merge_partition_lists(
+            [part['feedback_mechanisms'] for part in parts],
+            key=lambda feedback: (
+                feedback.get('source_process_id'),
+                feedback.get('target_controller_id'),
+                normalized(feedback.get('feedback_name'))
+            ),
+            id_field='identifier',
+            id_prefix='FB'
+        )
         
-        return AgentResult(
-            agent_type="feedback_mechanism",
-            success=True,
-            data={
-                'feedback_mechanisms': feedback_data['feedback_mechanisms'],
-                'process_models': feedback_data['process_models'],
-                'summary': self._generate_summary(feedback_data),
-                'component_registry': registry
-            },
-            execution_time_ms=execution_time,
-            metadata={'cognitive_style': self.cognitive_style.value}
+        # Process models cite feedback identifiers that were just renumbered
+        renumbered_models = [
+            [
+                {**model, 'update_sources': [remap.get(source, source) for source in model.get('update_sources', [])]}
+                for model in part['process_models']
+            ]
+            for part, remap in zip(parts, remaps)
+        ]
+        models, _, model_duplicates = merge_partition_lists(
+            renumbered_models,
+            key=lambda model: (model.get('controller_id'), normalized(model.get('model_name')))
+        )
+        gaps, _, _ = merge_partition_lists(
+            [part.get('feedback_gaps', []) for part in parts],
+            key=lambda gap: normalized(gap.get('description'))
         )
         
+        return {
+            'feedback_mechanisms': mechanisms,
+            'process_models': models,
+            'feedback_gaps': gaps,
+            'analysis_notes': "\n\n".join(
+                f"[Partition {index + 1}] {part['analysis_notes']}"
+                for index, part in enumerate(parts) if part['analysis_notes']
+            ),
+            'validation_errors': [error for part in parts for error in part['validation_errors']],
+            'partitioning': {
+                'partitions': len(partitions),
+                'partition_sizes': [len(partition.members) for partition in partitions],
+                'duplicates_removed': duplicates + model_duplicates
+            }
+        }
+        
     async def _load_control_structure(self, analysis_id: str) -> Dict[str, Any]:
         """Load control structure components from database."""
         components = await self.db_connection.fetch(
@@ -138,12 +235,23 @@ class FeedbackMechanismAgent(BaseStep2Agent):
     def _build_feedback_prompt(self, step1_results: Dict[str, Any], 
                               control_structure: Dict[str, Any],
                               control_actions: List[Dict[str, Any]],
-                              registry: ComponentRegistry) -> str:
+                              registry: ComponentRegistry,
+                              partition: Optional[RegistryPartition] = None,
+                              partition_count: int = 1) -> str:
         """Build prompt for feedback mechanism identification."""
         base_prompt = self.format_control_structure_prompt(step1_results)
         
         # Get registry context
-        registry_context = registry.get_prompt_context()
+        if partition is None:
+            registry_context = registry.get_prompt_context()
+        else:
+            # Only this partition's components plus the interface to the rest
+            registry_context = registry.get_prompt_context(set(partition.members))
+            registry_context += "\n" + interface_summary(registry, partition, partition_count)
+            control_structure = {
+                key: scope_components(rows, partition.identifiers)
+                for key, rows in control_structure.items()
+            }
         
         prompt = f"""{base_prompt}
 
@@ -382,47 +490,46 @@ Ensure all string values properly escape newlines and quotes."""
             }
             
     async def _store_feedback_mechanisms(self, analysis_id: str, feedback_data: Dict[str, Any]) -> None:
-        """Store feedback mechanisms in database."""
-        # Store feedback mechanisms
-        for feedback in feedback_data['feedback_mechanisms']:
-            await self.db_connection.execute(
-                """
-                INSERT INTO feedback_mechanisms
-                (id, analysis_id, identifier, source_process_id, target_controller_id,
-                 feedback_name, information_type, information_content,
-                 timing_characteristics, reliability_requirements)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-                """,
-                str(uuid.uuid4()),
-                analysis_id,
-                feedback['identifier'],
-                feedback['source_db_id'],
-                feedback['target_db_id'],
-                feedback['feedback_name'],
-                feedback['information_type'],
-                feedback.get('information_content', ''),
-                json.dumps(feedback.get('timing_characteristics', {})),
-                json.dumps(feedback.get('reliability_requirements', {}))
-            )
+        """Store feedback mechanisms and process models in one transaction."""
+        db_compat = Step2DBCompat(self.db_connection)
+        
+        async with self.db_connection.transaction():
+            await db_compat.insert_feedback_mechanisms(analysis_id, [
+                {
+                    'identifier': feedback['identifier'],
+                    'source_process_id': feedback['source_db_id'],
+                    'target_controller_id': feedback['target_db_id'],
+                    'feedback_name': feedback['feedback_name'],
+                    'information_type': feedback['information_type'],
+                    'information_content': feedback.get('information_content', ''),
+                    'timing_characteristics': feedback.get('timing_characteristics', {}),
+                    'reliability_requirements': feedback.get('reliability_requirements', {})
+                }
+                for feedback in feedback_data['feedback_mechanisms']
+            ])
             
-        # Store process models
-        for model in feedback_data['process_models']:
-            await self.db_connection.execute(
-                """
-                INSERT INTO process_models
-                (id, controller_id, model_name, state_variables, update_sources,
-                 update_frequency, staleness_tolerance, assumptions)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                """,
-                str(uuid.uuid4()),
-                model['controller_db_id'],
-                model['model_name'],
-                json.dumps(model.get('state_variables', [])),
-                model.get('update_sources', []),
-                model.get('update_frequency', 'unknown'),
-                model.get('staleness_tolerance', 'unknown'),
-                json.dumps(model.get('assumptions', []))
-            )
+            if feedback_data['process_models']:
+                await self.db_connection.executemany(
+                    """
+                    INSERT INTO process_models
+                    (id, controller_id, model_name, state_variables, update_sources,
+                     update_frequency, staleness_tolerance, assumptions)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                    """,
+                    [
+                        (
+                            str(uuid.uuid4()),
+                            model['controller_db_id'],
+                            model['model_name'],
+                            json.dumps(model.get('state_variables', [])),
+                            model.get('update_sources', []),
+                            model.get('update_frequency', 'unknown'),
+                            model.get('staleness_tolerance', 'unknown'),
+                            json.dumps(model.get('assumptions', []))
+                        )
+                        for model in feedback_data['process_models']
+                    ]
+                )
             
     def _generate_summary(self, feedback_data: Dict[str, Any]) -> str:
         """Generate summary of feedback mechanisms."""
@@ -0,0 +1,201 @@
+"""
+Partitioned (map-reduce) analysis for large control structures
+
+With 100+ components a single prompt listing every component truncates the
+model's output. Agents that map relationships across the whole control
+structure instead split the ComponentRegistry into partitions that follow
+the control hierarchy (and trust level when a subtree is too big), analyze
+each partition concurrently with a summary of the components on its
+interface, and merge the partial results.
+"""
+from typing import Dict, Any, List, Optional, Callable, Hashable, Iterable, Set, Tuple
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+
+from .component_registry import ComponentRegistry
+
+
+# Registries at least this large are analyzed partition by partition
+PARTITION_THRESHOLD = 60
+# Upper bound on components owned by one partition
+MAX_PARTITION_SIZE = 30
+
+
+@dataclass
+class RegistryPartition:
+    """Components owned by one map task plus the neighbours it may reference"""
+    index: int
+    members: List[str]
+    interface: List[str] = field(default_factory=list)
+
+    @property
+    def identifiers(self) -> Set[str]:
+        return set(self.members) | set(self.interface)
+
+
+def should_partition(registry: ComponentRegistry, threshold: int = PARTITION_THRESHOLD) -> bool:
+    return len(registry.components) >= threshold
+
+
+def _edges(registry: ComponentRegistry) -> Dict[str, Set[str]]:
+    """Directed control edges: references plus declared controls/controlled_by"""
+    edges: Dict[str, Set[str]] = defaultdict(set)
+    for identifier, component in registry.components.items():
+        for target in component.references:
+            edges[identifier].add(target)
+        for target in component.properties.get('controls') or []:
+            edges[identifier].add(target)
+        for source in component.properties.get('controlled_by') or []:
+            edges[source].add(identifier)
+    known = registry.components
+    return {
+        source: {target for target in targets if target in known and target != source}
+        for source, targets in edges.items() if source in known
+    }
+
+
+def _hierarchy_groups(registry: ComponentRegistry, edges: Dict[str, Set[str]]) -> List[List[str]]:
+    """Group components by the hierarchy subtree that first reaches them"""
+    incoming = {target for targets in edges.values() for target in targets}
+    order = sorted(registry.components)
+    roots = [identifier for identifier in order if identifier not in incoming]
+    # Components only reachable through cycles get their own roots
+    roots += [identifier for identifier in order if identifier in incoming]
+
+    assigned: Set[str] = set()
+    groups = []
+    for root in roots:
+        if root in assigned:
+            continue
+        group = []
+        queue = deque([root])
+        assigned.add(root)
+        while queue:
+            node = queue.popleft()
+            group.append(node)
+            for child in sorted(edges.get(node, ())):
+                if child not in assigned:
+                    assigned.add(child)
+                    queue.append(child)
+        groups.append(group)
+    return groups
+
+
+def _split_group(registry: ComponentRegistry, group: List[str], max_size: int) -> List[List[str]]:
+    """Split an oversized subtree by trust level, then into hierarchy-ordered chunks"""
+    if len(group) <= max_size:
+        return [group]
+    by_trust: Dict[str, List[str]] = defaultdict(list)
+    for identifier in group:
+        trust = registry.components[identifier].properties.get('trust_level') or 'unspecified'
+        by_trust[trust].append(identifier)
+    chunks = []
+    for members in by_trust.values():
+        chunks.extend(members[i:i + max_size] for i in range(0, len(members), max_size))
+    return chunks
+
+
+def partition_registry(registry: ComponentRegistry, max_size: int = MAX_PARTITION_SIZE) -> List[RegistryPartition]:
+    """
+    Partition the control structure graph.
+
+    Hierarchy subtrees are kept together where they fit, oversized subtrees
+    are split by trust level, and small subtrees are packed together
+    (first-fit decreasing) so the number of map tasks stays low.
+    """
+    edges = _edges(registry)
+    groups = []
+    for group in _hierarchy_groups(registry, edges):
+        groups.extend(_split_group(registry, group, max_size))
+
+    bins: List[List[str]] = []
+    for group in sorted(groups, key=len, reverse=True):
+        for members in bins:
+            if len(members) + len(group) <= max_size:
+                members.extend(group)
+                break
+        else:
+            bins.append(list(group))
+
+    neighbours: Dict[str, Set[str]] = defaultdict(set)
+    for source, targets in edges.items():
+        for target in targets:
+            neighbours[source].add(target)
+            neighbours[target].add(source)
+
+    partitions = []
+    for index, members in enumerate(bins):
+        member_set = set(members)
+        interface = sorted({
+            other for identifier in members for other in neighbours[identifier]
+            if other not in member_set
+        })
+        partitions.append(RegistryPartition(index, members, interface))
+    return partitions
+
+
+def interface_summary(registry: ComponentRegistry, partition: RegistryPartition,
+                      partition_count: int) -> str:
+    """Prompt section describing the partition and the components on its edges"""
+    summary = (
+        f"## Partition {partition.index + 1} of {partition_count}\n\n"
+        f"The control structure is too large for one analysis. Analyze only "
+        f"relationships that involve at least one component of this partition.\n"
+    )
+    if partition.interface:
+        summary += "\n### Interface Components (owned by other partitions):\n"
+        for identifier in partition.interface:
+            component = registry.components[identifier]
+            summary += f"- {identifier}: {component.name} ({component.type})\n"
+        summary += (
+            "\nRelationships that cross into another partition may reference the "
+            "interface components above, but no other component outside this partition.\n"
+        )
+    return summary
+
+
+def merge_partition_lists(parts: List[List[Dict[str, Any]]],
+                          key: Callable[[Dict[str, Any]], Hashable],
+                          id_field: Optional[str] = None,
+                          id_prefix: Optional[str] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]], int]:
+    """
+    Merge per-partition finding lists, dropping cross-partition duplicates.
+
+    Every partition numbers its findings from 1, so when ``id_field`` and
+    ``id_prefix`` are given the merged findings are renumbered.
+
+    Returns:
+        Merged findings, one old-to-new identifier map per partition, and the
+        number of duplicates removed
+    """
+    merged: List[Dict[str, Any]] = []
+    seen: Dict[Hashable, Dict[str, Any]] = {}
+    remaps: List[Dict[str, str]] = []
+    duplicates = 0
+    for items in parts:
+        remap: Dict[str, str] = {}
+        for item in items:
+            item_key = key(item)
+            old_id = item.get(id_field) if id_field else None
+            if item_key in seen:
+                duplicates += 1
+                if old_id is not None:
+                    remap[old_id] = seen[item_key][id_field]
+                continue
+            if id_field and id_prefix:
+                item = {**item, id_field: f"{id_prefix}-{len(merged) + 1}"}
+            if old_id is not None:
+                remap[old_id] = item[id_field]
+            seen[item_key] = item
+            merged.append(item)
+        remaps.append(remap)
+    return merged, remaps, duplicates
+
+
+def normalized(value: Any) -> str:
+    return " ".join(str(value or "").lower().split())
+
+
+def scope_components(components: Iterable[Dict[str, Any]], identifiers: Set[str]) -> List[Dict[str, Any]]:
+    """Database rows of the components a partition may reference"""
+    return [component for component in components if component.get('identifier') in identifiers]
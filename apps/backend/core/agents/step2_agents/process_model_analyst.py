@@ -21,6 +21,8 @@ class ProcessModelAnalystAgent(BaseStep2Agent):
     Identifies control algorithm constraints and inadequate control scenarios.
     """
     
+    consumes = ('control_structure', 'control_actions')
+    
     async def analyze(self, step1_analysis_id: str, step2_analysis_id: str, 
                       previous_results: Dict[str, Any]) -> AgentResult:
         """Analyze process models and control algorithm constraints."""
@@ -62,7 +64,7 @@ class ProcessModelAnalystAgent(BaseStep2Agent):
                 process_models = self._parse_process_models(response, registry)
             
             # Store in database
-            await self._store_process_models(step2_analysis_id, process_models)
+            await self._store_result(self._store_process_models, step2_analysis_id, process_models)
             
             execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
             
@@ -94,10 +96,8 @@ class ProcessModelAnalystAgent(BaseStep2Agent):
     
     def _get_registry_from_previous(self, previous_results: Dict[str, Any]) -> ComponentRegistry:
         """Extract component registry from previous phase results."""
-        # Check different phases in reverse order (most recent first)
-        phases_to_check = ['control_context', 'feedback_trust', 'control_actions', 'control_structure']
-        
-        for phase_name in phases_to_check:
+        # Check the phases this agent consumes, most recent first
+        for phase_name in reversed(self.consumes):
             if phase_name in previous_results:
                 phase_data = previous_results[phase_name]
                 if isinstance(phase_data, dict):
@@ -343,65 +343,74 @@ Remember: This is Step 2 - focus on understanding HOW control works, not on iden
         return actions
     
     async def _store_process_models(self, analysis_id: str, process_models: Dict[str, Any]) -> None:
-        """Store process models in database."""
-        # Store each process model
-        for model in process_models['models']:
-            await self.db_connection.execute(
-                """
-                INSERT INTO process_models 
-                (id, analysis_id, identifier, controller_id, process_id, 
-                 state_variables, assumptions, update_frequency, staleness_risk)
-                VALUES ($1::VARCHAR, $2, $3, $4, $5, $6::JSONB, $7::JSONB, $8, $9)
-                ON CONFLICT (identifier, analysis_id) DO UPDATE SET
-                    state_variables = EXCLUDED.state_variables,
-                    assumptions = EXCLUDED.assumptions,
-                    update_frequency = EXCLUDED.update_frequency,
-                    staleness_risk = EXCLUDED.staleness_risk
-                """,
-                str(uuid.uuid4()),
-                analysis_id,
-                model['identifier'],
-                model.get('controller_id'),
-                model.get('process_id'),
-                json.dumps(model.get('state_variables', [])),
-                json.dumps(model.get('assumptions', [])),
-                model.get('update_frequency'),
-                model.get('staleness_risk')
-            )
-        
-        # Store control algorithms
-        for alg in process_models['algorithms']:
+        """Store process models, algorithms and insights in one transaction."""
+        async with self.db_connection.transaction():
+            if process_models['models']:
+                await self.db_connection.executemany(
+                    """
+                    INSERT INTO process_models 
+                    (id, analysis_id, identifier, controller_id, process_id, 
+                     state_variables, assumptions, update_frequency, staleness_risk)
+                    VALUES ($1::VARCHAR, $2, $3, $4, $5, $6::JSONB, $7::JSONB, $8, $9)
+                    ON CONFLICT (identifier, analysis_id) DO UPDATE SET
+                        state_variables = EXCLUDED.state_variables,
+                        assumptions = EXCLUDED.assumptions,
+                        update_frequency = EXCLUDED.update_frequency,
+                        staleness_risk = EXCLUDED.staleness_risk
+                    """,
+                    [
+                        (
+                            str(uuid.uuid4()),
+                            analysis_id,
+                            model['identifier'],
+                            model.get('controller_id'),
+                            model.get('process_id'),
+                            json.dumps(model.get('state_variables', [])),
+                            json.dumps(model.get('assumptions', [])),
+                            model.get('update_frequency'),
+                            model.get('staleness_risk')
+                        )
+                        for model in process_models['models']
+                    ]
+                )
+            
+            if process_models['algorithms']:
+                await self.db_connection.executemany(
+                    """
+                    INSERT INTO control_algorithms
+                    (id, analysis_id, identifier, controller_id, name, 
+                     description, constraints, decision_logic, conflict_resolution)
+                    VALUES ($1::UUID, $2, $3, $4, $5, $6, $7::JSONB, $8, $9)
+                    ON CONFLICT (identifier, analysis_id) DO UPDATE SET
+                        name = EXCLUDED.name,
+                        description = EXCLUDED.description,
+                        constraints = EXCLUDED.constraints,
+                        decision_logic = EXCLUDED.decision_logic,
+                        conflict_resolution = EXCLUDED.conflict_resolution
+                    """,
+                    [
+                        (
+                            uuid.uuid4(),  # Pass UUID directly, not string
+                            analysis_id,
+                            alg['identifier'],
+                            alg.get('controller_id'),
+                            alg.get('name'),
+                            alg.get('description'),
+                            json.dumps(alg.get('constraints', [])),
+                            alg.get('decision_logic'),
+                            alg.get('conflict_resolution')
+                        )
+                        for alg in process_models['algorithms']
+                    ]
+                )
+            
+            # Store insights as metadata
             await self.db_connection.execute(
                 """
-                INSERT INTO control_algorithms
-                (id, analysis_id, identifier, controller_id, name, 
-                 description, constraints, decision_logic, conflict_resolution)
-                VALUES ($1::UUID, $2, $3, $4, $5, $6, $7::JSONB, $8, $9)
-                ON CONFLICT (identifier, analysis_id) DO UPDATE SET
-                    name = EXCLUDED.name,
-                    description = EXCLUDED.description,
-                    constraints = EXCLUDED.constraints,
-                    decision_logic = EXCLUDED.decision_logic,
-                    conflict_resolution = EXCLUDED.conflict_resolution
+                UPDATE step2_analyses 
+                SET metadata = COALESCE(metadata, '{}'::jsonb) || jsonb_build_object('process_model_insights', $1)
+                WHERE id = $2
                 """,
-                uuid.uuid4(),  # Pass UUID directly, not string
-                analysis_id,
-                alg['identifier'],
-                alg.get('controller_id'),
-                alg.get('name'),
-                alg.get('description'),
-                json.dumps(alg.get('constraints', [])),
-                alg.get('decision_logic'),
-                alg.get('conflict_resolution')
-            )
-        
-        # Store insights as metadata
-        await self.db_connection.execute(
-            """
-            UPDATE step2_analyses 
-            SET metadata = COALESCE(metadata, '{}'::jsonb) || jsonb_build_object('process_model_insights', $1)
-            WHERE id = $2
-            """,
-            json.dumps(process_models.get('insights', {})),
-            analysis_id
-        )
\ No newline at end of file
+                json.dumps(process_models.get('insights', {})),
+                analysis_id
+            )
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""
+Immutable Step 1 snapshot shared by all agents of a Step 2 run
+"""
+from typing import Dict, Any, List, Optional, Iterator
+from collections.abc import Mapping
+from contextlib import asynccontextmanager
+from types import MappingProxyType
+import asyncio
+
+import asyncpg
+
+from core.schema_capabilities import get_schema_profile
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, (dict, asyncpg.Record)):
+        return MappingProxyType({key: _freeze(item) for key, item in dict(value).items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+class Step1Snapshot(Mapping):
+    """
+    Read-only view of the Step 1 results a Step 2 run works from.
+
+    Behaves like the dict ``BaseStep2Agent.load_step1_results`` always
+    returned, but lists are tuples and rows are read-only mappings so that
+    one agent cannot change what the next one sees.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self._data = {key: _freeze(value) for key, value in data.items()}
+
+    def __getitem__(self, key: str) -> Any:
+        return self._data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def analysis_id(self) -> str:
+        return self._data['analysis_id']
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Mutable deep copy, for callers that need to edit or serialize"""
+        return _thaw(self._data)
+
+
+_HEADER_QUERY = """
+SELECT name, metadata->>'mission_statement' AS mission_statement
+FROM step1_analyses
+WHERE id = $1
+"""
+
+_LOSSES_QUERY = """
+SELECT id, identifier, loss_category as loss_type, description,
+       COALESCE(severity_classification->>'stakeholder_impact', '') as stakeholder_impact
+FROM step1_losses
+WHERE analysis_id = $1
+ORDER BY identifier
+"""
+
+_LEGACY_LOSSES_QUERY = """
+SELECT id, description,
+       COALESCE(properties->>'loss_type', 'safety') as loss_type,
+       COALESCE(properties->>'stakeholder_impact', '') as stakeholder_impact,
+       'L-' || SUBSTRING(id::text, 1, 8) as identifier
+FROM losses
+ORDER BY created_at
+"""
+
+_HAZARDS_QUERY = """
+SELECT h.id, h.identifier, h.description, h.hazard_category,
+       h.affected_system_property,
+       COALESCE(h.environmental_factors->>'system_state', '') as system_state,
+       array_agg(DISTINCT hm.loss_id) as associated_losses
+FROM step1_hazards h
+LEFT JOIN hazard_loss_mappings hm ON h.id = hm.hazard_id
+WHERE h.analysis_id = $1
+GROUP BY h.id, h.identifier, h.description, h.hazard_category,
+         h.affected_system_property, h.environmental_factors
+ORDER BY h.identifier
+"""
+
+_LEGACY_HAZARDS_QUERY = """
+SELECT h.id, h.description,
+       COALESCE(h.properties->>'system_state', '') as system_state,
+       'H-' || SUBSTRING(h.id::text, 1, 8) as identifier,
+       array_agg(DISTINCT hl.loss_id) as associated_losses
+FROM hazards h
+LEFT JOIN hazard_losses hl ON h.id = hl.hazard_id
+GROUP BY h.id, h.description, h.properties
+ORDER BY h.created_at
+"""
+
+_CONSTRAINTS_QUERY = """
+SELECT sc.id, sc.identifier, sc.constraint_statement as constraint_text, sc.constraint_type,
+       array_agg(DISTINCT chm.hazard_id) as mitigated_hazards
+FROM security_constraints sc
+LEFT JOIN constraint_hazard_mappings chm ON sc.id = chm.constraint_id
+WHERE sc.analysis_id = $1
+GROUP BY sc.id, sc.identifier, sc.constraint_statement, sc.constraint_type
+ORDER BY sc.identifier
+"""
+
+_STAKEHOLDERS_QUERY = """
+SELECT id, name, stakeholder_type,
+       COALESCE(mission_perspective->>'primary_needs', '') as concerns,
+       COALESCE(influence_interest->>'trust_level', 'medium') as trust_level
+FROM step1_stakeholders
+WHERE analysis_id = $1
+ORDER BY name
+"""
+
+_LEGACY_STAKEHOLDERS_QUERY = """
+SELECT id, name, stakeholder_type, concerns, trust_level
+FROM stakeholders
+WHERE analysis_id = $1
+ORDER BY name
+"""
+
+_BOUNDARIES_QUERY = """
+SELECT id, boundary_type, description,
+       COALESCE(definition_criteria->>'includes', '[]') as includes,
+       COALESCE(definition_criteria->>'excludes', '[]') as excludes
+FROM system_boundaries
+WHERE analysis_id = $1
+ORDER BY boundary_type
+"""
+
+
+async def load_step1_snapshot(db_connection: asyncpg.Connection, step1_analysis_id: str,
+                              db_pool: Optional[asyncpg.Pool] = None) -> Step1Snapshot:
+    """
+    Load everything Step 2 agents need from Step 1.
+
+    With a pool the five result queries run concurrently on pooled
+    connections; otherwise they run back to back on ``db_connection``.
+    """
+    header = await db_connection.fetchrow(_HEADER_QUERY, step1_analysis_id)
+    if not header:
+        raise ValueError(f"Step 1 analysis {step1_analysis_id} not found")
+    schema = await get_schema_profile(db_connection)
+
+    # The legacy losses/hazards tables are not scoped by analysis
+    queries = {
+        'losses': (
+            (_LOSSES_QUERY, True) if schema.has_table('step1_losses') else (_LEGACY_LOSSES_QUERY, False)
+        ),
+        'hazards': (
+            (_HAZARDS_QUERY, True) if schema.has_table('step1_hazards') else (_LEGACY_HAZARDS_QUERY, False)
+        ),
+        'security_constraints': (_CONSTRAINTS_QUERY, True),
+        'stakeholders': (
+            _STAKEHOLDERS_QUERY if schema.has_table('step1_stakeholders') else _LEGACY_STAKEHOLDERS_QUERY, True
+        ),
+        'system_boundaries': (_BOUNDARIES_QUERY, True),
+    }
+
+    @asynccontextmanager
+    async def connection():
+        if db_pool is None:
+            yield db_connection
+        else:
+            async with db_pool.acquire() as conn:
+                yield conn
+
+    async def fetch(query: str, scoped: bool) -> List[Dict[str, Any]]:
+        async with connection() as conn:
+            rows = await conn.fetch(query, step1_analysis_id) if scoped else await conn.fetch(query)
+        return [dict(row) for row in rows]
+
+    if db_pool is not None:
+        fetched = await asyncio.gather(*(fetch(*queries[key]) for key in queries))
+    else:
+        fetched = [await fetch(*queries[key]) for key in queries]
+
+    return Step1Snapshot({
+        'analysis_id': step1_analysis_id,
+        'system_name': header['name'] or 'Unknown System',
+        'mission_statement': header['mission_statement'] or '',
+        **dict(zip(queries, fetched)),
+    })
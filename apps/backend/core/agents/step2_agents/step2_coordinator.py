@@ -2,17 +2,21 @@
 Step 2 Coordinator for STPA-Sec Control Structure Analysis
 """
 from typing import Dict, Any, List, Optional
+from contextlib import asynccontextmanager, nullcontext
 import uuid
 import json
+import time
 from datetime import datetime
 import asyncio
 from pathlib import Path
 
 from core.agents.step1_agents.base_step1 import CognitiveStyle
 from .base_step2 import AgentResult
+from .step1_snapshot import Step1Snapshot, load_step1_snapshot
 import asyncpg
 import logging
-from core.validation import Step2Validator
+from core.validation import Step2ResultModel, Step2Validator
+from core.schema_capabilities import get_schema_profile
 
 from .control_structure_analyst import ControlStructureAnalystAgent
 from .control_action_mapping import ControlActionMappingAgent
@@ -31,15 +35,26 @@ class Step2Coordinator:
     """
     
     def __init__(self, model_provider, db_connection: asyncpg.Connection, output_dir: Optional[Path] = None, 
-                 cognitive_style: CognitiveStyle = CognitiveStyle.BALANCED):
+                 cognitive_style: CognitiveStyle = CognitiveStyle.BALANCED,
+                 db_pool: Optional[asyncpg.Pool] = None):
         self.model_provider = model_provider
         self.db_connection = db_connection
+        # Agents in a parallel phase each need their own connection; without a
+        # pool they share db_connection and therefore run one after another
+        self.db_pool = db_pool
+        self.phase_timings: Dict[str, Dict[str, Any]] = {}
+        self.schedule: Dict[str, Any] = {}
+        # Step 1 results are read once per run and shared by every agent
+        self.step1_snapshot: Optional[Step1Snapshot] = None
+        self._step1_snapshots: Dict[str, Step1Snapshot] = {}
         self.cognitive_style = cognitive_style
         self.logger = logging.getLogger(self.__class__.__name__)
         self.output_dir = output_dir
         self.validator = Step2Validator()
         self.synthesis_enhancer = Step2SynthesisEnhancer()
         self.cross_ref_validator = CrossReferenceValidator()
+        # Normalized phase results shared by synthesis and all validators
+        self.result_model = Step2ResultModel()
         
         # Define execution phases for Step 2
         self.phases = [
@@ -108,61 +123,31 @@ class Step2Coordinator:
         start_time = datetime.now()
         
         # Ensure Step 2 tables have correct schema
-        try:
-            # Check if system_components table exists and has identifier column
-            table_exists = await self.db_connection.fetchval(
-                "SELECT EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'system_components')"
-            )
-            if table_exists:
-                columns = await self.db_connection.fetch(
-                    "SELECT column_name FROM information_schema.columns WHERE table_name = 'system_components'"
-                )
-                self.logger.info(f"system_components columns: {[c['column_name'] for c in columns]}")
-                
-                # Try to query identifier column
-                await self.db_connection.fetchval("SELECT identifier FROM system_components LIMIT 1")
-        except Exception as e:
-            if "column" in str(e) and "identifier" in str(e):
-                self.logger.error(f"Step 2 schema error: {e}")
+        schema = await get_schema_profile(self.db_connection)
+        if schema.has_table('system_components'):
+            self.logger.info(f"system_components columns: {schema.column_names('system_components')}")
+            if not schema.has_column('system_components', 'identifier'):
+                self.logger.error("Step 2 schema error: system_components has no identifier column")
                 self.logger.warning("Step 2 tables have incorrect schema. Please run migrations.")
         
         # Create Step 2 analysis record
         step2_analysis_id = await self._create_step2_analysis(step1_analysis_id, execution_mode)
         self.current_step2_id = step2_analysis_id
+        self.step1_snapshot = await self.get_step1_snapshot(step1_analysis_id)
         
-        # Execute phases
-        phase_results = {}
-        for phase in self.phases:
-            self.logger.info(f"Executing Step 2 phase: {phase['name']}")
-            
-            if phase.get('parallel', False):
-                # Run agents in parallel
-                results = await self._execute_parallel_agents(
-                    phase['agents'], 
-                    step2_analysis_id,
-                    step1_analysis_id,
-                    execution_mode,
-                    phase_results
-                )
-            else:
-                # Run agents sequentially
-                results = await self._execute_sequential_agents(
-                    phase['agents'],
-                    step2_analysis_id, 
-                    step1_analysis_id,
-                    execution_mode,
-                    phase_results
-                )
-                
-            phase_results[phase['name']] = results
-            
+        # Execute agents as soon as the phase outputs they consume exist
+        phase_results = await self._execute_agent_graph(
+            step2_analysis_id, step1_analysis_id, execution_mode
+        )
+        for phase_name, results in phase_results.items():
             # Validate phase results
-            validation = self._validate_phase(phase['name'], results)
+            validation = self._validate_phase(phase_name, results)
             if not validation['valid']:
-                self.logger.warning(f"Phase {phase['name']} validation issues: {validation['errors']}")
+                self.logger.warning(f"Phase {phase_name} validation issues: {validation['errors']}")
                 
         # Run cross-reference validation
-        cross_ref_validation = self.cross_ref_validator.validate(phase_results)
+        self.result_model.sync(phase_results)
+        cross_ref_validation = self.cross_ref_validator.validate(phase_results, model=self.result_model)
         if not cross_ref_validation['valid']:
             self.logger.error(f"Cross-reference validation failed: {cross_ref_validation['summary']}")
             for error in cross_ref_validation['errors']:
@@ -188,12 +173,13 @@ class Step2Coordinator:
             'phase_results': phase_results,
             'synthesis': synthesis,
             'cross_reference_validation': cross_ref_validation,
+            'schedule': self.schedule,
             'execution_time_ms': execution_time,
             'timestamp': datetime.now().isoformat()
         }
         
         # Run comprehensive validation
-        validation_report = self.validator.validate(results)
+        validation_report = self.validator.validate(results, model=self.result_model)
         results['validation'] = validation_report
         
         # Log validation summary
@@ -232,43 +218,232 @@ class Step2Coordinator:
         
         return analysis_id
         
-    async def _execute_parallel_agents(self, agent_names: List[str], step2_analysis_id: str, 
-                                     step1_analysis_id: str, execution_mode: str,
-                                     previous_results: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute multiple agents in parallel."""
-        tasks = []
-        
-        for agent_name in agent_names:
-            cognitive_styles = self.agent_config[execution_mode].get(agent_name, [CognitiveStyle.BALANCED])
-            
-            for style in cognitive_styles:
-                agent = self._create_agent(agent_name, style)
-                task = agent.analyze(
-                    step1_analysis_id=step1_analysis_id,
-                    step2_analysis_id=step2_analysis_id,
-                    previous_results=previous_results
+    def build_agent_graph(self) -> Dict[str, List[str]]:
+        """
+        Map each agent to the agents it has to wait for.
+
+        Agents declare the phase outputs they read in ``consumes``; an agent
+        depends on every agent of those phases.
+        """
+        phase_agents = {phase['name']: phase['agents'] for phase in self.phases}
+        graph = {}
+        for phase in self.phases:
+            for agent_name in phase['agents']:
+                consumes = self.agent_classes[agent_name].consumes
+                unknown = [name for name in consumes if name not in phase_agents]
+                if unknown:
+                    raise ValueError(f"Agent {agent_name} consumes unknown phase outputs: {unknown}")
+                graph[agent_name] = [dep for name in consumes for dep in phase_agents[name]]
+                
+        # Kahn's algorithm; anything left over is part of a cycle
+        remaining = {agent_name: len(deps) for agent_name, deps in graph.items()}
+        ready = [agent_name for agent_name, count in remaining.items() if count == 0]
+        while ready:
+            done = ready.pop()
+            del remaining[done]
+            for agent_name, deps in graph.items():
+                if done in deps and agent_name in remaining:
+                    remaining[agent_name] -= deps.count(done)
+                    if remaining[agent_name] == 0:
+                        ready.append(agent_name)
+        if remaining:
+            raise ValueError(f"Step 2 agent dependencies form a cycle: {sorted(remaining)}")
+        return graph
+        
+    async def _execute_agent_graph(self, step2_analysis_id: str, step1_analysis_id: str,
+                                   execution_mode: str) -> Dict[str, Any]:
+        """
+        Run every agent as soon as its inputs are available.
+
+        Returns phase results keyed by phase name, as the phase-by-phase
+        execution did, and records wait and run times in ``self.schedule``.
+        """
+        graph = self.build_agent_graph()
+        phase_of = {agent_name: phase for phase in self.phases for agent_name in phase['agents']}
+        outputs: Dict[str, Dict[str, Any]] = {}
+        timings: Dict[str, Dict[str, float]] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+        # One shared connection cannot serve two agents at once
+        serial = asyncio.Lock() if self.db_pool is None else None
+        self.phase_timings = {}
+        graph_start = time.perf_counter()
+        
+        def phase_output(phase_name: str) -> Dict[str, Any]:
+            merged = {}
+            for phase in self.phases:
+                if phase['name'] == phase_name:
+                    for agent_name in phase['agents']:
+                        merged.update(outputs[agent_name])
+            return merged
+        
+        async def run(agent_name: str):
+            if graph[agent_name]:
+                await asyncio.gather(*(tasks[dep] for dep in graph[agent_name]))
+            ready = time.perf_counter()
+            previous_results = {
+                name: phase_output(name) for name in self.agent_classes[agent_name].consumes
+            }
+            async with serial or nullcontext():
+                started = time.perf_counter()
+                self.logger.info(f"Starting Step 2 agent: {agent_name}")
+                outputs[agent_name] = await self._run_scheduled_agent(
+                    agent_name, phase_of[agent_name], step2_analysis_id,
+                    step1_analysis_id, execution_mode, previous_results
                 )
-                tasks.append((agent_name, style, task))
+            timings[agent_name] = {
+                'ready': ready - graph_start,
+                'started': started - graph_start,
+                'finished': time.perf_counter() - graph_start
+            }
+            
+        for agent_name in graph:
+            tasks[agent_name] = asyncio.create_task(run(agent_name))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+            
+        self.schedule = self._schedule_report(graph, phase_of, timings, time.perf_counter() - graph_start)
+        self.logger.info(
+            f"Step 2 critical path: {' -> '.join(self.schedule['critical_path'])} "
+            f"({self.schedule['critical_path_ms']} ms, {self.schedule['time_saved_ms']} ms saved)"
+        )
+        return {phase['name']: phase_output(phase['name']) for phase in self.phases}
+        
+    async def _run_scheduled_agent(self, agent_name: str, phase: Dict[str, Any], step2_analysis_id: str,
+                                   step1_analysis_id: str, execution_mode: str,
+                                   previous_results: Dict[str, Any]) -> Dict[str, Any]:
+        """Run all cognitive styles of one agent the way its phase is configured"""
+        if phase.get('parallel', False):
+            # Styles run concurrently and are reported separately
+            return await self._execute_parallel_agents(
+                [agent_name], step2_analysis_id, step1_analysis_id, execution_mode,
+                previous_results, phase_name=agent_name
+            )
+        async with self._agent_connection() as conn:
+            return await self._execute_sequential_agents(
+                [agent_name], step2_analysis_id, step1_analysis_id, execution_mode,
+                previous_results, db_connection=conn
+            )
+            
+    def _schedule_report(self, graph: Dict[str, List[str]], phase_of: Dict[str, Dict[str, Any]],
+                         timings: Dict[str, Dict[str, float]], wall_clock: float) -> Dict[str, Any]:
+        """Per-agent wait and run times plus the critical path that bounded the run"""
+        finished = {agent_name: timing['finished'] for agent_name, timing in timings.items()}
+        node = max(finished, key=finished.get)
+        critical_path = [node]
+        while graph[node]:
+            node = max(graph[node], key=finished.get)
+            critical_path.append(node)
+        critical_path.reverse()
+        
+        agents = {}
+        for agent_name, timing in timings.items():
+            agents[agent_name] = {
+                'phase': phase_of[agent_name]['name'],
+                'depends_on': graph[agent_name],
+                'dependency_wait_ms': int(timing['ready'] * 1000),
+                'wait_ms': int(timing['started'] * 1000),
+                'run_ms': int((timing['finished'] - timing['started']) * 1000),
+                'finished_at_ms': int(timing['finished'] * 1000)
+            }
+            if agent_name in self.phase_timings:
+                agents[agent_name]['styles_time_saved_ms'] = self.phase_timings[agent_name]['time_saved_ms']
                 
-        # Execute all tasks
-        results = {}
-        for agent_name, style, task in tasks:
+        agent_time = sum(agent['run_ms'] for agent in agents.values())
+        wall_clock_ms = int(wall_clock * 1000)
+        return {
+            'concurrent': self.db_pool is not None,
+            'wall_clock_ms': wall_clock_ms,
+            'agent_time_ms': agent_time,
+            'time_saved_ms': max(agent_time - wall_clock_ms, 0),
+            'critical_path': critical_path,
+            'critical_path_ms': int(finished[critical_path[-1]] * 1000),
+            'agents': agents
+        }
+        
+    async def get_step1_snapshot(self, step1_analysis_id: str) -> Step1Snapshot:
+        """Load the Step 1 snapshot for an analysis, once per coordinator"""
+        if step1_analysis_id not in self._step1_snapshots:
+            self._step1_snapshots[step1_analysis_id] = await load_step1_snapshot(
+                self.db_connection, step1_analysis_id, self.db_pool
+            )
+        return self._step1_snapshots[step1_analysis_id]
+        
+    async def _execute_parallel_agents(self, agent_names: List[str], step2_analysis_id: str, 
+                                     step1_analysis_id: str, execution_mode: str,
+                                     previous_results: Dict[str, Any],
+                                     phase_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Execute multiple agents concurrently.
+
+        Each agent runs on its own pooled connection and stores its result as
+        soon as it finishes. A failing agent is recorded under an ``_error``
+        key without affecting the others.
+        """
+        runs = [
+            (agent_name, style)
+            for agent_name in agent_names
+            for style in self.agent_config[execution_mode].get(agent_name, [CognitiveStyle.BALANCED])
+        ]
+        agent_seconds: List[float] = []
+
+        async def run_agent(agent_name: str, style: CognitiveStyle):
+            started = time.perf_counter()
             try:
-                result = await task
+                async with self._agent_connection() as conn:
+                    agent = self._create_agent(agent_name, style, conn)
+                    result = await agent.analyze(
+                        step1_analysis_id=step1_analysis_id,
+                        step2_analysis_id=step2_analysis_id,
+                        previous_results=previous_results
+                    )
+                    
+                    # Store agent result
+                    await self._store_agent_result(step2_analysis_id, result, conn)
                 key = f"{agent_name}_{style.value}" if execution_mode == 'enhanced' else agent_name
-                results[key] = result
-                
-                # Store agent result
-                await self._store_agent_result(step2_analysis_id, result)
+                return key, result
             except Exception as e:
                 self.logger.error(f"Agent {agent_name} ({style.value}) failed: {str(e)}")
-                results[f"{agent_name}_{style.value}_error"] = str(e)
-                
-        return results
+                return f"{agent_name}_{style.value}_error", str(e)
+            finally:
+                agent_seconds.append(time.perf_counter() - started)
+
+        phase_start = time.perf_counter()
+        if self.db_pool is not None:
+            outcomes = await asyncio.gather(*(run_agent(name, style) for name, style in runs))
+        else:
+            # A single asyncpg connection cannot serve concurrent queries
+            self.logger.warning("No connection pool configured; running parallel agents one at a time")
+            outcomes = [await run_agent(name, style) for name, style in runs]
+        wall_clock = time.perf_counter() - phase_start
+
+        agent_total = sum(agent_seconds)
+        self.phase_timings[phase_name or '+'.join(agent_names)] = {
+            'parallel': self.db_pool is not None,
+            'agents': len(runs),
+            'wall_clock_ms': int(wall_clock * 1000),
+            'agent_time_ms': int(agent_total * 1000),
+            'time_saved_ms': int(max(agent_total - wall_clock, 0.0) * 1000)
+        }
+        
+        return dict(outcomes)
+        
+    @asynccontextmanager
+    async def _agent_connection(self):
+        """Get the connection a parallel agent should use"""
+        if self.db_pool is None:
+            yield self.db_connection
+            return
+        async with self.db_pool.acquire() as conn:
+            yield conn
         
     async def _execute_sequential_agents(self, agent_names: List[str], step2_analysis_id: str,
                                        step1_analysis_id: str, execution_mode: str,
-                                       previous_results: Dict[str, Any]) -> Dict[str, Any]:
+                                       previous_results: Dict[str, Any],
+                                       db_connection: Optional[asyncpg.Connection] = None) -> Dict[str, Any]:
         """Execute agents sequentially."""
         results = {}
         
@@ -277,7 +452,7 @@ class Step2Coordinator:
             
             agent_results = {}
             for style in cognitive_styles:
-                agent = self._create_agent(agent_name, style)
+                agent = self._create_agent(agent_name, style, db_connection)
                 
                 try:
                     result = await agent.analyze(
@@ -290,7 +465,7 @@ class Step2Coordinator:
                     agent_results[key] = result
                     
                     # Store agent result
-                    await self._store_agent_result(step2_analysis_id, result)
+                    await self._store_agent_result(step2_analysis_id, result, db_connection)
                     
                 except Exception as e:
                     self.logger.error(f"Agent {agent_name} ({style.value}) failed: {str(e)}")
@@ -305,13 +480,16 @@ class Step2Coordinator:
                 
         return results
         
-    def _create_agent(self, agent_name: str, cognitive_style: CognitiveStyle):
+    def _create_agent(self, agent_name: str, cognitive_style: CognitiveStyle,
+                      db_connection: Optional[asyncpg.Connection] = None):
         """Create agent instance."""
         agent_class = self.agent_classes.get(agent_name)
         if not agent_class:
             raise ValueError(f"Unknown agent: {agent_name}")
             
-        return agent_class(self.model_provider, self.db_connection, cognitive_style)
+        agent = agent_class(self.model_provider, db_connection or self.db_connection, cognitive_style)
+        agent.step1_snapshot = self.step1_snapshot
+        return agent
         
     def _make_json_serializable(self, obj):
         """Convert objects to JSON-serializable format"""
@@ -407,150 +585,108 @@ class Step2Coordinator:
         
     async def _synthesize_results(self, step2_analysis_id: str, phase_results: Dict[str, Any]) -> Dict[str, Any]:
         """Synthesize final Step 2 results."""
+        model = self.result_model
+        model.sync(phase_results)
+        
         synthesis = {
-            'control_structure_summary': '',
+            'control_structure_summary': model.structure_summary,
             'key_controllers': [],
             'critical_control_actions': [],
             'trust_boundaries': [],
             'feedback_loops': [],
             'control_contexts': [],
-            'operational_modes': []
+            'operational_modes': model.operational_modes
         }
         
-        # Extract control structure
-        control_results = phase_results.get('control_structure', {})
-        for result in control_results.values():
-            if isinstance(result, AgentResult) and result.success:
-                components = result.data.get('components', {})
-                synthesis['control_structure_summary'] = result.data.get('summary', '')
-                
-                # Key controllers (high authority)
-                for controller in components.get('controllers', []):
-                    if controller.get('authority_level') == 'high':
-                        synthesis['key_controllers'].append({
-                            'identifier': controller['identifier'],
-                            'name': controller['name'],
-                            'controls': controller.get('controls', [])
-                        })
+        # Key controllers (high authority)
+        for controller in model.controllers:
+            if controller.get('authority_level') == 'high':
+                synthesis['key_controllers'].append({
+                    'identifier': controller['identifier'],
+                    'name': controller['name'],
+                    'controls': controller.get('controls', [])
+                })
                         
         # Extract control actions
-        action_results = phase_results.get('control_actions', {})
-        for result in action_results.values():
-            if isinstance(result, AgentResult) and result.success:
-                actions = result.data.get('control_actions', {}).get('control_actions', [])
-                for action in actions:
-                    if action.get('authority_level') == 'mandatory':
-                        synthesis['critical_control_actions'].append({
-                            'identifier': action['identifier'],
-                            'name': action['action_name'],
-                            'type': action['action_type'],
-                            'from': action.get('controller_id'),
-                            'to': action.get('controlled_process_id')
-                        })
+        for action in model.control_actions:
+            if action.get('authority_level') == 'mandatory':
+                synthesis['critical_control_actions'].append({
+                    'identifier': action['identifier'],
+                    'name': action['action_name'],
+                    'type': action['action_type'],
+                    'from': action.get('controller_id'),
+                    'to': action.get('controlled_process_id')
+                })
         
         # Extract feedback mechanisms
-        feedback_results = phase_results.get('feedback_trust', {})
-        for result in feedback_results.values():
-            if isinstance(result, AgentResult) and result.success and 'feedback' in result.agent_type:
-                mechanisms = result.data.get('feedback_mechanisms', [])
-                for feedback in mechanisms:
-                    synthesis['feedback_loops'].append({
-                        'identifier': feedback['identifier'],
-                        'name': feedback['feedback_name'],
-                        'type': feedback['information_type'],
-                        'from': feedback.get('source_process_id'),
-                        'to': feedback.get('target_controller_id')
-                    })
+        for feedback in model.feedback_mechanisms:
+            synthesis['feedback_loops'].append({
+                'identifier': feedback['identifier'],
+                'name': feedback['feedback_name'],
+                'type': feedback['information_type'],
+                'from': feedback.get('source_process_id'),
+                'to': feedback.get('target_controller_id')
+            })
         
         # Extract trust boundaries
-        for result in feedback_results.values():
-            if isinstance(result, AgentResult) and result.success and 'trust' in result.agent_type:
-                boundaries = result.data.get('trust_boundaries', [])
-                for boundary in boundaries:
-                    synthesis['trust_boundaries'].append({
-                        'identifier': boundary['identifier'],
-                        'name': boundary['boundary_name'],
-                        'type': boundary['boundary_type'],
-                        'between': [boundary.get('component_a_id'), boundary.get('component_b_id')]
-                    })
+        for boundary in model.trust_boundaries:
+            synthesis['trust_boundaries'].append({
+                'identifier': boundary['identifier'],
+                'name': boundary['boundary_name'],
+                'type': boundary['boundary_type'],
+                'between': [boundary.get('component_a_id'), boundary.get('component_b_id')]
+            })
         
         # Extract control contexts
-        context_results = phase_results.get('control_context', {})
-        for result in context_results.values():
-            if isinstance(result, AgentResult) and result.success:
-                contexts = result.data.get('control_contexts', [])
-                for context in contexts[:10]:  # Top 10 most important
-                    timing = context.get('execution_context', {}).get('timing_requirements', {})
-                    if timing.get('response_time') or len(context.get('decision_logic', {}).get('inputs_evaluated', [])) > 3:
-                        synthesis['control_contexts'].append({
-                            'control_action': context['control_action_id'],
-                            'timing_critical': bool(timing.get('response_time')),
-                            'decision_complexity': len(context.get('decision_logic', {}).get('inputs_evaluated', [])),
-                            'applicable_modes': context.get('applicable_modes', [])
-                        })
-                
-                # Add operational modes
-                modes = result.data.get('operational_modes', [])
-                synthesis['operational_modes'] = modes
+        for context in model.control_contexts[:10]:  # Top 10 most important
+            timing = context.get('execution_context', {}).get('timing_requirements', {})
+            if timing.get('response_time') or len(context.get('decision_logic', {}).get('inputs_evaluated', [])) > 3:
+                synthesis['control_contexts'].append({
+                    'control_action': context['control_action_id'],
+                    'timing_critical': bool(timing.get('response_time')),
+                    'decision_complexity': len(context.get('decision_logic', {}).get('inputs_evaluated', [])),
+                    'applicable_modes': context.get('applicable_modes', [])
+                })
         
         # Add key feedback mechanisms to synthesis
         synthesis['key_feedback_mechanisms'] = synthesis.pop('feedback_loops', [])
         
-        # Extract process models and control algorithms
-        process_model_results = phase_results.get('process_models', {})
-        synthesis['process_models'] = []
-        synthesis['control_algorithms'] = []
-        synthesis['process_model_insights'] = {}
-        
-        for result in process_model_results.values():
-            if isinstance(result, AgentResult) and result.success:
-                # Add process models
-                models = result.data.get('process_models', [])
-                for model in models:
-                    synthesis['process_models'].append({
-                        'identifier': model['identifier'],
-                        'controller_id': model.get('controller_id'),
-                        'process_id': model.get('process_id'),
-                        'staleness_risk': model.get('staleness_risk', 'unknown'),
-                        'state_variables_count': len(model.get('state_variables', []))
-                    })
-                
-                # Add control algorithms
-                algorithms = result.data.get('control_algorithms', [])
-                for alg in algorithms:
-                    synthesis['control_algorithms'].append({
-                        'identifier': alg['identifier'],
-                        'name': alg.get('name'),
-                        'controller_id': alg.get('controller_id'),
-                        'constraints_count': len(alg.get('constraints', []))
-                    })
-                
-                # Add process model insights
-                insights = result.data.get('insights', {})
-                if insights:
-                    synthesis['process_model_insights'] = insights
+        # Process models and control algorithms
+        synthesis['process_models'] = [
+            {
+                'identifier': model_entry['identifier'],
+                'controller_id': model_entry.get('controller_id'),
+                'process_id': model_entry.get('process_id'),
+                'staleness_risk': model_entry.get('staleness_risk', 'unknown'),
+                'state_variables_count': len(model_entry.get('state_variables', []))
+            }
+            for model_entry in model.process_models
+        ]
+        synthesis['control_algorithms'] = [
+            {
+                'identifier': alg['identifier'],
+                'name': alg.get('name'),
+                'controller_id': alg.get('controller_id'),
+                'constraints_count': len(alg.get('constraints', []))
+            }
+            for alg in model.control_algorithms
+        ]
+        synthesis['process_model_insights'] = model.process_model_insights
         
         # Include all controllers and processes for complete picture
-        all_controllers = []
-        all_processes = []
-        for result in control_results.values():
-            if isinstance(result, AgentResult) and result.success:
-                components = result.data.get('components', {})
-                all_controllers.extend(components.get('controllers', []))
-                all_processes.extend(components.get('controlled_processes', []))
-        
-        # Ensure we capture all controllers referenced in actions
-        synthesis['all_controllers'] = all_controllers
-        synthesis['all_processes'] = all_processes
+        synthesis['all_controllers'] = list(model.controllers)
+        synthesis['all_processes'] = list(model.processes)
         
         # Apply cross-reference enhancement
-        enhanced_synthesis = self.synthesis_enhancer.enhance_synthesis(synthesis)
+        enhanced_synthesis = self.synthesis_enhancer.enhance_synthesis(synthesis, model)
+        model.update_synthesis(enhanced_synthesis)
         
         return enhanced_synthesis
         
-    async def _store_agent_result(self, analysis_id: str, result: AgentResult) -> None:
+    async def _store_agent_result(self, analysis_id: str, result: AgentResult,
+                                  db_connection: Optional[asyncpg.Connection] = None) -> None:
         """Store individual agent result."""
-        await self.db_connection.execute(
+        await (db_connection or self.db_connection).execute(
             """
             INSERT INTO step2_agent_results 
             (id, analysis_id, agent_type, results, execution_time_ms)
@@ -1,10 +1,78 @@
 """
 Enhanced synthesis for Step 2 with cross-referencing
 """
-from typing import Dict, Any, List, Set, Tuple, Optional
+from typing import Dict, Any, FrozenSet, List, Set, Tuple, Optional
 from collections import defaultdict
 import logging
 
+from core.validation import Step2ResultModel
+
+
+def boundary_components(boundary: Dict[str, Any]) -> List[str]:
+    """Components a trust boundary names, whether members or its two sides"""
+    # The coordinator's synthesis lists the two sides under 'between'
+    return [c for c in boundary.get('components') or boundary.get('between') or [] if c]
+
+
+def feedback_endpoints(feedback: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """(source, target) of a feedback mechanism in either synthesis spelling"""
+    return feedback.get('source', feedback.get('from')), feedback.get('target', feedback.get('to'))
+
+
+class SynthesisIndex:
+    """
+    Lookups built in one pass over a synthesis.
+
+    Trust boundaries listing their 'components' are indexed by member,
+    those 'between' two components by that pair, and feedback by
+    (source, target), so resolving an action's boundary crossings and its
+    feedback loop does not scan the boundary or feedback lists.
+    """
+    
+    def __init__(self, synthesis: Dict[str, Any]):
+        self.boundaries: List[Dict[str, Any]] = synthesis.get('trust_boundaries', [])
+        # component -> positions of the boundaries it belongs to
+        self.boundaries_by_component: Dict[str, Set[int]] = defaultdict(set)
+        # {side, side} -> positions of the boundaries between the two
+        self.boundaries_by_pair: Dict[FrozenSet[str], Set[int]] = defaultdict(set)
+        for position, boundary in enumerate(self.boundaries):
+            if boundary.get('components'):
+                for component in boundary_components(boundary):
+                    self.boundaries_by_component[component].add(position)
+            else:
+                sides = frozenset(boundary_components(boundary))
+                if len(sides) == 2:
+                    self.boundaries_by_pair[sides].add(position)
+        
+        self.feedback_by_pair: Dict[Tuple[str, str], List[Dict[str, Any]]] = defaultdict(list)
+        for feedback in synthesis.get('key_feedback_mechanisms', []):
+            source, target = feedback_endpoints(feedback)
+            if source and target:
+                self.feedback_by_pair[(source, target)].append({
+                    'id': feedback['identifier'],
+                    'name': feedback['name'],
+                    'type': feedback.get('type', 'unknown')
+                })
+    
+    def crossings(self, from_component: Optional[str], to_component: Optional[str]) -> List[int]:
+        """
+        Positions of the boundaries an action between two components crosses
+
+        That is the boundaries between exactly these two, and those with
+        exactly one of them inside.
+        """
+        if not from_component or not to_component:
+            return []
+        empty: Set[int] = set()
+        return sorted(
+            self.boundaries_by_pair.get(frozenset((from_component, to_component)), empty)
+            | (self.boundaries_by_component.get(from_component, empty)
+               ^ self.boundaries_by_component.get(to_component, empty))
+        )
+    
+    def feedback_for(self, source: Optional[str], target: Optional[str]) -> List[Dict[str, Any]]:
+        return self.feedback_by_pair.get((source, target), [])
+
 
 class Step2SynthesisEnhancer:
     """
@@ -14,7 +82,8 @@ class Step2SynthesisEnhancer:
     def __init__(self):
         self.logger = logging.getLogger(self.__class__.__name__)
     
-    def enhance_synthesis(self, synthesis: Dict[str, Any]) -> Dict[str, Any]:
+    def enhance_synthesis(self, synthesis: Dict[str, Any],
+                          model: Optional[Step2ResultModel] = None) -> Dict[str, Any]:
         """
         Enhance synthesis with cross-references between components.
         
@@ -23,12 +92,17 @@ class Step2SynthesisEnhancer:
         - Feedback loop completeness for control actions
         - Component hierarchy and relationships
         - Risk mappings between boundaries and actions
+        
+        With the run's Step2ResultModel, controller details come from the full
+        controller records rather than the key controllers of the synthesis.
         """
         # Build component maps for quick lookup
-        controllers_map = {c['identifier']: c for c in synthesis.get('key_controllers', [])}
-        actions_map = {a['identifier']: a for a in synthesis.get('critical_control_actions', [])}
-        boundaries_map = {b['identifier']: b for b in synthesis.get('trust_boundaries', [])}
-        feedback_map = self._build_feedback_map(synthesis.get('key_feedback_mechanisms', []))
+        if model is not None:
+            controllers_map = model.controllers_by_id
+        else:
+            controllers_map = {c['identifier']: c for c in synthesis.get('key_controllers', [])}
+        index = SynthesisIndex(synthesis)
+        crossing_actions: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
         
         # Enhance control actions with cross-references
         enhanced_actions = []
@@ -36,16 +110,20 @@ class Step2SynthesisEnhancer:
             enhanced_action = action.copy()
             
             # Add trust boundary crossing information
-            boundary_crossings = self._find_boundary_crossings(
-                action, 
-                synthesis.get('trust_boundaries', [])
-            )
-            if boundary_crossings:
-                enhanced_action['crosses_boundaries'] = boundary_crossings
+            crossed = index.crossings(action.get('from'), action.get('to'))
+            if crossed:
+                enhanced_action['crosses_boundaries'] = [index.boundaries[position]['identifier'] for position in crossed]
                 enhanced_action['security_critical'] = True
+                for position in crossed:
+                    crossing_actions[position].append({
+                        'action_id': action['identifier'],
+                        'action_name': action['name'],
+                        'from': action['from'],
+                        'to': action['to']
+                    })
             
             # Add feedback loop information
-            feedback_loops = feedback_map.get((action['to'], action['from']), [])
+            feedback_loops = index.feedback_for(action.get('to'), action.get('from'))
             if feedback_loops:
                 enhanced_action['feedback_mechanisms'] = feedback_loops
                 enhanced_action['closed_loop'] = True
@@ -61,26 +139,14 @@ class Step2SynthesisEnhancer:
             
             enhanced_actions.append(enhanced_action)
         
-        # Enhance trust boundaries with component details
+        # Enhance trust boundaries with the actions crossing them
         enhanced_boundaries = []
-        for boundary in synthesis.get('trust_boundaries', []):
+        for position, boundary in enumerate(index.boundaries):
             enhanced_boundary = boundary.copy()
-            
-            # Find all control actions crossing this boundary
-            crossing_actions = []
-            for action in enhanced_actions:
-                if boundary['identifier'] in action.get('crosses_boundaries', []):
-                    crossing_actions.append({
-                        'action_id': action['identifier'],
-                        'action_name': action['name'],
-                        'from': action['from'],
-                        'to': action['to']
-                    })
-            
-            enhanced_boundary['crossing_actions'] = crossing_actions
+            enhanced_boundary['crossing_actions'] = crossing_actions.get(position, [])
             enhanced_boundary['risk_level'] = self._assess_boundary_risk(
                 enhanced_boundary, 
-                crossing_actions
+                enhanced_boundary['crossing_actions']
             )
             
             enhanced_boundaries.append(enhanced_boundary)
@@ -116,43 +182,6 @@ class Step2SynthesisEnhancer:
         
         return enhanced_synthesis
     
-    def _find_boundary_crossings(self, action: Dict[str, Any], 
-                                  boundaries: List[Dict[str, Any]]) -> List[str]:
-        """Find which trust boundaries a control action crosses."""
-        crossings = []
-        
-        from_component = action.get('from')
-        to_component = action.get('to')
-        
-        if not from_component or not to_component:
-            return crossings
-        
-        for boundary in boundaries:
-            components = set(boundary.get('components', []))
-            
-            # Check if action crosses this boundary
-            if (from_component in components and to_component not in components) or \
-               (to_component in components and from_component not in components):
-                crossings.append(boundary['identifier'])
-        
-        return crossings
-    
-    def _build_feedback_map(self, feedbacks: List[Dict[str, Any]]) -> Dict[Tuple[str, str], List[Dict]]:
-        """Build a map of feedback mechanisms by (source, target) pairs."""
-        feedback_map = defaultdict(list)
-        
-        for feedback in feedbacks:
-            source = feedback.get('source')
-            target = feedback.get('target')
-            if source and target:
-                feedback_map[(source, target)].append({
-                    'id': feedback['identifier'],
-                    'name': feedback['name'],
-                    'type': feedback.get('type', 'unknown')
-                })
-        
-        return feedback_map
-    
     def _assess_boundary_risk(self, boundary: Dict[str, Any], 
                               crossing_actions: List[Dict[str, Any]]) -> str:
         """Assess risk level of a trust boundary based on crossing actions."""
@@ -217,8 +246,7 @@ class Step2SynthesisEnhancer:
         
         # Add feedback relationships
         for feedback in feedbacks:
-            source = feedback.get('source')
-            target = feedback.get('target')
+            source, target = feedback_endpoints(feedback)
             
             if source and target:
                 # Update feedback tracking
@@ -1,10 +1,9 @@
 from typing import Dict, Any, List, Optional
-import json
-import uuid
 from datetime import datetime
 
 from .base_step2 import BaseStep2Agent, AgentResult
 from .component_registry import ComponentRegistry
+from .db_compat import Step2DBCompat
 from core.agents.step1_agents.base_step1 import CognitiveStyle
 from core.utils.json_parser import parse_llm_json
 from .schemas import TRUST_BOUNDARY_SCHEMA
@@ -16,6 +15,8 @@ class TrustBoundaryAgent(BaseStep2Agent):
     and analyzes security implications.
     """
     
+    consumes = ('control_structure', 'control_actions')
+    
     async def analyze(self, step1_analysis_id: str, step2_analysis_id: str, **kwargs) -> AgentResult:
         """Identify trust boundaries."""
         start_time = datetime.now()
@@ -61,7 +62,7 @@ class TrustBoundaryAgent(BaseStep2Agent):
             trust_data = self._parse_trust_boundaries(response_text, control_structure, registry)
         
         # Store in database
-        await self._store_trust_boundaries(step2_analysis_id, trust_data)
+        await self._store_result(self._store_trust_boundaries, step2_analysis_id, trust_data)
         
         execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
         
@@ -360,27 +361,20 @@ Ensure all string values properly escape newlines and quotes."""
             
     async def _store_trust_boundaries(self, analysis_id: str, trust_data: Dict[str, Any]) -> None:
         """Store trust boundaries in database."""
-        for boundary in trust_data['trust_boundaries']:
-            await self.db_connection.execute(
-                """
-                INSERT INTO trust_boundaries
-                (id, analysis_id, identifier, boundary_name, boundary_type,
-                 component_a_id, component_b_id, trust_direction,
-                 authentication_method, authorization_method, data_protection_requirements)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
-                """,
-                str(uuid.uuid4()),
-                analysis_id,
-                boundary['identifier'],
-                boundary['boundary_name'],
-                boundary.get('boundary_type', 'network'),
-                boundary['component_a_db_id'],
-                boundary['component_b_db_id'],
-                boundary.get('trust_direction', 'none'),
-                boundary.get('authentication_method', ''),
-                boundary.get('authorization_method', ''),
-                json.dumps(boundary.get('data_protection', {}))
-            )
+        await Step2DBCompat(self.db_connection).insert_trust_boundaries(analysis_id, [
+            {
+                'identifier': boundary['identifier'],
+                'boundary_name': boundary['boundary_name'],
+                'boundary_type': boundary.get('boundary_type', 'network'),
+                'component_a_id': boundary['component_a_db_id'],
+                'component_b_id': boundary['component_b_db_id'],
+                'trust_direction': boundary.get('trust_direction', 'none'),
+                'authentication_method': boundary.get('authentication_method', ''),
+                'authorization_method': boundary.get('authorization_method', ''),
+                'data_protection_requirements': boundary.get('data_protection', {})
+            }
+            for boundary in trust_data['trust_boundaries']
+        ])
             
     def _generate_summary(self, trust_data: Dict[str, Any]) -> str:
         """Generate summary of trust boundaries."""
@@ -0,0 +1,168 @@
+"""
+In-memory graph of Step 2 results for cross-reference validation
+"""
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+
+class ValidationGraph:
+    """
+    Components, hierarchy, control actions and feedback of one validation
+    run as a single graph.
+
+    Identifiers are interned to integer nodes once; adjacency lists and
+    their reverse index make every check a single pass over the edges
+    instead of a scan of the edge list per component.
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+
+        # Component roles
+        self.controllers: Set[int] = set()
+        self.processes: Set[int] = set()
+        self.dual_role: Set[int] = set()
+        self.components: Set[int] = set()
+
+        # Hierarchy: parent -> children and the reverse
+        self.children: List[List[int]] = []
+        self.parents: List[List[int]] = []
+        self.self_loops: Set[int] = set()
+
+        # Control actions: controller -> controlled processes and the reverse
+        self.controls: List[List[int]] = []
+        self.controlled_by: List[List[int]] = []
+        self.action_pairs: Set[Tuple[int, int]] = set()
+
+        # Processes that report feedback
+        self.feedback_sources: Set[int] = set()
+
+    def node(self, identifier: str) -> int:
+        """Intern an identifier, adding a node the first time it is seen"""
+        node = self.index.get(identifier)
+        if node is None:
+            node = len(self.ids)
+            self.index[identifier] = node
+            self.ids.append(identifier)
+            self.children.append([])
+            self.parents.append([])
+            self.controls.append([])
+            self.controlled_by.append([])
+        return node
+
+    def has_role(self, identifier: Optional[str], role: str) -> bool:
+        node = self.index.get(identifier)
+        return node is not None and node in getattr(self, role)
+
+    @classmethod
+    def build(cls, components: Dict[str, Any], hierarchy: List[Dict[str, str]],
+              control_actions: List[Dict[str, Any]],
+              feedbacks: List[Dict[str, Any]]) -> 'ValidationGraph':
+        graph = cls()
+        for role, key in (('controllers', 'controllers'), ('processes', 'processes'),
+                          ('dual_role', 'dual_role'), ('components', 'all')):
+            role_nodes = getattr(graph, role)
+            # Sorted so node numbers, and the order of findings, are stable
+            for identifier in sorted(components[key], key=str):
+                if identifier is not None:
+                    role_nodes.add(graph.node(identifier))
+
+        for rel in hierarchy:
+            if rel.get('parent') is None or rel.get('child') is None:
+                continue
+            parent, child = graph.node(rel['parent']), graph.node(rel['child'])
+            graph.children[parent].append(child)
+            graph.parents[child].append(parent)
+            if parent == child:
+                graph.self_loops.add(parent)
+
+        for action in control_actions:
+            if not action.get('controller_id') or not action.get('controlled_process_id'):
+                continue
+            controller = graph.node(action['controller_id'])
+            process = graph.node(action['controlled_process_id'])
+            graph.controls[controller].append(process)
+            graph.controlled_by[process].append(controller)
+            graph.action_pairs.add((controller, process))
+
+        for feedback in feedbacks:
+            if feedback.get('source_process_id'):
+                graph.feedback_sources.add(graph.node(feedback['source_process_id']))
+        return graph
+
+    def strongly_connected_components(self) -> List[List[int]]:
+        """Tarjan's algorithm over the hierarchy, iterative to avoid recursion limits"""
+        count = len(self.ids)
+        order = [-1] * count
+        low = [0] * count
+        on_stack = [False] * count
+        stack: List[int] = []
+        result: List[List[int]] = []
+        counter = 0
+
+        for root in range(count):
+            if order[root] != -1:
+                continue
+            order[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            work = [(root, 0)]
+            while work:
+                node, position = work[-1]
+                children = self.children[node]
+                if position < len(children):
+                    work[-1] = (node, position + 1)
+                    child = children[position]
+                    if order[child] == -1:
+                        order[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack[child] = True
+                        work.append((child, 0))
+                    elif on_stack[child]:
+                        low[node] = min(low[node], order[child])
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == order[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    result.append(component)
+        return result
+
+    def find_cycles(self) -> List[List[str]]:
+        """One representative cycle for every cyclic part of the hierarchy"""
+        cycles = []
+        for component in self.strongly_connected_components():
+            if len(component) == 1 and component[0] not in self.self_loops:
+                continue
+            cycles.append([self.ids[node] for node in self._cycle_through(min(component), set(component))])
+        return cycles
+
+    def _cycle_through(self, start: int, members: Set[int]) -> List[int]:
+        """Shortest hierarchy path from ``start`` back to itself within its component"""
+        previous = {start: None}
+        frontier = [start]
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                for child in self.children[node]:
+                    if child == start:
+                        path = [node]
+                        while previous[path[-1]] is not None:
+                            path.append(previous[path[-1]])
+                        return path[::-1]
+                    if child in members and child not in previous:
+                        previous[child] = node
+                        next_frontier.append(child)
+            frontier = next_frontier
+        return [start]
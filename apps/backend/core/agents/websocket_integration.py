@@ -14,12 +14,14 @@ from core.agents.types import SectionResult
 class AgentWebSocketNotifier:
     """Handles WebSocket notifications for agent operations"""
     
-    def __init__(self, analysis_id: str):
+    def __init__(self, analysis_id: str, broadcaster=None):
         self.analysis_id = analysis_id
+        # The connection manager, or a publisher when running in a worker process
+        self.broadcaster = broadcaster or manager
         
     async def notify_analysis_start(self, framework: str):
         """Notify that analysis has started"""
-        await manager.broadcast_analysis_update(
+        await self.broadcaster.broadcast_analysis_update(
             self.analysis_id,
             AnalysisStatus.IN_PROGRESS,
             0.0,
@@ -33,7 +35,7 @@ class AgentWebSocketNotifier:
         metadata: Optional[Dict[str, Any]] = None
     ):
         """Notify analysis progress update"""
-        await manager.broadcast_analysis_update(
+        await self.broadcaster.broadcast_analysis_update(
             self.analysis_id,
             AnalysisStatus.IN_PROGRESS,
             progress,
@@ -48,7 +50,7 @@ class AgentWebSocketNotifier:
         section_title: str
     ):
         """Notify that a section analysis has started"""
-        await manager.broadcast_section_update(
+        await self.broadcaster.broadcast_section_update(
             self.analysis_id,
             framework,
             section_id,
@@ -62,7 +64,7 @@ class AgentWebSocketNotifier:
         section: SectionResult
     ):
         """Notify that a section analysis has completed"""
-        await manager.broadcast_section_update(
+        await self.broadcaster.broadcast_section_update(
             self.analysis_id,
             framework,
             section.section_id,
@@ -81,7 +83,7 @@ class AgentWebSocketNotifier:
         status = AnalysisStatus.COMPLETED if success else AnalysisStatus.FAILED
         message = f"{framework} analysis completed" if success else f"{framework} analysis failed: {error}"
         
-        await manager.broadcast_analysis_update(
+        await self.broadcaster.broadcast_analysis_update(
             self.analysis_id,
             status,
             100.0 if success else 0.0,
@@ -89,6 +91,6 @@ class AgentWebSocketNotifier:
         )
 
 
-def create_agent_notifier(analysis_id: str) -> AgentWebSocketNotifier:
+def create_agent_notifier(analysis_id: str, broadcaster=None) -> AgentWebSocketNotifier:
     """Create a WebSocket notifier for an analysis"""
-    return AgentWebSocketNotifier(analysis_id)
\ No newline at end of file
+    return AgentWebSocketNotifier(analysis_id, broadcaster)
\ No newline at end of file
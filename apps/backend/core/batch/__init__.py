@@ -0,0 +1,15 @@
+"""
+Batch analysis of many systems with shared LLM and database resources
+"""
+from .shared_resources import SharedModelClient, DatabasePoolRegistry, UsageStats, current_system
+from .runner import BatchRunner, BatchSystem, BatchPricing
+
+__all__ = [
+    'SharedModelClient',
+    'DatabasePoolRegistry',
+    'UsageStats',
+    'current_system',
+    'BatchRunner',
+    'BatchSystem',
+    'BatchPricing'
+]
@@ -0,0 +1,351 @@
+"""
+Batch runner for analyzing many systems in one process
+"""
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+import asyncio
+import json
+import logging
+import time
+import traceback
+
+from core.agents.step1_agents import Step1Coordinator
+from .shared_resources import SharedModelClient, DatabasePoolRegistry, UsageStats, current_system
+
+
+
+@dataclass
+class BatchSystem:
+    """One system (configuration file) in a batch and its progress"""
+    name: str
+    config_path: str
+    config: Dict[str, Any] = field(default_factory=dict, repr=False)
+    input_configs: List[Dict[str, Any]] = field(default_factory=list, repr=False)
+    status: str = "pending"  # pending, running, completed, failed
+    db_name: Optional[str] = None
+    step1_analysis_id: Optional[str] = None
+    completed_steps: List[int] = field(default_factory=list)
+    attempts: int = 0
+    error: Optional[str] = None
+    durations: Dict[str, float] = field(default_factory=dict)
+
+    def to_state(self) -> Dict[str, Any]:
+        state = asdict(self)
+        state.pop("config")
+        state.pop("input_configs")
+        return state
+
+
+@dataclass
+class BatchPricing:
+    """Cost per 1,000 tokens, used for the cost column of the report"""
+    input_per_1k: float = 0.0
+    output_per_1k: float = 0.0
+
+    def cost(self, usage: UsageStats) -> float:
+        return (usage.prompt_tokens / 1000 * self.input_per_1k +
+                usage.completion_tokens / 1000 * self.output_per_1k)
+
+
+class BatchRunner:
+    """
+    Runs Step 1 (and optionally Step 2) for many systems concurrently.
+
+    All systems share one LLM client (global concurrency budget and response
+    cache) and one database pool registry (global connection cap). A failing
+    system is recorded and the rest of the batch continues. Progress is
+    written to ``batch-state.json`` after every step so an interrupted batch
+    can be resumed from the same directory.
+    """
+
+    STATE_FILE = "batch-state.json"
+    REPORT_FILE = "batch-report.json"
+    MARKDOWN_REPORT_FILE = "batch-report.md"
+
+    def __init__(self, systems: List[BatchSystem], batch_dir: Path,
+                 model_client: SharedModelClient, pools: DatabasePoolRegistry,
+                 create_database: Callable[[Dict[str, Any], str], Awaitable[Any]],
+                 prepare_step2_database: Callable[[Any], Awaitable[None]],
+                 steps: int = 1, max_systems: int = 4, enhanced: bool = False,
+                 max_refinements: int = 5, knowledge_dir: Optional[Path] = None,
+                 pricing: Optional[BatchPricing] = None,
+                 on_progress: Optional[Callable[[BatchSystem, str], None]] = None):
+        self.systems = systems
+        self.batch_dir = batch_dir
+        self.model_client = model_client
+        self.pools = pools
+        self.create_database = create_database
+        self.prepare_step2_database = prepare_step2_database
+        self.steps = steps
+        # A running system fans out further than its pool allows (the main
+        # connection, five Step 1 snapshot queries, up to six Step 2 agents),
+        # so its pool size is what it can hold at once. Never let the global
+        # cap be smaller than what the concurrent systems hold or they deadlock
+        affordable = max(1, pools.max_connections // pools.per_database)
+        if max_systems > affordable:
+            logging.getLogger(self.__class__.__name__).warning(
+                f"Reducing concurrent systems from {max_systems} to {affordable} "
+                f"to fit {pools.max_connections} database connections"
+            )
+        self.max_systems = min(max_systems, affordable)
+        self.enhanced = enhanced
+        self.max_refinements = max_refinements
+        self.knowledge_dir = knowledge_dir
+        self.pricing = pricing or BatchPricing()
+        self.on_progress = on_progress
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.batch_id = batch_dir.name
+        self._state_lock = asyncio.Lock()
+
+    @classmethod
+    def load_state(cls, batch_dir: Path) -> Dict[str, Dict[str, Any]]:
+        """Load per-system state from a previous run, keyed by system name"""
+        state_file = batch_dir / cls.STATE_FILE
+        if not state_file.exists():
+            return {}
+        with open(state_file) as f:
+            state = json.load(f)
+        return {entry["name"]: entry for entry in state.get("systems", [])}
+
+    def restore(self, previous: Dict[str, Dict[str, Any]]):
+        """Carry over completed steps and databases from a previous run"""
+        for system in self.systems:
+            entry = previous.get(system.name)
+            if not entry:
+                continue
+            system.db_name = entry.get("db_name")
+            system.step1_analysis_id = entry.get("step1_analysis_id")
+            system.completed_steps = entry.get("completed_steps", [])
+            system.attempts = entry.get("attempts", 0)
+            system.durations = entry.get("durations", {})
+            if 1 not in system.completed_steps:
+                # A half-written Step 1 database is not reused
+                system.db_name = None
+                system.step1_analysis_id = None
+
+    async def run(self) -> Dict[str, Any]:
+        """Run every pending system and write the consolidated report"""
+        self.batch_dir.mkdir(parents=True, exist_ok=True)
+        started_at = datetime.now()
+        start = time.perf_counter()
+        limiter = asyncio.Semaphore(self.max_systems)
+
+        async def run_limited(system: BatchSystem):
+            async with limiter:
+                await self._run_system(system)
+
+        await self._save_state()
+        try:
+            await asyncio.gather(*(run_limited(system) for system in self.systems))
+        finally:
+            await self.pools.close()
+            self.model_client.save_cache()
+
+        report = self._build_report(started_at, time.perf_counter() - start)
+        with open(self.batch_dir / self.REPORT_FILE, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        with open(self.batch_dir / self.MARKDOWN_REPORT_FILE, "w") as f:
+            f.write(self._render_markdown(report))
+        return report
+
+    def _pending_steps(self, system: BatchSystem) -> List[int]:
+        return [step for step in range(1, self.steps + 1) if step not in system.completed_steps]
+
+    async def _run_system(self, system: BatchSystem):
+        """Run one system; errors are recorded on the system, never raised"""
+        current_system.set(system.name)
+        if not self._pending_steps(system):
+            system.status = "completed"
+            self._notify(system, "already complete")
+            return
+
+        system.status = "running"
+        system.attempts += 1
+        system.error = None
+        try:
+            if 1 in self._pending_steps(system):
+                await self._run_step1(system)
+            if 2 in self._pending_steps(system):
+                await self._run_step2(system)
+            system.status = "completed"
+            self._notify(system, "completed")
+        except Exception as e:
+            system.status = "failed"
+            system.error = f"{type(e).__name__}: {e}"
+            self.logger.error(f"Batch system {system.name} failed: {system.error}\n{traceback.format_exc()}")
+            self._notify(system, f"failed - {system.error}")
+        finally:
+            if system.db_name:
+                await self.pools.release_database(system.db_name)
+            await self._save_state()
+            self.model_client.save_cache()
+
+    async def _run_step1(self, system: BatchSystem):
+        self._notify(system, "Step 1 starting")
+        start = time.perf_counter()
+        # Retries get a fresh database; a half-written one is left for inspection
+        suffix = f"_r{system.attempts}" if system.attempts > 1 else ""
+        system.db_name = f"stpa_analysis_{self.batch_id}_{self.systems.index(system):03d}{suffix}"
+        await self.create_database(system.config, system.db_name)
+
+        execution_mode = 'enhanced' if self.enhanced else system.config.get('execution', {}).get('mode', 'standard')
+        async with self.pools.acquire(system.db_name) as conn:
+            coordinator = Step1Coordinator(
+                db_connection=conn,
+                execution_mode=execution_mode,
+                db_name=system.db_name,
+                model_provider=self.model_client,
+                db_pool=self.pools.bind(system.db_name)
+            )
+            results = await coordinator.perform_analysis(
+                system_description="",
+                analysis_name=system.config['analysis']['name'],
+                input_configs=system.input_configs
+            )
+
+        system.step1_analysis_id = results.get("analysis_id", coordinator.analysis_id)
+        results['model_info'] = {"model": self.model_client.model, "execution_mode": execution_mode}
+        self._write_results(system, "step1-results.json", results)
+        system.durations["step1"] = round(time.perf_counter() - start, 2)
+        system.completed_steps.append(1)
+        await self._save_state()
+        self._notify(system, f"Step 1 done in {system.durations['step1']:.0f}s")
+
+    async def _run_step2(self, system: BatchSystem):
+        from core.agents.step2_agents import Step2Coordinator
+
+        self._notify(system, "Step 2 starting")
+        start = time.perf_counter()
+        output_dir = self.batch_dir / system.name / "step2"
+        execution_mode = 'enhanced' if self.enhanced else 'standard'
+
+        async with self.pools.acquire(system.db_name) as conn:
+            await self.prepare_step2_database(conn)
+            coordinator = Step2Coordinator(self.model_client, conn, output_dir=output_dir,
+                                           db_pool=self.pools.bind(system.db_name))
+
+            is_mock_provider = self.model_client.inner.__class__.__name__ == 'MockModelClient'
+            if is_mock_provider or not self.knowledge_dir:
+                results = await coordinator.coordinate(
+                    step1_analysis_id=system.step1_analysis_id,
+                    execution_mode=execution_mode
+                )
+            else:
+                from core.agents.expert_integration import create_expert_supervised_coordinator
+                from core.agents.expert_agent import OperatingMode
+
+                supervised = create_expert_supervised_coordinator(
+                    base_coordinator=coordinator,
+                    model_provider=self.model_client,
+                    knowledge_dir=self.knowledge_dir,
+                    operating_mode=OperatingMode.HUMAN_AFTER_LOOP
+                )
+                results = await supervised.coordinate_with_supervision(
+                    step1_analysis_id=system.step1_analysis_id,
+                    execution_mode=execution_mode,
+                    max_refinements=self.max_refinements
+                )
+
+        self._write_results(system, "step2-results.json", results)
+        system.durations["step2"] = round(time.perf_counter() - start, 2)
+        system.completed_steps.append(2)
+        await self._save_state()
+        self._notify(system, f"Step 2 done in {system.durations['step2']:.0f}s")
+
+    def _write_results(self, system: BatchSystem, filename: str, results: Dict[str, Any]):
+        system_dir = self.batch_dir / system.name
+        system_dir.mkdir(parents=True, exist_ok=True)
+        with open(system_dir / filename, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+
+    async def _save_state(self):
+        async with self._state_lock:
+            state = {
+                "batch_id": self.batch_id,
+                "steps": self.steps,
+                "updated_at": datetime.now().isoformat(),
+                "systems": [system.to_state() for system in self.systems],
+            }
+            tmp_path = self.batch_dir / f"{self.STATE_FILE}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f, indent=2, default=str)
+            tmp_path.replace(self.batch_dir / self.STATE_FILE)
+
+    def _notify(self, system: BatchSystem, message: str):
+        self.logger.info(f"[{system.name}] {message}")
+        if self.on_progress:
+            self.on_progress(system, message)
+
+    def _build_report(self, started_at: datetime, wall_seconds: float) -> Dict[str, Any]:
+        systems = []
+        for system in self.systems:
+            usage = self.model_client.usage.get(system.name, UsageStats())
+            systems.append({
+                **system.to_state(),
+                "usage": usage.to_dict(),
+                "cost": round(self.pricing.cost(usage), 4),
+            })
+
+        totals = self.model_client.totals()
+        completed = [s for s in self.systems if s.status == "completed"]
+        requests = totals.calls + totals.cache_hits
+        return {
+            "batch_id": self.batch_id,
+            "started_at": started_at.isoformat(),
+            "wall_seconds": round(wall_seconds, 2),
+            "model": self.model_client.model,
+            "limits": {
+                "max_systems": self.max_systems,
+                "llm_concurrency": self.model_client.max_concurrency,
+                "max_connections": self.pools.max_connections,
+            },
+            "throughput": {
+                "systems_total": len(self.systems),
+                "systems_completed": len(completed),
+                "systems_failed": len([s for s in self.systems if s.status == "failed"]),
+                "systems_per_hour": round(len(completed) / wall_seconds * 3600, 2) if wall_seconds else 0.0,
+                "tokens_per_minute": round(
+                    (totals.prompt_tokens + totals.completion_tokens) / wall_seconds * 60, 1
+                ) if wall_seconds else 0.0,
+                "cache_hit_rate": round(totals.cache_hits / requests, 3) if requests else 0.0,
+                # Summed LLM time over wall time: how much the shared budget overlapped work
+                "llm_parallelism": round(totals.llm_seconds / wall_seconds, 2) if wall_seconds else 0.0,
+            },
+            "usage": totals.to_dict(),
+            "cost": round(self.pricing.cost(totals), 4),
+            "systems": systems,
+        }
+
+    @staticmethod
+    def _render_markdown(report: Dict[str, Any]) -> str:
+        throughput = report["throughput"]
+        usage = report["usage"]
+        lines = [
+            f"# Batch Analysis Report: {report['batch_id']}",
+            "",
+            f"- **Model:** {report['model']}",
+            f"- **Wall time:** {report['wall_seconds']:.0f}s",
+            f"- **Systems:** {throughput['systems_completed']}/{throughput['systems_total']} completed, "
+            f"{throughput['systems_failed']} failed",
+            f"- **Throughput:** {throughput['systems_per_hour']} systems/hour, "
+            f"{throughput['tokens_per_minute']} tokens/minute",
+            f"- **LLM calls:** {usage['calls']} ({usage['cache_hits']} served from cache, "
+            f"hit rate {throughput['cache_hit_rate']:.0%})",
+            f"- **Tokens:** {usage['prompt_tokens']} prompt / {usage['completion_tokens']} completion",
+            f"- **Estimated cost:** ${report['cost']:.2f}",
+            "",
+            "| System | Status | Steps | Step 1 (s) | Step 2 (s) | LLM calls | Cache hits | Tokens | Cost | Error |",
+            "|--------|--------|-------|-----------|-----------|-----------|------------|--------|------|-------|",
+        ]
+        for system in report["systems"]:
+            system_usage = system["usage"]
+            lines.append(
+                f"| {system['name']} | {system['status']} | "
+                f"{','.join(str(s) for s in system['completed_steps']) or '-'} | "
+                f"{system['durations'].get('step1', '-')} | {system['durations'].get('step2', '-')} | "
+                f"{system_usage['calls']} | {system_usage['cache_hits']} | {system_usage['total_tokens']} | "
+                f"${system['cost']:.2f} | {system['error'] or ''} |"
+            )
+        return "\n".join(lines) + "\n"
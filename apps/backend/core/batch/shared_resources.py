@@ -0,0 +1,243 @@
+"""
+Resources shared by every system in a batch analysis run
+"""
+from typing import Dict, Any, List, Optional
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+import asyncio
+import hashlib
+import json
+import logging
+import time
+
+import asyncpg
+
+from core.model_providers import BaseModelClient, ModelResponse
+
+
+# Name of the system whose coroutine is currently calling the model.
+# asyncio tasks copy the context on creation, so agent fan-out inherits it.
+current_system: ContextVar[str] = ContextVar("current_system", default="unassigned")
+
+
+@dataclass
+class UsageStats:
+    """LLM usage accumulated for one system (or the whole batch)"""
+    calls: int = 0
+    cache_hits: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    llm_seconds: float = 0.0
+    queue_seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "llm_seconds": round(self.llm_seconds, 2),
+            "queue_seconds": round(self.queue_seconds, 2),
+        }
+
+
+class SharedModelClient(BaseModelClient):
+    """
+    Wraps one provider client for a whole batch.
+
+    - A semaphore enforces a global budget of concurrent LLM requests
+    - Identical requests are answered from a response cache (and concurrent
+      identical requests share one in-flight call)
+    - Token usage is attributed to the system set in ``current_system``
+    """
+
+    def __init__(self, inner: BaseModelClient, max_concurrency: int = 8,
+                 cache_path: Optional[Path] = None):
+        super().__init__()
+        self.inner = inner
+        self.supports_structured_output = getattr(inner, "supports_structured_output", False)
+        self.model = getattr(inner, "model", "unknown")
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.cache_path = cache_path
+        self.usage: Dict[str, UsageStats] = {}
+        self.logger = logging.getLogger(self.__class__.__name__)
+        if cache_path and cache_path.exists():
+            self._load_cache()
+
+    def __getattr__(self, name):
+        # Provider-specific attributes (is_azure, endpoint, ...) come from the inner client
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    async def generate(self, messages: List[Dict[str, str]],
+                       temperature: float = 0.7,
+                       max_tokens: Optional[int] = None) -> ModelResponse:
+        return await self._call("generate", messages, None, temperature, max_tokens)
+
+    async def generate_structured(self, messages: List[Dict[str, str]],
+                                  response_format: Dict[str, Any],
+                                  temperature: float = 0.7,
+                                  max_tokens: Optional[int] = None) -> ModelResponse:
+        return await self._call("generate_structured", messages, response_format, temperature, max_tokens)
+
+    def _stats(self) -> UsageStats:
+        return self.usage.setdefault(current_system.get(), UsageStats())
+
+    @staticmethod
+    def _cache_key(method: str, model: str, messages, response_format, temperature, max_tokens) -> str:
+        payload = json.dumps(
+            [method, model, messages, response_format, temperature, max_tokens],
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def _call(self, method: str, messages, response_format, temperature, max_tokens) -> ModelResponse:
+        stats = self._stats()
+        key = self._cache_key(method, self.model, messages, response_format, temperature, max_tokens)
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            stats.cache_hits += 1
+            return ModelResponse(content=cached["content"], model=cached["model"], usage=cached.get("usage"))
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            stats.cache_hits += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            queued_at = time.perf_counter()
+            async with self._semaphore:
+                started_at = time.perf_counter()
+                stats.queue_seconds += started_at - queued_at
+                if method == "generate_structured":
+                    response = await self.inner.generate_structured(
+                        messages, response_format, temperature, max_tokens
+                    )
+                else:
+                    response = await self.inner.generate(messages, temperature, max_tokens)
+                stats.llm_seconds += time.perf_counter() - started_at
+
+            stats.calls += 1
+            usage = response.usage or {}
+            stats.prompt_tokens += usage.get("prompt_tokens", 0) or 0
+            stats.completion_tokens += usage.get("completion_tokens", 0) or 0
+            self._cache[key] = {"content": response.content, "model": response.model, "usage": response.usage}
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; retrieve to avoid "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self._cache[entry["key"]] = entry["response"]
+            self.logger.info(f"Loaded {len(self._cache)} cached responses from {self.cache_path}")
+        except Exception as e:
+            self.logger.warning(f"Could not load response cache {self.cache_path}: {e}")
+
+    def save_cache(self):
+        """Persist cached responses so a resumed batch does not pay for them again"""
+        if not self.cache_path:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            for key, response in self._cache.items():
+                f.write(json.dumps({"key": key, "response": response}, default=str) + "\n")
+        tmp_path.replace(self.cache_path)
+
+    def totals(self) -> UsageStats:
+        total = UsageStats()
+        for stats in self.usage.values():
+            total.calls += stats.calls
+            total.cache_hits += stats.cache_hits
+            total.prompt_tokens += stats.prompt_tokens
+            total.completion_tokens += stats.completion_tokens
+            total.llm_seconds += stats.llm_seconds
+            total.queue_seconds += stats.queue_seconds
+        return total
+
+
+class DatabasePoolRegistry:
+    """
+    One asyncpg pool per analysis database under a global connection cap.
+
+    Every analysis lives in its own database, so a single pool cannot serve
+    the whole batch. The registry creates pools lazily and makes sure the sum
+    of connections held across all of them stays within ``max_connections``.
+    """
+
+    def __init__(self, dsn_factory, max_connections: int = 20, per_database: int = 4):
+        self._dsn_factory = dsn_factory
+        self.max_connections = max_connections
+        self.per_database = per_database
+        self._budget = asyncio.Semaphore(max_connections)
+        self._pools: Dict[str, asyncpg.Pool] = {}
+        self._lock = asyncio.Lock()
+
+    async def pool(self, db_name: str) -> asyncpg.Pool:
+        async with self._lock:
+            if db_name not in self._pools:
+                self._pools[db_name] = await asyncpg.create_pool(
+                    self._dsn_factory(db_name), min_size=1, max_size=self.per_database
+                )
+            return self._pools[db_name]
+
+    @asynccontextmanager
+    async def acquire(self, db_name: str):
+        """Acquire a connection to ``db_name`` counted against the global cap"""
+        pool = await self.pool(db_name)
+        # Wait for the database's own pool first, so callers queued behind a
+        # busy system do not hold global budget they cannot use
+        async with pool.acquire() as conn:
+            async with self._budget:
+                yield conn
+
+    def bind(self, db_name: str) -> "BoundPool":
+        """Pool-like view of one database, usable wherever an asyncpg pool is expected"""
+        return BoundPool(self, db_name)
+
+    async def release_database(self, db_name: str):
+        """Close the pool for a finished system"""
+        async with self._lock:
+            pool = self._pools.pop(db_name, None)
+        if pool is not None:
+            await pool.close()
+
+    async def close(self):
+        async with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            await pool.close()
+
+
+class BoundPool:
+    """Exposes ``acquire()`` for a single database of a DatabasePoolRegistry"""
+
+    def __init__(self, registry: DatabasePoolRegistry, db_name: str):
+        self.registry = registry
+        self.db_name = db_name
+
+    def acquire(self):
+        return self.registry.acquire(self.db_name)
@@ -53,7 +53,7 @@ async def init_db():
     """Initialize database (create tables)"""
     # Import models to ensure they're registered
     from core.models.database import (
-        User, Project, Analysis, AnalysisResult, 
+        User, Project, Analysis, AnalysisJob, AnalysisResult, 
         ChatMessage, Artifact, SystemComponent, Setting
     )
     
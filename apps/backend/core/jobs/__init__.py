@@ -0,0 +1,19 @@
+"""
+Durable analysis job queue and the workers that run it
+"""
+from .queue import (
+    enqueue_analysis, claim_next_job, heartbeat, finish_job,
+    release_jobs, release_expired_leases, request_cancel
+)
+from .worker import AnalysisWorker
+
+__all__ = [
+    'enqueue_analysis',
+    'claim_next_job',
+    'heartbeat',
+    'finish_job',
+    'release_jobs',
+    'release_expired_leases',
+    'request_cancel',
+    'AnalysisWorker'
+]
@@ -0,0 +1,268 @@
+"""
+Durable analysis job queue on the ``analysis_jobs`` table
+
+Workers claim jobs with ``SELECT ... FOR UPDATE SKIP LOCKED`` so any
+number of them can poll the same table without handing one job to two
+workers. A claimed job holds a lease the worker extends with heartbeats;
+when a worker dies its lease runs out and the job is queued again, until
+it has used ``max_attempts``.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+from uuid import UUID
+import logging
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import settings
+from core.models.database import Analysis, AnalysisJob
+from core.models.schemas import AnalysisJobStatus, AnalysisStatus
+
+logger = logging.getLogger(__name__)
+
+# Notified when there is something for idle workers to look at
+JOBS_CHANNEL = "analysis_jobs"
+# Queued jobs locked and considered per claim
+CLAIM_BATCH_SIZE = 20
+
+
+def _is_postgres(db: AsyncSession) -> bool:
+    return db.bind.dialect.name == "postgresql"
+
+
+async def _wake_workers(db: AsyncSession):
+    """Wake listening workers once the current transaction commits"""
+    if _is_postgres(db):
+        await db.execute(text("SELECT pg_notify(:channel, '')"), {"channel": JOBS_CHANNEL})
+
+
+async def enqueue_analysis(
+    db: AsyncSession,
+    analysis: Analysis,
+    tenant_id: UUID,
+    payload: Dict[str, Any],
+    priority: int = 0
+) -> AnalysisJob:
+    """Queue a run of ``analysis`` for the workers"""
+    job = AnalysisJob(
+        analysis_id=analysis.id,
+        tenant_id=tenant_id,
+        priority=priority,
+        payload=payload,
+        status=AnalysisJobStatus.QUEUED,
+        max_attempts=settings.analysis_job_max_attempts
+    )
+    db.add(job)
+    await _wake_workers(db)
+    await db.commit()
+    return job
+
+
+async def claim_next_job(
+    db: AsyncSession,
+    worker_id: str,
+    lease_seconds: Optional[int] = None,
+    tenant_limit: Optional[int] = None
+) -> Optional[AnalysisJob]:
+    """
+    Claim the highest-priority queued job whose tenant has a free slot
+
+    Tenants already running ``tenant_limit`` jobs are filtered out up front.
+    Two workers may still lock jobs of the same tenant at once, so the
+    running count is checked again under a per-tenant advisory lock. The
+    lock is only tried: a tenant another worker is claiming for is skipped
+    rather than waited on, since waiting while holding row locks and other
+    tenants' advisory locks could deadlock two claiming workers.
+    """
+    lease = timedelta(seconds=lease_seconds or settings.analysis_job_lease_seconds)
+    limit = tenant_limit or settings.analysis_jobs_per_tenant
+
+    full_tenants = (
+        select(AnalysisJob.tenant_id)
+        .where(AnalysisJob.status == AnalysisJobStatus.RUNNING)
+        .group_by(AnalysisJob.tenant_id)
+        .having(func.count() >= limit)
+    )
+    candidates = (await db.execute(
+        select(AnalysisJob)
+        .where(AnalysisJob.status == AnalysisJobStatus.QUEUED)
+        .where(AnalysisJob.tenant_id.not_in(full_tenants))
+        .order_by(AnalysisJob.priority.desc(), AnalysisJob.created_at)
+        .limit(CLAIM_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+        .execution_options(populate_existing=True)
+    )).scalars().all()
+
+    checked = set()
+    for job in candidates:
+        if job.tenant_id in checked:
+            continue
+        checked.add(job.tenant_id)
+        if _is_postgres(db) and not await db.scalar(
+            text("SELECT pg_try_advisory_xact_lock(hashtext(:key))"),
+            {"key": f"{JOBS_CHANNEL}:{job.tenant_id}"}
+        ):
+            continue
+        running = await db.scalar(
+            select(func.count())
+            .select_from(AnalysisJob)
+            .where(AnalysisJob.tenant_id == job.tenant_id, AnalysisJob.status == AnalysisJobStatus.RUNNING)
+        )
+        if running >= limit:
+            continue
+
+        now = datetime.utcnow()
+        job.status = AnalysisJobStatus.RUNNING
+        job.worker_id = worker_id
+        job.attempts += 1
+        job.started_at = now
+        job.heartbeat_at = now
+        job.lease_expires_at = now + lease
+        await db.commit()
+        return job
+
+    await db.commit()
+    return None
+
+
+async def heartbeat(
+    db: AsyncSession,
+    worker_id: str,
+    job_ids: Sequence[UUID],
+    lease_seconds: Optional[int] = None
+) -> Dict[UUID, bool]:
+    """
+    Extend the leases of a worker's running jobs
+
+    Returns whether cancellation was requested, per job. Jobs missing from
+    the result are no longer this worker's: their lease ran out and they
+    were queued again or settled.
+    """
+    if not job_ids:
+        return {}
+    now = datetime.utcnow()
+    lease = timedelta(seconds=lease_seconds or settings.analysis_job_lease_seconds)
+    result = await db.execute(
+        update(AnalysisJob)
+        .where(
+            AnalysisJob.id.in_(job_ids),
+            AnalysisJob.worker_id == worker_id,
+            AnalysisJob.status == AnalysisJobStatus.RUNNING
+        )
+        .values(heartbeat_at=now, lease_expires_at=now + lease)
+        .returning(AnalysisJob.id, AnalysisJob.cancel_requested)
+        .execution_options(synchronize_session=False)
+    )
+    leases = {job_id: cancel_requested for job_id, cancel_requested in result.all()}
+    await db.commit()
+    return leases
+
+
+async def finish_job(
+    db: AsyncSession,
+    job_id: UUID,
+    worker_id: str,
+    status: AnalysisJobStatus,
+    error_message: Optional[str] = None
+) -> bool:
+    """Settle a running job; False if the worker had already lost it"""
+    result = await db.execute(
+        update(AnalysisJob)
+        .where(
+            AnalysisJob.id == job_id,
+            AnalysisJob.worker_id == worker_id,
+            AnalysisJob.status == AnalysisJobStatus.RUNNING
+        )
+        .values(status=status, error_message=error_message, finished_at=datetime.utcnow(),
+                lease_expires_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def release_jobs(db: AsyncSession, worker_id: str, job_ids: Sequence[UUID]) -> int:
+    """Queue a stopping worker's jobs again without charging them an attempt"""
+    if not job_ids:
+        return 0
+    result = await db.execute(
+        update(AnalysisJob)
+        .where(
+            AnalysisJob.id.in_(job_ids),
+            AnalysisJob.worker_id == worker_id,
+            AnalysisJob.status == AnalysisJobStatus.RUNNING
+        )
+        .values(status=AnalysisJobStatus.QUEUED, worker_id=None, lease_expires_at=None,
+                attempts=AnalysisJob.attempts - 1)
+        .execution_options(synchronize_session=False)
+    )
+    await _wake_workers(db)
+    await db.commit()
+    return result.rowcount
+
+
+async def release_expired_leases(db: AsyncSession) -> List[AnalysisJob]:
+    """
+    Recover jobs whose worker stopped heartbeating
+
+    Jobs with attempts left are queued again. The rest are cancelled if
+    that was requested, and otherwise fail along with their analysis.
+    """
+    expired = (await db.execute(
+        select(AnalysisJob)
+        .where(
+            AnalysisJob.status == AnalysisJobStatus.RUNNING,
+            AnalysisJob.lease_expires_at < datetime.utcnow()
+        )
+        .with_for_update(skip_locked=True)
+        .execution_options(populate_existing=True)
+    )).scalars().all()
+
+    now = datetime.utcnow()
+    for job in expired:
+        logger.warning(f"Lease on analysis job {job.id} held by {job.worker_id} expired")
+        job.worker_id = None
+        job.lease_expires_at = None
+        if job.cancel_requested:
+            job.status = AnalysisJobStatus.CANCELLED
+        elif job.attempts >= job.max_attempts:
+            job.status = AnalysisJobStatus.FAILED
+            job.error_message = f"Worker lease expired after {job.attempts} attempts"
+            analysis = await db.get(Analysis, job.analysis_id)
+            if analysis:
+                analysis.status = AnalysisStatus.FAILED
+                analysis.error_message = job.error_message
+        else:
+            job.status = AnalysisJobStatus.QUEUED
+            continue
+        job.finished_at = now
+    await db.commit()
+    return list(expired)
+
+
+async def request_cancel(db: AsyncSession, analysis_id: UUID) -> int:
+    """
+    Cancel an analysis's jobs
+
+    Queued jobs are cancelled outright; running ones are flagged, and their
+    worker stops them at its next heartbeat. Runs in the caller's
+    transaction so the cancellation commits along with the caller's own
+    changes; the caller commits.
+    """
+    now = datetime.utcnow()
+    queued = await db.execute(
+        update(AnalysisJob)
+        .where(AnalysisJob.analysis_id == analysis_id, AnalysisJob.status == AnalysisJobStatus.QUEUED)
+        .values(status=AnalysisJobStatus.CANCELLED, cancel_requested=True, finished_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    running = await db.execute(
+        update(AnalysisJob)
+        .where(AnalysisJob.analysis_id == analysis_id, AnalysisJob.status == AnalysisJobStatus.RUNNING)
+        .values(cancel_requested=True)
+        .execution_options(synchronize_session=False)
+    )
+    if running.rowcount:
+        await _wake_workers(db)
+    return queued.rowcount + running.rowcount
@@ -0,0 +1,224 @@
+"""
+Analysis worker: claims queued analysis jobs and runs them
+
+Usage: python -m core.jobs.worker [--concurrency N]
+
+Each pass heartbeats the running jobs in one statement, stops those that
+were cancelled or whose lease was lost, recovers jobs from workers whose
+leases expired, and claims jobs for its free slots. Passes run every
+heartbeat interval, or sooner when the queue notifies.
+"""
+from typing import Dict, Optional, Set
+from uuid import UUID, uuid4
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+
+import asyncpg
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config.settings import settings
+from core.models.database import AnalysisJob
+from core.models.schemas import AnalysisJobStatus, AnalysisStatus, FrameworkType
+from .queue import (
+    JOBS_CHANNEL, claim_next_job, finish_job, heartbeat,
+    release_expired_leases, release_jobs
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisWorker:
+    """Runs up to ``concurrency`` analysis jobs at a time"""
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker,
+        concurrency: Optional[int] = None,
+        broadcaster=None,
+        lease_seconds: Optional[int] = None,
+        tenant_limit: Optional[int] = None,
+        worker_id: Optional[str] = None
+    ):
+        self.session_maker = session_maker
+        self.concurrency = concurrency or settings.max_concurrent_analyses
+        # Where agents send progress; the connection manager by default
+        self.broadcaster = broadcaster
+        self.lease_seconds = lease_seconds or settings.analysis_job_lease_seconds
+        self.tenant_limit = tenant_limit
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        # Analysis task per running job, and why we stopped one ourselves
+        self._tasks: Dict[UUID, asyncio.Task] = {}
+        self._stopped: Dict[UUID, Optional[AnalysisJobStatus]] = {}
+        self._runners: Set[asyncio.Task] = set()
+        self._wake = asyncio.Event()
+
+    @property
+    def heartbeat_interval(self) -> float:
+        return self.lease_seconds / 3
+
+    async def run_job(self, job: AnalysisJob) -> AnalysisStatus:
+        """Run the analysis a job was queued for"""
+        from api.analysis import build_analysis_context, run_analysis_task
+        from core.models.database import Analysis
+
+        async with self.session_maker() as db:
+            analysis = await db.get(Analysis, job.analysis_id)
+            project_id = analysis.project_id
+            system_description = analysis.system_description
+        context = await build_analysis_context(
+            job.analysis_id, system_description, project_id, job.payload.get("metadata")
+        )
+        return await run_analysis_task(
+            str(job.analysis_id),
+            context,
+            [FrameworkType(framework) for framework in job.payload["frameworks"]],
+            job.payload.get("section_ids"),
+            broadcaster=self.broadcaster
+        )
+
+    async def run_once(self) -> int:
+        """One pass over running and queued jobs; returns how many were claimed"""
+        async with self.session_maker() as db:
+            await self._heartbeat(db)
+            for job in await release_expired_leases(db):
+                logger.info(f"Recovered analysis job {job.id}: {job.status.value}")
+
+            claimed = 0
+            while len(self._tasks) < self.concurrency:
+                job = await claim_next_job(db, self.worker_id, self.lease_seconds, self.tenant_limit)
+                if job is None:
+                    break
+                self._start(job)
+                claimed += 1
+        return claimed
+
+    async def run(self):
+        """Work the queue until cancelled, then hand running jobs back"""
+        listener = await self._listen()
+        logger.info(f"Analysis worker {self.worker_id} started with {self.concurrency} slots")
+        try:
+            while True:
+                try:
+                    await self.run_once()
+                except Exception as e:
+                    logger.error(f"Analysis worker pass failed: {e}", exc_info=True)
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self._shutdown()
+            if listener:
+                await listener.close()
+
+    async def _listen(self) -> Optional[asyncpg.Connection]:
+        """Wake on queue notifications when the database supports them"""
+        url = self.session_maker.kw["bind"].url
+        if url.get_backend_name() != "postgresql":
+            return None
+        try:
+            connection = await asyncpg.connect(
+                url.set(drivername="postgresql").render_as_string(hide_password=False)
+            )
+            await connection.add_listener(JOBS_CHANNEL, lambda *args: self._wake.set())
+            return connection
+        except Exception as e:
+            logger.warning(f"Analysis worker polling without notifications: {e}")
+            return None
+
+    def _start(self, job: AnalysisJob):
+        logger.info(f"Worker {self.worker_id} running analysis job {job.id} "
+                    f"(analysis {job.analysis_id}, attempt {job.attempts})")
+        self._tasks[job.id] = asyncio.create_task(self.run_job(job))
+        runner = asyncio.create_task(self._execute(job))
+        self._runners.add(runner)
+        runner.add_done_callback(self._runners.discard)
+
+    def _stop(self, job_id: UUID, status: Optional[AnalysisJobStatus]):
+        """Cancel a job's analysis; ``status`` None leaves the job row alone"""
+        task = self._tasks.get(job_id)
+        if task and not task.done():
+            self._stopped[job_id] = status
+            task.cancel()
+
+    async def _heartbeat(self, db: AsyncSession):
+        running = list(self._tasks)
+        leases = await heartbeat(db, self.worker_id, running, self.lease_seconds)
+        for job_id in running:
+            if job_id not in leases:
+                logger.warning(f"Worker {self.worker_id} lost the lease on analysis job {job_id}")
+                self._stop(job_id, None)
+            elif leases[job_id]:
+                logger.info(f"Cancelling analysis job {job_id}")
+                self._stop(job_id, AnalysisJobStatus.CANCELLED)
+
+    async def _execute(self, job: AnalysisJob):
+        """Wait for a job's analysis and settle the job"""
+        task = self._tasks[job.id]
+        status, error_message = AnalysisJobStatus.COMPLETED, None
+        try:
+            result = await task
+            if result == AnalysisStatus.FAILED:
+                status, error_message = AnalysisJobStatus.FAILED, "Analysis failed"
+            elif result == AnalysisStatus.CANCELLED:
+                status = AnalysisJobStatus.CANCELLED
+        except asyncio.CancelledError:
+            if job.id not in self._stopped:
+                raise
+            status = self._stopped[job.id]
+        except Exception as e:
+            logger.error(f"Analysis job {job.id} failed: {e}", exc_info=True)
+            status, error_message = AnalysisJobStatus.FAILED, str(e)
+        finally:
+            self._tasks.pop(job.id, None)
+            self._stopped.pop(job.id, None)
+
+        if status is None:
+            return
+        async with self.session_maker() as db:
+            await finish_job(db, job.id, self.worker_id, status, error_message)
+
+    async def _shutdown(self):
+        running = list(self._tasks)
+        for job_id in running:
+            self._stop(job_id, None)
+        if self._runners:
+            await asyncio.gather(*self._runners, return_exceptions=True)
+        if running:
+            async with self.session_maker() as db:
+                released = await release_jobs(db, self.worker_id, running)
+            logger.info(f"Worker {self.worker_id} handed back {released} analysis jobs")
+
+
+async def main(concurrency: Optional[int] = None):
+    from core.database import async_session_maker, engine
+    from core.websocket import AnalysisEventPublisher
+
+    worker = AnalysisWorker(async_session_maker, concurrency, broadcaster=AnalysisEventPublisher(engine))
+    task = asyncio.create_task(worker.run())
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, task.cancel)
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run queued security analyses")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="Analyses to run at once (default: MAX_CONCURRENT_ANALYSES)")
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(main(args.concurrency))
@@ -655,8 +655,21 @@ class MockModelClient(BaseModelClient):
             )
 
 
+# Process-wide client installed by batch runs so every agent shares one
+# concurrency budget and response cache
+_shared_client: Optional[BaseModelClient] = None
+
+
+def set_shared_model_client(client: Optional[BaseModelClient]):
+    """Install (or clear with None) a client returned by every get_model_client() call"""
+    global _shared_client
+    _shared_client = client
+
+
 def get_model_client() -> BaseModelClient:
     """Get the configured model client"""
+    if _shared_client is not None:
+        return _shared_client
     
     active_provider = settings.active_provider
     
@@ -16,7 +16,7 @@ from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from core.database import Base
-from core.models.schemas import FrameworkType, AnalysisStatus
+from core.models.schemas import FrameworkType, AnalysisStatus, AnalysisJobStatus
 
 
 class User(Base):
@@ -86,6 +86,34 @@ class Analysis(Base):
     )
 
 
+class AnalysisJob(Base):
+    """Queued run of an analysis, claimed and executed by a worker process"""
+    __tablename__ = "analysis_jobs"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    analysis_id = Column(UUID(as_uuid=True), ForeignKey("analyses.id"), nullable=False)
+    tenant_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)  # Project owner
+    priority = Column(Integer, nullable=False, default=0)  # Higher runs first
+    payload = Column(JSON, nullable=False)  # Frameworks, section ids and request metadata
+    status = Column(SQLEnum(AnalysisJobStatus), nullable=False, default=AnalysisJobStatus.QUEUED)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    worker_id = Column(String(255), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    error_message = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    
+    __table_args__ = (
+        Index("idx_analysis_job_claim", "status", "priority", "created_at"),
+        Index("idx_analysis_job_tenant", "tenant_id", "status"),
+        Index("idx_analysis_job_analysis", "analysis_id"),
+    )
+
+
 class AnalysisResult(Base):
     """Analysis result for a specific framework"""
     __tablename__ = "analysis_results"
@@ -14,6 +14,14 @@ class AnalysisStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
+class AnalysisJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
 class FrameworkType(str, Enum):
     STPA_SEC = "stpa-sec"
     STRIDE = "stride"
@@ -0,0 +1,167 @@
+"""
+Schema capability registry for per-analysis databases
+
+Step 2 code has to work against databases created by different migration
+sets, so it keeps asking the catalog whether a table or column exists. On a
+Postgres instance hosting many analysis databases those information_schema
+queries are slow. The registry reads the catalog once per database into a
+SchemaProfile and every caller picks its SQL variant from that cached answer.
+"""
+from typing import Dict, FrozenSet, Optional, Set, Tuple, Callable, List
+from dataclasses import dataclass, field
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# One catalog scan per database: every column of every table or view
+# visible on the search path, and the column lists of unique indexes that
+# can back an ON CONFLICT clause (no predicate, no expressions)
+_PROBE_QUERY = """
+SELECT 'column' AS kind,
+       c.relname AS table_name,
+       a.attname AS column_name,
+       format_type(a.atttypid, a.atttypmod) AS data_type,
+       NOT a.attnotnull AS is_nullable,
+       a.attnum AS position
+FROM pg_catalog.pg_class c
+JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_catalog.pg_attribute a
+       ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+WHERE c.relkind IN ('r', 'p', 'v', 'm')
+  AND n.nspname = ANY (current_schemas(false))
+UNION ALL
+SELECT 'unique',
+       t.relname,
+       string_agg(a.attname, ',' ORDER BY a.attname),
+       NULL,
+       NULL,
+       0
+FROM pg_catalog.pg_index i
+JOIN pg_catalog.pg_class t ON t.oid = i.indrelid
+JOIN pg_catalog.pg_namespace n ON n.oid = t.relnamespace
+JOIN pg_catalog.pg_attribute a ON a.attrelid = t.oid AND a.attnum = ANY (i.indkey)
+WHERE i.indisunique
+  AND i.indpred IS NULL
+  AND i.indexprs IS NULL
+  AND n.nspname = ANY (current_schemas(false))
+GROUP BY t.relname, i.indexrelid
+ORDER BY kind, table_name, position
+"""
+
+
+@dataclass(frozen=True)
+class ColumnInfo:
+    data_type: str
+    is_nullable: bool
+
+
+@dataclass(frozen=True)
+class SchemaProfile:
+    """What one database's schema supports"""
+    database: str
+    columns: Dict[str, Dict[str, ColumnInfo]] = field(default_factory=dict)
+    unique_keys: Dict[str, FrozenSet[FrozenSet[str]]] = field(default_factory=dict)
+
+    def has_table(self, table: str) -> bool:
+        return table in self.columns
+
+    def has_column(self, table: str, column: str) -> bool:
+        return column in self.columns.get(table, {})
+
+    def column(self, table: str, column: str) -> Optional[ColumnInfo]:
+        return self.columns.get(table, {}).get(column)
+
+    def column_names(self, table: str) -> List[str]:
+        return list(self.columns.get(table, {}))
+
+    def has_unique_key(self, table: str, columns: Tuple[str, ...]) -> bool:
+        """Whether ON CONFLICT on exactly these columns is possible"""
+        return frozenset(columns) in self.unique_keys.get(table, frozenset())
+
+    @property
+    def applied_migrations(self) -> List[str]:
+        """Migrations whose schema changes are present, by file name"""
+        return [name for name, check in MIGRATION_MARKERS if check(self)]
+
+    @property
+    def migration_version(self) -> int:
+        """Number of the newest migration detected, 0 when none is"""
+        applied = self.applied_migrations
+        return int(applied[-1].split('_', 1)[0]) if applied else 0
+
+
+def _column_is(table: str, column: str, predicate: Callable[[ColumnInfo], bool]) -> Callable[[SchemaProfile], bool]:
+    def check(profile: SchemaProfile) -> bool:
+        info = profile.column(table, column)
+        return info is not None and predicate(info)
+    return check
+
+
+# Observable effect of each migration the Step 1/Step 2 code depends on
+MIGRATION_MARKERS: List[Tuple[str, Callable[[SchemaProfile], bool]]] = [
+    ("007_stpa_sec_step1_clean.sql", lambda p: p.has_table('step1_losses')),
+    ("016_step2_control_structure.sql", lambda p: p.has_table('step2_analyses')),
+    ("017_step2_fixes.sql", lambda p: p.has_column('step2_analyses', 'metadata')),
+    ("020_step2_ensure_identifier.sql", lambda p: p.has_column('system_components', 'identifier')),
+    ("021_process_models.sql", lambda p: p.has_table('process_models')),
+    ("022_system_description.sql", lambda p: p.has_table('system_descriptions')),
+    ("023_control_contexts.sql", lambda p: p.has_table('control_contexts')),
+    ("024_control_structures.sql", lambda p: p.has_table('control_structures')),
+    ("025_fix_foreign_key_types.sql", _column_is('input_analysis', 'analysis_id', lambda c: c.data_type != 'uuid')),
+    ("026_process_models_cleanup.sql", _column_is('process_models', 'model_name', lambda c: c.is_nullable)),
+    ("027_step2_identifier_keys.sql", lambda p: p.has_unique_key('system_components', ('analysis_id', 'identifier'))),
+]
+
+
+class SchemaCapabilityRegistry:
+    """Caches one SchemaProfile per database name"""
+
+    def __init__(self):
+        self._profiles: Dict[str, SchemaProfile] = {}
+
+    async def profile(self, db_connection, database: Optional[str] = None) -> SchemaProfile:
+        """
+        Get the profile for the database behind ``db_connection``.
+
+        Pass ``database`` when the caller knows it to skip the
+        ``current_database()`` round trip.
+        """
+        if database is None:
+            database = await db_connection.fetchval("SELECT current_database()")
+        cached = self._profiles.get(database)
+        if cached is not None:
+            return cached
+
+        columns: Dict[str, Dict[str, ColumnInfo]] = {}
+        unique_keys: Dict[str, Set[FrozenSet[str]]] = {}
+        for row in await db_connection.fetch(_PROBE_QUERY):
+            if row.get('kind') == 'unique':
+                unique_keys.setdefault(row['table_name'], set()).add(frozenset(row['column_name'].split(',')))
+                continue
+            table_columns = columns.setdefault(row['table_name'], {})
+            if row['column_name'] is not None:
+                table_columns[row['column_name']] = ColumnInfo(row['data_type'], row['is_nullable'])
+
+        profile = SchemaProfile(
+            database, columns, {table: frozenset(keys) for table, keys in unique_keys.items()}
+        )
+        self._profiles[database] = profile
+        logger.debug(f"Probed schema of {database}: {len(columns)} tables, "
+                     f"migration version {profile.migration_version}")
+        return profile
+
+    def invalidate(self, database: Optional[str] = None):
+        """Forget cached profiles, e.g. after running migrations"""
+        if database is None:
+            self._profiles.clear()
+        else:
+            self._profiles.pop(database, None)
+
+
+schema_capabilities = SchemaCapabilityRegistry()
+
+
+async def get_schema_profile(db_connection, database: Optional[str] = None) -> SchemaProfile:
+    """Profile from the process-wide registry"""
+    return await schema_capabilities.profile(db_connection, database)
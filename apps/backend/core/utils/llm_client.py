@@ -403,6 +403,17 @@ class LLMManager:
         self.clients: Dict[ModelProvider, BaseLLMClient] = {}
         self._db_checked = False
         self._no_llm_warning_shown = False
+        # Bounds concurrent generate() calls across all running agents
+        self._budget: Optional[asyncio.Semaphore] = None
+        self._budget_loop = None
+    
+    def _llm_budget(self) -> asyncio.Semaphore:
+        """The request budget for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._budget_loop is not loop:
+            self._budget = asyncio.Semaphore(settings.llm_max_concurrency)
+            self._budget_loop = loop
+        return self._budget
     
     async def _ensure_clients(self):
         """Ensure clients are initialized, checking DB first"""
@@ -511,23 +522,24 @@ class LLMManager:
         providers = [active_provider] if active_provider else list(self.clients.keys())
         
         last_error = None
-        for provider in providers:
-            if provider not in self.clients:
-                continue
+        async with self._llm_budget():
+            for provider in providers:
+                if provider not in self.clients:
+                    continue
+                
+                try:
+                    return await self.clients[provider].generate(prompt, **kwargs)
+                except Exception as e:
+                    last_error = e
+                    if "401" in str(e) or "403" in str(e):
+                        print(f"Authentication failed for {provider}: {e}")
+                    else:
+                        print(f"Provider {provider} failed: {e}")
+                    continue
             
-            try:
-                return await self.clients[provider].generate(prompt, **kwargs)
-            except Exception as e:
-                last_error = e
-                if "401" in str(e) or "403" in str(e):
-                    print(f"Authentication failed for {provider}: {e}")
-                else:
-                    print(f"Provider {provider} failed: {e}")
-                continue
-        
-        # If all providers failed, return mock response
-        if ModelProvider.CUSTOM in self.clients:
-            return await self.clients[ModelProvider.CUSTOM].generate(prompt, **kwargs)
+            # If all providers failed, return mock response
+            if ModelProvider.CUSTOM in self.clients:
+                return await self.clients[ModelProvider.CUSTOM].generate(prompt, **kwargs)
         
         raise Exception(f"All providers failed. Last error: {last_error}")
     
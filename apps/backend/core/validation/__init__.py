@@ -3,6 +3,16 @@ STPA-Sec Validation Module
 
 Provides validation for different steps of STPA-Sec analysis.
 """
+from .engine import RuleEngine, RuleRegistry, ValidationRule
+from .step2_model import Step2ResultModel
 from .step2_validator import Step2Validator, ValidationIssue, ValidationSeverity
 
-__all__ = ['Step2Validator', 'ValidationIssue', 'ValidationSeverity']
\ No newline at end of file
+__all__ = [
+    'RuleEngine',
+    'RuleRegistry',
+    'ValidationRule',
+    'Step2ResultModel',
+    'Step2Validator',
+    'ValidationIssue',
+    'ValidationSeverity'
+]
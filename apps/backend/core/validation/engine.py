@@ -0,0 +1,91 @@
+"""
+Rule registry and incremental rule engine
+
+Validation rules are registered per rule set and run as passes over a
+Step2ResultModel. The engine remembers every rule's findings together with
+the versions of the phases the rule reads, so after one phase changes (for
+example an expert refinement of a single agent) only the rules that depend
+on that phase run again.
+"""
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+from dataclasses import dataclass
+import time
+
+
+@dataclass(frozen=True)
+class ValidationRule:
+    """One validation pass and the model phases it reads"""
+    name: str
+    phases: FrozenSet[str]
+    check: Callable[[Any, Any], Iterable[Any]]
+
+
+class RuleRegistry:
+    """Ordered collection of the rules of one rule set"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._rules: List[ValidationRule] = []
+
+    def rule(self, name: Optional[str] = None, phases: Iterable[str] = ()):
+        """Register a method ``check(self, model)`` returning its findings"""
+        def decorator(check):
+            rule_name = name or check.__name__.lstrip('_')
+            if any(existing.name == rule_name for existing in self._rules):
+                raise ValueError(f"Rule {rule_name} is already registered in {self.name}")
+            self._rules.append(ValidationRule(rule_name, frozenset(phases), check))
+            return check
+        return decorator
+
+    def __iter__(self) -> Iterator[ValidationRule]:
+        return iter(self._rules)
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+
+class RuleEngine:
+    """
+    Runs a registry's rules for one owner over a Step2ResultModel.
+
+    Findings are returned in registration order. A rule is re-run only when
+    the model is a different one or one of its phases has a new version.
+    """
+
+    def __init__(self, registry: RuleRegistry, owner: Any):
+        self.registry = registry
+        self.owner = owner
+        self.timings_ms: Dict[str, float] = {}
+        self.rules_run = 0
+        self.rules_reused = 0
+        self._model_id: Optional[int] = None
+        self._findings: Dict[str, Tuple[Tuple[int, ...], List[Any]]] = {}
+
+    def run(self, model) -> List[Any]:
+        if self._model_id != model.uid:
+            self._model_id = model.uid
+            self._findings = {}
+        self.rules_run = self.rules_reused = 0
+
+        findings = []
+        for rule in self.registry:
+            versions = model.versions(rule.phases)
+            cached = self._findings.get(rule.name)
+            if cached is not None and cached[0] == versions:
+                self.rules_reused += 1
+            else:
+                start = time.perf_counter()
+                cached = (versions, list(rule.check(self.owner, model) or []))
+                self.timings_ms[rule.name] = (time.perf_counter() - start) * 1000
+                self._findings[rule.name] = cached
+                self.rules_run += 1
+            findings.extend(cached[1])
+        return findings
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'rule_set': self.registry.name,
+            'rules_run': self.rules_run,
+            'rules_reused': self.rules_reused,
+            'timings_ms': {name: round(ms, 3) for name, ms in self.timings_ms.items()}
+        }
@@ -0,0 +1,206 @@
+"""
+Normalized Step 2 result model
+
+Phase results arrive as ``{phase: {agent: AgentResult or dict}}``. The model
+extracts components, control actions, feedback, trust boundaries, contexts
+and process models from them once, and keeps a version per phase so
+validation passes over the model can be re-run only for what changed.
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import itertools
+
+
+PHASES = ('control_structure', 'control_actions', 'control_context', 'feedback_trust', 'process_models')
+SYNTHESIS = 'synthesis'
+
+# Phases the component graph is built from
+GRAPH_PHASES = ('control_structure', 'control_actions', 'feedback_trust')
+
+
+def successful_outputs(phase_output: Optional[Dict[str, Any]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(agent, data) of each successful result of a phase"""
+    for key, result in (phase_output or {}).items():
+        if hasattr(result, 'data') and result.success:
+            yield key, result.data or {}
+        elif isinstance(result, dict) and result.get('success'):
+            yield key, result.get('data') or {}
+
+
+def _hierarchy_relation(rel: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'parent': rel.get('parent'),
+        'child': rel.get('child'),
+        'type': rel.get('relationship_type', 'hierarchical'),
+        'description': rel.get('description', '')
+    }
+
+
+class Step2ResultModel:
+    """
+    One normalized view of a Step 2 run shared by all validators.
+
+    Agent results are treated as immutable: ``update_phase`` re-extracts a
+    phase only when its results are different objects from last time, and
+    bumps that phase's version.
+    """
+
+    _uids = itertools.count(1)
+
+    def __init__(self, phase_results: Optional[Dict[str, Any]] = None,
+                 synthesis: Optional[Dict[str, Any]] = None):
+        self.uid = next(self._uids)
+        self.phase_versions: Dict[str, int] = {}
+        self._sources: Dict[str, Any] = {}
+        self._graph = None
+        self._graph_versions: Optional[Tuple[int, ...]] = None
+
+        # control_structure
+        self.controllers: List[Dict[str, Any]] = []
+        self.processes: List[Dict[str, Any]] = []
+        self.dual_role_components: List[Dict[str, Any]] = []
+        self.controllers_by_id: Dict[str, Dict[str, Any]] = {}
+        self.components: Dict[str, Any] = self._empty_components()
+        self.hierarchy: List[Dict[str, Any]] = []
+        self.structure_summary = ''
+        # control_actions
+        self.control_actions: List[Dict[str, Any]] = []
+        # control_context
+        self.control_contexts: List[Dict[str, Any]] = []
+        self.operational_modes: List[Any] = []
+        # feedback_trust
+        self.feedback_mechanisms: List[Dict[str, Any]] = []
+        self.trust_boundaries: List[Dict[str, Any]] = []
+        # process_models
+        self.process_models: List[Dict[str, Any]] = []
+        self.control_algorithms: List[Dict[str, Any]] = []
+        self.process_model_insights: Dict[str, Any] = {}
+        # synthesis
+        self.synthesis: Dict[str, Any] = {}
+
+        if phase_results is not None:
+            self.sync(phase_results)
+        if synthesis is not None:
+            self.update_synthesis(synthesis)
+
+    @staticmethod
+    def _empty_components() -> Dict[str, Any]:
+        return {
+            'controllers': set(),
+            'processes': set(),
+            'dual_role': set(),
+            'all': set(),
+            'hierarchical_levels': {}  # component_id -> level
+        }
+
+    def versions(self, phases: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(self.phase_versions.get(phase, 0) for phase in sorted(phases))
+
+    def sync(self, phase_results: Dict[str, Any]) -> Set[str]:
+        """Bring every phase up to date; returns the phases that changed"""
+        return {
+            phase for phase in PHASES
+            if self.update_phase(phase, phase_results.get(phase) or {})
+        }
+
+    def update_phase(self, phase: str, phase_output: Dict[str, Any], force: bool = False) -> bool:
+        """Re-extract one phase if its results changed; True when it did"""
+        previous = self._sources.get(phase)
+        if not force and previous is not None and previous.keys() == phase_output.keys() and all(
+            previous[key] is phase_output[key] for key in phase_output
+        ):
+            return False
+        # Holding the results keeps their identity meaningful for the next comparison
+        self._sources[phase] = dict(phase_output)
+        getattr(self, f'_extract_{phase}')(phase_output)
+        self.phase_versions[phase] = self.phase_versions.get(phase, 0) + 1
+        return True
+
+    def update_synthesis(self, synthesis: Dict[str, Any]) -> bool:
+        if synthesis is self.synthesis and SYNTHESIS in self.phase_versions:
+            return False
+        self.synthesis = synthesis
+        self.phase_versions[SYNTHESIS] = self.phase_versions.get(SYNTHESIS, 0) + 1
+        return True
+
+    @property
+    def graph(self):
+        """ValidationGraph of components, hierarchy, actions and feedback, rebuilt when they change"""
+        versions = self.versions(GRAPH_PHASES)
+        if self._graph is None or self._graph_versions != versions:
+            from core.agents.step2_agents.validation_graph import ValidationGraph
+            self._graph = ValidationGraph.build(
+                self.components, self.hierarchy, self.control_actions, self.feedback_mechanisms
+            )
+            self._graph_versions = versions
+        return self._graph
+
+    def _extract_control_structure(self, phase_output: Dict[str, Any]):
+        self.controllers, self.processes, self.dual_role_components = [], [], []
+        self.components = components = self._empty_components()
+        self.hierarchy = []
+        self.structure_summary = ''
+
+        for _, data in successful_outputs(phase_output):
+            comp_data = data.get('components', {})
+            if data.get('summary'):
+                self.structure_summary = data['summary']
+
+            for ctrl in comp_data.get('controllers', []):
+                self.controllers.append(ctrl)
+                ctrl_id = ctrl.get('identifier')
+                components['controllers'].add(ctrl_id)
+                components['all'].add(ctrl_id)
+                if 'hierarchical_level' in ctrl:
+                    components['hierarchical_levels'][ctrl_id] = ctrl['hierarchical_level']
+
+            for proc in comp_data.get('controlled_processes', []):
+                self.processes.append(proc)
+                components['processes'].add(proc.get('identifier'))
+                components['all'].add(proc.get('identifier'))
+
+            # Dual-role components are both controllers and processes
+            for dual in comp_data.get('dual_role_components', []):
+                self.dual_role_components.append(dual)
+                dual_id = dual.get('identifier')
+                for key in ('dual_role', 'all', 'controllers', 'processes'):
+                    components[key].add(dual_id)
+
+            self.hierarchy.extend(_hierarchy_relation(rel) for rel in comp_data.get('control_hierarchy', []))
+            # Also accept a top-level control_hierarchy
+            self.hierarchy.extend(_hierarchy_relation(rel) for rel in data.get('control_hierarchy', []))
+
+        self.controllers_by_id = {
+            ctrl['identifier']: ctrl for ctrl in self.controllers if ctrl.get('identifier')
+        }
+
+    def _extract_control_actions(self, phase_output: Dict[str, Any]):
+        self.control_actions = []
+        for _, data in successful_outputs(phase_output):
+            action_data = data.get('control_actions', {})
+            if isinstance(action_data, dict):
+                self.control_actions.extend(action_data.get('control_actions', []))
+            elif isinstance(action_data, list):
+                self.control_actions.extend(action_data)
+
+    def _extract_control_context(self, phase_output: Dict[str, Any]):
+        self.control_contexts, self.operational_modes = [], []
+        for _, data in successful_outputs(phase_output):
+            self.control_contexts.extend(data.get('control_contexts', []))
+            self.operational_modes = data.get('operational_modes', [])
+
+    def _extract_feedback_trust(self, phase_output: Dict[str, Any]):
+        self.feedback_mechanisms, self.trust_boundaries = [], []
+        for key, data in successful_outputs(phase_output):
+            if 'feedback' in key:
+                self.feedback_mechanisms.extend(data.get('feedback_mechanisms', []))
+            if 'trust' in key:
+                self.trust_boundaries.extend(data.get('trust_boundaries', []))
+
+    def _extract_process_models(self, phase_output: Dict[str, Any]):
+        self.process_models, self.control_algorithms = [], []
+        self.process_model_insights = {}
+        for _, data in successful_outputs(phase_output):
+            self.process_models.extend(data.get('process_models', []))
+            self.control_algorithms.extend(data.get('control_algorithms', []))
+            if data.get('insights'):
+                self.process_model_insights = data['insights']
@@ -8,6 +8,9 @@ from dataclasses import dataclass
 import logging
 from enum import Enum
 
+from .engine import RuleEngine, RuleRegistry
+from .step2_model import Step2ResultModel
+
 
 class ValidationSeverity(str, Enum):
     """Severity levels for validation issues"""
@@ -38,31 +41,31 @@ class Step2Validator:
     5. No orphaned components exist
     """
     
+    rules = RuleRegistry('step2')
+    
     def __init__(self):
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.engine = RuleEngine(self.rules, self)
         
-    def validate(self, step2_results: Dict[str, Any]) -> Dict[str, Any]:
+    def validate(self, step2_results: Dict[str, Any],
+                 model: Optional[Step2ResultModel] = None) -> Dict[str, Any]:
         """
         Validate Step 2 analysis results.
         
         Args:
             step2_results: Complete Step 2 analysis results
+            model: Normalized results already built for this run; rules whose
+                inputs have not changed since the last validation are not re-run
             
         Returns:
             Validation report with issues and completeness status
         """
-        issues = []
-        
-        # Extract key components from results
-        phase_results = step2_results.get('phase_results', {})
-        synthesis = step2_results.get('synthesis', {})
+        if model is None:
+            model = Step2ResultModel(step2_results.get('phase_results', {}))
+        model.update_synthesis(step2_results.get('synthesis', {}))
         
         # Run validation checks
-        issues.extend(self._validate_control_structure(phase_results, synthesis))
-        issues.extend(self._validate_control_actions(phase_results, synthesis))
-        issues.extend(self._validate_feedback_mechanisms(phase_results, synthesis))
-        issues.extend(self._validate_trust_boundaries(phase_results, synthesis))
-        issues.extend(self._validate_component_connectivity(phase_results, synthesis))
+        issues = self.engine.run(model)
         
         # Generate summary
         error_count = sum(1 for i in issues if i.severity == ValidationSeverity.ERROR)
@@ -80,11 +83,14 @@ class Step2Validator:
                 'warnings': warning_count,
                 'info': info_count
             },
-            'validation_status': 'passed' if is_complete else 'failed'
+            'validation_status': 'passed' if is_complete else 'failed',
+            'rules': self.engine.stats()
         }
     
-    def _validate_control_structure(self, phase_results: Dict, synthesis: Dict) -> List[ValidationIssue]:
+    @rules.rule(phases=('synthesis',))
+    def _validate_control_structure(self, model: Step2ResultModel) -> List[ValidationIssue]:
         """Validate basic control structure integrity."""
+        synthesis = model.synthesis
         issues = []
         
         # Check for controllers
@@ -108,8 +114,10 @@ class Step2Validator:
         
         return issues
     
-    def _validate_control_actions(self, phase_results: Dict, synthesis: Dict) -> List[ValidationIssue]:
+    @rules.rule(phases=('synthesis',))
+    def _validate_control_actions(self, model: Step2ResultModel) -> List[ValidationIssue]:
         """Validate control actions and check for UCAs."""
+        synthesis = model.synthesis
         issues = []
         
         # Get control actions
@@ -148,8 +156,10 @@ class Step2Validator:
         
         return issues
     
-    def _validate_feedback_mechanisms(self, phase_results: Dict, synthesis: Dict) -> List[ValidationIssue]:
+    @rules.rule(phases=('synthesis',))
+    def _validate_feedback_mechanisms(self, model: Step2ResultModel) -> List[ValidationIssue]:
         """Validate feedback mechanisms."""
+        synthesis = model.synthesis
         issues = []
         
         # Get feedback mechanisms
@@ -186,11 +196,9 @@ class Step2Validator:
                 ))
         
         # Check for control loops without feedback
+        feedback_pairs = {(f.get('source'), f.get('target')) for f in feedbacks}
         for action in control_actions:
-            has_feedback = any(
-                f.get('source') == action.get('to') and f.get('target') == action.get('from')
-                for f in feedbacks
-            )
+            has_feedback = (action.get('to'), action.get('from')) in feedback_pairs
             if not has_feedback and action.get('type') != 'emergency':
                 issues.append(ValidationIssue(
                     severity=ValidationSeverity.WARNING,
@@ -206,8 +214,10 @@ class Step2Validator:
         
         return issues
     
-    def _validate_trust_boundaries(self, phase_results: Dict, synthesis: Dict) -> List[ValidationIssue]:
+    @rules.rule(phases=('synthesis',))
+    def _validate_trust_boundaries(self, model: Step2ResultModel) -> List[ValidationIssue]:
         """Validate trust boundaries align with control structure."""
+        synthesis = model.synthesis
         issues = []
         
         # Get trust boundaries
@@ -269,8 +279,10 @@ class Step2Validator:
         
         return issues
     
-    def _validate_component_connectivity(self, phase_results: Dict, synthesis: Dict) -> List[ValidationIssue]:
+    @rules.rule(phases=('synthesis',))
+    def _validate_component_connectivity(self, model: Step2ResultModel) -> List[ValidationIssue]:
         """Check for orphaned components and connectivity issues."""
+        synthesis = model.synthesis
         issues = []
         
         # Build component graph
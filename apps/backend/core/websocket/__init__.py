@@ -1,4 +1,8 @@
 """WebSocket module for real-time updates"""
 from .manager import manager, websocket_endpoint, ConnectionManager, WSMessage
+from .relay import AnalysisEventPublisher, AnalysisEventRelay
 
-__all__ = ["manager", "websocket_endpoint", "ConnectionManager", "WSMessage"]
\ No newline at end of file
+__all__ = [
+    "manager", "websocket_endpoint", "ConnectionManager", "WSMessage",
+    "AnalysisEventPublisher", "AnalysisEventRelay"
+]
\ No newline at end of file
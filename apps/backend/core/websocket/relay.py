@@ -0,0 +1,132 @@
+"""
+Relay of analysis progress from worker processes to WebSocket clients
+
+Workers have no WebSocket connections, so their agents broadcast through
+an ``AnalysisEventPublisher``, which sends each event over Postgres
+NOTIFY. Every API process runs an ``AnalysisEventRelay`` that listens and
+hands the events to its own connection manager.
+"""
+from typing import Any, Dict, Optional
+import asyncio
+import json
+import logging
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.models.schemas import AnalysisStatus
+from .manager import manager as default_manager, ConnectionManager
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL = "analysis_events"
+# NOTIFY payloads must stay under 8000 bytes
+MAX_PAYLOAD_BYTES = 7900
+
+
+class AnalysisEventPublisher:
+    """Connection manager stand-in for workers: broadcasts go out over NOTIFY"""
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+
+    async def broadcast_analysis_update(
+        self,
+        analysis_id: str,
+        status: AnalysisStatus,
+        progress: float,
+        message: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        await self._publish({
+            "type": "analysis_update",
+            "analysis_id": analysis_id,
+            "status": status.value,
+            "progress": progress,
+            "message": message,
+            "metadata": metadata
+        })
+
+    async def broadcast_section_update(
+        self,
+        analysis_id: str,
+        framework: str,
+        section_id: str,
+        status: str,
+        content: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ):
+        await self._publish({
+            "type": "section_update",
+            "analysis_id": analysis_id,
+            "framework": framework,
+            "section_id": section_id,
+            "status": status,
+            "content": content,
+            "error": error
+        })
+
+    async def _publish(self, event: Dict[str, Any]):
+        payload = json.dumps(event, default=str)
+        if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+            # Clients fetch full section content from the REST API
+            event = {**event, "content": None, "metadata": None, "truncated": True}
+            payload = json.dumps(event, default=str)
+        try:
+            async with self.engine.begin() as conn:
+                await conn.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": EVENTS_CHANNEL, "payload": payload}
+                )
+        except Exception as e:
+            logger.warning(f"Failed to publish {event['type']} for analysis {event['analysis_id']}: {e}")
+
+
+class AnalysisEventRelay:
+    """Forwards worker events received over LISTEN to the connection manager"""
+
+    def __init__(self, dsn: str, manager: ConnectionManager = default_manager):
+        self.dsn = dsn
+        self.manager = manager
+
+    async def dispatch(self, payload: str):
+        event = json.loads(payload)
+        if event["type"] == "analysis_update":
+            await self.manager.broadcast_analysis_update(
+                event["analysis_id"],
+                AnalysisStatus(event["status"]),
+                event["progress"],
+                event.get("message"),
+                event.get("metadata")
+            )
+        elif event["type"] == "section_update":
+            await self.manager.broadcast_section_update(
+                event["analysis_id"],
+                event["framework"],
+                event["section_id"],
+                event["status"],
+                content=event.get("content"),
+                error=event.get("error")
+            )
+
+    async def run(self):
+        """Listen and forward until cancelled"""
+        try:
+            connection = await asyncpg.connect(self.dsn)
+        except Exception as e:
+            logger.error(f"Analysis event relay could not connect: {e}")
+            return
+        events: asyncio.Queue = asyncio.Queue()
+        try:
+            await connection.add_listener(
+                EVENTS_CHANNEL, lambda conn, pid, channel, payload: events.put_nowait(payload)
+            )
+            while True:
+                payload = await events.get()
+                try:
+                    await self.dispatch(payload)
+                except Exception as e:
+                    logger.error(f"Failed to relay analysis event: {e}")
+        finally:
+            await connection.close()
@@ -5,13 +5,16 @@ from fastapi import FastAPI, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import uvicorn
 
 from config.settings import settings
-from core.database import init_db, close_db
+from core.database import init_db, close_db, database_url, async_session_maker, engine
 from api import analysis, artifacts, chat, auth, websocket, settings as settings_api, frameworks
-from core.websocket import websocket_endpoint
+from core.websocket import websocket_endpoint, AnalysisEventPublisher, AnalysisEventRelay
+from core.jobs import AnalysisWorker
+from src.database.analytics_views import AnalyticsViewRefresher
 
 # Configure logging
 logging.basicConfig(
@@ -29,10 +32,32 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("Database initialized")
     
+    background_tasks = []
+    is_postgres = database_url.startswith("postgresql")
+    if is_postgres:
+        # Keep the materialized analytics views current after writes
+        refresher = AnalyticsViewRefresher(database_url.replace('+asyncpg', ''))
+        background_tasks.append(asyncio.create_task(refresher.run()))
+        # Forward progress from analysis workers to this process's WebSockets
+        relay = AnalysisEventRelay(database_url.replace('+asyncpg', ''))
+        background_tasks.append(asyncio.create_task(relay.run()))
+    
+    # Analyses run on queue workers; standalone ones are started with
+    # `python -m core.jobs.worker`, this one serves single-process setups
+    if settings.embedded_analysis_worker:
+        worker = AnalysisWorker(
+            async_session_maker,
+            broadcaster=AnalysisEventPublisher(engine) if is_postgres else None
+        )
+        background_tasks.append(asyncio.create_task(worker.run()))
+    
     yield
     
     # Shutdown
     logger.info("Shutting down...")
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
     await close_db()
     logger.info("Database connections closed")
 
@@ -52,6 +77,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Link", "X-Next-Cursor"],
 )
 
 # Exception handler
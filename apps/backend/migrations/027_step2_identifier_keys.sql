@@ -0,0 +1,37 @@
+-- Migration: 027_step2_identifier_keys.sql
+-- Description: Unique (analysis_id, identifier) keys so Step 2 results can be bulk upserted
+-- Created: 2026-10-18
+
+-- Feedback mechanisms and trust boundaries were inserted without checking
+-- for existing rows; keep the newest row of each identifier
+DELETE FROM feedback_mechanisms a
+USING feedback_mechanisms b
+WHERE a.analysis_id = b.analysis_id
+  AND a.identifier = b.identifier
+  AND (a.created_at, a.ctid) < (b.created_at, b.ctid);
+
+DELETE FROM trust_boundaries a
+USING trust_boundaries b
+WHERE a.analysis_id = b.analysis_id
+  AND a.identifier = b.identifier
+  AND (a.created_at, a.ctid) < (b.created_at, b.ctid);
+
+-- Components and control actions are referenced by other tables, so
+-- duplicates are left alone; the Step 2 writer falls back to
+-- update-then-insert for any table without the key
+DO $$
+DECLARE
+    target TEXT;
+BEGIN
+    FOREACH target IN ARRAY ARRAY['system_components', 'control_actions', 'feedback_mechanisms', 'trust_boundaries']
+    LOOP
+        BEGIN
+            EXECUTE format(
+                'CREATE UNIQUE INDEX IF NOT EXISTS %I ON %I (analysis_id, identifier)',
+                'uq_' || target || '_identifier', target
+            );
+        EXCEPTION WHEN unique_violation THEN
+            RAISE NOTICE 'Skipping unique identifier key on %: duplicate identifiers exist', target;
+        END;
+    END LOOP;
+END $$;
@@ -0,0 +1,87 @@
+-- Migration: 028_entity_criticality_cache.sql
+-- Description: Cached entity criticality scores, invalidated by relationship and scenario writes
+-- Created: 2026-10-18
+
+CREATE TABLE IF NOT EXISTS entity_criticality_scores (
+  entity_id VARCHAR PRIMARY KEY REFERENCES entities(id) ON DELETE CASCADE,
+  -- NULL while invalidated
+  score FLOAT,
+  relationship_count INTEGER,
+  risk_score FLOAT,
+  -- Bumped by every invalidation; a score is only written back if the
+  -- version it was computed against is still current
+  version BIGINT NOT NULL DEFAULT 0,
+  computed_at TIMESTAMP DEFAULT NOW()
+);
+
+-- A score depends on the entity's criticality, its relationships and the
+-- scenarios on those relationships; invalidate the rows a write affects.
+-- Entities without a row get an invalidated one, so a score computed
+-- before the write cannot be inserted after it.
+CREATE OR REPLACE FUNCTION invalidate_criticality(entity_ids VARCHAR[])
+RETURNS VOID AS $$
+BEGIN
+  INSERT INTO entity_criticality_scores (entity_id, version)
+  SELECT id, 1 FROM entities WHERE id = ANY(entity_ids)
+  ORDER BY id
+  ON CONFLICT (entity_id) DO UPDATE
+    SET score = NULL, relationship_count = NULL, risk_score = NULL,
+        version = entity_criticality_scores.version + 1;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION invalidate_relationship_criticality()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM invalidate_criticality(ARRAY[OLD.source_id, OLD.target_id]);
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM invalidate_criticality(ARRAY[NEW.source_id, NEW.target_id]);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION invalidate_scenario_criticality()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM invalidate_criticality(ARRAY(
+      SELECT unnest(ARRAY[source_id, target_id]) FROM relationships WHERE id = OLD.relationship_id
+    ));
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM invalidate_criticality(ARRAY(
+      SELECT unnest(ARRAY[source_id, target_id]) FROM relationships WHERE id = NEW.relationship_id
+    ));
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION invalidate_entity_criticality()
+RETURNS TRIGGER AS $$
+BEGIN
+  PERFORM invalidate_criticality(ARRAY[NEW.id]);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS relationships_invalidate_criticality ON relationships;
+CREATE TRIGGER relationships_invalidate_criticality
+  AFTER INSERT OR UPDATE OF source_id, target_id OR DELETE ON relationships
+  FOR EACH ROW
+  EXECUTE FUNCTION invalidate_relationship_criticality();
+
+DROP TRIGGER IF EXISTS scenarios_invalidate_criticality ON scenarios;
+CREATE TRIGGER scenarios_invalidate_criticality
+  AFTER INSERT OR UPDATE OF relationship_id, likelihood, impact OR DELETE ON scenarios
+  FOR EACH ROW
+  EXECUTE FUNCTION invalidate_scenario_criticality();
+
+DROP TRIGGER IF EXISTS entities_invalidate_criticality ON entities;
+CREATE TRIGGER entities_invalidate_criticality
+  AFTER UPDATE OF criticality ON entities
+  FOR EACH ROW
+  EXECUTE FUNCTION invalidate_entity_criticality();
@@ -0,0 +1,181 @@
+-- Migration: 029_hazard_traceability.sql
+-- Description: Hazard traceability closure, maintained incrementally by triggers
+-- Created: 2026-10-18
+
+-- One row per hazard and every loss, stakeholder, UCA, scenario and
+-- mitigation it traces to, so a trace in either direction is one index read.
+-- UCA node ids are '<analysis id>:<uca type>'.
+CREATE TABLE IF NOT EXISTS hazard_trace (
+  hazard_id VARCHAR NOT NULL REFERENCES hazards(id) ON DELETE CASCADE,
+  node_type VARCHAR NOT NULL CHECK (node_type IN ('loss', 'stakeholder', 'uca', 'scenario', 'mitigation')),
+  node_id VARCHAR NOT NULL,
+  PRIMARY KEY (hazard_id, node_type, node_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_hazard_trace_node ON hazard_trace(node_type, node_id);
+
+-- Reference arrays are searched by element when a loss or scenario changes
+CREATE INDEX IF NOT EXISTS idx_hazards_loss_refs ON hazards USING GIN(loss_refs);
+CREATE INDEX IF NOT EXISTS idx_scenarios_hazard_refs ON scenarios USING GIN(hazard_refs);
+
+-- Recompute the loss, stakeholder, scenario and mitigation rows of some
+-- hazards; UCA rows are kept by the stpa_analyses trigger below
+CREATE OR REPLACE FUNCTION refresh_hazard_trace(target_hazards VARCHAR[])
+RETURNS VOID AS $$
+BEGIN
+  DELETE FROM hazard_trace
+  WHERE hazard_id = ANY(target_hazards) AND node_type <> 'uca';
+
+  INSERT INTO hazard_trace (hazard_id, node_type, node_id)
+  SELECT h.id, 'loss', loss_id
+  FROM hazards h, unnest(h.loss_refs) AS loss_id
+  WHERE h.id = ANY(target_hazards)
+  UNION
+  SELECT h.id, 'stakeholder', stakeholder_id
+  FROM hazards h
+  JOIN losses l ON l.id = ANY(h.loss_refs), unnest(l.stakeholder_refs) AS stakeholder_id
+  WHERE h.id = ANY(target_hazards)
+  UNION
+  SELECT h.id, 'scenario', s.id
+  FROM scenarios s
+  JOIN hazards h ON h.id = ANY(s.hazard_refs)
+  WHERE s.hazard_refs && target_hazards AND h.id = ANY(target_hazards)
+  UNION
+  SELECT h.id, 'mitigation', sm.mitigation_id
+  FROM scenarios s
+  JOIN scenario_mitigations sm ON sm.scenario_id = s.id
+  JOIN hazards h ON h.id = ANY(s.hazard_refs)
+  WHERE s.hazard_refs && target_hazards AND h.id = ANY(target_hazards);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Hazards named in the hazard_refs of an analysis' UCAs
+CREATE OR REPLACE FUNCTION uca_hazard_refs(analysis stpa_analyses)
+RETURNS TABLE (hazard_id VARCHAR, uca_type VARCHAR) AS $$
+  SELECT DISTINCT ref::VARCHAR, u.uca_type::VARCHAR
+  FROM (VALUES
+    ('not_provided', analysis.uca_not_provided),
+    ('provided_causes_hazard', analysis.uca_provided_causes_hazard),
+    ('wrong_timing', analysis.uca_wrong_timing),
+    ('stopped_too_soon', analysis.uca_stopped_too_soon)
+  ) AS u(uca_type, uca),
+  jsonb_array_elements_text(
+    CASE WHEN jsonb_typeof(u.uca->'hazard_refs') = 'array' THEN u.uca->'hazard_refs' ELSE '[]'::jsonb END
+  ) AS ref
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION trace_hazards_on_hazard_change()
+RETURNS TRIGGER AS $$
+BEGIN
+  PERFORM refresh_hazard_trace(ARRAY[NEW.id]);
+  -- Analyses may name a hazard before it is created
+  IF TG_OP = 'INSERT' THEN
+    INSERT INTO hazard_trace (hazard_id, node_type, node_id)
+    SELECT NEW.id, 'uca', a.id || ':' || r.uca_type
+    FROM stpa_analyses a
+    CROSS JOIN LATERAL uca_hazard_refs(a) r
+    WHERE r.hazard_id = NEW.id
+    ON CONFLICT DO NOTHING;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION trace_hazards_on_loss_change()
+RETURNS TRIGGER AS $$
+DECLARE
+  loss_ids VARCHAR[];
+BEGIN
+  loss_ids := CASE TG_OP WHEN 'INSERT' THEN ARRAY[NEW.id] WHEN 'DELETE' THEN ARRAY[OLD.id] ELSE ARRAY[OLD.id, NEW.id] END;
+  PERFORM refresh_hazard_trace(ARRAY(SELECT id FROM hazards WHERE loss_refs && loss_ids));
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION trace_hazards_on_scenario_change()
+RETURNS TRIGGER AS $$
+BEGIN
+  PERFORM refresh_hazard_trace(
+    CASE TG_OP WHEN 'INSERT' THEN NEW.hazard_refs
+               WHEN 'DELETE' THEN OLD.hazard_refs
+               ELSE OLD.hazard_refs || NEW.hazard_refs END
+  );
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION trace_hazards_on_scenario_mitigation_change()
+RETURNS TRIGGER AS $$
+BEGIN
+  PERFORM refresh_hazard_trace(ARRAY(
+    SELECT DISTINCT unnest(hazard_refs) FROM scenarios
+    WHERE id IN (
+      CASE WHEN TG_OP <> 'INSERT' THEN OLD.scenario_id END,
+      CASE WHEN TG_OP <> 'DELETE' THEN NEW.scenario_id END
+    )
+  ));
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION trace_hazards_on_analysis_change()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    DELETE FROM hazard_trace
+    WHERE node_type = 'uca' AND node_id = ANY(ARRAY[
+      OLD.id || ':not_provided', OLD.id || ':provided_causes_hazard',
+      OLD.id || ':wrong_timing', OLD.id || ':stopped_too_soon'
+    ]);
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    INSERT INTO hazard_trace (hazard_id, node_type, node_id)
+    SELECT r.hazard_id, 'uca', NEW.id || ':' || r.uca_type
+    FROM uca_hazard_refs(NEW) r
+    JOIN hazards h ON h.id = r.hazard_id
+    ON CONFLICT DO NOTHING;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS hazards_trace ON hazards;
+CREATE TRIGGER hazards_trace
+  AFTER INSERT OR UPDATE OF loss_refs ON hazards
+  FOR EACH ROW
+  EXECUTE FUNCTION trace_hazards_on_hazard_change();
+
+DROP TRIGGER IF EXISTS losses_trace ON losses;
+CREATE TRIGGER losses_trace
+  AFTER INSERT OR UPDATE OF stakeholder_refs OR DELETE ON losses
+  FOR EACH ROW
+  EXECUTE FUNCTION trace_hazards_on_loss_change();
+
+DROP TRIGGER IF EXISTS scenarios_trace ON scenarios;
+CREATE TRIGGER scenarios_trace
+  AFTER INSERT OR UPDATE OF hazard_refs OR DELETE ON scenarios
+  FOR EACH ROW
+  EXECUTE FUNCTION trace_hazards_on_scenario_change();
+
+DROP TRIGGER IF EXISTS scenario_mitigations_trace ON scenario_mitigations;
+CREATE TRIGGER scenario_mitigations_trace
+  AFTER INSERT OR UPDATE OR DELETE ON scenario_mitigations
+  FOR EACH ROW
+  EXECUTE FUNCTION trace_hazards_on_scenario_mitigation_change();
+
+DROP TRIGGER IF EXISTS stpa_analyses_trace ON stpa_analyses;
+CREATE TRIGGER stpa_analyses_trace
+  AFTER INSERT OR UPDATE OF uca_not_provided, uca_provided_causes_hazard, uca_wrong_timing, uca_stopped_too_soon
+     OR DELETE ON stpa_analyses
+  FOR EACH ROW
+  EXECUTE FUNCTION trace_hazards_on_analysis_change();
+
+-- Backfill existing data
+SELECT refresh_hazard_trace(ARRAY(SELECT id FROM hazards));
+
+INSERT INTO hazard_trace (hazard_id, node_type, node_id)
+SELECT r.hazard_id, 'uca', a.id || ':' || r.uca_type
+FROM stpa_analyses a
+CROSS JOIN LATERAL uca_hazard_refs(a) r
+JOIN hazards h ON h.id = r.hazard_id
+ON CONFLICT DO NOTHING;
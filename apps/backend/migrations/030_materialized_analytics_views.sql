@@ -0,0 +1,234 @@
+-- Migration: 030_materialized_analytics_views.sql
+-- Description: Materialized copies of the 004 analytics views, refreshed after writes
+-- Created: 2026-10-18
+
+-- Views whose rows need a key for concurrent refresh gain one as a trailing column
+CREATE OR REPLACE VIEW adversary_capability_coverage AS
+SELECT
+  a.name as adversary,
+  a.type as adversary_type,
+  COUNT(DISTINCT acp.entity_id) as controlled_entities,
+  COUNT(DISTINCT r.id) as influenced_relationships,
+  COUNT(DISTINCT m.id) as applicable_mitigations,
+  AVG(CASE
+    WHEN m.effectiveness = 'low' THEN 1
+    WHEN m.effectiveness = 'medium' THEN 2
+    WHEN m.effectiveness = 'high' THEN 3
+    WHEN m.effectiveness = 'very_high' THEN 4
+    ELSE 0
+  END) as avg_mitigation_effectiveness,
+  ARRAY_AGG(DISTINCT
+    CASE
+      WHEN m.id IS NULL THEN acp.entity_id
+      ELSE NULL
+    END
+  ) FILTER (WHERE m.id IS NULL) as unmitigated_control_points,
+  a.id as adversary_id
+FROM adversaries a
+JOIN adversary_control_problems acp ON a.id = acp.adversary_id
+LEFT JOIN relationships r ON r.source_id = acp.entity_id OR r.target_id = acp.entity_id
+LEFT JOIN stpa_analyses an ON an.relationship_id = r.id
+LEFT JOIN scenarios s ON s.relationship_id = r.id
+  AND a.id = ANY(s.threat_actor_refs)
+LEFT JOIN scenario_mitigations sm ON sm.scenario_id = s.id
+LEFT JOIN mitigations m ON m.id = sm.mitigation_id
+GROUP BY a.id, a.name, a.type;
+
+CREATE OR REPLACE VIEW regulatory_compliance_status AS
+SELECT
+  cr.regulation_name,
+  cr.jurisdiction,
+  JSON_BUILD_OBJECT(
+    'required', CARDINALITY(ARRAY(SELECT DISTINCT jsonb_array_elements_text(cr.required_controls->'data_protection'))),
+    'implemented', COUNT(DISTINCT im.control_type),
+    'coverage_percentage',
+      CASE
+        WHEN CARDINALITY(ARRAY(SELECT DISTINCT jsonb_array_elements_text(cr.required_controls->'data_protection'))) > 0
+        THEN (COUNT(DISTINCT im.control_type)::FLOAT /
+              CARDINALITY(ARRAY(SELECT DISTINCT jsonb_array_elements_text(cr.required_controls->'data_protection')))::FLOAT * 100)::INT
+        ELSE 100
+      END
+  ) as control_coverage,
+  (cr.penalty_structure->'max_fine'->>'amount')::NUMERIC as max_penalty,
+  CASE
+    WHEN COUNT(DISTINCT im.control_type)::FLOAT /
+         NULLIF(CARDINALITY(ARRAY(SELECT DISTINCT jsonb_array_elements_text(cr.required_controls->'data_protection'))), 0)::FLOAT >= 0.95
+    THEN 'audit_ready'
+    WHEN COUNT(DISTINCT im.control_type)::FLOAT /
+         NULLIF(CARDINALITY(ARRAY(SELECT DISTINCT jsonb_array_elements_text(cr.required_controls->'data_protection'))), 0)::FLOAT >= 0.80
+    THEN 'nearly_ready'
+    ELSE 'gaps_exist'
+  END as audit_status,
+  JSON_AGG(
+    JSON_BUILD_OBJECT(
+      'control', im.control_type,
+      'evidence', im.audit_evidence,
+      'last_tested', im.last_tested
+    )
+  ) as audit_evidence,
+  cr.id as requirement_id
+FROM compliance_requirements cr
+LEFT JOIN implemented_mitigations im ON im.control_type = ANY(ARRAY(SELECT jsonb_array_elements_text(cr.required_controls->'data_protection')))
+GROUP BY cr.id, cr.regulation_name, cr.jurisdiction, cr.required_controls, cr.penalty_structure
+ORDER BY max_penalty DESC;
+
+CREATE OR REPLACE VIEW entity_exposure_analysis AS
+SELECT
+  e.name,
+  e.trust_level,
+  e.exposure,
+  COUNT(DISTINCT a.id) as total_vulnerabilities,
+  COUNT(DISTINCT CASE WHEN a.uca_not_provided->>'severity' = 'critical' THEN a.id END) as critical_ucas,
+  COUNT(DISTINCT CASE WHEN a.stride_spoofing->>'severity' = 'critical' THEN a.id END) as critical_stride,
+  e.id as entity_id
+FROM entities e
+JOIN relationships r ON e.id IN (r.source_id, r.target_id)
+JOIN stpa_analyses a ON r.id = a.relationship_id
+WHERE e.exposure = 'external'
+GROUP BY e.id, e.name, e.trust_level, e.exposure
+ORDER BY critical_ucas DESC, critical_stride DESC;
+
+-- Registry of materialized views; only refreshes write to it
+CREATE TABLE IF NOT EXISTS analytics_views (
+  view_name VARCHAR PRIMARY KEY,
+  materialized_name VARCHAR NOT NULL UNIQUE,
+  unique_key TEXT NOT NULL,
+  sort_order TEXT NOT NULL,
+  refreshed_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS analytics_view_dependencies (
+  view_name VARCHAR NOT NULL REFERENCES analytics_views(view_name) ON DELETE CASCADE,
+  table_name VARCHAR NOT NULL,
+  PRIMARY KEY (view_name, table_name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_analytics_view_dependencies_table ON analytics_view_dependencies(table_name);
+
+-- Writes to a dependency append a row per dependent view here rather than
+-- updating the registry, so concurrent writers never wait on each other.
+-- A view is stale while it has rows; a refresh consumes them.
+CREATE TABLE IF NOT EXISTS analytics_view_changes (
+  id BIGSERIAL PRIMARY KEY,
+  view_name VARCHAR NOT NULL REFERENCES analytics_views(view_name) ON DELETE CASCADE,
+  changed_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_analytics_view_changes_view ON analytics_view_changes(view_name, changed_at);
+
+INSERT INTO analytics_views (view_name, materialized_name, unique_key, sort_order) VALUES
+  ('mitigation_impact_analysis', 'mv_mitigation_impact_analysis', 'mitigation_id', 'total_risk_reduction DESC'),
+  ('entity_complexity', 'mv_entity_complexity', 'id', 'total_relationships DESC'),
+  ('mission_impact_traceability', 'mv_mission_impact_traceability', 'mitigation_id', 'mitigation_id'),
+  ('adversary_capability_coverage', 'mv_adversary_capability_coverage', 'adversary_id', 'adversary_id'),
+  ('temporal_risk_windows', 'mv_temporal_risk_windows', 'time_window, window_type', 'peak_risk DESC'),
+  ('d4_priority_analysis', 'mv_d4_priority_analysis', 'scenario_id', 'd4_total DESC, risk_score DESC'),
+  ('comprehensive_security_posture', 'mv_comprehensive_security_posture', 'entity_id', 'total_risks DESC, max_business_impact DESC'),
+  ('ai_agent_risk_assessment', 'mv_ai_agent_risk_assessment', 'id', 'ai_risk_priority DESC'),
+  ('security_investment_optimization', 'mv_security_investment_optimization', 'mitigation_id', 'roi_percentage DESC NULLS LAST, total_risk_reduced DESC'),
+  ('regulatory_compliance_status', 'mv_regulatory_compliance_status', 'requirement_id', 'max_penalty DESC'),
+  ('critical_unmitigated_scenarios', 'mv_critical_unmitigated_scenarios', 'id', 'risk_score DESC'),
+  ('entity_exposure_analysis', 'mv_entity_exposure_analysis', 'entity_id', 'critical_ucas DESC, critical_stride DESC')
+ON CONFLICT (view_name) DO NOTHING;
+
+-- Views never refreshed start out stale
+INSERT INTO analytics_view_changes (view_name)
+SELECT view_name FROM analytics_views v
+WHERE v.refreshed_at IS NULL
+  AND NOT EXISTS (SELECT 1 FROM analytics_view_changes c WHERE c.view_name = v.view_name);
+
+-- Dependencies are the tables each view's rewrite rule references, read
+-- from the catalog so they follow the view definitions
+INSERT INTO analytics_view_dependencies (view_name, table_name)
+SELECT DISTINCT v.view_name, c.relname
+FROM analytics_views v
+JOIN pg_rewrite rw ON rw.ev_class = v.view_name::regclass
+JOIN pg_depend d ON d.objid = rw.oid
+  AND d.classid = 'pg_rewrite'::regclass
+  AND d.refclassid = 'pg_class'::regclass
+  AND d.refobjid <> rw.ev_class
+JOIN pg_class c ON c.oid = d.refobjid AND c.relkind IN ('r', 'p')
+ON CONFLICT DO NOTHING;
+
+-- Materialized views start empty and are populated below, so one that
+-- cannot be computed on the current data does not fail the migration
+DO $$
+DECLARE
+  v RECORD;
+BEGIN
+  FOR v IN SELECT * FROM analytics_views LOOP
+    EXECUTE format('CREATE MATERIALIZED VIEW IF NOT EXISTS %I AS SELECT * FROM %I WITH NO DATA',
+                   v.materialized_name, v.view_name);
+    -- Concurrent refresh needs a unique index over plain columns
+    EXECUTE format('CREATE UNIQUE INDEX IF NOT EXISTS %I ON %I (%s)',
+                   'uq_' || v.materialized_name, v.materialized_name, v.unique_key);
+  END LOOP;
+END $$;
+
+-- Refresh one view without blocking its readers. Returns false when
+-- another session is already refreshing it.
+CREATE OR REPLACE FUNCTION refresh_analytics_view(target VARCHAR)
+RETURNS BOOLEAN AS $$
+DECLARE
+  view_record analytics_views%ROWTYPE;
+BEGIN
+  SELECT * INTO view_record FROM analytics_views WHERE view_name = target;
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Unknown analytics view: %', target;
+  END IF;
+  IF NOT pg_try_advisory_xact_lock(hashtext('analytics_views'), hashtext(target)) THEN
+    RETURN FALSE;
+  END IF;
+
+  -- Each statement here sees what committed before it started, so the
+  -- refresh covers every change consumed now. Changes committed later
+  -- stay logged and leave the view stale.
+  DELETE FROM analytics_view_changes WHERE view_name = target;
+  IF (SELECT ispopulated FROM pg_matviews WHERE matviewname = view_record.materialized_name) THEN
+    EXECUTE format('REFRESH MATERIALIZED VIEW CONCURRENTLY %I', view_record.materialized_name);
+  ELSE
+    EXECUTE format('REFRESH MATERIALIZED VIEW %I', view_record.materialized_name);
+  END IF;
+
+  UPDATE analytics_views SET refreshed_at = clock_timestamp() WHERE view_name = target;
+  RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level, so a bulk write marks each dependent view once
+CREATE OR REPLACE FUNCTION mark_analytics_views_stale()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO analytics_view_changes (view_name)
+  SELECT view_name FROM analytics_view_dependencies WHERE table_name = TG_TABLE_NAME;
+  PERFORM pg_notify('analytics_views_stale', TG_TABLE_NAME);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+  dependency RECORD;
+BEGIN
+  FOR dependency IN SELECT DISTINCT table_name FROM analytics_view_dependencies LOOP
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I',
+                   dependency.table_name || '_analytics_stale', dependency.table_name);
+    EXECUTE format('CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+                   'FOR EACH STATEMENT EXECUTE FUNCTION mark_analytics_views_stale()',
+                   dependency.table_name || '_analytics_stale', dependency.table_name);
+  END LOOP;
+END $$;
+
+-- Initial population
+DO $$
+DECLARE
+  v RECORD;
+BEGIN
+  FOR v IN SELECT view_name FROM analytics_views LOOP
+    BEGIN
+      PERFORM refresh_analytics_view(v.view_name);
+    EXCEPTION WHEN OTHERS THEN
+      RAISE NOTICE 'Could not populate %: %', v.view_name, SQLERRM;
+    END;
+  END LOOP;
+END $$;
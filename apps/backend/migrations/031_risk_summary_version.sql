@@ -0,0 +1,39 @@
+-- Migration: 031_risk_summary_version.sql
+-- Description: Write version for the cached STPA-Sec risk summary
+-- Created: 2026-10-18
+
+-- A cached response is current while its version matches; any write to
+-- the tables the summary reads bumps it. Writers bump one of several
+-- slots, picked by backend, so concurrent writers rarely wait on the same
+-- row and a transaction never locks two; the version is the slots' sum.
+CREATE TABLE IF NOT EXISTS cache_versions (
+  cache_key VARCHAR NOT NULL,
+  slot SMALLINT NOT NULL,
+  version BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (cache_key, slot)
+);
+
+INSERT INTO cache_versions (cache_key, slot)
+SELECT 'risk_summary', slot FROM generate_series(0, 15) AS slot
+ON CONFLICT (cache_key, slot) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_risk_summary_version()
+RETURNS TRIGGER AS $$
+BEGIN
+  UPDATE cache_versions SET version = version + 1
+  WHERE cache_key = 'risk_summary' AND slot = pg_backend_pid() % 16;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+  source_table TEXT;
+BEGIN
+  FOREACH source_table IN ARRAY ARRAY['hazards', 'scenarios', 'mitigations', 'scenario_mitigations'] LOOP
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', source_table || '_risk_summary_version', source_table);
+    EXECUTE format('CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+                   'FOR EACH STATEMENT EXECUTE FUNCTION bump_risk_summary_version()',
+                   source_table || '_risk_summary_version', source_table);
+  END LOOP;
+END $$;
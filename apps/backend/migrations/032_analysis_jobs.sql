@@ -0,0 +1,60 @@
+-- Migration: 032_analysis_jobs.sql
+-- Description: Durable analysis job queue claimed by the analysis workers
+-- Created: 2026-10-18
+
+-- Matches core.models.database.AnalysisJob, so it agrees with a schema
+-- made by create_all; SQLAlchemy stores the enum member names
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'analysisjobstatus') THEN
+    CREATE TYPE analysisjobstatus AS ENUM ('QUEUED', 'RUNNING', 'COMPLETED', 'FAILED', 'CANCELLED');
+  END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS analysis_jobs (
+  id UUID PRIMARY KEY,
+  analysis_id UUID NOT NULL REFERENCES analyses(id),
+  -- Project owner; the per-tenant running limit counts by this
+  tenant_id UUID NOT NULL REFERENCES users(id),
+  -- Higher runs first
+  priority INTEGER NOT NULL DEFAULT 0,
+  -- Frameworks, section ids and request metadata
+  payload JSON NOT NULL,
+  status analysisjobstatus NOT NULL DEFAULT 'QUEUED',
+  attempts INTEGER NOT NULL DEFAULT 0,
+  max_attempts INTEGER NOT NULL DEFAULT 3,
+  worker_id VARCHAR(255),
+  heartbeat_at TIMESTAMPTZ,
+  lease_expires_at TIMESTAMPTZ,
+  cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+  error_message TEXT,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  started_at TIMESTAMPTZ,
+  finished_at TIMESTAMPTZ
+);
+
+-- Claim: queued jobs by priority, then age
+CREATE INDEX IF NOT EXISTS idx_analysis_job_claim ON analysis_jobs(status, priority, created_at);
+-- Running jobs per tenant, for the tenant limit
+CREATE INDEX IF NOT EXISTS idx_analysis_job_tenant ON analysis_jobs(tenant_id, status);
+-- Cancellation and results by analysis
+CREATE INDEX IF NOT EXISTS idx_analysis_job_analysis ON analysis_jobs(analysis_id);
+
+-- Wake idle workers LISTENing on the analysis_jobs channel (JOBS_CHANNEL in
+-- core/jobs/queue.py) whenever a job becomes claimable, including jobs
+-- queued again after a lease ran out. Notifications are sent on commit,
+-- and repeats within one transaction are folded into one.
+CREATE OR REPLACE FUNCTION notify_analysis_jobs()
+RETURNS TRIGGER AS $$
+BEGIN
+  PERFORM pg_notify('analysis_jobs', '');
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS analysis_jobs_notify ON analysis_jobs;
+CREATE TRIGGER analysis_jobs_notify
+  AFTER INSERT OR UPDATE OF status ON analysis_jobs
+  FOR EACH ROW
+  WHEN (NEW.status = 'QUEUED')
+  EXECUTE FUNCTION notify_analysis_jobs();
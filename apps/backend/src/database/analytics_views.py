@@ -0,0 +1,138 @@
+"""
+STPA-Sec+ Analytics Views
+Reads of the materialized analytics views with their staleness, and the
+refresher that keeps them current after writes
+"""
+
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import asyncpg
+from sqlalchemy import DateTime, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Channel the dependency triggers notify on after a write
+STALE_CHANNEL = 'analytics_views_stale'
+# Seconds to wait after a write for more writes before refreshing
+DEFAULT_REFRESH_DEBOUNCE = 2.0
+
+# A view is stale since its oldest change not yet consumed by a refresh
+_VIEW_STATE = (
+    "SELECT view_name, materialized_name, sort_order, refreshed_at, "
+    "(SELECT MIN(changed_at) FROM analytics_view_changes c WHERE c.view_name = v.view_name) AS stale_since "
+    "FROM analytics_views v"
+)
+_STALE_VIEWS = (
+    "SELECT view_name FROM analytics_view_changes GROUP BY view_name ORDER BY MIN(changed_at)"
+)
+
+
+def _state_query(clause: str):
+    return text(f"{_VIEW_STATE} {clause}").columns(refreshed_at=DateTime, stale_since=DateTime)
+
+
+def _freshness(state) -> Dict[str, Any]:
+    return {
+        'refreshed_at': state.refreshed_at.isoformat() if state.refreshed_at else None,
+        'stale': state.stale_since is not None,
+        'stale_since': state.stale_since.isoformat() if state.stale_since else None
+    }
+
+
+def list_analytics_views(session: Session) -> List[Dict[str, Any]]:
+    """Every analytics view with its freshness"""
+    return [
+        {'view': state.view_name, **_freshness(state)}
+        for state in session.execute(_state_query("ORDER BY view_name"))
+    ]
+
+
+def read_analytics_view(session: Session, view_name: str, limit: Optional[int] = None,
+                        offset: int = 0) -> Dict[str, Any]:
+    """
+    Rows of a materialized analytics view in the plain view's order
+
+    Concurrent refreshes never block this read; ``stale`` says whether
+    writes have landed since the rows were computed.
+    """
+    state = session.execute(
+        _state_query("WHERE view_name = :view_name"), {'view_name': view_name}
+    ).first()
+    if state is None:
+        raise ValueError(f"Unknown analytics view {view_name!r}")
+
+    # Names and orderings come from the registry, never from the caller
+    materialized = session.get_bind().dialect.identifier_preparer.quote(state.materialized_name)
+    query = f"SELECT * FROM {materialized} ORDER BY {state.sort_order}"
+    params = {}
+    if limit is not None:
+        query += " LIMIT :limit"
+        params['limit'] = limit
+    if offset:
+        query += " OFFSET :offset"
+        params['offset'] = offset
+    rows = session.execute(text(query), params).mappings().all()
+
+    return {'view': view_name, **_freshness(state), 'rows': [dict(row) for row in rows]}
+
+
+def refresh_stale_views(session: Session) -> List[str]:
+    """Refresh every stale view, each in its own transaction; returns those refreshed"""
+    refreshed = []
+    for view_name in session.execute(text(_STALE_VIEWS)).scalars().all():
+        if session.execute(text("SELECT refresh_analytics_view(:view_name)"),
+                           {'view_name': view_name}).scalar():
+            refreshed.append(view_name)
+        session.commit()
+    return refreshed
+
+
+class AnalyticsViewRefresher:
+    """
+    Refreshes stale analytics views when the dependency triggers notify
+
+    Notifications arriving within ``debounce`` seconds of each other are
+    handled by one pass, so a burst of agent writes costs one refresh.
+    """
+
+    def __init__(self, dsn: str, debounce: float = DEFAULT_REFRESH_DEBOUNCE):
+        self.dsn = dsn
+        self.debounce = debounce
+        self._pending = asyncio.Event()
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._pending.set()
+
+    async def refresh(self, connection) -> List[str]:
+        """One pass over the stale views"""
+        refreshed = []
+        for row in await connection.fetch(_STALE_VIEWS):
+            if await connection.fetchval('SELECT refresh_analytics_view($1)', row['view_name']):
+                refreshed.append(row['view_name'])
+        return refreshed
+
+    async def run(self):
+        """Listen and refresh until cancelled"""
+        try:
+            connection = await asyncpg.connect(self.dsn)
+        except Exception as e:
+            logger.error(f"Analytics view refresher could not connect: {e}")
+            return
+        try:
+            await connection.add_listener(STALE_CHANNEL, self._on_notify)
+            # Catch up on writes made while nothing was listening
+            self._pending.set()
+            while True:
+                await self._pending.wait()
+                await asyncio.sleep(self.debounce)
+                self._pending.clear()
+                try:
+                    refreshed = await self.refresh(connection)
+                    if refreshed:
+                        logger.info(f"Refreshed analytics views: {', '.join(refreshed)}")
+                except Exception as e:
+                    logger.error(f"Analytics view refresh failed: {e}")
+        finally:
+            await connection.close()
@@ -0,0 +1,294 @@
+"""
+STPA-Sec+ Relationship Graph
+In-memory graph of entities and relationships for path and reachability queries
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import heapq
+import numpy as np
+from sqlalchemy.orm import Session
+from .stpa_sec_models import Entity, Relationship
+
+# Bounds for path enumeration when the caller gives none
+DEFAULT_MAX_PATH_LENGTH = 8
+DEFAULT_PATH_LIMIT = 100
+
+Adjacency = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def _csr(keys: np.ndarray, values: np.ndarray, node_count: int) -> Adjacency:
+    """(indptr, neighbours, edges) with the edges of node i at indptr[i]:indptr[i + 1]"""
+    order = np.argsort(keys, kind='stable')
+    indptr = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=node_count), out=indptr[1:])
+    return indptr, values[order], order
+
+
+def _gather(indptr: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """Positions of all adjacency entries of ``nodes`` in one vectorized step"""
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    total = int(counts.sum())
+    if not total:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.cumsum(counts) - counts
+    return np.arange(total, dtype=np.int64) + np.repeat(starts - offsets, counts)
+
+
+class RelationshipGraph:
+    """
+    Entities and relationships interned to integers in CSR adjacency arrays
+
+    Nodes are entities and edges are relationships from source to target.
+    Paths are lists of edge indices; ``relationship_ids``, ``actions`` and
+    ``types`` map an edge index back to its relationship.
+    """
+
+    def __init__(self, entity_ids: Iterable[str],
+                 relationships: Iterable[Tuple[str, str, str, str, str]]):
+        self.node_ids: List[str] = list(dict.fromkeys(entity_ids))
+        self.index: Dict[str, int] = {node: i for i, node in enumerate(self.node_ids)}
+        self.relationship_ids: List[str] = []
+        self.actions: List[str] = []
+        self.types: List[str] = []
+
+        sources, targets = [], []
+        for relationship_id, source_id, target_id, action, relationship_type in relationships:
+            sources.append(self._intern(source_id))
+            targets.append(self._intern(target_id))
+            self.relationship_ids.append(relationship_id)
+            self.actions.append(action)
+            self.types.append(relationship_type)
+
+        node_count = len(self.node_ids)
+        self.edge_sources = np.asarray(sources, dtype=np.int64)
+        self.edge_targets = np.asarray(targets, dtype=np.int64)
+        self._out = _csr(self.edge_sources, self.edge_targets, node_count)
+        self._in = _csr(self.edge_targets, self.edge_sources, node_count)
+        self._self_loops = np.bincount(
+            self.edge_sources[self.edge_sources == self.edge_targets], minlength=node_count
+        )
+
+        # Path enumeration steps one edge at a time, which is faster on lists
+        self._out_ptr = self._out[0].tolist()
+        self._out_neighbours = self._out[1].tolist()
+        self._out_edges = self._out[2].tolist()
+        self._edge_targets = targets
+
+    @classmethod
+    def load(cls, session: Session) -> 'RelationshipGraph':
+        """Build the graph with one query for entities and one for relationships"""
+        entity_ids = [row.id for row in session.query(Entity.id)]
+        relationships = session.query(
+            Relationship.id, Relationship.source_id, Relationship.target_id,
+            Relationship.action, Relationship.type
+        ).all()
+        return cls(entity_ids, relationships)
+
+    def _intern(self, entity_id: str) -> int:
+        # Relationships may reference entities that were not loaded
+        node = self.index.get(entity_id)
+        if node is None:
+            node = self.index[entity_id] = len(self.node_ids)
+            self.node_ids.append(entity_id)
+        return node
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self.index
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.relationship_ids)
+
+    def _adjacency(self, direction: str) -> List[Adjacency]:
+        if direction == 'out':
+            return [self._out]
+        if direction == 'in':
+            return [self._in]
+        if direction == 'both':
+            return [self._out, self._in]
+        raise ValueError(f"Unknown direction {direction!r}")
+
+    def _nodes(self, entity_ids: Iterable[str]) -> np.ndarray:
+        return np.unique(np.asarray(
+            [self.index[e] for e in entity_ids if e in self.index], dtype=np.int64
+        ))
+
+    def incident_edges(self, entity_id: str) -> np.ndarray:
+        """Edge indices of relationships with the entity at either end"""
+        node = self.index.get(entity_id)
+        if node is None:
+            return np.empty(0, dtype=np.int64)
+        nodes = np.asarray([node], dtype=np.int64)
+        return np.unique(np.concatenate([
+            adjacency[2][_gather(adjacency[0], nodes)] for adjacency in (self._out, self._in)
+        ]))
+
+    def degree(self, entity_id: str) -> int:
+        """Number of relationships with the entity at either end"""
+        node = self.index.get(entity_id)
+        if node is None:
+            return 0
+        out_ptr, in_ptr = self._out[0], self._in[0]
+        return int(out_ptr[node + 1] - out_ptr[node] + in_ptr[node + 1] - in_ptr[node]
+                   - self._self_loops[node])
+
+    def hop_distances(self, sources: Iterable[str], max_hops: Optional[int] = None,
+                      direction: str = 'out') -> np.ndarray:
+        """
+        Hops from the nearest source to every node, -1 where unreachable
+
+        Breadth-first by whole frontiers, so each level costs a few
+        vectorized operations regardless of its size.
+        """
+        adjacency = self._adjacency(direction)
+        distances = np.full(self.node_count, -1, dtype=np.int64)
+        frontier = self._nodes(sources)
+        distances[frontier] = 0
+        hops = 0
+        while frontier.size and (max_hops is None or hops < max_hops):
+            hops += 1
+            neighbours = np.concatenate([
+                indices[_gather(indptr, frontier)] for indptr, indices, _ in adjacency
+            ])
+            frontier = np.unique(neighbours[distances[neighbours] < 0])
+            distances[frontier] = hops
+        return distances
+
+    def reachable(self, sources: Iterable[str], max_hops: Optional[int] = None,
+                  direction: str = 'out') -> Dict[str, int]:
+        """Entities reachable from ``sources`` (included at 0) and their hop counts"""
+        distances = self.hop_distances(sources, max_hops, direction)
+        return {self.node_ids[node]: int(distances[node]) for node in np.flatnonzero(distances >= 0)}
+
+    def edges_within(self, distances: np.ndarray, max_hops: int, direction: str = 'out') -> np.ndarray:
+        """Edge indices a traversal of ``max_hops`` crosses, given its ``hop_distances``"""
+        inner = np.flatnonzero((distances >= 0) & (distances < max_hops))
+        return np.unique(np.concatenate([np.empty(0, dtype=np.int64)] + [
+            edges[_gather(indptr, inner)] for indptr, _, edges in self._adjacency(direction)
+        ]))
+
+    def _simple_paths(self, source: int, target: int, max_length: int) -> Iterator[List[int]]:
+        """
+        Depth-first over simple paths, never stepping to a node that cannot
+        reach the target within the remaining length. Yields a shared list.
+        """
+        remaining = self.hop_distances([self.node_ids[target]], max_length, 'in').tolist()
+        if remaining[source] < 0:
+            return
+        ptr, neighbours, edges = self._out_ptr, self._out_neighbours, self._out_edges
+        path: List[int] = []
+        on_path = {source}
+        stack = [[source, ptr[source]]]
+        while stack:
+            frame = stack[-1]
+            node, position = frame
+            if position == ptr[node + 1]:
+                stack.pop()
+                on_path.discard(node)
+                if path:
+                    path.pop()
+                continue
+            frame[1] = position + 1
+            step = neighbours[position]
+            if step == target:
+                path.append(edges[position])
+                yield path
+                path.pop()
+                continue
+            hops = remaining[step]
+            if hops < 0 or step in on_path or len(path) + 1 + hops > max_length:
+                continue
+            path.append(edges[position])
+            on_path.add(step)
+            stack.append([step, ptr[step]])
+
+    def paths_up_to(self, source_id: str, target_id: str, max_length: int = DEFAULT_MAX_PATH_LENGTH,
+                    limit: Optional[int] = None) -> Iterator[List[int]]:
+        """Simple paths of at most ``max_length`` relationships, at most ``limit`` of them"""
+        source, target = self.index.get(source_id), self.index.get(target_id)
+        if source is None or target is None:
+            return
+        if source == target:
+            yield []
+            return
+        for emitted, path in enumerate(self._simple_paths(source, target, max_length), start=1):
+            yield list(path)
+            if limit is not None and emitted >= limit:
+                return
+
+    def count_paths(self, source_id: str, target_id: str,
+                    max_length: int = DEFAULT_MAX_PATH_LENGTH) -> int:
+        """Number of simple paths of at most ``max_length`` relationships"""
+        source, target = self.index.get(source_id), self.index.get(target_id)
+        if source is None or target is None:
+            return 0
+        if source == target:
+            return 1
+        return sum(1 for _ in self._simple_paths(source, target, max_length))
+
+    def _shortest_path(self, source: int, target: int, max_length: Optional[int],
+                       banned_nodes: Set[int], banned_edges: Set[int]) -> Optional[List[int]]:
+        """Fewest-hop path avoiding the banned nodes and edges, by breadth-first search"""
+        ptr, neighbours, edges = self._out_ptr, self._out_neighbours, self._out_edges
+        parents: Dict[int, Tuple[int, int]] = {source: (-1, -1)}
+        frontier = [source]
+        depth = 0
+        while frontier and (max_length is None or depth < max_length):
+            depth += 1
+            next_frontier = []
+            for node in frontier:
+                for position in range(ptr[node], ptr[node + 1]):
+                    step, edge = neighbours[position], edges[position]
+                    if step in parents or step in banned_nodes or edge in banned_edges:
+                        continue
+                    parents[step] = (node, edge)
+                    if step == target:
+                        path = []
+                        while step != source:
+                            step, edge = parents[step]
+                            path.append(edge)
+                        return path[::-1]
+                    next_frontier.append(step)
+            frontier = next_frontier
+        return None
+
+    def shortest_paths(self, source_id: str, target_id: str, k: int = 1,
+                       max_length: Optional[int] = DEFAULT_MAX_PATH_LENGTH) -> List[List[int]]:
+        """The ``k`` fewest-hop simple paths, shortest first (Yen's algorithm)"""
+        source, target = self.index.get(source_id), self.index.get(target_id)
+        if source is None or target is None or k < 1:
+            return []
+        if source == target:
+            return [[]]
+        first = self._shortest_path(source, target, max_length, set(), set())
+        if first is None:
+            return []
+
+        found = [first]
+        seen = {tuple(first)}
+        candidates: List[Tuple[int, Tuple[int, ...]]] = []
+        while len(found) < k:
+            previous = found[-1]
+            nodes = [source] + [self._edge_targets[edge] for edge in previous]
+            for i in range(len(previous)):
+                root = previous[:i]
+                # Leave the root at node i by an edge no accepted path used there
+                banned_edges = {path[i] for path in found if len(path) > i and path[:i] == root}
+                spur = self._shortest_path(
+                    nodes[i], target, None if max_length is None else max_length - i,
+                    set(nodes[:i + 1]), banned_edges
+                )
+                if spur is not None:
+                    candidate = tuple(root + spur)
+                    if candidate not in seen:
+                        seen.add(candidate)
+                        heapq.heappush(candidates, (len(candidate), candidate))
+            if not candidates:
+                break
+            found.append(list(heapq.heappop(candidates)[1]))
+        return found
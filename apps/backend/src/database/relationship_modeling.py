@@ -5,13 +5,32 @@ This module provides functions for modeling and validating relationships in the
 
 from typing import List, Dict, Any, Optional, Tuple, Set
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, case, func, distinct, exists, select, union
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from .stpa_sec_models import (
-    Entity, Relationship, ControlLoop, Analysis, Scenario,
-    Adversary, AdversaryControlProblem, Hazard, Loss, Stakeholder
+    Entity, Relationship, ControlLoop, Scenario,
+    Adversary, AdversaryControlProblem, Hazard, Loss, Stakeholder, EntityCriticalityScore,
+    HazardTrace, ScenarioMitigation
 )
+from .relationship_graph import RelationshipGraph, DEFAULT_MAX_PATH_LENGTH, DEFAULT_PATH_LIMIT
 import json
-from datetime import datetime
+from collections import defaultdict
+from datetime import datetime, timedelta
+import numpy as np
+
+# Control loop issues and how long a process model stays fresh
+CONTROL_LOOP_ISSUES = {
+    'missing_feedback': {
+        'severity': 'high',
+        'description': 'Control loop has no feedback mechanisms'
+    },
+    'stale_process_model': {
+        'severity': 'medium',
+        'description': 'Process model not validated in over 30 days'
+    },
+}
+STALE_PROCESS_MODEL_AGE = timedelta(days=30)
 
 class RelationshipValidator:
     """Validates relationships and ensures consistency across the STPA-Sec model"""
@@ -109,6 +128,18 @@ class RelationshipModeler:
     def __init__(self, session: Session):
         self.session = session
         self.validator = RelationshipValidator(session)
+        self._graph: Optional[RelationshipGraph] = None
+    
+    @property
+    def graph(self) -> RelationshipGraph:
+        """Entities and relationships, loaded once and shared by the graph queries"""
+        if self._graph is None:
+            self._graph = RelationshipGraph.load(self.session)
+        return self._graph
+    
+    def invalidate_graph(self):
+        """Reload the graph on next use, after entities or relationships changed"""
+        self._graph = None
     
     def create_control_structure(self, entities: List[Dict[str, Any]], 
                                relationships: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -145,6 +176,7 @@ class RelationshipModeler:
         
         if not errors:
             self.session.commit()
+            self.invalidate_graph()
         else:
             self.session.rollback()
         
@@ -155,82 +187,85 @@ class RelationshipModeler:
             'errors': errors
         }
     
-    def analyze_control_loops(self) -> List[Dict[str, Any]]:
-        """Analyze all control loops for completeness and potential issues"""
-        loops = self.session.query(ControlLoop).all()
-        results = []
-        
-        for loop in loops:
-            # Get all relationships in this control loop
-            relationships = self.session.query(Relationship).filter_by(control_loop_id=loop.id).all()
-            
-            # Analyze loop properties
-            analysis = {
-                'loop_id': loop.id,
-                'loop_name': loop.name,
-                'relationship_count': len(relationships),
-                'issues': []
-            }
-            
-            # Check for missing feedback loops
-            control_relationships = [r for r in relationships if r.type == 'control']
-            feedback_relationships = [r for r in relationships if r.type == 'feedback']
-            
-            if len(control_relationships) > 0 and len(feedback_relationships) == 0:
-                analysis['issues'].append({
-                    'type': 'missing_feedback',
-                    'severity': 'high',
-                    'description': 'Control loop has no feedback mechanisms'
-                })
-            
-            # Check for process model staleness
-            if loop.model_validation:
-                last_validated = loop.model_validation.get('last_validated')
-                if last_validated:
-                    # Simple check - validated more than 30 days ago
-                    from datetime import datetime, timedelta
-                    last_date = datetime.fromisoformat(last_validated)
-                    if datetime.now() - last_date > timedelta(days=30):
-                        analysis['issues'].append({
-                            'type': 'stale_process_model',
-                            'severity': 'medium',
-                            'description': 'Process model not validated in over 30 days'
-                        })
-            
-            results.append(analysis)
-        
-        return results
+    def analyze_control_loops(self, issue_type: Optional[str] = None, offset: int = 0,
+                              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Analyze control loops for completeness and potential issues"""
+        return self.control_loop_report(issue_type, offset, limit)['loops']
     
-    def find_critical_paths(self, start_entity_id: str, end_entity_id: str) -> List[List[str]]:
-        """Find all paths between two entities through relationships"""
-        paths = []
-        visited = set()
-        
-        def dfs(current_id: str, target_id: str, path: List[str]):
-            if current_id == target_id:
-                paths.append(path.copy())
-                return
-            
-            if current_id in visited:
-                return
-            
-            visited.add(current_id)
-            
-            # Get all outgoing relationships
-            relationships = self.session.query(Relationship).filter_by(source_id=current_id).all()
-            
-            for rel in relationships:
-                path.append(f"{rel.id}:{rel.action}")
-                dfs(rel.target_id, target_id, path)
-                path.pop()
-            
-            visited.remove(current_id)
+    def control_loop_report(self, issue_type: Optional[str] = None, offset: int = 0,
+                            limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        One page of control loop analyses, optionally only loops with ``issue_type``
+
+        Relationship counts per loop come from one grouped query and the
+        issue checks run over whole columns, so only the returned page is
+        turned into dictionaries.
+        """
+        if issue_type is not None and issue_type not in CONTROL_LOOP_ISSUES:
+            raise ValueError(f"Unknown control loop issue type {issue_type!r}")
+        
+        def count_of(relationship_type: str):
+            return func.coalesce(func.sum(case((Relationship.type == relationship_type, 1), else_=0)), 0)
+        
+        rows = self.session.query(
+            ControlLoop.id, ControlLoop.name,
+            ControlLoop.model_validation['last_validated'].as_string().label('last_validated'),
+            func.count(Relationship.id).label('relationship_count'),
+            count_of('control').label('control_count'),
+            count_of('feedback').label('feedback_count')
+        ).outerjoin(
+            Relationship, Relationship.control_loop_id == ControlLoop.id
+        ).group_by(ControlLoop.id).order_by(ControlLoop.id).all()
+        
+        control = np.fromiter((row.control_count for row in rows), dtype=np.int64, count=len(rows))
+        feedback = np.fromiter((row.feedback_count for row in rows), dtype=np.int64, count=len(rows))
+        last_validated = np.array(
+            [row.last_validated or 'NaT' for row in rows], dtype='datetime64[us]'
+        )
+        cutoff = np.datetime64(datetime.now() - STALE_PROCESS_MODEL_AGE, 'us')
+        issues = {
+            'missing_feedback': (control > 0) & (feedback == 0),
+            # NaT compares false, so loops never validated are not stale
+            'stale_process_model': last_validated < cutoff
+        }
         
-        dfs(start_entity_id, end_entity_id, [])
-        return paths
+        selected = np.flatnonzero(issues[issue_type]) if issue_type else np.arange(len(rows))
+        page = selected[offset:None if limit is None else offset + limit]
+        
+        loops = []
+        for i in page.tolist():
+            row = rows[i]
+            loops.append({
+                'loop_id': row.id,
+                'loop_name': row.name,
+                'relationship_count': row.relationship_count,
+                'control_count': int(control[i]),
+                'feedback_count': int(feedback[i]),
+                'issues': [
+                    {'type': name, **CONTROL_LOOP_ISSUES[name]}
+                    for name, mask in issues.items() if mask[i]
+                ]
+            })
+        
+        return {'total': int(selected.size), 'offset': offset, 'limit': limit, 'loops': loops}
     
-    def analyze_adversary_influence(self, adversary_id: str) -> Dict[str, Any]:
-        """Analyze the potential influence of an adversary across the system"""
+    def find_critical_paths(self, start_entity_id: str, end_entity_id: str,
+                            max_length: int = DEFAULT_MAX_PATH_LENGTH,
+                            limit: int = DEFAULT_PATH_LIMIT) -> List[List[str]]:
+        """Find the shortest paths between two entities through relationships, shortest first"""
+        graph = self.graph
+        return [
+            [f"{graph.relationship_ids[edge]}:{graph.actions[edge]}" for edge in path]
+            for path in graph.shortest_paths(start_entity_id, end_entity_id, k=limit, max_length=max_length)
+        ]
+    
+    def analyze_adversary_influence(self, adversary_id: str, max_hops: int = 1) -> Dict[str, Any]:
+        """
+        Analyze the potential influence of an adversary across the system
+
+        Influence spreads ``max_hops`` relationships, in either direction,
+        out from the entities the adversary can control.
+        """
         adversary = self.session.query(Adversary).filter_by(id=adversary_id).first()
         if not adversary:
             return {'error': 'Adversary not found'}
@@ -240,39 +275,64 @@ class RelationshipModeler:
             adversary_id=adversary_id
         ).all()
         
-        influenced_entities = set()
-        influenced_relationships = set()
-        
-        for cp in control_problems:
-            influenced_entities.add(cp.entity_id)
-            
-            # Find all relationships involving this entity
-            relationships = self.session.query(Relationship).filter(
-                or_(
-                    Relationship.source_id == cp.entity_id,
-                    Relationship.target_id == cp.entity_id
-                )
-            ).all()
-            
-            for rel in relationships:
-                influenced_relationships.add(rel.id)
-                # Add connected entities
-                influenced_entities.add(rel.source_id)
-                influenced_entities.add(rel.target_id)
-        
         # Analyze potential impact
         scenarios = self.session.query(Scenario).filter(
-            Scenario.threat_actor_refs.contains([adversary_id])
+            Scenario.threat_actor_refs.any(adversary_id)
         ).all()
         
+        return self._influence(adversary, control_problems, scenarios, max_hops)
+    
+    def analyze_all_adversary_influence(self, max_hops: int = 1) -> Dict[str, Dict[str, Any]]:
+        """
+        Influence of every adversary, keyed by adversary id
+
+        One query each for adversaries, control problems and attributed
+        scenarios, so capability coverage can be precomputed in one pass.
+        """
+        adversaries = self.session.query(Adversary).all()
+        
+        control_problems: Dict[str, List[AdversaryControlProblem]] = defaultdict(list)
+        for cp in self.session.query(AdversaryControlProblem).all():
+            control_problems[cp.adversary_id].append(cp)
+        
+        scenarios: Dict[str, List[Scenario]] = defaultdict(list)
+        for scenario in self.session.query(Scenario).filter(Scenario.threat_actor_refs.isnot(None)):
+            for actor in set(scenario.threat_actor_refs):
+                scenarios[actor].append(scenario)
+        
+        return {
+            adversary.id: self._influence(
+                adversary, control_problems[adversary.id], scenarios[adversary.id], max_hops
+            )
+            for adversary in adversaries
+        }
+    
+    def _influence(self, adversary: Adversary, control_problems: List[AdversaryControlProblem],
+                   scenarios: List[Scenario], max_hops: int) -> Dict[str, Any]:
+        """Influence summary from an adversary's already loaded control problems and scenarios"""
+        graph = self.graph
+        controlled = [cp.entity_id for cp in control_problems]
+        
+        distances = graph.hop_distances(controlled, max_hops, direction='both')
+        reached = np.flatnonzero(distances >= 0)
+        influenced_entities = set(controlled)
+        influenced_entities.update(graph.node_ids[node] for node in reached)
+        influenced_relationships = graph.edges_within(distances, max_hops, direction='both')
+        
         total_risk = sum(s.risk_score for s in scenarios if hasattr(s, 'risk_score') and s.risk_score)
         
         return {
             'adversary': adversary.name,
             'type': adversary.type,
             'sophistication': adversary.technical_sophistication,
+            'max_hops': max_hops,
             'directly_controlled_entities': len(control_problems),
             'total_influenced_entities': len(influenced_entities),
+            'influenced_entities_by_hop': {
+                int(hops): int(count)
+                for hops, count in zip(*np.unique(distances[reached], return_counts=True))
+                if hops > 0
+            },
             'influenced_relationships': len(influenced_relationships),
             'associated_scenarios': len(scenarios),
             'total_risk_score': total_risk,
@@ -292,105 +352,116 @@ class HazardTraceability:
         self.session = session
     
     def trace_hazard_to_stakeholders(self, hazard_id: str) -> Dict[str, Any]:
-        """Trace a hazard back to affected stakeholders"""
-        hazard = self.session.query(Hazard).filter_by(id=hazard_id).first()
-        if not hazard:
-            return {'error': 'Hazard not found'}
-        
-        # Get losses associated with this hazard
-        losses = self.session.query(Loss).filter(
-            Loss.id.in_(hazard.loss_refs)
-        ).all()
+        """
+        Trace a hazard back to affected stakeholders
+
+        One read of the hazard_trace closure, joined to the rows it names.
+        """
+        rows = self.session.query(
+            Hazard.description.label('hazard_description'), Hazard.likelihood,
+            Hazard.worst_case_scenario, HazardTrace.node_type, HazardTrace.node_id,
+            Stakeholder.name, Stakeholder.type, Stakeholder.trust_level,
+            Loss.description.label('loss_description'), Loss.severity, Loss.impact_type,
+            Scenario.risk_score
+        ).outerjoin(
+            HazardTrace, HazardTrace.hazard_id == Hazard.id
+        ).outerjoin(
+            Stakeholder, and_(HazardTrace.node_type == 'stakeholder', Stakeholder.id == HazardTrace.node_id)
+        ).outerjoin(
+            Loss, and_(HazardTrace.node_type == 'loss', Loss.id == HazardTrace.node_id)
+        ).outerjoin(
+            Scenario, and_(HazardTrace.node_type == 'scenario', Scenario.id == HazardTrace.node_id)
+        ).filter(
+            Hazard.id == hazard_id
+        ).order_by(HazardTrace.node_type, HazardTrace.node_id).all()
         
-        # Get stakeholders affected by these losses
-        all_stakeholder_refs = []
-        for loss in losses:
-            all_stakeholder_refs.extend(loss.stakeholder_refs)
+        if not rows:
+            return {'error': 'Hazard not found'}
         
-        unique_stakeholder_refs = list(set(all_stakeholder_refs))
-        stakeholders = self.session.query(Stakeholder).filter(
-            Stakeholder.id.in_(unique_stakeholder_refs)
-        ).all()
+        hazard = rows[0]
+        by_type = defaultdict(list)
+        for row in rows:
+            by_type[row.node_type].append(row)
         
-        # Get scenarios related to this hazard
-        scenarios = self.session.query(Scenario).filter(
-            Scenario.hazard_refs.contains([hazard_id])
-        ).all()
-        
-        # Get analyses that reference this hazard
-        analyses = self.session.query(Analysis).filter(
-            or_(
-                Analysis.uca_not_provided.op('->>')('hazard_refs').contains(hazard_id),
-                Analysis.uca_provided_causes_hazard.op('->>')('hazard_refs').contains(hazard_id),
-                Analysis.uca_wrong_timing.op('->>')('hazard_refs').contains(hazard_id),
-                Analysis.uca_stopped_too_soon.op('->>')('hazard_refs').contains(hazard_id)
-            )
-        ).all()
+        scenarios = by_type['scenario']
+        # UCA nodes are '<analysis id>:<uca type>'
+        analyses = {row.node_id.rsplit(':', 1)[0] for row in by_type['uca']}
         
         return {
             'hazard': {
-                'id': hazard.id,
-                'description': hazard.description,
+                'id': hazard_id,
+                'description': hazard.hazard_description,
                 'likelihood': hazard.likelihood,
                 'worst_case': hazard.worst_case_scenario
             },
             'affected_stakeholders': [
                 {
-                    'id': s.id,
+                    'id': s.node_id,
                     'name': s.name,
                     'type': s.type,
                     'trust_level': s.trust_level
                 }
-                for s in stakeholders
+                for s in by_type['stakeholder'] if s.name is not None
             ],
             'related_losses': [
                 {
-                    'id': l.id,
-                    'description': l.description,
+                    'id': l.node_id,
+                    'description': l.loss_description,
                     'severity': l.severity,
                     'impact_type': l.impact_type
                 }
-                for l in losses
+                for l in by_type['loss'] if l.loss_description is not None
             ],
             'scenarios_count': len(scenarios),
-            'total_risk': sum(s.risk_score for s in scenarios if hasattr(s, 'risk_score') and s.risk_score),
-            'analyses_count': len(analyses)
+            'total_risk': sum(s.risk_score for s in scenarios if s.risk_score),
+            'analyses_count': len(analyses),
+            'mitigations_count': len(by_type['mitigation'])
         }
     
-    def find_unmitigated_paths(self) -> List[Dict[str, Any]]:
+    def hazards_for_node(self, node_type: str, node_id: str) -> List[str]:
+        """Hazards tracing to a loss, stakeholder, UCA, scenario or mitigation"""
+        return [
+            row.hazard_id for row in self.session.query(HazardTrace.hazard_id).filter(
+                HazardTrace.node_type == node_type, HazardTrace.node_id == node_id
+            ).order_by(HazardTrace.hazard_id)
+        ]
+    
+    def find_unmitigated_paths(self, min_risk_score: float = 15) -> List[Dict[str, Any]]:
         """Find critical paths through the system that lack adequate mitigation"""
-        # Get all high-risk scenarios without mitigation
-        unmitigated_scenarios = self.session.query(Scenario).outerjoin(
-            ScenarioMitigation, Scenario.id == ScenarioMitigation.scenario_id
+        source = aliased(Entity)
+        target = aliased(Entity)
+        
+        # High-risk scenarios without mitigation, with their relationship
+        # endpoints, in one query
+        rows = self.session.query(
+            Scenario.id, Scenario.description, Scenario.risk_score,
+            Scenario.hazard_refs, Scenario.threat_actor_refs,
+            Relationship.action, Relationship.type,
+            source.name.label('source_name'), target.name.label('target_name')
+        ).join(
+            Relationship, Relationship.id == Scenario.relationship_id
+        ).join(
+            source, source.id == Relationship.source_id
+        ).join(
+            target, target.id == Relationship.target_id
         ).filter(
-            and_(
-                ScenarioMitigation.scenario_id.is_(None),
-                Scenario.risk_score >= 15  # High risk threshold
-            )
-        ).all()
-        
-        results = []
-        for scenario in unmitigated_scenarios:
-            relationship = self.session.query(Relationship).filter_by(
-                id=scenario.relationship_id
-            ).first()
-            
-            if relationship:
-                source = self.session.query(Entity).filter_by(id=relationship.source_id).first()
-                target = self.session.query(Entity).filter_by(id=relationship.target_id).first()
-                
-                results.append({
-                    'scenario_id': scenario.id,
-                    'description': scenario.description,
-                    'risk_score': scenario.risk_score,
-                    'path': f"{source.name} -> {target.name}",
-                    'action': relationship.action,
-                    'relationship_type': relationship.type,
-                    'hazards': scenario.hazard_refs,
-                    'threat_actors': scenario.threat_actor_refs
-                })
-        
-        return sorted(results, key=lambda x: x['risk_score'], reverse=True)
+            Scenario.risk_score >= min_risk_score,
+            ~exists().where(ScenarioMitigation.scenario_id == Scenario.id)
+        ).order_by(Scenario.risk_score.desc()).all()
+        
+        return [
+            {
+                'scenario_id': row.id,
+                'description': row.description,
+                'risk_score': row.risk_score,
+                'path': f"{row.source_name} -> {row.target_name}",
+                'action': row.action,
+                'relationship_type': row.type,
+                'hazards': row.hazard_refs,
+                'threat_actors': row.threat_actor_refs
+            }
+            for row in rows
+        ]
 
 # Helper functions for common validation tasks
 
@@ -416,37 +487,125 @@ def validate_hazard_references(session: Session, hazard_refs: List[str]) -> Tupl
         return False, list(missing)
     return True, []
 
-def calculate_entity_criticality_score(session: Session, entity_id: str) -> float:
-    """Calculate a criticality score for an entity based on its relationships and risks"""
-    entity = session.query(Entity).filter_by(id=entity_id).first()
-    if not entity:
-        return 0.0
+# Base score per entity criticality; unknown or missing counts as low
+CRITICALITY_WEIGHTS = {'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
+RELATIONSHIP_WEIGHT = 0.1
+RISK_WEIGHT = 0.05
+
+def calculate_entity_criticality_scores(session: Session,
+                                        entity_ids: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Calculate criticality scores for many entities (all when ``entity_ids`` is None)
+
+    Two grouped queries fetch entity criticality and per-entity relationship
+    and scenario risk totals; the scores are then combined as arrays.
+    Returns entity id -> score, relationship_count and risk_score.
+    """
+    entities = session.query(Entity.id, Entity.criticality)
+    if entity_ids is not None:
+        if not entity_ids:
+            return {}
+        entities = entities.filter(Entity.id.in_(entity_ids))
+    entities = entities.all()
+    if not entities:
+        return {}
+    position = {row.id: i for i, row in enumerate(entities)}
     
-    # Base score from entity properties
-    criticality_scores = {'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
-    base_score = criticality_scores.get(entity.criticality, 1)
+    # Each relationship once per endpoint; UNION keeps self-loops single
+    incidence = union(
+        select(Relationship.source_id.label('entity_id'), Relationship.id.label('relationship_id')),
+        select(Relationship.target_id.label('entity_id'), Relationship.id.label('relationship_id'))
+    ).subquery()
+    totals = session.query(
+        incidence.c.entity_id,
+        func.count(distinct(incidence.c.relationship_id)),
+        func.coalesce(func.sum(Scenario.risk_score), 0)
+    ).outerjoin(
+        Scenario, Scenario.relationship_id == incidence.c.relationship_id
+    ).group_by(incidence.c.entity_id)
+    if entity_ids is not None:
+        totals = totals.filter(incidence.c.entity_id.in_(list(position)))
     
-    # Add score based on relationships
-    rel_count = session.query(Relationship).filter(
-        or_(
-            Relationship.source_id == entity_id,
-            Relationship.target_id == entity_id
-        )
-    ).count()
+    base = np.array([CRITICALITY_WEIGHTS.get(row.criticality, 1) for row in entities], dtype=float)
+    relationship_counts = np.zeros(len(entities))
+    risk = np.zeros(len(entities))
+    for entity_id, relationship_count, risk_score in totals:
+        i = position.get(entity_id)
+        if i is not None:
+            relationship_counts[i] = relationship_count
+            risk[i] = risk_score or 0
     
-    # Add score based on associated risks
-    scenarios = session.query(Scenario).join(
-        Relationship, Scenario.relationship_id == Relationship.id
-    ).filter(
-        or_(
-            Relationship.source_id == entity_id,
-            Relationship.target_id == entity_id
-        )
-    ).all()
+    # Combine scores (this is a simple formula - could be more sophisticated)
+    scores = np.round(base + relationship_counts * RELATIONSHIP_WEIGHT + risk * RISK_WEIGHT, 2)
     
-    risk_score = sum(s.risk_score for s in scenarios if hasattr(s, 'risk_score') and s.risk_score)
+    return {
+        row.id: {
+            'score': float(scores[i]),
+            'relationship_count': int(relationship_counts[i]),
+            'risk_score': float(risk[i])
+        }
+        for i, row in enumerate(entities)
+    }
+
+def cached_entity_criticality_scores(session: Session,
+                                     entity_ids: Optional[List[str]] = None) -> Dict[str, float]:
+    """
+    Criticality scores served from entity_criticality_scores
+
+    Entities without a cached score (never computed, or invalidated by a
+    relationship, scenario or criticality change) are scored in bulk and
+    written back in the caller's transaction, which the caller commits.
+    A score is only written if no invalidation happened since the cache
+    was read; otherwise it is returned but left for the next call.
+    """
+    cached = session.query(
+        EntityCriticalityScore.entity_id, EntityCriticalityScore.score, EntityCriticalityScore.version
+    )
+    if entity_ids is not None:
+        cached = cached.filter(EntityCriticalityScore.entity_id.in_(entity_ids))
+    versions = {}
+    scores = {}
+    for row in cached:
+        versions[row.entity_id] = row.version
+        if row.score is not None:
+            scores[row.entity_id] = row.score
     
-    # Combine scores (this is a simple formula - could be more sophisticated)
-    total_score = base_score + (rel_count * 0.1) + (risk_score * 0.05)
+    if entity_ids is None:
+        missing = [row.id for row in session.query(Entity.id).filter(
+            ~Entity.id.in_(
+                select(EntityCriticalityScore.entity_id).where(EntityCriticalityScore.score.isnot(None))
+            )
+        )]
+    else:
+        missing = [entity_id for entity_id in entity_ids if entity_id not in scores]
+    if not missing:
+        return scores
     
-    return round(total_score, 2)
\ No newline at end of file
+    computed = calculate_entity_criticality_scores(session, missing)
+    if computed:
+        # Skipped for rows a trigger created or bumped since the read
+        statement = pg_insert(EntityCriticalityScore).values([
+            {'entity_id': entity_id, 'version': versions.get(entity_id, 0), **values}
+            for entity_id, values in computed.items()
+        ])
+        session.execute(statement.on_conflict_do_update(
+            index_elements=[EntityCriticalityScore.entity_id],
+            set_={
+                'score': statement.excluded.score,
+                'relationship_count': statement.excluded.relationship_count,
+                'risk_score': statement.excluded.risk_score,
+                'computed_at': func.now()
+            },
+            where=EntityCriticalityScore.version == statement.excluded.version
+        ))
+    scores.update((entity_id, values['score']) for entity_id, values in computed.items())
+    return scores
+
+def calculate_entity_criticality_score(session: Session, entity_id: str) -> float:
+    """
+    Criticality score for an entity based on its relationships and risks
+
+    Served from the score cache; a recomputed score is written back in the
+    caller's transaction.
+    """
+    return cached_entity_criticality_scores(session, [entity_id]).get(entity_id, 0.0)
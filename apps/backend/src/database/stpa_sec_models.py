@@ -6,8 +6,8 @@ This module provides SQLAlchemy models for the STPA-Sec+ PostgreSQL schema
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 from sqlalchemy import (
-    Column, String, Text, DateTime, Float, Integer, Boolean, 
-    ForeignKey, CheckConstraint, ARRAY, JSON, Numeric, Date
+    Column, String, Text, DateTime, Float, Integer, BigInteger, Boolean, 
+    ForeignKey, CheckConstraint, ARRAY, JSON, Numeric, Date, Computed, Index
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -103,6 +103,16 @@ class Hazard(Base):
     properties = Column(JSON)
     created_at = Column(DateTime, default=func.now())
 
+class HazardTrace(Base):
+    """Closure of each hazard over its losses, stakeholders, UCAs, scenarios and mitigations"""
+    __tablename__ = 'hazard_trace'
+    
+    hazard_id = Column(String, ForeignKey('hazards.id', ondelete='CASCADE'), primary_key=True)
+    node_type = Column(String, CheckConstraint("node_type IN ('loss', 'stakeholder', 'uca', 'scenario', 'mitigation')"), primary_key=True)
+    node_id = Column(String, primary_key=True)
+    
+    __table_args__ = (Index('idx_hazard_trace_node', 'node_type', 'node_id'),)
+
 class Entity(Base):
     __tablename__ = 'entities'
     
@@ -166,6 +176,18 @@ class Relationship(Base):
     analyses = relationship("Analysis", back_populates="rel")
     scenarios = relationship("Scenario", back_populates="rel")
 
+class EntityCriticalityScore(Base):
+    __tablename__ = 'entity_criticality_scores'
+    
+    entity_id = Column(String, ForeignKey('entities.id', ondelete='CASCADE'), primary_key=True)
+    # NULL while invalidated
+    score = Column(Float)
+    relationship_count = Column(Integer)
+    risk_score = Column(Float)
+    # Bumped by the invalidation triggers
+    version = Column(BigInteger, nullable=False, default=0)
+    computed_at = Column(DateTime, default=func.now())
+
 class AdversaryControlProblem(Base):
     __tablename__ = 'adversary_control_problems'
     
@@ -223,6 +245,13 @@ class Scenario(Base):
     prerequisites = Column(ARRAY(Text))
     likelihood = Column(String, CheckConstraint("likelihood IN ('rare', 'unlikely', 'possible', 'likely', 'certain')"))
     impact = Column(String, CheckConstraint("impact IN ('negligible', 'minor', 'moderate', 'major', 'catastrophic')"))
+    risk_score = Column(Float, Computed(
+        "CASE likelihood WHEN 'rare' THEN 1 WHEN 'unlikely' THEN 2 WHEN 'possible' THEN 3 "
+        "WHEN 'likely' THEN 4 WHEN 'certain' THEN 5 END * "
+        "CASE impact WHEN 'negligible' THEN 1 WHEN 'minor' THEN 2 WHEN 'moderate' THEN 3 "
+        "WHEN 'major' THEN 4 WHEN 'catastrophic' THEN 5 END",
+        persisted=True
+    ))
     d4_assessment = Column(JSON)
     contributing_factors = Column(JSON)
     properties = Column(JSON)
@@ -7,7 +7,7 @@ from uuid import uuid4
 from datetime import datetime
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, and_, or_, exists, func, text
 
 from src.database.stpa_sec_models import (
     SystemDefinition, Stakeholder, Adversary, ControlLoop,
@@ -495,4 +495,62 @@ class STPASecRepository:
         """Get scenarios above a certain risk threshold"""
         return self.session.query(Scenario).filter(
             Scenario.risk_score >= min_risk_score
-        ).order_by(Scenario.risk_score.desc()).all()
\ No newline at end of file
+        ).order_by(Scenario.risk_score.desc()).all()
+    
+    def get_risk_summary_version(self) -> Optional[int]:
+        """
+        Version of the data behind the risk summary, bumped by write triggers
+
+        None when there are no version counters, so nothing would ever
+        invalidate a cached summary.
+        """
+        return self.session.execute(
+            text("SELECT CAST(SUM(version) AS BIGINT) FROM cache_versions WHERE cache_key = 'risk_summary'")
+        ).scalar()
+    
+    def get_risk_summary(self) -> Dict[str, Any]:
+        """Risk posture counts in one aggregate query, plus the top five risks"""
+        high_impact = Scenario.impact.in_(['catastrophic', 'major'])
+        counts = self.session.query(
+            select(func.count(Hazard.id)).scalar_subquery().label('total_hazards'),
+            select(func.count(Mitigation.id)).scalar_subquery().label('total_mitigations'),
+            func.count(Scenario.id).label('total_scenarios'),
+            func.count(Scenario.id).filter(high_impact).label('high_risk_scenarios'),
+            func.count(Scenario.id).filter(Scenario.impact == 'catastrophic').label('critical'),
+            func.count(Scenario.id).filter(Scenario.impact == 'major').label('high'),
+            func.count(Scenario.id).filter(Scenario.impact == 'moderate').label('medium'),
+            func.count(Scenario.id).filter(Scenario.impact == 'minor').label('low'),
+            func.count(Scenario.id).filter(
+                exists().where(ScenarioMitigation.scenario_id == Scenario.id)
+            ).label('mitigated_scenarios')
+        ).select_from(Scenario).one()
+        
+        top_risk_scenarios = self.session.query(
+            Scenario.id, Scenario.description, Scenario.impact, Scenario.likelihood
+        ).filter(high_impact).order_by(Scenario.risk_score.desc(), Scenario.id).limit(5).all()
+        
+        total_scenarios = counts.total_scenarios
+        return {
+            "summary": {
+                "total_hazards": counts.total_hazards,
+                "high_risk_scenarios": counts.high_risk_scenarios,
+                "total_scenarios": total_scenarios,
+                "total_mitigations": counts.total_mitigations,
+                "mitigation_coverage": (counts.mitigated_scenarios / total_scenarios * 100) if total_scenarios > 0 else 0
+            },
+            "risk_distribution": {
+                "critical": counts.critical,
+                "high": counts.high,
+                "medium": counts.medium,
+                "low": counts.low,
+            },
+            "top_risks": [
+                {
+                    "scenario_id": scenario.id,
+                    "description": scenario.description,
+                    "impact": scenario.impact,
+                    "likelihood": scenario.likelihood
+                }
+                for scenario in top_risk_scenarios
+            ]
+        }
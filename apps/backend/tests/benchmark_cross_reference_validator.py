@@ -0,0 +1,84 @@
+"""
+Benchmark CrossReferenceValidator on large synthetic control structures
+
+Usage: python tests/benchmark_cross_reference_validator.py [--components N] [--edges M]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.agents.step2_agents.cross_reference_validator import CrossReferenceValidator
+
+
+def synthetic_phase_results(component_count: int, edge_count: int, seed: int = 7):
+    """A layered structure with a few hierarchy cycles and unknown references mixed in"""
+    rng = random.Random(seed)
+    controllers = [f"CTRL-{i}" for i in range(component_count // 2)]
+    processes = [f"PROC-{i}" for i in range(component_count - len(controllers))]
+    dual_role = controllers[:component_count // 100]
+
+    hierarchy_count = edge_count // 5
+    hierarchy = [
+        {"parent": controllers[i // 4], "child": controllers[i] if i < len(controllers) else rng.choice(processes)}
+        for i in range(1, hierarchy_count + 1)
+    ]
+    hierarchy += [{"parent": controllers[i + 1], "child": controllers[i]} for i in range(0, 50, 5)]
+
+    action_count = (edge_count - len(hierarchy)) // 2
+    actions = [
+        {"identifier": f"CA-{i}", "controller_id": rng.choice(controllers),
+         "controlled_process_id": rng.choice(processes + dual_role + ["PROC-missing"])}
+        for i in range(action_count)
+    ]
+    feedback = [
+        {"identifier": f"FB-{i}", "source_process_id": action["controlled_process_id"],
+         "target_controller_id": action["controller_id"]}
+        for i, action in enumerate(actions[:edge_count - len(hierarchy) - action_count])
+    ]
+    models = [
+        {"identifier": f"PM-{i}", "controller_id": rng.choice(controllers), "process_id": rng.choice(processes)}
+        for i in range(len(controllers))
+    ]
+
+    def result(data):
+        return {"success": True, "data": data}
+
+    return {
+        "control_structure": {"control_structure_analyst": result({"components": {
+            "controllers": [{"identifier": c} for c in controllers],
+            "controlled_processes": [{"identifier": p} for p in processes],
+            "dual_role_components": [{"identifier": d} for d in dual_role],
+            "control_hierarchy": hierarchy,
+        }})},
+        "control_actions": {"control_action_mapping": result({"control_actions": actions})},
+        "feedback_trust": {"feedback_mechanism": result({"feedback_mechanisms": feedback})},
+        "process_models": {"process_model_analyst": result({"process_models": models})},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--components", type=int, default=10_000)
+    parser.add_argument("--edges", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    phase_results = synthetic_phase_results(args.components, args.edges)
+    timings = []
+    for _ in range(args.repeat):
+        validator = CrossReferenceValidator()
+        start = time.perf_counter()
+        report = validator.validate(phase_results)
+        timings.append(time.perf_counter() - start)
+
+    print(f"{args.components} components, {args.edges} edges")
+    print(f"validate: best {min(timings) * 1000:.0f} ms of {args.repeat}")
+    print(f"{len(report['errors'])} errors, {len(report['warnings'])} warnings")
+
+
+if __name__ == "__main__":
+    main()
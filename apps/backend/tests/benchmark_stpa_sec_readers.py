@@ -0,0 +1,121 @@
+"""
+Load test concurrent readers of the STPA-Sec API
+
+Usage: python tests/benchmark_stpa_sec_readers.py [--latency MS] [--requests N]
+
+Serves /stpa-sec/control-loops from SQLite with a simulated database round
+trip of --latency ms per statement, and at each concurrency level measures
+reader latency and how late the event loop wakes a 5 ms timer. --inline runs the queries on the event loop, as the routes
+did before, for comparison. With the bounded pool the loop lag stays near zero
+and reader p99 stays flat up to the pool size.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+
+from api.routes import stpa_sec
+from api.routes.stpa_sec_db import MAX_OVERFLOW, POOL_SIZE, get_sync_db
+from src.database.stpa_sec_models import ControlLoop, Entity, Relationship
+
+
+def build_app(database: Path, latency: float, inline: bool) -> FastAPI:
+    engine = create_engine(f"sqlite:///{database}", connect_args={"check_same_thread": False},
+                           poolclass=QueuePool, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW)
+    for model in (ControlLoop, Entity, Relationship):
+        model.__table__.create(engine, checkfirst=True)
+    with Session(engine) as session:
+        if not session.query(ControlLoop).count():
+            session.add_all([Entity(id="E1", name="Controller"), Entity(id="E2", name="Process")])
+            session.add_all([ControlLoop(id=f"CL{i}", name=f"Loop {i}", controlled_process="E2")
+                             for i in range(200)])
+            session.add_all([Relationship(id=f"R{i}", source_id="E1", target_id="E2", action="cmd",
+                                          type="control", control_loop_id=f"CL{i % 200}")
+                             for i in range(600)])
+            session.commit()
+    event.listen(engine, "before_cursor_execute", lambda *args: time.sleep(latency))
+
+    if inline:
+        async def run_inline(func):
+            return func()
+        stpa_sec.run_in_db_pool = run_inline
+
+    app = FastAPI()
+    app.include_router(stpa_sec.router)
+
+    def session_override():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_sync_db] = session_override
+
+    return app
+
+
+def p99(samples):
+    return statistics.quantiles(samples, n=100)[98] if len(samples) > 1 else samples[0]
+
+
+async def timed(client, path):
+    start = time.perf_counter()
+    response = await client.get(path)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def measure(app, concurrency: int, requests: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        readers, lags = [], []
+        done = asyncio.Event()
+
+        async def reader(count):
+            for _ in range(count):
+                readers.append(await timed(client, "/stpa-sec/control-loops?limit=50"))
+
+        async def watch_loop():
+            # How late the loop wakes a 5 ms timer; requests share its wait
+            while not done.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lags.append(time.perf_counter() - start - 0.005)
+
+        await timed(client, "/stpa-sec/control-loops?limit=50")
+        watching = asyncio.create_task(watch_loop())
+        await asyncio.gather(*(reader(max(1, requests // concurrency)) for _ in range(concurrency)))
+        done.set()
+        await watching
+        return readers, lags
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=5.0, help="simulated ms per statement")
+    parser.add_argument("--requests", type=int, default=240)
+    parser.add_argument("--inline", action="store_true", help="query on the event loop")
+    args = parser.parse_args()
+
+    database = Path(__file__).resolve().parent / ".benchmark_stpa_sec_readers.db"
+    try:
+        app = build_app(database, args.latency / 1000, args.inline)
+        print(f"{'readers':>8} {'reader p50 ms':>14} {'reader p99 ms':>14} {'loop lag p99 ms':>16}")
+        for concurrency in (1, 4, 8, POOL_SIZE + MAX_OVERFLOW):
+            readers, lags = asyncio.run(measure(app, concurrency, args.requests))
+            print(f"{concurrency:>8} {statistics.median(readers) * 1000:>14.1f} "
+                  f"{p99(readers) * 1000:>14.1f} {p99(lags) * 1000:>16.1f}")
+    finally:
+        database.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark Step2SynthesisEnhancer on large synthetic syntheses
+
+Usage: python tests/benchmark_synthesis_enhancement.py [--actions N] [--steps K]
+
+Times the enhancer at N, 2N, ... K*N actions with boundaries and feedback
+growing in proportion; with indexed lookups the time per action stays flat.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.agents.step2_agents.synthesis_enhancement import Step2SynthesisEnhancer
+
+
+def synthetic_synthesis(action_count: int, seed: int = 7):
+    """Synthesis shaped like the coordinator's, with one boundary per 10 actions"""
+    rng = random.Random(seed)
+    controllers = [f"CTRL-{i}" for i in range(max(1, action_count // 5))]
+    processes = [f"PROC-{i}" for i in range(max(1, action_count // 2))]
+    components = controllers + processes
+
+    actions = [
+        {"identifier": f"CA-{i}", "name": f"Action {i}", "type": "command",
+         "from": rng.choice(controllers), "to": rng.choice(processes)}
+        for i in range(action_count)
+    ]
+    feedback = [
+        {"identifier": f"FB-{i}", "name": f"Feedback {i}", "type": "status",
+         "from": action["to"], "to": action["from"]}
+        for i, action in enumerate(actions[::2])
+    ]
+    boundaries = [
+        {"identifier": f"TB-{i}", "name": f"Boundary {i}", "type": rng.choice(["network", "process"]),
+         "between": rng.sample(components, 2)}
+        for i in range(max(1, action_count // 10))
+    ]
+    return {
+        "key_controllers": [{"identifier": c, "name": c, "controls": []} for c in controllers],
+        "critical_control_actions": actions,
+        "key_feedback_mechanisms": feedback,
+        "trust_boundaries": boundaries,
+    }
+
+
+def time_enhancer(action_count: int, repeat: int) -> float:
+    synthesis = synthetic_synthesis(action_count)
+    enhancer = Step2SynthesisEnhancer()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        enhancer.enhance_synthesis(synthesis)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--actions", type=int, default=20_000)
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'actions':>10} {'boundaries':>11} {'ms':>9} {'us/action':>10}")
+    for step in range(1, args.steps + 1):
+        action_count = args.actions * step
+        elapsed = time_enhancer(action_count, args.repeat)
+        print(f"{action_count:>10} {action_count // 10:>11} {elapsed * 1000:>9.0f} "
+              f"{elapsed * 1e6 / action_count:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
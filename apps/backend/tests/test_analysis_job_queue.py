@@ -0,0 +1,142 @@
+"""
+Tests for the durable analysis job queue and its worker
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import MetaData, Uuid, select
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from core.jobs import (
+    AnalysisWorker, claim_next_job, enqueue_analysis, release_expired_leases, request_cancel
+)
+from core.models.database import Analysis, AnalysisJob, Project, User
+from core.models.schemas import AnalysisJobStatus, AnalysisStatus
+from core.websocket import AnalysisEventRelay
+
+TABLES = [User.__table__, Project.__table__, Analysis.__table__, AnalysisJob.__table__]
+
+
+async def make_session_maker(tmp_path):
+    # SQLite cannot render the Postgres UUID type; the generic one stores the same hex
+    metadata = MetaData()
+    for table in TABLES:
+        for column in table.to_metadata(metadata).columns:
+            if isinstance(column.type, UUID):
+                column.type = Uuid()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.create_all)
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def queue_analyses(db, owner_count, per_owner, priority=lambda owner, i: 0):
+    """Queue ``per_owner`` analyses for each of ``owner_count`` tenants"""
+    tenants = []
+    for owner in range(owner_count):
+        user = User(id=uuid4(), email=f"owner{owner}@example.com", hashed_password="x", name=f"Owner {owner}")
+        project = Project(id=uuid4(), name=f"Project {owner}", owner_id=user.id)
+        db.add_all([user, project])
+        tenants.append(user.id)
+        for i in range(per_owner):
+            analysis = Analysis(id=uuid4(), project_id=project.id, system_description="Payments",
+                                frameworks=["stride"], status=AnalysisStatus.PENDING)
+            db.add(analysis)
+            await enqueue_analysis(db, analysis, user.id, {"frameworks": ["stride"]},
+                                   priority=priority(owner, i))
+    return tenants
+
+
+async def test_claims_follow_priority_within_tenant_limits(tmp_path):
+    session_maker = await make_session_maker(tmp_path)
+    async with session_maker() as db:
+        busy, quiet = await queue_analyses(db, 2, 3, priority=lambda owner, i: 10 if owner == 0 else i)
+
+        claimed = []
+        while (job := await claim_next_job(db, "worker-1", lease_seconds=30, tenant_limit=2)) is not None:
+            claimed.append((job.tenant_id, job.priority))
+
+    # The busy tenant's high-priority jobs go first, but only two at a time
+    assert claimed == [(busy, 10), (busy, 10), (quiet, 2), (quiet, 1)]
+
+
+async def test_expired_leases_requeue_until_attempts_run_out(tmp_path):
+    session_maker = await make_session_maker(tmp_path)
+    async with session_maker() as db:
+        await queue_analyses(db, 1, 1)
+        for attempt in range(1, 4):
+            job = await claim_next_job(db, f"worker-{attempt}", lease_seconds=30)
+            assert job.attempts == attempt
+            job.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+            await db.commit()
+            await release_expired_leases(db)
+
+        assert job.status == AnalysisJobStatus.FAILED
+        assert await claim_next_job(db, "worker-4") is None
+        analysis = await db.get(Analysis, job.analysis_id)
+        assert analysis.status == AnalysisStatus.FAILED
+
+
+async def test_worker_runs_and_cancels_jobs(tmp_path):
+    session_maker = await make_session_maker(tmp_path)
+    started, finish = asyncio.Event(), asyncio.Event()
+
+    class Worker(AnalysisWorker):
+        async def run_job(self, job):
+            started.set()
+            await finish.wait()
+            return AnalysisStatus.COMPLETED
+
+    worker = Worker(session_maker, concurrency=2, lease_seconds=30, tenant_limit=2)
+    async with session_maker() as db:
+        await queue_analyses(db, 1, 3)
+
+    assert await worker.run_once() == 2
+    await started.wait()
+    async with session_maker() as db:
+        running = (await db.execute(
+            select(AnalysisJob).where(AnalysisJob.status == AnalysisJobStatus.RUNNING)
+        )).scalars().all()
+        await request_cancel(db, running[0].analysis_id)
+        await db.commit()
+
+    # The next pass heartbeats and sees the cancellation, freeing a slot
+    claimed = await worker.run_once()
+    await asyncio.sleep(0.05)
+    assert claimed + await worker.run_once() == 1
+    finish.set()
+    await asyncio.gather(*worker._runners)
+
+    async with session_maker() as db:
+        jobs = {job.id: job.status for job in (await db.execute(select(AnalysisJob))).scalars()}
+    assert jobs[running[0].id] == AnalysisJobStatus.CANCELLED
+    assert sorted(status.value for status in jobs.values()) == ["cancelled", "completed", "completed"]
+
+
+async def test_relay_forwards_worker_events_to_the_manager():
+    calls = []
+
+    class Manager:
+        async def broadcast_analysis_update(self, *args):
+            calls.append(("analysis_update", args))
+
+        async def broadcast_section_update(self, *args, **kwargs):
+            calls.append(("section_update", args, kwargs))
+
+    relay = AnalysisEventRelay("postgresql://unused", manager=Manager())
+    await relay.dispatch(json.dumps({
+        "type": "analysis_update", "analysis_id": "a1", "status": "in_progress",
+        "progress": 40.0, "message": "Running STRIDE", "metadata": None
+    }))
+    await relay.dispatch(json.dumps({
+        "type": "section_update", "analysis_id": "a1", "framework": "stride",
+        "section_id": "threats", "status": "completed", "content": {"rows": []}, "error": None
+    }))
+
+    assert calls == [
+        ("analysis_update", ("a1", AnalysisStatus.IN_PROGRESS, 40.0, "Running STRIDE", None)),
+        ("section_update", ("a1", "stride", "threats", "completed"), {"content": {"rows": []}, "error": None}),
+    ]
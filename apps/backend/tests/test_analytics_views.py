@@ -0,0 +1,93 @@
+"""
+Tests for materialized analytics view reads and refreshes
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from src.database.analytics_views import (
+    AnalyticsViewRefresher, list_analytics_views, read_analytics_view
+)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE analytics_views (
+              view_name VARCHAR PRIMARY KEY, materialized_name VARCHAR, sort_order TEXT,
+              refreshed_at TIMESTAMP
+            )
+        """))
+        conn.execute(text("""
+            CREATE TABLE analytics_view_changes (
+              id INTEGER PRIMARY KEY, view_name VARCHAR, changed_at TIMESTAMP
+            )
+        """))
+        # Plain tables stand in for the materialized views
+        conn.execute(text("CREATE TABLE mv_entity_complexity (id VARCHAR, total_relationships INT)"))
+        conn.execute(text("CREATE TABLE mv_critical_unmitigated_scenarios (id VARCHAR, risk_score FLOAT)"))
+        conn.execute(text("""
+            INSERT INTO mv_entity_complexity VALUES ('E1', 2), ('E2', 5), ('E3', 1)
+        """))
+        conn.execute(text("""
+            INSERT INTO analytics_views VALUES
+              ('entity_complexity', 'mv_entity_complexity', 'total_relationships DESC',
+               '2026-10-18 09:00:00'),
+              ('critical_unmitigated_scenarios', 'mv_critical_unmitigated_scenarios', 'risk_score DESC',
+               '2026-10-18 09:00:00')
+        """))
+        conn.execute(text("""
+            INSERT INTO analytics_view_changes (view_name, changed_at) VALUES
+              ('critical_unmitigated_scenarios', '2026-10-18 09:45:00'),
+              ('critical_unmitigated_scenarios', '2026-10-18 09:30:00')
+        """))
+    with Session(engine) as session:
+        yield session
+
+
+def test_reads_are_ordered_paginated_and_carry_staleness(session):
+    result = read_analytics_view(session, "entity_complexity", limit=2)
+
+    assert [row["id"] for row in result["rows"]] == ["E2", "E1"]
+    assert result["stale"] is False
+    assert result["refreshed_at"] == datetime(2026, 10, 18, 9).isoformat()
+    assert [row["id"] for row in read_analytics_view(session, "entity_complexity", limit=2, offset=2)["rows"]] == ["E3"]
+
+    stale = read_analytics_view(session, "critical_unmitigated_scenarios")
+    assert stale["stale"] is True and stale["rows"] == []
+    assert stale["stale_since"] == datetime(2026, 10, 18, 9, 30).isoformat()
+    assert [view["view"] for view in list_analytics_views(session)] == [
+        "critical_unmitigated_scenarios", "entity_complexity"
+    ]
+    with pytest.raises(ValueError):
+        read_analytics_view(session, "mv_entity_complexity; DROP TABLE analytics_views")
+
+
+class FakeConnection:
+    """Answers the stale-view query and records refresh calls"""
+
+    def __init__(self, stale, busy=()):
+        self.stale = stale
+        self.busy = set(busy)
+        self.refreshed = []
+
+    async def fetch(self, query):
+        return [{"view_name": name} for name in self.stale]
+
+    async def fetchval(self, query, view_name):
+        self.refreshed.append(view_name)
+        return view_name not in self.busy
+
+
+async def test_refresher_refreshes_each_stale_view_once():
+    connection = FakeConnection(["entity_complexity", "d4_priority_analysis"], busy=["d4_priority_analysis"])
+
+    refreshed = await AnalyticsViewRefresher("postgresql://unused").refresh(connection)
+
+    assert connection.refreshed == ["entity_complexity", "d4_priority_analysis"]
+    # A view another session is refreshing is not reported
+    assert refreshed == ["entity_complexity"]
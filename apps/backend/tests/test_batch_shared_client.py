@@ -0,0 +1,85 @@
+"""
+Tests for the shared batch LLM client and connection budget
+"""
+import asyncio
+
+from core.model_providers import BaseModelClient, ModelResponse
+from core.batch import BatchRunner, DatabasePoolRegistry, SharedModelClient, current_system
+
+
+class SlowClient(BaseModelClient):
+    """Records peak concurrency and answers after a short delay"""
+
+    def __init__(self):
+        super().__init__()
+        self.model = "slow-test"
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    async def generate(self, messages, temperature=0.7, max_tokens=None):
+        self.active += 1
+        self.calls += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return ModelResponse(
+            content=messages[-1]["content"].upper(),
+            model=self.model,
+            usage={"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+        )
+
+
+async def test_concurrency_budget_is_enforced():
+    inner = SlowClient()
+    client = SharedModelClient(inner, max_concurrency=3)
+
+    await asyncio.gather(*(
+        client.generate([{"role": "user", "content": f"prompt {i}"}]) for i in range(12)
+    ))
+
+    assert inner.calls == 12
+    assert inner.peak <= 3
+
+
+async def test_identical_requests_are_cached_and_attributed_per_system():
+    inner = SlowClient()
+    client = SharedModelClient(inner, max_concurrency=4)
+    messages = [{"role": "user", "content": "same prompt"}]
+
+    async def run_as(system):
+        current_system.set(system)
+        return await client.generate(messages)
+
+    first, second, third = await asyncio.gather(run_as("a"), run_as("b"), run_as("b"))
+
+    assert first.content == second.content == third.content == "SAME PROMPT"
+    assert inner.calls == 1
+    totals = client.totals()
+    assert totals.calls == 1
+    assert totals.cache_hits == 2
+    assert client.usage["a"].prompt_tokens + client.usage["b"].prompt_tokens == 10
+
+
+async def test_cache_persists_for_resume(tmp_path):
+    cache_path = tmp_path / "response-cache.jsonl"
+    client = SharedModelClient(SlowClient(), cache_path=cache_path)
+    await client.generate([{"role": "user", "content": "persist me"}])
+    client.save_cache()
+
+    inner = SlowClient()
+    resumed = SharedModelClient(inner, cache_path=cache_path)
+    response = await resumed.generate([{"role": "user", "content": "persist me"}])
+
+    assert response.content == "PERSIST ME"
+    assert inner.calls == 0
+
+
+def test_concurrent_systems_fit_the_connection_cap(tmp_path):
+    pools = DatabasePoolRegistry(lambda db_name: db_name, max_connections=10, per_database=4)
+
+    runner = BatchRunner([], tmp_path, SharedModelClient(SlowClient()), pools,
+                         create_database=None, prepare_step2_database=None, max_systems=4)
+
+    # Each system can hold its whole pool of four connections
+    assert runner.max_systems == 2
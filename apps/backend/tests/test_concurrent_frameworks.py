@@ -0,0 +1,197 @@
+"""
+Tests for concurrent framework execution in run_analysis_task
+"""
+import asyncio
+import time
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import MetaData, Uuid, select
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import api.analysis
+import core.database
+import core.utils.llm_client
+from api.analysis import run_analysis_task
+from config.settings import settings
+from core.models.database import Analysis, AnalysisJob, AnalysisResult, Project, User
+from core.models.schemas import AgentContext, AgentResult, AnalysisStatus, FrameworkType
+from core.utils.llm_client import LLMManager, LLMResponse
+
+TABLES = [User.__table__, Project.__table__, Analysis.__table__, AnalysisResult.__table__, AnalysisJob.__table__]
+
+
+@pytest.fixture
+async def session_maker(tmp_path, monkeypatch):
+    # SQLite cannot render the Postgres UUID type; the generic one stores the same hex
+    metadata = MetaData()
+    for table in TABLES:
+        for column in table.to_metadata(metadata).columns:
+            if isinstance(column.type, UUID):
+                column.type = Uuid()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'analysis.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.create_all)
+    maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(core.database, "async_session_maker", maker)
+    yield maker
+    await engine.dispose()
+
+
+async def create_analysis(session_maker, frameworks):
+    async with session_maker() as db:
+        user = User(id=uuid4(), email="owner@example.com", hashed_password="x", name="Owner")
+        project = Project(id=uuid4(), name="Payments", owner_id=user.id)
+        analysis = Analysis(id=uuid4(), project_id=project.id, system_description="Payments",
+                            frameworks=[f.value for f in frameworks], status=AnalysisStatus.PENDING)
+        db.add_all([user, project, analysis])
+        await db.commit()
+    return AgentContext(analysis_id=analysis.id, system_description="Payments")
+
+
+def fake_registry(runs, on_start=None):
+    """Agent classes that record when each framework ran"""
+
+    def agent_class(framework):
+        class FakeAgent:
+            def __init__(self, db_session=None):
+                pass
+
+            async def analyze(self, context, section_ids=None, notifier=None, save_to_db=False):
+                start = time.perf_counter()
+                if on_start:
+                    await on_start(framework, context)
+                await asyncio.sleep(0.1)
+                if framework == FrameworkType.STPA_SEC:
+                    context.artifacts["stpa-sec_control_structure"] = {"controllers": ["Gateway"]}
+                runs[framework] = (start, time.perf_counter())
+                return AgentResult(framework=framework, sections=[], duration=0.1,
+                                   token_usage={"total_tokens": 10})
+        return FakeAgent
+
+    return {framework: agent_class(framework) for framework in FrameworkType}
+
+
+async def test_stpa_sec_runs_first_then_the_rest_concurrently(session_maker, monkeypatch):
+    frameworks = [FrameworkType.STRIDE, FrameworkType.STPA_SEC, FrameworkType.PASTA,
+                  FrameworkType.DREAD, FrameworkType.HAZOP]
+    context = await create_analysis(session_maker, frameworks)
+    runs, seen_control_structure, stored_before_dread = {}, [], []
+
+    async def on_start(framework, context):
+        if framework != FrameworkType.STPA_SEC:
+            seen_control_structure.append("stpa-sec_control_structure" in context.artifacts)
+        if framework == FrameworkType.DREAD:
+            # Give the quick frameworks time to finish, then look for their results
+            await asyncio.sleep(0.2)
+            async with session_maker() as db:
+                stored_before_dread.extend((await db.execute(select(AnalysisResult.framework))).scalars())
+
+    monkeypatch.setattr(api.analysis, "AGENT_REGISTRY", fake_registry(runs, on_start))
+
+    start = time.perf_counter()
+    status = await run_analysis_task(str(context.analysis_id), context, frameworks)
+    elapsed = time.perf_counter() - start
+
+    assert status == AnalysisStatus.COMPLETED
+    stpa_end = runs[FrameworkType.STPA_SEC][1]
+    assert all(runs[f][0] >= stpa_end for f in frameworks if f != FrameworkType.STPA_SEC)
+    assert all(seen_control_structure)
+    # In turn these would take 0.7 s; concurrently, STPA-Sec plus the slowest (DREAD)
+    assert elapsed < 0.6
+    # Results were committed as each framework finished, not at the end
+    assert FrameworkType.STRIDE in stored_before_dread and FrameworkType.DREAD not in stored_before_dread
+
+    async with session_maker() as db:
+        stored = set((await db.execute(select(AnalysisResult.framework))).scalars())
+        analysis = await db.get(Analysis, context.analysis_id)
+    assert stored == set(frameworks)
+    assert analysis.status == AnalysisStatus.COMPLETED
+
+
+async def test_retry_skips_frameworks_with_results(session_maker, monkeypatch):
+    frameworks = [FrameworkType.STRIDE, FrameworkType.PASTA]
+    context = await create_analysis(session_maker, frameworks)
+    async with session_maker() as db:
+        db.add(AnalysisResult(id=uuid4(), analysis_id=context.analysis_id, framework=FrameworkType.STRIDE,
+                              sections=[], artifacts=[]))
+        await db.commit()
+    runs = {}
+    monkeypatch.setattr(api.analysis, "AGENT_REGISTRY", fake_registry(runs))
+
+    assert await run_analysis_task(str(context.analysis_id), context, frameworks) == AnalysisStatus.COMPLETED
+    assert list(runs) == [FrameworkType.PASTA]
+
+
+async def test_retry_restores_stored_stpa_sec_artifacts(session_maker, monkeypatch):
+    frameworks = [FrameworkType.STPA_SEC, FrameworkType.STRIDE, FrameworkType.PASTA]
+    context = await create_analysis(session_maker, frameworks)
+    async with session_maker() as db:
+        db.add(AnalysisResult(id=uuid4(), analysis_id=context.analysis_id, framework=FrameworkType.STPA_SEC,
+                              sections=[
+                                  {"section_id": "control_structure", "content": {"controllers": ["Ledger"]},
+                                   "status": "completed"},
+                                  {"section_id": "hazards", "content": {}, "status": "failed"},
+                              ], artifacts=[]))
+        await db.commit()
+    runs, seen_artifacts = {}, {}
+
+    async def on_start(framework, context):
+        seen_artifacts[framework] = dict(context.artifacts)
+
+    monkeypatch.setattr(api.analysis, "AGENT_REGISTRY", fake_registry(runs, on_start))
+
+    assert await run_analysis_task(str(context.analysis_id), context, frameworks) == AnalysisStatus.COMPLETED
+    assert set(runs) == {FrameworkType.STRIDE, FrameworkType.PASTA}
+    assert all(artifacts == {"stpa-sec_control_structure": {"controllers": ["Ledger"]}}
+               for artifacts in seen_artifacts.values())
+
+
+async def test_cancel_during_the_run_is_not_overwritten(session_maker, monkeypatch):
+    frameworks = [FrameworkType.STPA_SEC, FrameworkType.STRIDE]
+    context = await create_analysis(session_maker, frameworks)
+
+    async def on_start(framework, context):
+        if framework == FrameworkType.STRIDE:
+            async with session_maker() as db:
+                await api.analysis.cancel_analysis(context.analysis_id, db)
+
+    monkeypatch.setattr(api.analysis, "AGENT_REGISTRY", fake_registry({}, on_start))
+
+    assert await run_analysis_task(str(context.analysis_id), context, frameworks) == AnalysisStatus.CANCELLED
+    async with session_maker() as db:
+        analysis = await db.get(Analysis, context.analysis_id)
+    assert analysis.status == AnalysisStatus.CANCELLED and analysis.completed_at is None
+
+    # A job claimed after the cancel does not start the analysis again
+    assert await run_analysis_task(str(context.analysis_id), context, frameworks) == AnalysisStatus.CANCELLED
+
+
+async def test_llm_calls_stay_within_the_budget(monkeypatch):
+    monkeypatch.setattr(settings, "llm_max_concurrency", 2)
+    monkeypatch.setattr(settings, "active_provider", None)
+
+    async def no_db():
+        raise RuntimeError("no database")
+        yield
+
+    monkeypatch.setattr(core.utils.llm_client, "get_db", no_db)
+    in_flight, peak = 0, 0
+
+    class SlowClient:
+        async def generate(self, prompt, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.02)
+            in_flight -= 1
+            return LLMResponse(content=prompt, model="slow", provider="custom", usage={}, latency=0.02)
+
+    manager = LLMManager()
+    manager.clients = {settings.fallback_order[0]: SlowClient()}
+    manager._db_checked = True
+
+    responses = await asyncio.gather(*(manager.generate(f"prompt {i}") for i in range(6)))
+    assert [r.content for r in responses] == [f"prompt {i}" for i in range(6)]
+    assert peak == 2
@@ -0,0 +1,74 @@
+"""
+Tests for grouped control loop analysis
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from src.database.relationship_modeling import RelationshipModeler
+from src.database.stpa_sec_models import ControlLoop, Entity, Relationship
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    for model in (ControlLoop, Entity, Relationship):
+        model.__table__.create(engine)
+    recent = (datetime.now() - timedelta(days=2)).isoformat()
+    old = (datetime.now() - timedelta(days=90)).isoformat()
+    with Session(engine) as session:
+        session.add_all([
+            Entity(id="E1", name="Controller"),
+            Entity(id="E2", name="Process"),
+            # Control without feedback and a stale model
+            ControlLoop(id="CL1", name="Payments", controlled_process="E2",
+                        model_validation={"last_validated": old}),
+            ControlLoop(id="CL2", name="Ledger", controlled_process="E2",
+                        model_validation={"last_validated": recent}),
+            # No relationships and never validated
+            ControlLoop(id="CL3", name="Idle", controlled_process="E2"),
+            ControlLoop(id="CL4", name="Reports", controlled_process="E2"),
+            Relationship(id="R1", source_id="E1", target_id="E2", action="post", type="control", control_loop_id="CL1"),
+            Relationship(id="R2", source_id="E1", target_id="E2", action="void", type="control", control_loop_id="CL1"),
+            Relationship(id="R3", source_id="E1", target_id="E2", action="post", type="control", control_loop_id="CL2"),
+            Relationship(id="R4", source_id="E2", target_id="E1", action="ack", type="feedback", control_loop_id="CL2"),
+            Relationship(id="R5", source_id="E1", target_id="E2", action="run", type="control", control_loop_id="CL4"),
+        ])
+        session.commit()
+        statements.clear()
+        session.statements = statements
+        yield session
+
+
+def test_loops_are_analyzed_in_one_query(session):
+    loops = RelationshipModeler(session).analyze_control_loops()
+
+    assert len(session.statements) == 1
+    assert [loop["loop_id"] for loop in loops] == ["CL1", "CL2", "CL3", "CL4"]
+    assert loops[0]["relationship_count"] == 2 and loops[0]["feedback_count"] == 0
+    assert [issue["type"] for issue in loops[0]["issues"]] == ["missing_feedback", "stale_process_model"]
+    assert loops[1]["control_count"] == 1 and loops[1]["feedback_count"] == 1
+    assert loops[1]["issues"] == [] and loops[2]["issues"] == []
+    assert loops[2]["relationship_count"] == 0
+
+
+def test_report_filters_by_issue_and_paginates(session):
+    modeler = RelationshipModeler(session)
+
+    missing = modeler.control_loop_report("missing_feedback")
+    assert missing["total"] == 2
+    assert [loop["loop_id"] for loop in missing["loops"]] == ["CL1", "CL4"]
+
+    page = modeler.control_loop_report(offset=1, limit=2)
+    assert page["total"] == 4
+    assert [loop["loop_id"] for loop in page["loops"]] == ["CL2", "CL3"]
+
+    stale = modeler.control_loop_report("stale_process_model")
+    assert [loop["loop_id"] for loop in stale["loops"]] == ["CL1"]
+
+    with pytest.raises(ValueError):
+        modeler.control_loop_report("unknown")
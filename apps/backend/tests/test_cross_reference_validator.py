@@ -0,0 +1,77 @@
+"""
+Tests for graph-based Step 2 cross-reference validation
+"""
+from core.agents.step2_agents.cross_reference_validator import CrossReferenceValidator
+from core.agents.step2_agents.validation_graph import ValidationGraph
+
+
+def phase_results(controllers, processes, hierarchy=(), actions=(), feedback=(), dual_role=(), models=()):
+    def result(data):
+        return {"success": True, "data": data}
+
+    return {
+        "control_structure": {"control_structure_analyst": result({"components": {
+            "controllers": [{"identifier": c} for c in controllers],
+            "controlled_processes": [{"identifier": p} for p in processes],
+            "dual_role_components": [{"identifier": d} for d in dual_role],
+            "control_hierarchy": [{"parent": parent, "child": child} for parent, child in hierarchy],
+        }})},
+        "control_actions": {"control_action_mapping": result({"control_actions": [
+            {"identifier": f"CA-{i}", "controller_id": c, "controlled_process_id": p}
+            for i, (c, p) in enumerate(actions, start=1)
+        ]})},
+        "feedback_trust": {"feedback_mechanism": result({"feedback_mechanisms": [
+            {"identifier": f"FB-{i}", "source_process_id": p, "target_controller_id": c}
+            for i, (p, c) in enumerate(feedback, start=1)
+        ]})},
+        "process_models": {"process_model_analyst": result({"process_models": [
+            {"identifier": f"PM-{i}", "controller_id": c, "process_id": p}
+            for i, (c, p) in enumerate(models, start=1)
+        ]})},
+    }
+
+
+def messages(report, error_type):
+    return [e["message"] for e in report["errors"] + report["warnings"] if e["type"] == error_type]
+
+
+def test_each_hierarchy_cycle_is_reported_once():
+    report = CrossReferenceValidator().validate(phase_results(
+        ["A", "B", "C", "D"], ["P"],
+        hierarchy=[("A", "B"), ("B", "C"), ("C", "A"), ("C", "B"), ("D", "D"), ("A", "P")],
+    ))
+
+    cycles = messages(report, "circular_hierarchy")
+    assert len(cycles) == 2
+    assert "Circular dependency detected: D -> D" in cycles
+    assert any(message.startswith("Circular dependency detected: A -> B -> C -> A") for message in cycles)
+
+
+def test_references_and_roles_are_checked_against_the_graph():
+    report = CrossReferenceValidator().validate(phase_results(
+        ["C1"], ["P1"], dual_role=["D1"],
+        actions=[("C1", "P1"), ("C1", "P9")],
+        feedback=[("D1", "C1")],
+        models=[("C1", "P1"), ("C1", "D1")],
+    ))
+
+    assert messages(report, "invalid_reference") == ["Control action references non-existent process: P9"]
+    assert messages(report, "partial_dual_role") == [
+        "Dual-role component D1 only acts as a process, not as a controller"
+    ]
+    assert messages(report, "orphan_process_model") == [
+        "Process model exists but no control action from C1 to D1"
+    ]
+
+
+def test_tarjan_handles_deep_hierarchies():
+    graph = ValidationGraph()
+    chain = [graph.node(f"N{i}") for i in range(20000)]
+    for parent, child in zip(chain, chain[1:]):
+        graph.children[parent].append(child)
+    graph.children[chain[-1]].append(chain[0])
+
+    components = graph.strongly_connected_components()
+
+    assert len(components) == 1
+    assert len(graph.find_cycles()[0]) == 20000
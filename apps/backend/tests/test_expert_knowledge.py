@@ -0,0 +1,51 @@
+"""
+Tests for the shared expert knowledge index
+"""
+import os
+
+from core.agents.expert_knowledge import KnowledgeIndexRegistry, chunk_markdown, tokenize
+
+
+def write_docs(directory):
+    (directory / "principles.md").write_text(
+        "# Principles\n\n"
+        "## Feedback\n\nEvery control action needs a feedback path back to the controller.\n\n"
+        "## Trust Boundaries\n\nTrust boundaries sit where authentication or authorization changes.\n"
+    )
+    (directory / "glossary.md").write_text("# Glossary\n\nA hazard is a system state that leads to a loss.\n")
+
+
+def test_markdown_is_chunked_by_section():
+    chunks = chunk_markdown("doc", "# A\n\nalpha\n\n## B\n\nbeta\n")
+
+    assert [(chunk.heading, chunk.text) for chunk in chunks] == [("A", "alpha"), ("B", "beta")]
+    assert tokenize("Control Actions and the feedback") == ["control", "action", "feedback"]
+
+
+def test_search_returns_relevant_chunks(tmp_path):
+    write_docs(tmp_path)
+    index = KnowledgeIndexRegistry().index(tmp_path)
+    assert index.search("trust boundary") == []
+    index.refresh()
+
+    top = index.search("trust boundary authorization", k=1)
+
+    assert top[0].heading == "Trust Boundaries"
+    assert set(index.documents) == {"principles", "glossary"}
+
+
+async def test_index_is_shared_and_picks_up_changes(tmp_path):
+    write_docs(tmp_path)
+    registry = KnowledgeIndexRegistry()
+    index = registry.index(tmp_path)
+    assert registry.index(tmp_path) is index
+    await index.refresh_async()
+    assert index.search("process model belief") == []
+
+    glossary = tmp_path / "glossary.md"
+    glossary.write_text("# Glossary\n\nA process model is the controller's belief about the process.\n")
+    stat = glossary.stat()
+    os.utime(glossary, (stat.st_atime, stat.st_mtime + 10))
+
+    assert index.refresh(force=True)
+    assert index.search("process model belief", k=1)[0].source == "glossary"
@@ -0,0 +1,140 @@
+"""
+Tests for the ExpertAgent rule-based pre-screen and assessment cache
+"""
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+from core.agents.expert_agent import ExpertAgent, OperatingMode, QualityLevel
+from core.agents.step2_agents.base_step2 import AgentResult
+
+
+class CountingProvider:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate(self, messages, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(content=json.dumps({"quality_level": "excellent", "overall_score": 0.95, "issues": []}))
+
+
+def make_expert():
+    provider = CountingProvider()
+    expert = ExpertAgent(provider, Path("/nonexistent"), OperatingMode.FULLY_AUTOMATED)
+    return expert, provider
+
+
+STRUCTURE = {
+    "components": {
+        "controllers": [{"identifier": "CTRL-1"}, {"identifier": "CTRL-2"}],
+        "controlled_processes": [{"identifier": "PROC-1"}, {"identifier": "PROC-2"}],
+        "hierarchy_depth": 2
+    }
+}
+
+CONTEXT = {
+    "control_structure": {
+        "control_structure_analyst": AgentResult(
+            agent_type="control_structure_analyst", success=True, data=STRUCTURE, execution_time_ms=1
+        )
+    }
+}
+
+
+async def test_clear_pass_needs_no_llm_call():
+    expert, provider = make_expert()
+
+    result = await expert.supervise_step_analysis(2, "control_structure_analyst", STRUCTURE, {})
+
+    assert result["success"]
+    assert result["quality_assessment"]["quality_level"] == QualityLevel.ACCEPTABLE
+    assert result["iteration_history"][0]["assessed_by"] == "prescreen"
+    assert provider.calls == 0
+
+
+async def test_agents_without_standards_always_get_expert_review():
+    expert, provider = make_expert()
+    output = {"trust_boundaries": [
+        {"identifier": "TB-1", "component_a_id": "CTRL-1", "component_b_id": "PROC-1"}
+    ]}
+
+    # Well-formed with valid references, but no rule says whether it is any good
+    assessment = await expert.assess_output_quality(2, "trust_boundary", output, CONTEXT)
+
+    assert assessment["quality_level"] == QualityLevel.EXCELLENT
+    assert assessment.get("assessed_by") != "prescreen"
+    assert provider.calls == 1
+
+
+async def test_thin_action_mapping_gets_expert_review():
+    expert, provider = make_expert()
+    output = {"control_actions": {"control_actions": [
+        {"identifier": "CA-1", "action_name": "Route Payment", "controller_id": "CTRL-1",
+         "controlled_process_id": "PROC-1"}
+    ]}}
+
+    # Plausible and correctly referenced, but CTRL-2 and PROC-2 have no actions
+    assert expert.prescreen.assess(2, "control_action_mapping", output, CONTEXT) is None
+    assessment = await expert.assess_output_quality(2, "control_action_mapping", output, CONTEXT)
+    assert assessment.get("assessed_by") != "prescreen"
+    assert provider.calls == 1
+
+
+async def test_clear_failure_gets_rule_based_guidance():
+    expert, provider = make_expert()
+    output = {"control_actions": {"control_actions": [
+        {"identifier": "CA-1", "action_name": "Configure Routing", "controller_id": "CTRL-9",
+         "controlled_process_id": "PROC-1"}
+    ]}}
+
+    guidance = []
+
+    async def refine(refinement_guidance):
+        guidance.append(refinement_guidance)
+        return output
+
+    result = await expert.supervise_step_analysis(2, "control_action_mapping", output, CONTEXT, refine=refine)
+
+    assessment = result["quality_assessment"]
+    assert assessment["quality_level"] == QualityLevel.NEEDS_IMPROVEMENT
+    assert "undefined_components" in {issue["type"] for issue in assessment["issues"]}
+    assert "CTRL-9" in guidance[0]["priority_fixes"][0]["issue"]
+    assert provider.calls == 0
+    stats = expert.supervision_stats()
+    # Two assessments and one round of guidance
+    assert stats["llm_calls_avoided"] == 3
+    assert stats["llm_calls"] == 0
+
+
+async def test_undecided_outputs_are_assessed_once_per_output():
+    expert, provider = make_expert()
+    output = {"control_actions": {"control_actions": [
+        {"identifier": "CA-1", "action_name": "Manage Network", "controller_id": "CTRL-1",
+         "controlled_process_id": "PROC-1"}
+    ]}}
+
+    first = await expert.assess_output_quality(2, "control_action_mapping", output, CONTEXT)
+    second = await expert.assess_output_quality(2, "control_action_mapping", output, CONTEXT)
+
+    assert first["quality_level"] == second["quality_level"] == QualityLevel.EXCELLENT
+    assert second["assessed_by"] == "cache"
+    assert provider.calls == 1
+    assert expert.supervision_stats()["cached_assessments"] == 1
+
+
+async def test_cached_assessments_are_keyed_by_context():
+    expert, provider = make_expert()
+    output = {"control_actions": {"control_actions": [
+        {"identifier": "CA-1", "action_name": "Manage Network", "controller_id": "CTRL-1",
+         "controlled_process_id": "PROC-1"}
+    ]}}
+    other_structure = {"components": {**STRUCTURE["components"], "controllers": [{"identifier": "CTRL-1"}]}}
+    other_context = {"control_structure": {"control_structure_analyst": AgentResult(
+        agent_type="control_structure_analyst", success=True, data=other_structure, execution_time_ms=1
+    )}}
+
+    await expert.assess_output_quality(2, "control_action_mapping", output, CONTEXT)
+    second = await expert.assess_output_quality(2, "control_action_mapping", output, other_context)
+
+    assert second.get("assessed_by") != "cache"
+    assert provider.calls == 2
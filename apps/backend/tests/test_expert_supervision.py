@@ -0,0 +1,115 @@
+"""
+Tests for concurrent, budgeted ExpertAgent supervision of Step 2 agents
+"""
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+from core.agents.expert_agent import ExpertAgent, OperatingMode, SupervisionBudget
+from core.agents.expert_integration import ExpertSupervisedCoordinator
+from core.agents.step2_agents.base_step2 import AgentResult, BaseStep2Agent
+from core.agents.step2_agents.step2_coordinator import Step2Coordinator
+
+
+class FakePool:
+    @asynccontextmanager
+    async def acquire(self):
+        yield object()
+
+
+class ScriptedProvider:
+    """Rates every output with the next score, and answers guidance requests"""
+
+    def __init__(self, scores):
+        self.scores = list(scores)
+
+    async def generate(self, messages, **kwargs):
+        await asyncio.sleep(0)
+        if "assessing the quality" in messages[-1]["content"]:
+            score = self.scores.pop(0) if self.scores else 0.5
+            level = "excellent" if score >= 0.9 else "needs_improvement"
+            return SimpleNamespace(content=json.dumps({"quality_level": level, "overall_score": score, "issues": []}))
+        return SimpleNamespace(content=json.dumps({"priority_fixes": [], "prompt_additions": []}))
+
+
+class SleepyAgent(BaseStep2Agent):
+    consumes = ()
+    active = 0
+    peak = 0
+    runs = 0
+    stored = {}
+
+    async def analyze(self, step1_analysis_id, step2_analysis_id, previous_results=None):
+        SleepyAgent.active += 1
+        SleepyAgent.runs += 1
+        run = SleepyAgent.runs
+        SleepyAgent.peak = max(SleepyAgent.peak, SleepyAgent.active)
+        await asyncio.sleep(0.02)
+        SleepyAgent.active -= 1
+        await self._store_result(self._store, run)
+        return AgentResult(agent_type=self.__class__.__name__, success=True,
+                           data={"run": run}, execution_time_ms=20)
+
+    async def _store(self, run):
+        SleepyAgent.stored.setdefault(self.__class__.__name__, []).append(run)
+
+
+def make_supervisor(scores):
+    class First(SleepyAgent):
+        pass
+
+    class Second(SleepyAgent):
+        pass
+
+    base = Step2Coordinator(None, None, db_pool=FakePool())
+    base.phases = [{"name": "fanout", "agents": ["first", "second"], "parallel": True}]
+    base.agent_classes = {"first": First, "second": Second}
+    base.current_step2_id = "s2"
+    expert = ExpertAgent(ScriptedProvider(scores), Path("/nonexistent"), OperatingMode.FULLY_AUTOMATED)
+    SleepyAgent.active = SleepyAgent.peak = SleepyAgent.runs = 0
+    SleepyAgent.stored = {}
+    return ExpertSupervisedCoordinator(base, expert)
+
+
+async def test_independent_agents_are_supervised_concurrently():
+    supervisor = make_supervisor([0.95, 0.95])
+
+    phase_results, supervision = await supervisor._execute_graph_with_supervision(
+        "s1", max_refinements=3, budget=SupervisionBudget(3)
+    )
+
+    assert SleepyAgent.peak == 2
+    assert set(phase_results["fanout"]) == {"first", "second"}
+    assert all(result["success"] for result in supervision["fanout"].values())
+
+
+async def test_refinement_stops_when_quality_stops_improving():
+    supervisor = make_supervisor([0.4, 0.6, 0.58])
+
+    budget = SupervisionBudget(10)
+    phase_results, supervision = await supervisor._execute_graph_with_supervision(
+        "s1", max_refinements=5, budget=budget
+    )
+
+    # One agent improves once, then regresses; its best output is kept
+    stopped = [result for result in supervision["fanout"].values() if result.get("stop_reason") == "no_improvement"]
+    assert stopped
+    assert budget.used_iterations < 10
+    # Only the kept output reaches the database
+    assert SleepyAgent.stored == {
+        agent.capitalize(): [result.data["run"]] for agent, result in phase_results["fanout"].items()
+    }
+    assert SleepyAgent.runs > len(SleepyAgent.stored)
+
+
+async def test_refinements_share_one_budget():
+    supervisor = make_supervisor([0.3, 0.3])
+
+    budget = SupervisionBudget(1)
+    _, supervision = await supervisor._execute_graph_with_supervision("s1", max_refinements=5, budget=budget)
+
+    assert budget.used_iterations == 1
+    assert sum(result["retry_count"] for result in supervision["fanout"].values()) == 1
+    assert any(result.get("stop_reason") == "iteration_budget" for result in supervision["fanout"].values())
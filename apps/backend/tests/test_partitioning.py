@@ -0,0 +1,122 @@
+"""
+Tests for partitioned analysis of large control structures
+"""
+import asyncio
+
+from core.agents.step1_agents.base_step1 import CognitiveStyle
+from core.agents.step2_agents.component_registry import ComponentRegistry
+from core.agents.step2_agents.control_action_mapping import ControlActionMappingAgent
+from core.agents.step2_agents.partitioning import (
+    partition_registry, merge_partition_lists, normalized, should_partition
+)
+
+
+def make_registry(subtrees=8, children=11):
+    """One controller per subtree, each controlling ``children`` processes"""
+    registry = ComponentRegistry()
+    for tree in range(subtrees):
+        controller = f"CTRL-{tree}"
+        registry.register_component(
+            controller, f"Controller {tree}", "controller", "", "test",
+            trust_level="high" if tree % 2 else "low"
+        )
+        for child in range(children):
+            process = f"PROC-{tree}-{child}"
+            registry.register_component(process, f"Process {tree}.{child}", "process", "", "test")
+            registry.add_reference(controller, process)
+    # One edge crossing between subtrees
+    registry.add_reference("CTRL-0", "PROC-7-0")
+    return registry
+
+
+def test_partitions_cover_every_component_once():
+    registry = make_registry()
+    partitions = partition_registry(registry, max_size=30)
+
+    members = [identifier for partition in partitions for identifier in partition.members]
+    assert sorted(members) == sorted(registry.components)
+    assert all(len(partition.members) <= 30 for partition in partitions)
+    # Subtrees stay together
+    for partition in partitions:
+        for identifier in partition.members:
+            if identifier.startswith("PROC-"):
+                tree = identifier.split("-")[1]
+                assert f"CTRL-{tree}" in partition.members or identifier == "PROC-7-0"
+
+
+def test_interface_lists_neighbours_in_other_partitions():
+    registry = make_registry()
+    partitions = partition_registry(registry, max_size=30)
+
+    owner = {identifier: p for p in partitions for identifier in p.members}
+    if owner["CTRL-0"] is not owner["PROC-7-0"]:
+        assert "PROC-7-0" in owner["CTRL-0"].interface
+        assert "CTRL-0" in owner["PROC-7-0"].interface
+    for partition in partitions:
+        assert not set(partition.interface) & set(partition.members)
+
+
+def test_merge_drops_duplicates_and_renumbers():
+    parts = [
+        [{"identifier": "CA-1", "name": "Stop  Pump"}, {"identifier": "CA-2", "name": "Open valve"}],
+        [{"identifier": "CA-1", "name": "stop pump"}, {"identifier": "CA-2", "name": "Close valve"}],
+    ]
+    merged, remaps, duplicates = merge_partition_lists(
+        parts, key=lambda item: normalized(item["name"]), id_field="identifier", id_prefix="CA"
+    )
+
+    assert [item["identifier"] for item in merged] == ["CA-1", "CA-2", "CA-3"]
+    assert duplicates == 1
+    assert remaps[1] == {"CA-1": "CA-1", "CA-2": "CA-3"}
+
+
+class FakeConnection:
+    async def fetch(self, query, *args):
+        return []
+
+
+async def test_large_structures_are_mapped_partition_by_partition():
+    registry = make_registry()
+    assert should_partition(registry)
+    control_structure = {
+        "controllers": [
+            {"id": f"db-{identifier}", "identifier": identifier, "name": component.name}
+            for identifier, component in registry.components.items() if component.type == "controller"
+        ],
+        "processes": [
+            {"id": f"db-{identifier}", "identifier": identifier, "name": component.name}
+            for identifier, component in registry.components.items() if component.type == "process"
+        ],
+    }
+
+    agent = ControlActionMappingAgent(None, FakeConnection(), CognitiveStyle.BALANCED)
+    active = peak = 0
+
+    async def query_llm_structured(messages, schema, **kwargs):
+        nonlocal active, peak
+        prompt = messages[-1]["content"]
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        # Every partition containing CTRL-0 or its interface reports the crossing action
+        actions = [
+            {"identifier": f"CA-{index + 1}", "action_name": f"Command {controller['identifier']}",
+             "controller_id": controller["identifier"], "controlled_process_id": "PROC-7-0"}
+            for index, controller in enumerate(
+                c for c in control_structure["controllers"] if f"- {c['identifier']}:" in prompt
+            )
+            if controller["identifier"] == "CTRL-0"
+        ]
+        return {"control_actions": actions}
+
+    agent.query_llm_structured = query_llm_structured
+    step1_results = {
+        "system_name": "Plant", "mission_statement": "", "losses": [], "hazards": [],
+        "security_constraints": [], "stakeholders": [], "system_boundaries": []
+    }
+    result = await agent._map_partitioned(step1_results, control_structure, registry)
+
+    assert peak > 1
+    assert result["partitioning"]["partitions"] == len(partition_registry(registry))
+    assert [action["identifier"] for action in result["control_actions"]] == ["CA-1"]
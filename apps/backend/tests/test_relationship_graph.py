@@ -0,0 +1,153 @@
+"""
+Tests for the CSR relationship graph behind RelationshipModeler
+"""
+import random
+
+from src.database.relationship_graph import RelationshipGraph
+from src.database.relationship_modeling import RelationshipModeler
+from src.database.stpa_sec_models import Adversary, AdversaryControlProblem, Scenario
+
+
+def random_graph(node_count=12, edge_count=40, seed=1):
+    rng = random.Random(seed)
+    nodes = [f"E{i}" for i in range(node_count)]
+    relationships = [
+        (f"R{i}", rng.choice(nodes), rng.choice(nodes), f"act{i}", "control")
+        for i in range(edge_count)
+    ]
+    return nodes, relationships
+
+
+def brute_force_paths(relationships, source, target, max_length):
+    """Every simple path as relationship ids, by unpruned search"""
+    paths = []
+
+    def walk(node, visited, path):
+        if node == target:
+            paths.append(tuple(path))
+            return
+        if len(path) == max_length:
+            return
+        for rel_id, src, dst, _, _ in relationships:
+            if src == node and dst not in visited:
+                walk(dst, visited | {dst}, path + [rel_id])
+
+    walk(source, {source}, [])
+    return paths
+
+
+def as_ids(graph, paths):
+    return [tuple(graph.relationship_ids[edge] for edge in path) for path in paths]
+
+
+def test_path_queries_match_brute_force():
+    nodes, relationships = random_graph()
+    graph = RelationshipGraph(nodes, relationships)
+
+    for source, target in [("E0", "E5"), ("E3", "E7"), ("E1", "E11")]:
+        expected = brute_force_paths(relationships, source, target, 4)
+        bounded = as_ids(graph, graph.paths_up_to(source, target, max_length=4))
+        assert sorted(bounded) == sorted(expected)
+        assert graph.count_paths(source, target, max_length=4) == len(expected)
+
+        # Yen's algorithm returns distinct paths in non-decreasing length
+        shortest = as_ids(graph, graph.shortest_paths(source, target, k=10, max_length=4))
+        assert len(set(shortest)) == len(shortest) == min(10, len(expected))
+        assert [len(p) for p in shortest] == sorted(len(p) for p in expected)[:len(shortest)]
+        assert set(shortest) <= set(expected)
+
+
+def test_reachability_and_degree():
+    relationships = [
+        ("R1", "A", "B", "cmd", "control"),
+        ("R2", "B", "C", "cmd", "control"),
+        ("R3", "C", "B", "status", "feedback"),
+        ("R4", "D", "D", "self-check", "feedback"),
+        ("R5", "C", "X", "cmd", "control"),  # X is not a loaded entity
+    ]
+    graph = RelationshipGraph(["A", "B", "C", "D"], relationships)
+
+    assert graph.reachable(["A"]) == {"A": 0, "B": 1, "C": 2, "X": 3}
+    assert graph.reachable(["A"], max_hops=1) == {"A": 0, "B": 1}
+    assert graph.reachable(["C"], direction="in") == {"C": 0, "B": 1, "A": 2}
+    assert graph.degree("B") == 3 and graph.degree("D") == 1
+    assert as_ids(graph, [graph.incident_edges("C")]) == [("R2", "R3", "R5")]
+
+
+def test_find_critical_paths_is_bounded():
+    # A ladder where every rung doubles the number of A -> Z paths
+    relationships = []
+    for i in range(20):
+        relationships += [
+            (f"U{i}", f"N{i}", f"N{i + 1}", "up", "control"),
+            (f"D{i}", f"N{i}", f"M{i}", "down", "control"),
+            (f"J{i}", f"M{i}", f"N{i + 1}", "join", "control"),
+        ]
+    graph = RelationshipGraph([], relationships)
+    modeler = RelationshipModeler(session=None)
+    modeler._graph = graph
+
+    paths = modeler.find_critical_paths("N0", "N20", max_length=25, limit=5)
+
+    assert len(paths) == 5
+    assert paths[0] == [f"U{i}:up" for i in range(20)]
+    assert all(len(path) == 21 for path in paths[1:])
+    assert modeler.find_critical_paths("N0", "N20", max_length=19) == []
+
+
+class FakeQuery(list):
+    def filter(self, *conditions):
+        return self
+
+    def filter_by(self, **values):
+        return FakeQuery(row for row in self if all(getattr(row, k) == v for k, v in values.items()))
+
+    def all(self):
+        return list(self)
+
+    def first(self):
+        return self[0] if self else None
+
+
+class FakeSession:
+    """Serves fixed rows per model and counts queries"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def query(self, model):
+        self.queries += 1
+        return FakeQuery(self.rows.get(model, []))
+
+
+def test_adversary_influence_reaches_n_hops_for_all_adversaries():
+    relationships = [
+        ("R1", "E1", "E2", "cmd", "control"),
+        ("R2", "E3", "E2", "status", "feedback"),
+        ("R3", "E3", "E4", "cmd", "control"),
+        ("R4", "E5", "E6", "cmd", "control"),
+    ]
+    session = FakeSession({
+        Adversary: [Adversary(id="A1", name="Insider", type="insider"),
+                    Adversary(id="A2", name="Crew", type="organized_crime")],
+        AdversaryControlProblem: [AdversaryControlProblem(adversary_id="A1", entity_id="E1"),
+                                  AdversaryControlProblem(adversary_id="A2", entity_id="E6")],
+        Scenario: [Scenario(id="S1", threat_actor_refs=["A1", "A2"]),
+                   Scenario(id="S2", threat_actor_refs=["A1"])],
+    })
+    modeler = RelationshipModeler(session)
+    modeler._graph = RelationshipGraph([f"E{i}" for i in range(1, 7)], relationships)
+
+    one_hop = modeler.analyze_all_adversary_influence()
+    two_hops = modeler.analyze_all_adversary_influence(max_hops=2)
+
+    assert session.queries == 6
+    assert one_hop["A1"]["total_influenced_entities"] == 2
+    assert one_hop["A1"]["influenced_relationships"] == 1
+    # Influence follows relationships in either direction
+    assert two_hops["A1"]["influenced_entities_by_hop"] == {1: 1, 2: 1}
+    assert two_hops["A1"]["influenced_relationships"] == 2
+    assert two_hops["A1"]["associated_scenarios"] == 2
+    assert two_hops["A2"]["total_influenced_entities"] == 2
+    assert two_hops["A2"]["associated_scenarios"] == 1
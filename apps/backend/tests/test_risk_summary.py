@@ -0,0 +1,115 @@
+"""
+Tests for the aggregate, ETag-cached risk summary
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from api.routes import stpa_sec
+from api.routes.stpa_sec_db import get_sync_db
+from storage.repositories.stpa_sec import STPASecRepository
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as conn:
+        # The ARRAY columns of the real tables are not needed here
+        conn.execute(text("CREATE TABLE hazards (id VARCHAR PRIMARY KEY)"))
+        conn.execute(text("CREATE TABLE mitigations (id VARCHAR PRIMARY KEY)"))
+        conn.execute(text("""
+            CREATE TABLE scenarios (
+              id VARCHAR PRIMARY KEY, description TEXT, likelihood VARCHAR, impact VARCHAR, risk_score FLOAT
+            )
+        """))
+        conn.execute(text("CREATE TABLE scenario_mitigations (scenario_id VARCHAR, mitigation_id VARCHAR)"))
+        conn.execute(text("""
+            CREATE TABLE cache_versions (
+              cache_key VARCHAR, slot INT, version INT, PRIMARY KEY (cache_key, slot)
+            )
+        """))
+        conn.execute(text("INSERT INTO cache_versions VALUES ('risk_summary', 0, 1), ('risk_summary', 1, 0)"))
+        conn.execute(text("INSERT INTO hazards VALUES ('H1'), ('H2')"))
+        conn.execute(text("INSERT INTO mitigations VALUES ('M1')"))
+        conn.execute(text("""
+            INSERT INTO scenarios VALUES
+              ('S1', 'Forged command', 'likely', 'catastrophic', 20),
+              ('S2', 'Replay', 'possible', 'major', 12),
+              ('S3', 'Delay', 'likely', 'moderate', 12),
+              ('S4', 'Noise', 'rare', 'minor', 2)
+        """))
+        conn.execute(text("INSERT INTO scenario_mitigations VALUES ('S1', 'M1'), ('S3', 'M1')"))
+    return engine
+
+
+def test_summary_is_one_aggregate_query(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    with Session(engine) as session:
+        summary = STPASecRepository(session).get_risk_summary()
+
+    # One aggregate and one top-risks query
+    assert len(statements) == 2
+    assert summary["summary"] == {
+        "total_hazards": 2, "high_risk_scenarios": 2, "total_scenarios": 4,
+        "total_mitigations": 1, "mitigation_coverage": 50.0
+    }
+    assert summary["risk_distribution"] == {"critical": 1, "high": 1, "medium": 1, "low": 1}
+    assert [risk["scenario_id"] for risk in summary["top_risks"]] == ["S1", "S2"]
+
+
+def make_client(engine):
+    app = FastAPI()
+    app.include_router(stpa_sec.router)
+
+    def session_override():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_sync_db] = session_override
+    return TestClient(app)
+
+
+def test_endpoint_serves_304_until_a_write_bumps_the_version(engine):
+    client = make_client(engine)
+
+    first = client.get("/stpa-sec/risk-summary")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.json()["summary"]["total_scenarios"] == 4
+
+    assert client.get("/stpa-sec/risk-summary", headers={"If-None-Match": etag}).status_code == 304
+
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO scenarios VALUES ('S5', 'New', 'likely', 'major', 16)"))
+        conn.execute(text("UPDATE cache_versions SET version = version + 1 WHERE slot = 1"))
+
+    changed = client.get("/stpa-sec/risk-summary", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["summary"]["total_scenarios"] == 5
+
+
+def test_if_none_match_accepts_lists_wildcards_and_strong_tags(engine):
+    client = make_client(engine)
+    etag = client.get("/stpa-sec/risk-summary").headers["etag"]
+
+    for header in ['"other", ' + etag, "*", etag.removeprefix("W/"), '"a",' + etag + ' , "b"']:
+        assert client.get("/stpa-sec/risk-summary", headers={"If-None-Match": header}).status_code == 304
+    assert client.get("/stpa-sec/risk-summary", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_summary_is_not_cached_without_version_counters(engine):
+    client = make_client(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM cache_versions"))
+
+    first = client.get("/stpa-sec/risk-summary")
+    assert first.status_code == 200 and "etag" not in first.headers
+
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO scenarios VALUES ('S5', 'New', 'likely', 'major', 16)"))
+    assert client.get("/stpa-sec/risk-summary").json()["summary"]["total_scenarios"] == 5
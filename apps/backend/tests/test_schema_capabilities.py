@@ -0,0 +1,68 @@
+"""
+Tests for the cached schema capability registry
+"""
+from core.schema_capabilities import SchemaCapabilityRegistry
+
+
+class CatalogConnection:
+    """Serves a fixed catalog and counts probe queries"""
+
+    def __init__(self, database, rows):
+        self.database = database
+        self.rows = rows
+        self.probes = 0
+
+    async def fetchval(self, query, *args):
+        return self.database
+
+    async def fetch(self, query, *args):
+        self.probes += 1
+        return self.rows
+
+
+def catalog(*tables):
+    rows = []
+    for table, columns in tables:
+        if not columns:
+            rows.append({"table_name": table, "column_name": None, "data_type": None, "is_nullable": None})
+        for name, data_type, nullable in columns:
+            rows.append({"table_name": table, "column_name": name, "data_type": data_type, "is_nullable": nullable})
+    return rows
+
+
+async def test_profile_is_probed_once_per_database():
+    registry = SchemaCapabilityRegistry()
+    first = CatalogConnection("analysis_a", catalog(("step1_losses", [("id", "uuid", False)])))
+    second = CatalogConnection("analysis_b", catalog(("losses", [("id", "uuid", False)])))
+
+    for _ in range(3):
+        profile_a = await registry.profile(first)
+        profile_b = await registry.profile(second)
+
+    assert first.probes == 1 and second.probes == 1
+    assert profile_a.has_table("step1_losses") and not profile_b.has_table("step1_losses")
+
+    registry.invalidate("analysis_a")
+    await registry.profile(first)
+    assert first.probes == 2
+
+
+async def test_columns_and_migration_version():
+    registry = SchemaCapabilityRegistry()
+    conn = CatalogConnection("analysis", catalog(
+        ("step1_losses", [("id", "uuid", False)]),
+        ("step2_analyses", [("id", "uuid", False), ("metadata", "jsonb", True)]),
+        ("system_components", [("id", "uuid", False), ("identifier", "character varying(50)", True)]),
+        ("process_models", [("model_name", "character varying(255)", False)]),
+        ("empty_view", []),
+    ))
+
+    profile = await registry.profile(conn)
+
+    assert profile.has_column("system_components", "identifier")
+    assert not profile.has_column("system_components", "name")
+    assert profile.has_table("empty_view")
+    assert profile.column("process_models", "model_name").is_nullable is False
+    # 021 created process_models, but 026 (nullable model_name) is not applied
+    assert "026_process_models_cleanup.sql" not in profile.applied_migrations
+    assert profile.migration_version == 21
@@ -0,0 +1,86 @@
+"""
+Tests for the shared Step 1 snapshot used by Step 2 agents
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from core.agents.step2_agents.step1_snapshot import Step1Snapshot, load_step1_snapshot
+from core.agents.step2_agents.feedback_mechanism import FeedbackMechanismAgent
+
+
+class FakeConnection:
+    """Answers snapshot queries and records how many were issued"""
+
+    def __init__(self, log):
+        self.log = log
+        self.busy = False
+
+    async def fetchval(self, query, *args):
+        return "snapshot_test"
+
+    async def fetchrow(self, query, *args):
+        self.log.append("header")
+        return {"name": "Banking", "mission_statement": "Move money safely"}
+
+    async def fetch(self, query, *args):
+        if "pg_catalog" in query:
+            return [
+                {"table_name": table, "column_name": "id", "data_type": "uuid", "is_nullable": False}
+                for table in ("step1_losses", "step1_hazards", "step1_stakeholders")
+            ]
+        assert not self.busy, "concurrent queries on one connection"
+        self.busy = True
+        await asyncio.sleep(0.01)
+        self.busy = False
+        self.log.append("fetch")
+        if "FROM step1_losses" in query:
+            return [{"id": 1, "identifier": "L-1", "description": "Funds lost"}]
+        if "FROM step1_stakeholders" in query:
+            return [{"id": 2, "name": "Customer", "trust_level": "low"}]
+        return []
+
+
+class FakePool:
+    def __init__(self, log):
+        self.log = log
+        self.acquired = 0
+
+    @asynccontextmanager
+    async def acquire(self):
+        self.acquired += 1
+        yield FakeConnection(self.log)
+
+
+async def test_snapshot_is_read_only():
+    log = []
+    snapshot = await load_step1_snapshot(FakeConnection(log), "a1")
+
+    assert snapshot["system_name"] == "Banking"
+    assert snapshot["losses"][0]["identifier"] == "L-1"
+    with pytest.raises(TypeError):
+        snapshot["losses"][0]["identifier"] = "L-2"
+    with pytest.raises(AttributeError):
+        snapshot["losses"].append({})
+    assert snapshot.to_dict()["losses"] == [{"id": 1, "identifier": "L-1", "description": "Funds lost"}]
+    assert log == ["header"] + ["fetch"] * 5
+
+
+async def test_snapshot_queries_run_on_pooled_connections():
+    log = []
+    pool = FakePool(log)
+    snapshot = await load_step1_snapshot(FakeConnection(log), "a1", pool)
+
+    assert pool.acquired == 5
+    assert snapshot["stakeholders"][0]["name"] == "Customer"
+
+
+async def test_agent_reuses_snapshot_it_was_given():
+    log = []
+    snapshot = Step1Snapshot({"analysis_id": "a1", "losses": []})
+    agent = FeedbackMechanismAgent(None, FakeConnection(log))
+    agent.step1_snapshot = snapshot
+
+    assert await agent.load_step1_results("a1") is snapshot
+    assert log == []
@@ -0,0 +1,129 @@
+"""
+Tests for batched Step 2 writes through Step2DBCompat
+"""
+import uuid
+from contextlib import asynccontextmanager
+
+from core.agents.step2_agents import db_compat
+from core.agents.step2_agents.db_compat import Step2DBCompat
+
+
+def catalog(unique_key: bool, identifier: bool = True):
+    rows = []
+    for table in db_compat.ENTITY_COLUMNS:
+        columns = ["id", "analysis_id", *db_compat.ENTITY_COLUMNS[table]]
+        if identifier:
+            columns.append("identifier")
+        rows += [{"kind": "column", "table_name": table, "column_name": name,
+                  "data_type": "character varying", "is_nullable": True} for name in columns]
+        if unique_key and identifier:
+            rows.append({"kind": "unique", "table_name": table, "column_name": "analysis_id,identifier",
+                         "data_type": None, "is_nullable": None})
+    return rows
+
+
+class RecordingConnection:
+    """Serves a catalog and stored identifiers, recording every statement"""
+
+    def __init__(self, rows, stored=None):
+        self.database = f"analysis_{uuid.uuid4().hex}"
+        self.rows = rows
+        self.stored = stored or {}
+        self.calls = []
+        self.transactions = 0
+
+    async def fetchval(self, query, *args):
+        return self.database
+
+    async def fetch(self, query, *args):
+        if "pg_catalog" in query:
+            self.calls.append(("probe",))
+            return self.rows
+        self.calls.append(("fetch", query))
+        return [{"identifier": identifier, "id": self.stored[identifier]}
+                for identifier in args[1] if identifier in self.stored]
+
+    async def executemany(self, query, records):
+        self.calls.append(("executemany", query, list(records)))
+        if "ON CONFLICT" in query:
+            for record in records:
+                self.stored.setdefault(record[2], record[0])
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.calls.append(("copy", table, list(records), columns))
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.transactions += 1
+        yield
+
+    def statements(self, kind):
+        return [call for call in self.calls if call[0] == kind]
+
+
+def components(count):
+    return [
+        {"identifier": f"CTRL-{i}", "name": f"Controller {i}", "component_type": "controller",
+         "description": "", "abstraction_level": "service", "source": "inferred", "metadata": {}}
+        for i in range(count)
+    ]
+
+
+async def test_upsert_mode_writes_one_batch_and_keeps_existing_ids():
+    conn = RecordingConnection(catalog(unique_key=True), stored={"CTRL-0": "existing"})
+    writer = Step2DBCompat(conn)
+
+    ids = await writer.insert_components("A1", components(3) + components(1))
+
+    [(_, query, records)] = conn.statements("executemany")
+    assert "ON CONFLICT (analysis_id, identifier) DO UPDATE" in query
+    # The repeated identifier is written once
+    assert len(records) == 3
+    assert ids["CTRL-0"] == "existing" and set(ids) == {"CTRL-0", "CTRL-1", "CTRL-2"}
+    assert conn.transactions == 1
+
+    # The schema is probed once per writer, not per call
+    await writer.insert_trust_boundaries("A1", [])
+    await writer.insert_control_actions("A1", [{
+        "identifier": "CA-1", "controller_id": "c", "controlled_process_id": "p", "action_name": "Route"
+    }])
+    assert len(conn.statements("probe")) == 1
+
+
+async def test_merge_mode_updates_known_identifiers_and_inserts_the_rest():
+    conn = RecordingConnection(catalog(unique_key=False), stored={"CTRL-1": "existing"})
+
+    ids = await Step2DBCompat(conn).insert_components("A1", components(3))
+
+    update, insert = conn.statements("executemany")
+    assert update[1].startswith("UPDATE system_components") and update[2][0][0] == "existing"
+    assert insert[1].startswith("INSERT INTO system_components")
+    assert [record[2] for record in insert[2]] == ["CTRL-0", "CTRL-2"]
+    assert ids["CTRL-1"] == "existing"
+
+
+async def test_legacy_schema_appends_large_batches_with_copy():
+    conn = RecordingConnection(catalog(unique_key=False, identifier=False))
+
+    ids = await Step2DBCompat(conn).insert_components("A1", components(db_compat.COPY_THRESHOLD))
+
+    assert not conn.statements("executemany")
+    [(_, table, records, columns)] = conn.statements("copy")
+    assert table == "system_components" and "identifier" not in columns
+    assert len(records) == len(ids) == db_compat.COPY_THRESHOLD
+    # Without the column the identifier travels in metadata
+    assert '"identifier": "CTRL-0"' in records[0][-1]
+
+
+async def test_trust_boundary_agent_stores_empty_protection_as_object():
+    conn = RecordingConnection(catalog(unique_key=True))
+    writer = Step2DBCompat(conn)
+    boundary = {"identifier": "TB-1", "boundary_name": "Edge", "component_a_id": "a",
+                "component_b_id": "b", "trust_direction": "none"}
+
+    await writer.insert_trust_boundaries("A1", [{**boundary, "data_protection_requirements": {}}])
+    await writer.insert_trust_boundary("id", "A1", "TB-2", "Edge", None, "a", "b", "none", None, None, {})
+
+    first, second = conn.statements("executemany")
+    assert first[2][0][-1] == "{}"
+    assert second[2][0][-1] is None
@@ -0,0 +1,157 @@
+"""
+Tests for concurrent and dependency-driven Step 2 agent execution
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from core.agents.step1_agents.base_step1 import CognitiveStyle
+from core.agents.step2_agents.base_step2 import AgentResult
+from core.agents.step2_agents.step2_coordinator import Step2Coordinator
+
+
+class FakeConnection:
+    def __init__(self, name):
+        self.name = name
+        self.stored = []
+
+    async def execute(self, query, *args):
+        self.stored.append(args[2])
+
+
+class FakePool:
+    def __init__(self):
+        self.handed_out = []
+
+    @asynccontextmanager
+    async def acquire(self):
+        conn = FakeConnection(f"pooled-{len(self.handed_out)}")
+        self.handed_out.append(conn)
+        yield conn
+
+
+class SleepyAgent:
+    active = 0
+    peak = 0
+
+    def __init__(self, model_provider, db_connection, cognitive_style):
+        self.db_connection = db_connection
+        self.cognitive_style = cognitive_style
+
+    async def analyze(self, step1_analysis_id, step2_analysis_id, previous_results=None):
+        SleepyAgent.active += 1
+        SleepyAgent.peak = max(SleepyAgent.peak, SleepyAgent.active)
+        await asyncio.sleep(0.05)
+        SleepyAgent.active -= 1
+        return AgentResult(
+            agent_type=self.__class__.__name__,
+            success=True,
+            data={"connection": self.db_connection.name},
+            execution_time_ms=50
+        )
+
+
+class FailingAgent(SleepyAgent):
+    async def analyze(self, step1_analysis_id, step2_analysis_id, previous_results=None):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("model unavailable")
+
+
+def make_coordinator(db_pool):
+    coordinator = Step2Coordinator(None, FakeConnection("main"), db_pool=db_pool)
+    coordinator.agent_classes = {"first": SleepyAgent, "second": SleepyAgent, "broken": FailingAgent}
+    coordinator.agent_config["standard"] = {
+        "first": [CognitiveStyle.TECHNICAL],
+        "second": [CognitiveStyle.SYSTEMATIC],
+        "broken": [CognitiveStyle.CREATIVE],
+    }
+    return coordinator
+
+
+async def test_parallel_agents_run_concurrently_on_own_connections():
+    SleepyAgent.peak = 0
+    pool = FakePool()
+    coordinator = make_coordinator(pool)
+
+    results = await coordinator._execute_parallel_agents(
+        ["first", "second", "broken"], "s2", "s1", "standard", {}, phase_name="fanout"
+    )
+
+    assert SleepyAgent.peak == 2
+    assert results["first"].data["connection"] != results["second"].data["connection"]
+    assert results["broken_creative_error"] == "model unavailable"
+    # Each successful agent stored its own result on its own connection
+    assert sorted(c.stored[0] for c in pool.handed_out if c.stored) == ["SleepyAgent", "SleepyAgent"]
+    assert coordinator.db_connection.stored == []
+
+    timing = coordinator.phase_timings["fanout"]
+    assert timing["parallel"] is True
+    assert timing["time_saved_ms"] > 0
+
+
+async def test_without_pool_agents_share_main_connection_sequentially():
+    SleepyAgent.peak = 0
+    coordinator = make_coordinator(None)
+
+    results = await coordinator._execute_parallel_agents(
+        ["first", "second"], "s2", "s1", "standard", {}, phase_name="fanout"
+    )
+
+    assert SleepyAgent.peak == 1
+    assert results["first"].data["connection"] == "main"
+    assert coordinator.phase_timings["fanout"]["parallel"] is False
+
+
+def make_graph_coordinator(db_pool):
+    class Structure(SleepyAgent):
+        consumes = ()
+
+    class Actions(SleepyAgent):
+        consumes = ("structure",)
+
+    class Feedback(SleepyAgent):
+        consumes = ("structure", "actions")
+
+    class Models(SleepyAgent):
+        consumes = ("actions",)
+
+    coordinator = Step2Coordinator(None, FakeConnection("main"), db_pool=db_pool)
+    coordinator.phases = [
+        {"name": "structure", "agents": ["structure"]},
+        {"name": "actions", "agents": ["actions"]},
+        {"name": "feedback", "agents": ["feedback"], "parallel": True},
+        {"name": "models", "agents": ["models"]},
+    ]
+    coordinator.agent_classes = {
+        "structure": Structure, "actions": Actions, "feedback": Feedback, "models": Models
+    }
+    coordinator.agent_config["standard"] = {name: [CognitiveStyle.BALANCED] for name in coordinator.agent_classes}
+    return coordinator
+
+
+async def test_agents_start_when_their_inputs_exist():
+    SleepyAgent.peak = 0
+    coordinator = make_graph_coordinator(FakePool())
+
+    phase_results = await coordinator._execute_agent_graph("s2", "s1", "standard")
+
+    assert list(phase_results) == ["structure", "actions", "feedback", "models"]
+    assert phase_results["models"]["models"].success
+    # Feedback and process models both only wait for actions
+    assert SleepyAgent.peak == 2
+    schedule = coordinator.schedule
+    assert schedule["critical_path"][:2] == ["structure", "actions"]
+    assert len(schedule["critical_path"]) == 3
+    agents = schedule["agents"]
+    assert agents["feedback"]["wait_ms"] >= agents["actions"]["finished_at_ms"]
+    assert agents["models"]["depends_on"] == ["actions"]
+    assert schedule["time_saved_ms"] > 0
+
+
+async def test_dependency_cycles_are_rejected():
+    coordinator = make_graph_coordinator(None)
+    coordinator.agent_classes["structure"].consumes = ("models",)
+
+    with pytest.raises(ValueError, match="cycle"):
+        coordinator.build_agent_graph()
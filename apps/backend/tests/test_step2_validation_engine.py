@@ -0,0 +1,99 @@
+"""
+Tests for the shared Step 2 result model and incremental rule engine
+"""
+from core.agents.step2_agents.cross_reference_validator import CrossReferenceValidator
+from core.validation import Step2ResultModel, Step2Validator
+
+
+def result(data):
+    return {"success": True, "data": data}
+
+
+def phase_results(models=(("C1", "P1"),)):
+    return {
+        "control_structure": {"control_structure_analyst": result({"components": {
+            "controllers": [{"identifier": "C1", "name": "Controller", "authority_level": "high"}],
+            "controlled_processes": [{"identifier": "P1"}],
+            "control_hierarchy": [{"parent": "C1", "child": "P1"}],
+        }})},
+        "control_actions": {"control_action_mapping": result({"control_actions": [
+            {"identifier": "CA-1", "controller_id": "C1", "controlled_process_id": "P1"}
+        ]})},
+        "feedback_trust": {"feedback_mechanism": result({"feedback_mechanisms": [
+            {"identifier": "FB-1", "source_process_id": "P1", "target_controller_id": "C1"}
+        ]})},
+        "process_models": {"process_model_analyst": result({"process_models": [
+            {"identifier": f"PM-{i}", "controller_id": c, "process_id": p}
+            for i, (c, p) in enumerate(models, start=1)
+        ]})},
+    }
+
+
+def test_model_reextracts_only_changed_phases():
+    results = phase_results()
+    model = Step2ResultModel(results)
+    graph = model.graph
+
+    assert model.sync(results) == set()
+    assert model.graph is graph
+
+    results["process_models"] = phase_results(models=[("C1", "P9")])["process_models"]
+    assert model.sync(results) == {"process_models"}
+    assert model.process_models[0]["process_id"] == "P9"
+    # The graph does not read process models
+    assert model.graph is graph
+
+
+def test_only_rules_reading_a_changed_phase_are_rerun():
+    validator = CrossReferenceValidator()
+    results = phase_results()
+
+    first = validator.validate(results)
+    assert first["valid"]
+    assert first["rules"]["rules_run"] == len(CrossReferenceValidator.rules)
+    assert set(first["rules"]["timings_ms"]) == {rule.name for rule in CrossReferenceValidator.rules}
+
+    results["process_models"] = phase_results(models=[("C1", "P9")])["process_models"]
+    second = validator.validate(results)
+
+    assert second["rules"]["rules_run"] == 2
+    assert second["rules"]["rules_reused"] == len(CrossReferenceValidator.rules) - 2
+    assert [error["message"] for error in second["errors"]] == [
+        "Process model references non-existent process: P9"
+    ]
+
+
+def test_refined_agent_output_reuses_other_phases():
+    validator = CrossReferenceValidator()
+    context = phase_results()
+    output = {"feedback_mechanisms": [
+        {"identifier": "FB-1", "source_process_id": "P2", "target_controller_id": "C1"}
+    ]}
+
+    validator.validate_agent_output("feedback_mechanism", output, context)
+    refined = validator.validate_agent_output("feedback_mechanism", output, context)
+
+    # Only the three rules reading feedback_trust run again
+    assert validator.engine.rules_run == 3
+    assert validator.engine.rules_reused == len(CrossReferenceValidator.rules) - 3
+    assert refined["errors"][0]["message"] == "Feedback references non-existent source process: P2"
+
+
+def test_validators_share_one_model():
+    results = phase_results()
+    model = Step2ResultModel(results)
+    synthesis = {
+        "key_controllers": [{"identifier": "C1", "name": "Controller", "controls": ["P1"]}],
+        "critical_control_actions": [{"identifier": "CA-1", "from": "C1", "to": "P1", "potential_ucas": ["UCA-1"]}],
+        "key_feedback_mechanisms": [{"identifier": "FB-1", "source": "P1", "target": "C1"}],
+        "trust_boundaries": [],
+    }
+
+    CrossReferenceValidator().validate(results, model=model)
+    validator = Step2Validator()
+    report = validator.validate({"phase_results": results, "synthesis": synthesis}, model=model)
+    again = validator.validate({"phase_results": results, "synthesis": synthesis}, model=model)
+
+    assert [issue["category"] for issue in report["issues"]] == ["trust_boundaries", "connectivity"]
+    assert again["rules"]["rules_reused"] == len(Step2Validator.rules)
+    assert again["issues"] == report["issues"]
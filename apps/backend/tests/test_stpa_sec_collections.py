@@ -0,0 +1,86 @@
+"""
+Tests for keyset pagination, field projection and NDJSON on STPA-Sec collections
+"""
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from api.routes import stpa_sec, stpa_sec_pagination
+from api.routes.stpa_sec_db import get_sync_db
+from src.database.stpa_sec_models import Entity, Relationship
+
+
+@pytest.fixture
+def client():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Entity.__table__.create(engine)
+    Relationship.__table__.create(engine)
+    with Session(engine) as session:
+        session.add_all([
+            Entity(id=f"E{i:02d}", name=f"Entity {i}", description="component",
+                   properties={"type": "controller" if i % 2 else "process", "responsibilities": ["run"]})
+            for i in range(7)
+        ] + [
+            Relationship(id=f"R{i}", source_id="E00", target_id=f"E{i:02d}", action="cmd",
+                         type="control", properties={"control_actions": ["start"]})
+            for i in range(1, 4)
+        ])
+        session.commit()
+
+    app = FastAPI()
+    app.include_router(stpa_sec.router)
+
+    def session_override():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_sync_db] = session_override
+    return TestClient(app)
+
+
+def test_keyset_pages_cover_the_collection_once(client):
+    ids, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/stpa-sec/entities", params=params)
+        assert response.status_code == 200
+        ids += [entity["id"] for entity in response.json()]
+        pages += 1
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+        assert f"cursor={cursor}" in response.headers["link"]
+
+    assert ids == [f"E{i:02d}" for i in range(7)]
+    assert pages == 3
+    first = client.get("/stpa-sec/entities", params={"limit": 1}).json()[0]
+    assert first == {"id": "E00", "name": "Entity 0", "type": "process",
+                     "description": "component", "responsibilities": ["run"]}
+
+
+def test_fields_project_columns_and_filters_still_apply(client):
+    response = client.get("/stpa-sec/entities", params={"fields": "id,type", "entity_type": "controller"})
+    assert response.json() == [{"id": f"E{i:02d}", "type": "controller"} for i in (1, 3, 5)]
+
+    relationships = client.get("/stpa-sec/relationships", params={"entity_id": "E02", "fields": "id,control_actions"})
+    assert relationships.json() == [{"id": "R2", "control_actions": ["start"]}]
+
+    assert client.get("/stpa-sec/entities", params={"fields": "id,secret"}).status_code == 400
+    assert client.get("/stpa-sec/entities", params={"cursor": "not a cursor!"}).status_code == 400
+
+
+def test_ndjson_streams_every_row_after_the_cursor(client, monkeypatch):
+    monkeypatch.setattr(stpa_sec_pagination, "STREAM_BATCH_SIZE", 2)
+    cursor = client.get("/stpa-sec/entities", params={"limit": 2}).headers["x-next-cursor"]
+
+    response = client.get("/stpa-sec/entities", params={"cursor": cursor, "fields": "id"},
+                          headers={"Accept": "application/x-ndjson"})
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == [{"id": f"E{i:02d}"} for i in range(2, 7)]
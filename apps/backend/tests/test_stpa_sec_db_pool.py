@@ -0,0 +1,61 @@
+"""
+Tests that STPA-Sec reads run on the bounded database pool, off the event loop
+"""
+import asyncio
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from api.routes import stpa_sec
+from api.routes.stpa_sec_db import get_sync_db, run_in_db_pool
+from src.database.stpa_sec_models import ControlLoop, Entity, Relationship
+
+
+async def test_blocking_work_leaves_the_event_loop_responsive():
+    threads = set()
+
+    def blocking_query():
+        threads.add(threading.current_thread().name)
+        time.sleep(0.2)
+        return "done"
+
+    readers = [asyncio.create_task(run_in_db_pool(blocking_query)) for _ in range(4)]
+    start = time.perf_counter()
+    await asyncio.sleep(0.01)
+    # The loop woke on time while four 200 ms queries were running
+    assert time.perf_counter() - start < 0.1
+    assert await asyncio.gather(*readers) == ["done"] * 4
+    assert all(name.startswith("stpa-sec-db") for name in threads)
+    assert time.perf_counter() - start < 0.4
+
+
+def test_route_queries_run_on_the_pool():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    for model in (ControlLoop, Entity, Relationship):
+        model.__table__.create(engine)
+    threads = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda *args: threads.append(threading.current_thread().name))
+    with Session(engine) as session:
+        session.add(ControlLoop(id="CL1", name="Payments", controlled_process="E1"))
+        session.commit()
+    threads.clear()
+
+    app = FastAPI()
+    app.include_router(stpa_sec.router)
+
+    def session_override():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_sync_db] = session_override
+    response = TestClient(app).get("/stpa-sec/control-loops")
+
+    assert response.status_code == 200
+    assert response.json()["total"] == 1
+    assert threads and all(name.startswith("stpa-sec-db") for name in threads)
@@ -0,0 +1,89 @@
+"""
+Tests for the cognitive-style synthesis engine
+"""
+import random
+import time
+
+from core.agents.step1_agents.synthesis_engine import CognitiveSynthesisEngine
+
+
+def _style_results(style, losses):
+    return {"cognitive_style": style, "results": {"losses": losses}}
+
+
+def test_paraphrased_findings_are_merged():
+    """Paraphrases from different styles collapse into one finding"""
+    engine = CognitiveSynthesisEngine()
+    results = [
+        _style_results("intuitive", [
+            {"loss_category": "financial", "description": "Loss of customer funds through unauthorized transactions"},
+        ]),
+        _style_results("technical", [
+            {"loss_category": "financial", "description": "Unauthorized transactions causing loss of customer funds"},
+        ]),
+    ]
+
+    merged = engine.merge(results, "losses", group_fields=("loss_category",), text_field="description")
+
+    assert len(merged) == 1
+    assert merged[0]["found_by_styles"] == ["intuitive", "technical"]
+    assert merged[0]["merged_variants"][0]["style"] == "technical"
+
+
+def test_distinct_findings_and_categories_stay_separate():
+    """Different findings, or the same text in different categories, are not merged"""
+    engine = CognitiveSynthesisEngine()
+    results = [
+        _style_results("intuitive", [
+            {"loss_category": "financial", "description": "Loss of customer funds"},
+            {"loss_category": "privacy", "description": "Exposure of personal data to unauthorized parties"},
+        ]),
+        _style_results("creative", [
+            {"loss_category": "regulatory", "description": "Loss of customer funds"},
+            {"loss_category": "mission", "description": "Inability to deliver critical medical supplies"},
+        ]),
+    ]
+
+    merged = engine.merge(results, "losses", group_fields=("loss_category",), text_field="description")
+
+    assert len(merged) == 4
+    assert engine.style_contributions(merged) == {"intuitive": 2, "creative": 2}
+
+
+def test_on_merge_hook_and_exact_keys():
+    """Exact-key lists merge without text and hooks see every duplicate"""
+    engine = CognitiveSynthesisEngine()
+    seen = []
+    results = [
+        {"cognitive_style": "technical", "results": {"deps": [{"from": "L-1", "to": "L-2"}]}},
+        {"cognitive_style": "systematic", "results": {"deps": [{"from": "L-1", "to": "L-2"}, {"from": "L-2", "to": "L-3"}]}},
+    ]
+
+    merged = engine.merge(results, "deps", group_fields=("from", "to"),
+                          on_merge=lambda item, dup, style: seen.append(style))
+
+    assert len(merged) == 2
+    assert merged[0]["found_by_styles"] == ["technical", "systematic"]
+    assert seen == ["systematic"]
+
+
+def test_clustering_scales_to_many_findings():
+    """Hundreds of findings across many styles cluster in under five seconds"""
+    engine = CognitiveSynthesisEngine()
+    rng = random.Random(7)
+    vocabulary = [f"term{n}" for n in range(2000)]
+    descriptions = [" ".join(rng.sample(vocabulary, 8)) for _ in range(200)]
+    results = [
+        _style_results(f"style_{s}", [
+            {"loss_category": "mission", "description": text} for text in descriptions
+        ])
+        for s in range(8)
+    ]
+
+    start = time.perf_counter()
+    merged = engine.merge(results, "losses", group_fields=("loss_category",), text_field="description")
+    elapsed = time.perf_counter() - start
+
+    assert len(merged) == 200
+    assert all(len(m["found_by_styles"]) == 8 for m in merged)
+    assert elapsed < 5
@@ -0,0 +1,60 @@
+"""
+Tests for indexed cross-referencing in Step2SynthesisEnhancer
+"""
+import time
+
+from core.agents.step2_agents.synthesis_enhancement import Step2SynthesisEnhancer
+
+from benchmark_synthesis_enhancement import synthetic_synthesis
+
+
+SYNTHESIS = {
+    "key_controllers": [{"identifier": "C1", "name": "Gateway", "controls": ["P1"]}],
+    "critical_control_actions": [
+        {"identifier": "CA-1", "name": "Route", "type": "command", "from": "C1", "to": "P1"},
+        {"identifier": "CA-2", "name": "Throttle", "type": "command", "from": "C1", "to": "P2"},
+    ],
+    "key_feedback_mechanisms": [
+        {"identifier": "FB-1", "name": "Status", "type": "status", "from": "P1", "to": "C1"},
+    ],
+    "trust_boundaries": [
+        {"identifier": "TB-1", "name": "DMZ", "type": "network", "between": ["P2", "C1"]},
+        {"identifier": "TB-2", "name": "Core", "type": "process", "between": ["P1", "P2"]},
+        {"identifier": "TB-3", "name": "Edge", "type": "network", "components": ["C1", "P2"]},
+    ],
+}
+
+
+def test_crossings_and_feedback_are_resolved():
+    enhanced = Step2SynthesisEnhancer().enhance_synthesis(SYNTHESIS)
+    route, throttle = enhanced["critical_control_actions"]
+
+    # C1 -> P1 leaves TB-3 (C1 inside) and no boundary lies between C1 and P1
+    assert route["crosses_boundaries"] == ["TB-3"]
+    assert route["closed_loop"] and route["feedback_mechanisms"][0]["id"] == "FB-1"
+    # TB-1 separates C1 from P2, in either direction; both are inside TB-3
+    assert throttle["crosses_boundaries"] == ["TB-1"]
+    assert not throttle["closed_loop"]
+
+    dmz, core, edge = enhanced["trust_boundaries"]
+    assert [a["action_id"] for a in dmz["crossing_actions"]] == ["CA-2"]
+    assert core["crossing_actions"] == [] and core["risk_level"] == "low"
+    assert [a["action_id"] for a in edge["crossing_actions"]] == ["CA-1"]
+    assert dmz["risk_level"] == "high"
+    assert enhanced["component_hierarchy"]["controllers"]["C1"]["receives_feedback_from"] == ["P1"]
+
+
+def test_enhancer_scales_linearly():
+    enhancer = Step2SynthesisEnhancer()
+
+    def elapsed(action_count):
+        synthesis = synthetic_synthesis(action_count)
+        start = time.perf_counter()
+        enhancer.enhance_synthesis(synthesis)
+        return time.perf_counter() - start
+
+    small, large = elapsed(2_000), elapsed(16_000)
+
+    # Eight times the actions and boundaries; quadratic matching would be ~64x
+    assert large < small * 24
+    assert large < 5